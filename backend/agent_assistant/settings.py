@@ -151,10 +151,15 @@ DUPLICATE_EXCLUDE_PATTERNS = [  # Паттерны для исключения
     # 'Переслано из',   # Не исключаем пересланные сообщения
 ]
 DUPLICATE_DEBUG_LOGGING = False  # Включить отладочное логирование
+DUPLICATE_USE_LSH_INDEX = True  # Искать кандидатов через MinHash/LSH индекс
 
 # Медиафайлы
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Возраст, после которого версии изображений без ссылок удаляет cleanup_renditions
+TELEGRAM_RENDITION_ORPHAN_MIN_AGE_HOURS = config('TELEGRAM_RENDITION_ORPHAN_MIN_AGE_HOURS', default=24, cast=int)
+# Процессы для параллельной генерации версий (0 - в текущем процессе)
+TELEGRAM_RENDITION_WORKERS = config('TELEGRAM_RENDITION_WORKERS', default=4, cast=int)
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -179,6 +184,11 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 20,
 }
 
+# Время жизни закэшированного COUNT пагинации, секунды (0 - не кэшировать)
+PAGINATION_COUNT_CACHE_TTL = config('PAGINATION_COUNT_CACHE_TTL', default=30, cast=int)
+# Таблица без фильтров от этого числа строк считается по статистике PostgreSQL (0 - всегда точный COUNT)
+PAGINATION_COUNT_ESTIMATE_THRESHOLD = config('PAGINATION_COUNT_ESTIMATE_THRESHOLD', default=100000, cast=int)
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Agent Assistant API',
     'DESCRIPTION': 'API для автоматизации рабочего места актерского агента',
@@ -278,6 +288,42 @@ OPENAI_MAX_TOKENS = config('OPENAI_MAX_TOKENS', default=4000, cast=int)
 OPENAI_MAX_RETRIES = config('OPENAI_MAX_RETRIES', default=3, cast=int)
 OPENAI_TIMEOUT = config('OPENAI_TIMEOUT', default=60, cast=int)
 
+# Повторы с экспоненциальной задержкой и джиттером, circuit breaker (состояние в кэше)
+OPENAI_RETRY_BASE_DELAY = config('OPENAI_RETRY_BASE_DELAY', default=0.5, cast=float)
+OPENAI_RETRY_MAX_DELAY = config('OPENAI_RETRY_MAX_DELAY', default=20, cast=float)
+OPENAI_CIRCUIT_FAILURE_THRESHOLD = config('OPENAI_CIRCUIT_FAILURE_THRESHOLD', default=5, cast=int)
+OPENAI_CIRCUIT_RESET_TIMEOUT = config('OPENAI_CIRCUIT_RESET_TIMEOUT', default=30, cast=int)
+
+# Кэш ответов LLM (ключ - текст запроса, версии промпта/схемы, модель, версия каталога артистов)
+LLM_RESPONSE_CACHE_ENABLED = config('LLM_RESPONSE_CACHE_ENABLED', default=True, cast=bool)
+LLM_RESPONSE_CACHE_TTL = config('LLM_RESPONSE_CACHE_TTL', default=86400, cast=int)
+LLM_RESPONSE_CACHE_MAX_ENTRIES = config('LLM_RESPONSE_CACHE_MAX_ENTRIES', default=500, cast=int)
+
+# Фоновый анализ запросов: эндпоинт отвечает 202 с job_id, анализ выполняет пул потоков
+LLM_ANALYSIS_ASYNC = config('LLM_ANALYSIS_ASYNC', default=True, cast=bool)
+LLM_ANALYSIS_WORKERS = config('LLM_ANALYSIS_WORKERS', default=2, cast=int)
+
+# Пакетный анализ: сколько запросов одновременно отправляется в OpenAI и размер пачки
+LLM_BATCH_CONCURRENCY = config('LLM_BATCH_CONCURRENCY', default=4, cast=int)
+LLM_BATCH_MAX_REQUESTS = config('LLM_BATCH_MAX_REQUESTS', default=50, cast=int)
+
+# Метрики LLM: как часто воркер сбрасывает накопленные наблюдения в общий кэш, с
+LLM_METRICS_FLUSH_INTERVAL = config('LLM_METRICS_FLUSH_INTERVAL', default=5, cast=float)
+
+# ==============================
+# TELEGRAM MEDIA SETTINGS
+# ==============================
+
+# Адрес Bot API (переопределяется для локального сервера или тестов)
+TELEGRAM_API_URL = config('TELEGRAM_API_URL', default='https://api.telegram.org')
+# Размер пула keep-alive соединений с Bot API
+TELEGRAM_HTTP_POOL_SIZE = config('TELEGRAM_HTTP_POOL_SIZE', default=10, cast=int)
+
+# Фоновая загрузка медиафайлов из webhook
+TELEGRAM_MEDIA_INGESTION_WORKERS = config('TELEGRAM_MEDIA_INGESTION_WORKERS', default=4, cast=int)
+TELEGRAM_MEDIA_INGESTION_MAX_ATTEMPTS = config('TELEGRAM_MEDIA_INGESTION_MAX_ATTEMPTS', default=3, cast=int)
+TELEGRAM_MEDIA_INGESTION_RETRY_DELAY = config('TELEGRAM_MEDIA_INGESTION_RETRY_DELAY', default=2.0, cast=float)
+
 # ==============================
 # EMAIL CONFIGURATION
 # ==============================
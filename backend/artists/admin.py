@@ -98,7 +98,7 @@ class ArtistAdmin(BaseModelAdmin):
         }),
         ('Рабочие характеристики', {
             'fields': (
-                'availability_status', 'rate_per_day', 'travel_availability'
+                'availability_status', 'rate_per_shift', 'travel_availability'
             )
         }),
         ('Фотографии', {
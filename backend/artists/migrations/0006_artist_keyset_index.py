@@ -0,0 +1,17 @@
+# Generated by Django 4.2.24 on 2026-10-17 02:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('artists', '0005_remove_skill_groups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='artist',
+            index=models.Index(fields=['created_by', 'created_at', 'id'], name='artists_art_created_18d65a_idx'),
+        ),
+    ]
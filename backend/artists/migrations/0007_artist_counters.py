@@ -0,0 +1,54 @@
+# Generated by Django 4.2.24 on 2026-10-17 02:26
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_artist_counters(apps, schema_editor):
+    """Заполнить счетчики навыков, образований, ссылок и фотографий"""
+    Artist = apps.get_model('artists', 'Artist')
+    related_models = {
+        'skills_count': apps.get_model('artists', 'ArtistSkill'),
+        'education_count': apps.get_model('artists', 'ArtistEducation'),
+        'links_count': apps.get_model('artists', 'ArtistLink'),
+        'photos_count': apps.get_model('artists', 'ArtistPhoto'),
+    }
+    values = {}
+    for counter, related_model in related_models.items():
+        count = related_model.objects.filter(artist=OuterRef('pk')).order_by().values('artist').annotate(
+            total=Count('pk')
+        ).values('total')
+        values[counter] = Coalesce(Subquery(count), 0)
+    Artist.objects.update(**values)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('artists', '0006_artist_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='artist',
+            name='education_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Количество образований артиста', verbose_name='Количество образований'),
+        ),
+        migrations.AddField(
+            model_name='artist',
+            name='links_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Количество ссылок артиста', verbose_name='Количество ссылок'),
+        ),
+        migrations.AddField(
+            model_name='artist',
+            name='photos_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Количество фотографий артиста', verbose_name='Количество фотографий'),
+        ),
+        migrations.AddField(
+            model_name='artist',
+            name='skills_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Количество навыков артиста', verbose_name='Количество навыков'),
+        ),
+        migrations.RunPython(fill_artist_counters, migrations.RunPython.noop),
+    ]
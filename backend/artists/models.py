@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from core.models import BaseModel
 
@@ -277,6 +279,43 @@ class Artist(BaseModel):
         help_text="Массив занятых дат артиста в формате ['YYYY-MM-DD', ...]"
     )
     
+    # Денормализованные счетчики связанных записей (поддерживаются сигналами artists.signals)
+    skills_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Количество навыков",
+        help_text="Количество навыков артиста"
+    )
+    
+    education_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Количество образований",
+        help_text="Количество образований артиста"
+    )
+    
+    links_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Количество ссылок",
+        help_text="Количество ссылок артиста"
+    )
+    
+    photos_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Количество фотографий",
+        help_text="Количество фотографий артиста"
+    )
+    
+    # Счетчик -> related_name связанных записей
+    COUNTERS = {
+        'skills_count': 'skills',
+        'education_count': 'education',
+        'links_count': 'links',
+        'photos_count': 'photos',
+    }
+    
     class Meta(BaseModel.Meta):
         verbose_name = "Артист"
         verbose_name_plural = "Артисты"
@@ -286,6 +325,8 @@ class Artist(BaseModel):
             models.Index(fields=['age']),
             models.Index(fields=['availability_status']),
             models.Index(fields=['city']),
+            # Keyset пагинация списка артистов пользователя
+            models.Index(fields=['created_by', 'created_at', 'id']),
         ]
     
     def save(self, *args, **kwargs):
@@ -316,6 +357,31 @@ class Artist(BaseModel):
         if self.middle_name:
             return f"{self.last_name} {self.first_name[0]}.{self.middle_name[0]}."
         return f"{self.last_name} {self.first_name[0]}."
+    
+    @classmethod
+    def refresh_counters(cls, artist_ids=None, counters=None):
+        """
+        Пересчитывает счетчики связанных записей одним UPDATE.
+        
+        Args:
+            artist_ids: ID артистов (None - все артисты)
+            counters: Имена счетчиков из COUNTERS (None - все)
+        
+        Returns:
+            Количество обновленных артистов
+        """
+        values = {}
+        for counter in counters or cls.COUNTERS:
+            related_model = cls._meta.get_field(cls.COUNTERS[counter]).related_model
+            count = related_model.objects.filter(artist=OuterRef('pk')).order_by().values('artist').annotate(
+                total=Count('pk')
+            ).values('total')
+            values[counter] = Coalesce(Subquery(count), 0)
+        
+        queryset = cls.objects.all()
+        if artist_ids is not None:
+            queryset = queryset.filter(pk__in=artist_ids)
+        return queryset.update(**values)
 
 
 class ArtistSkill(models.Model):
@@ -157,7 +157,7 @@ class ArtistSerializer(BaseModelSerializer):
             
             # Рабочие характеристики
             'availability_status', 'availability_status_display',
-            'rate_per_day', 'travel_availability',
+            'rate_per_shift', 'travel_availability',
             
             # Связанные объекты
             'skills', 'education', 'links', 'photos',
@@ -187,7 +187,7 @@ class ArtistSerializer(BaseModelSerializer):
             'telegram_username': {'help_text': 'Имя пользователя в Telegram'},
             'city': {'help_text': 'Город, где проживает артист'},
             'availability_status': {'help_text': 'Доступен ли артист для работы'},
-            'rate_per_day': {'help_text': 'Ставка оплаты за рабочий день'},
+            'rate_per_shift': {'help_text': 'Ставка оплаты за смену'},
             'travel_availability': {'help_text': 'Готов ли артист к работе в других городах'},
         }
     
@@ -211,20 +211,24 @@ class ArtistListSerializer(BaseListSerializer):
         help_text="Текстовое представление статуса доступности"
     )
     
-    # Связанные объекты
+    # Связанные объекты; счетчики - денормализованные поля Artist
     skills = serializers.SerializerMethodField(
         help_text="Список навыков артиста"
     )
-    skills_count = serializers.SerializerMethodField(
+    skills_count = serializers.IntegerField(
+        read_only=True,
         help_text="Количество навыков артиста"
     )
-    education_count = serializers.SerializerMethodField(
+    education_count = serializers.IntegerField(
+        read_only=True,
         help_text="Количество образований артиста"
     )
-    links_count = serializers.SerializerMethodField(
+    links_count = serializers.IntegerField(
+        read_only=True,
         help_text="Количество ссылок артиста"
     )
-    photos_count = serializers.SerializerMethodField(
+    photos_count = serializers.IntegerField(
+        read_only=True,
         help_text="Количество фотографий артиста"
     )
     
@@ -258,30 +262,9 @@ class ArtistListSerializer(BaseListSerializer):
             skills.append({
                 'id': artist_skill.skill.id,
                 'name': artist_skill.skill.name,
-                'skill_group': artist_skill.skill.skill_group.name,
+                # Группы навыков удалены (0005_remove_skill_groups), ключ сохранен для клиента
+                'skill_group': None,
                 'proficiency_level': artist_skill.proficiency_level,
                 'proficiency_level_display': artist_skill.get_proficiency_level_display(),
             })
         return skills
-    
-    def get_skills_count(self, obj):
-        """Возвращает количество навыков артиста."""
-        return obj.skills.count()
-    
-    def get_education_count(self, obj):
-        """Возвращает количество образований артиста."""
-        if hasattr(obj, '_prefetched_objects_cache') and 'education' in obj._prefetched_objects_cache:
-            return len(obj.education.all())
-        return obj.education.count()
-    
-    def get_links_count(self, obj):
-        """Возвращает количество ссылок артиста."""
-        if hasattr(obj, '_prefetched_objects_cache') and 'links' in obj._prefetched_objects_cache:
-            return len(obj.links.all())
-        return obj.links.count()
-    
-    def get_photos_count(self, obj):
-        """Возвращает количество фотографий артиста."""
-        if hasattr(obj, '_prefetched_objects_cache') and 'photos' in obj._prefetched_objects_cache:
-            return len(obj.photos.all())
-        return obj.photos.count()
@@ -0,0 +1,38 @@
+"""
+Сигналы приложения artists
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Artist, ArtistEducation, ArtistLink, ArtistPhoto, ArtistSkill
+
+# Модель связанных записей -> счетчик артиста
+COUNTER_BY_MODEL = {
+    ArtistSkill: 'skills_count',
+    ArtistEducation: 'education_count',
+    ArtistLink: 'links_count',
+    ArtistPhoto: 'photos_count',
+}
+
+
+@receiver(post_save, sender=ArtistSkill)
+@receiver(post_save, sender=ArtistEducation)
+@receiver(post_save, sender=ArtistLink)
+@receiver(post_save, sender=ArtistPhoto)
+def refresh_counters_on_save(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Пересчитывает счетчик артиста при добавлении связанной записи"""
+    if raw:
+        # Загрузка фикстур: записи могут прийти раньше артиста
+        return
+    if not created and update_fields is not None and 'artist' not in update_fields:
+        return
+    Artist.refresh_counters([instance.artist_id], [COUNTER_BY_MODEL[sender]])
+
+
+@receiver(post_delete, sender=ArtistSkill)
+@receiver(post_delete, sender=ArtistEducation)
+@receiver(post_delete, sender=ArtistLink)
+@receiver(post_delete, sender=ArtistPhoto)
+def refresh_counters_on_delete(sender, instance, **kwargs):
+    """Пересчитывает счетчик артиста при удалении связанной записи"""
+    Artist.refresh_counters([instance.artist_id], [COUNTER_BY_MODEL[sender]])
@@ -1,7 +1,7 @@
 from rest_framework import viewsets, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Q
+from django.db.models import Count, Prefetch, Q
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiTypes
 
 from .models import (
@@ -17,7 +17,7 @@ from core.views import BaseReferenceViewSet, BaseModelViewSet
 from core.permissions import OwnerPermission
 from core.optimizations import OptimizedQuerySets, QueryOptimizer
 from core.caching import QuerySetCache, UserDataCache, CacheInvalidationService
-from core.pagination import OptimizedPageNumberPagination
+from core.pagination import CursorOrPageNumberPagination
 
 
 class SkillViewSet(BaseReferenceViewSet):
@@ -268,7 +268,9 @@ class ArtistViewSet(BaseModelViewSet):
     serializer_class = ArtistSerializer
     list_serializer_class = ArtistListSerializer
     permission_classes = [permissions.IsAuthenticated, OwnerPermission]
-    pagination_class = OptimizedPageNumberPagination
+    pagination_class = CursorOrPageNumberPagination
+    # Действия, отдающие списки через ArtistListSerializer
+    list_actions = ('list', 'by_skills')
     
     def get_queryset(self):
         """Возвращает только артистов, созданных текущим пользователем."""
@@ -276,11 +278,19 @@ class ArtistViewSet(BaseModelViewSet):
         # Фильтруем только по артистам, созданным текущим пользователем
         queryset = queryset.filter(created_by=self.request.user)
         
+        if self.action in self.list_actions:
+            # Списку нужны только навыки: счетчики хранятся в самом артисте
+            return QueryOptimizer.optimize_list_queryset(
+                queryset,
+                prefetch_fields=[self.list_skills_prefetch()],
+                select_related_fields=['created_by']
+            )
+        
         # Применяем оптимизации
         return QueryOptimizer.optimize_list_queryset(
             queryset,
             prefetch_fields=[
-                'skills__skill__skill_group',
+                'skills__skill',
                 'education__education',
                 'links',
                 'photos',
@@ -291,10 +301,32 @@ class ArtistViewSet(BaseModelViewSet):
     
     def get_serializer_class(self):
         """Возвращает соответствующий сериализатор в зависимости от действия."""
-        if self.action == 'list':
+        if self.action in self.list_actions:
             return ArtistListSerializer
         return ArtistSerializer
     
+    @staticmethod
+    def filter_by_skills(queryset, skill_ids, match_all=False):
+        """
+        Артисты с любым (match_all=False) или со всеми указанными навыками.
+        
+        Проверка выполняется в БД одним подзапросом: для "все навыки" -
+        GROUP BY artist HAVING COUNT(DISTINCT skill) = k, поэтому queryset
+        не размножается JOIN по навыкам и не требует distinct().
+        """
+        skill_ids = set(skill_ids)
+        matching = ArtistSkill.objects.filter(skill_id__in=skill_ids).order_by().values('artist')
+        if match_all:
+            matching = matching.annotate(
+                matched_skills=Count('skill', distinct=True)
+            ).filter(matched_skills=len(skill_ids)).values('artist')
+        return queryset.filter(pk__in=matching)
+    
+    @staticmethod
+    def list_skills_prefetch():
+        """Навыки для ArtistListSerializer одним запросом вместе с навыком"""
+        return Prefetch('skills', queryset=ArtistSkill.objects.select_related('skill'))
+    
     @action(detail=False, methods=['get'])
     def search(self, request):
         """Поиск артистов по различным параметрам."""
@@ -342,20 +374,11 @@ class ArtistViewSet(BaseModelViewSet):
         except ValueError:
             return Response({'error': 'Invalid skill_ids format'}, status=400)
         
-        # Получаем артистов, которые обладают всеми указанными навыками
-        artists = self.get_queryset().filter(
-            skills__skill__id__in=skill_ids_list
-        ).distinct()
-        
-        # Дополнительная фильтрация: артист должен обладать всеми указанными навыками
-        filtered_artists = []
-        for artist in artists:
-            artist_skill_ids = set(artist.skills.values_list('skill__id', flat=True))
-            if all(skill_id in artist_skill_ids for skill_id in skill_ids_list):
-                filtered_artists.append(artist)
+        queryset = self.filter_by_skills(self.get_queryset(), skill_ids_list, match_all=True)
         
-        serializer = self.get_serializer(filtered_artists, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
     
     @action(detail=False, methods=['get'], url_path='for-selection')
     @extend_schema(
@@ -422,6 +445,12 @@ class ArtistViewSet(BaseModelViewSet):
                 location=OpenApiParameter.QUERY,
                 description='Список ID навыков через запятую'
             ),
+            OpenApiParameter(
+                name='skills_match',
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                description='Совпадение навыков: any - любой из skill_ids (по умолчанию), all - все'
+            ),
             OpenApiParameter(
                 name='hair_color',
                 type=OpenApiTypes.STR,
@@ -457,12 +486,7 @@ class ArtistViewSet(BaseModelViewSet):
         # Применяем оптимизации
         queryset = QueryOptimizer.optimize_list_queryset(
             queryset,
-            prefetch_fields=[
-                'skills__skill__skill_group',
-                'education__education',
-                'links',
-                'photos'
-            ],
+            prefetch_fields=[self.list_skills_prefetch()],
             select_related_fields=['created_by']
         )
         
@@ -477,6 +501,7 @@ class ArtistViewSet(BaseModelViewSet):
         height_min = request.query_params.get('height_min', None)
         height_max = request.query_params.get('height_max', None)
         skill_ids = request.query_params.get('skill_ids', None)
+        skills_match = request.query_params.get('skills_match', 'any')
         hair_color = request.query_params.get('hair_color', None)
         eye_color = request.query_params.get('eye_color', None)
         body_type = request.query_params.get('body_type', None)
@@ -523,8 +548,8 @@ class ArtistViewSet(BaseModelViewSet):
         if skill_ids:
             try:
                 skill_ids_list = [int(sid.strip()) for sid in skill_ids.split(',')]
-                # Артист должен обладать хотя бы одним из указанных навыков
-                queryset = queryset.filter(skills__skill__id__in=skill_ids_list).distinct()
+                # Хотя бы один из указанных навыков или все (skills_match=all)
+                queryset = self.filter_by_skills(queryset, skill_ids_list, match_all=skills_match == 'all')
             except ValueError:
                 return Response({'error': 'Invalid skill_ids format'}, status=400)
         
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.24 on 2026-10-17 03:00
+
+from django.db import migrations
+
+
+def fill_blocking_keys(apps, schema_editor):
+    """Заполнить ключи блоков существующих кинокомпаний"""
+    from companies.services import company_matching_service
+
+    Company = apps.get_model('companies', 'Company')
+    company_matching_service.blocker.rebuild(
+        Company.objects.all(),
+        company_matching_service.blocking_keys,
+        key_model=apps.get_model('core', 'BlockingKey'),
+    )
+
+
+def clear_blocking_keys(apps, schema_editor):
+    """Удалить ключи блоков кинокомпаний"""
+    apps.get_model('core', 'BlockingKey').objects.filter(scope='companies.company').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0002_add_search_indexes'),
+        ('core', '0004_blockingkey'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_blocking_keys, clear_blocking_keys),
+    ]
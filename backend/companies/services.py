@@ -1,9 +1,10 @@
 import yaml
 import os
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set
 from django.conf import settings
 from django.db.models import Q
 from rapidfuzz import fuzz, process
+from core.blocking import CandidateBlocker
 from .models import Company
 
 
@@ -15,6 +16,7 @@ class CompanyMatchingService:
         self.thresholds = self.config['search']['thresholds']['companies']
         self.field_weights = self.config['search']['field_weights']['companies']
         self.fuzzy_config = self.config['search']['fuzzy_matching']['rapidfuzz']
+        self.blocker = CandidateBlocker(self.config)
         
     def _load_config(self) -> Dict[str, Any]:
         """Загружает конфигурацию из search_config.yaml"""
@@ -89,8 +91,8 @@ class CompanyMatchingService:
         if not any(search_data.values()):
             return []
         
-        # Получаем все активные компании
-        companies = Company.objects.filter(is_active=True)
+        # Отбираем кандидатов по ключам блоков вместо перебора всех компаний
+        companies = self._get_candidates(search_data)
         
         matches = []
         
@@ -150,6 +152,37 @@ class CompanyMatchingService:
         matches.sort(key=lambda x: x['score'], reverse=True)
         return matches[:limit]
     
+    def blocking_keys(self, company: Company) -> Set[str]:
+        """Ключи блоков кинокомпании для индекса кандидатов"""
+        return self.blocker.record_keys(
+            company,
+            text_fields=['name'],
+            domain_fields=['website', 'email'],
+            exact_fields=['email'],
+        )
+    
+    def _get_candidates(self, search_data: Dict[str, str]):
+        """
+        Отбирает кандидатов для fuzzy matching: токены названия,
+        домены сайта и email
+        """
+        keys = set()
+        
+        name = search_data.get('name')
+        if name:
+            keys |= self.blocker.text_keys(['name'], name)
+        
+        website = search_data.get('website')
+        if website:
+            keys |= self.blocker.domain_keys(website)
+        
+        email = search_data.get('email')
+        if email:
+            keys |= self.blocker.exact_keys('email', email)
+            keys |= self.blocker.domain_keys(email)
+        
+        return self.blocker.candidates(Company.objects.filter(is_active=True), keys)
+    
     def search_by_name(self, name: str, limit: int = 5) -> List[Dict[str, Any]]:
         """
         Ищет компании по названию
@@ -0,0 +1,26 @@
+"""
+Сигналы приложения companies
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Company
+from .services import company_matching_service
+
+BLOCKING_FIELDS = {'name', 'website', 'email'}
+
+
+@receiver(post_save, sender=Company)
+def index_company_blocking_keys(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Обновляет ключи блоков записи для отбора кандидатов"""
+    if raw or (update_fields and not BLOCKING_FIELDS & set(update_fields)):
+        return
+    company_matching_service.blocker.reindex(
+        instance, company_matching_service.blocking_keys(instance)
+    )
+
+
+@receiver(post_delete, sender=Company)
+def remove_company_blocking_keys(sender, instance, **kwargs):
+    """Удаляет ключи блоков удаленной записи"""
+    company_matching_service.blocker.remove(instance)
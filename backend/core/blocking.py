@@ -0,0 +1,198 @@
+"""
+Отбор кандидатов (blocking) перед fuzzy matching
+"""
+import string
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+from urllib.parse import urlparse
+
+from django.db import transaction
+from django.db.models import Count, Model, QuerySet
+
+from .models import BlockingKey
+
+
+class CandidateBlocker:
+    """
+    Дешевый отбор кандидатов для сервисов поиска совпадений.
+
+    Для каждой записи хранятся нормализованные ключи блоков в таблице
+    BlockingKey: начала и окончания токенов текстовых полей, домены сайта
+    и email, точные значения. Запись становится кандидатом, если делит
+    с запросом хотя бы один ключ; поиск идет точным совпадением по индексу
+    (scope, key), а кандидаты ранжируются по числу общих ключей до
+    ограничения их количества, поэтому лучшие совпадения не отсекаются.
+    """
+
+    DEFAULT_KEY_LENGTH = 3
+    DEFAULT_MAX_TOKENS = 5
+    DEFAULT_INDEX_MAX_TOKENS = 100
+    DEFAULT_MAX_CANDIDATES = 500
+
+    DOMAIN_FIELD = 'domain'
+    KEY_MAX_LENGTH = 255
+    BATCH_SIZE = 1000
+
+    _punctuation_table = str.maketrans(string.punctuation, ' ' * len(string.punctuation))
+
+    def __init__(self, config: Dict[str, Any]):
+        blocking_config = config.get('search', {}).get('blocking', {})
+        self.key_length = blocking_config.get('key_length', self.DEFAULT_KEY_LENGTH)
+        self.max_tokens = blocking_config.get('max_tokens', self.DEFAULT_MAX_TOKENS)
+        self.index_max_tokens = blocking_config.get('index_max_tokens', self.DEFAULT_INDEX_MAX_TOKENS)
+        self.max_candidates = blocking_config.get('max_candidates', self.DEFAULT_MAX_CANDIDATES)
+        self.ignored_domains = {
+            domain.lower() for domain in blocking_config.get('ignored_domains', [])
+        }
+
+    def _split(self, text: str, limit: int) -> List[str]:
+        """Уникальные нормализованные токены, самые длинные - первыми"""
+        if not text:
+            return []
+        words = text.lower().translate(self._punctuation_table).split()
+        unique_words = sorted(set(words), key=lambda word: (-len(word), word))
+        return unique_words[:limit]
+
+    def tokens(self, text: str) -> List[str]:
+        """Токены запроса: только самые длинные"""
+        return self._split(text, self.max_tokens)
+
+    def _keys_for_tokens(self, tokens: Iterable[str]) -> Set[str]:
+        """Начала и окончания токенов, короткие токены целиком"""
+        keys = set()
+        for token in tokens:
+            if len(token) <= self.key_length:
+                keys.add(token)
+            else:
+                keys.add(token[:self.key_length])
+                keys.add(token[-self.key_length:])
+        return keys
+
+    def token_keys(self, text: str) -> Set[str]:
+        """Ключи блоков текста запроса"""
+        return self._keys_for_tokens(self.tokens(text))
+
+    @staticmethod
+    def extract_domain(value: str) -> str:
+        """Извлекает домен из адреса сайта или email"""
+        if not value:
+            return ""
+        value = value.strip().lower()
+
+        if '@' in value and '://' not in value:
+            domain = value.rsplit('@', 1)[1]
+        else:
+            if '://' not in value:
+                value = f'http://{value}'
+            domain = urlparse(value).hostname or ''
+
+        if domain.startswith('www.'):
+            domain = domain[4:]
+        return domain.strip('.')
+
+    def _key(self, field: str, value: str) -> str:
+        return f'{field}:{value}'[:self.KEY_MAX_LENGTH]
+
+    def text_keys(self, fields: Iterable[str], text: str) -> Set[str]:
+        """Ключи запроса по текстовым полям"""
+        token_keys = self.token_keys(text)
+        return {self._key(field, key) for field in fields for key in token_keys}
+
+    def domain_keys(self, value: str) -> Set[str]:
+        """Ключ домена сайта или email; публичные почтовые домены блок не образуют"""
+        domain = self.extract_domain(value)
+        if not domain or domain in self.ignored_domains:
+            return set()
+        return {self._key(self.DOMAIN_FIELD, domain)}
+
+    def exact_keys(self, field: str, value: str) -> Set[str]:
+        """Ключ точного значения поля без учета регистра"""
+        value = (value or '').strip().lower()
+        return {self._key(field, f'={value}')} if value else set()
+
+    def record_keys(
+        self,
+        instance: Model,
+        text_fields: Iterable[str] = (),
+        domain_fields: Iterable[str] = (),
+        exact_fields: Iterable[str] = (),
+    ) -> Set[str]:
+        """Все ключи блоков записи для индекса кандидатов"""
+        keys = set()
+        for field in text_fields:
+            tokens = self._split(getattr(instance, field, None), self.index_max_tokens)
+            keys |= {self._key(field, key) for key in self._keys_for_tokens(tokens)}
+        for field in domain_fields:
+            keys |= self.domain_keys(getattr(instance, field, None))
+        for field in exact_fields:
+            keys |= self.exact_keys(field, getattr(instance, field, None))
+        return keys
+
+    def reindex(self, instance: Model, keys: Set[str]):
+        """Синхронизирует ключи записи: удаляет устаревшие и добавляет новые"""
+        scope = instance._meta.label_lower
+        stored = BlockingKey.objects.filter(scope=scope, object_id=instance.pk)
+        with transaction.atomic():
+            existing = set(stored.values_list('key', flat=True))
+            if existing - keys:
+                stored.filter(key__in=existing - keys).delete()
+            BlockingKey.objects.bulk_create([
+                BlockingKey(scope=scope, object_id=instance.pk, key=key)
+                for key in keys - existing
+            ])
+
+    def remove(self, instance: Model):
+        """Удаляет ключи записи из индекса"""
+        BlockingKey.objects.filter(
+            scope=instance._meta.label_lower, object_id=instance.pk
+        ).delete()
+
+    def rebuild(
+        self,
+        queryset: QuerySet,
+        key_builder: Callable[[Model], Set[str]],
+        key_model: Optional[type] = None,
+    ):
+        """
+        Перестраивает ключи всех записей выборки пакетами.
+
+        key_model позволяет передать историческую модель BlockingKey
+        из миграции данных.
+        """
+        key_model = key_model or BlockingKey
+        scope = queryset.model._meta.label_lower
+        key_model.objects.filter(scope=scope).delete()
+
+        rows = []
+        for instance in queryset.order_by('pk').iterator(chunk_size=self.BATCH_SIZE):
+            rows.extend(
+                key_model(scope=scope, object_id=instance.pk, key=key)
+                for key in key_builder(instance)
+            )
+            if len(rows) >= self.BATCH_SIZE:
+                key_model.objects.bulk_create(rows, batch_size=self.BATCH_SIZE)
+                rows = []
+        if rows:
+            key_model.objects.bulk_create(rows, batch_size=self.BATCH_SIZE)
+
+    def candidates(self, queryset: QuerySet, keys: Set[str]) -> QuerySet:
+        """
+        Кандидаты выборки, делящие с запросом ключи блоков.
+
+        Записи ранжируются по числу общих ключей, и только затем
+        ограничиваются max_candidates.
+        """
+        if not keys:
+            return queryset.none()
+
+        ranked = (
+            BlockingKey.objects
+            .filter(
+                scope=queryset.model._meta.label_lower,
+                key__in=keys,
+                object_id__in=queryset.order_by().values('pk'),
+            )
+            .values('object_id')
+            .annotate(hits=Count('key'))
+            .order_by('-hits', 'object_id')[:self.max_candidates]
+        )
+        return queryset.filter(pk__in=[row['object_id'] for row in ranked])
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.24 on 2026-10-17 02:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlockingKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(help_text='Метка модели записи, например companies.company', max_length=100, verbose_name='Модель')),
+                ('object_id', models.PositiveBigIntegerField(help_text='Первичный ключ записи', verbose_name='ID записи')),
+                ('key', models.CharField(help_text='Нормализованный ключ блока', max_length=255, verbose_name='Ключ')),
+            ],
+            options={
+                'verbose_name': 'Ключ блока',
+                'verbose_name_plural': 'Ключи блоков',
+                'indexes': [models.Index(fields=['scope', 'key', 'object_id'], name='core_blockingkey_lookup')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='blockingkey',
+            constraint=models.UniqueConstraint(fields=('scope', 'object_id', 'key'), name='core_blockingkey_unique'),
+        ),
+    ]
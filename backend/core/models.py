@@ -223,4 +223,46 @@ class BackupRecord(models.Model):
         """Возвращает время создания бэкапа в секундах"""
         if self.completed_at and self.created_at:
             return (self.completed_at - self.created_at).total_seconds()
-        return None
\ No newline at end of file
+        return None
+
+class BlockingKey(models.Model):
+    """
+    Ключ блока записи для отбора кандидатов перед fuzzy matching.
+
+    Хранит нормализованные ключи (начала и окончания токенов, домены,
+    точные значения) в индексируемом виде, поэтому отбор кандидатов
+    выполняется точным поиском по индексу, а не ILIKE по всей таблице.
+    """
+
+    scope = models.CharField(
+        max_length=100,
+        verbose_name="Модель",
+        help_text="Метка модели записи, например companies.company"
+    )
+
+    object_id = models.PositiveBigIntegerField(
+        verbose_name="ID записи",
+        help_text="Первичный ключ записи"
+    )
+
+    key = models.CharField(
+        max_length=255,
+        verbose_name="Ключ",
+        help_text="Нормализованный ключ блока"
+    )
+
+    class Meta:
+        verbose_name = "Ключ блока"
+        verbose_name_plural = "Ключи блоков"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['scope', 'object_id', 'key'],
+                name='core_blockingkey_unique',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['scope', 'key', 'object_id'], name='core_blockingkey_lookup'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope}#{self.object_id}: {self.key}"
@@ -2,25 +2,295 @@
 Оптимизированная пагинация для улучшения производительности
 """
 
-from typing import List, Dict, Any, Optional
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-from django.db.models import QuerySet
+import hashlib
+import time
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator, Page, EmptyPage, PageNotAnInteger
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class CountProvider:
+    """
+    Число записей для пагинации.
+    
+    Точные числа кэшируются: ключ - сигнатура фильтра (SQL и параметры
+    запроса без сортировки) и версия таблицы модели. Версия увеличивается
+    сигналами post_save и post_delete моделей из
+    core.signals.PAGINATION_COUNT_SOURCES, поэтому новые и удаленные записи
+    сразу меняют число; массовые update()/delete() без сигналов и изменения
+    остальных связанных таблиц учитываются не позже PAGINATION_COUNT_CACHE_TTL.
+    
+    Для таблицы без фильтров на PostgreSQL число берется из статистики
+    планировщика (pg_class.reltuples), если в ней не меньше
+    PAGINATION_COUNT_ESTIMATE_THRESHOLD строк: точный COUNT(*) такой
+    таблицы - полное сканирование. Такое число помечается как оценка.
+    """
+    
+    KEY_PREFIX = 'pagination:count:'
+    VERSION_KEY = 'pagination:count_version:{label}'
+    ESTIMATE_KEY = 'pagination:estimate:{alias}:{table}'
+    
+    def __init__(self, timeout: Optional[int] = None, estimate_threshold: Optional[int] = None):
+        self.timeout = timeout
+        self.estimate_threshold = estimate_threshold
+    
+    def get_timeout(self) -> int:
+        if self.timeout is not None:
+            return self.timeout
+        return getattr(settings, 'PAGINATION_COUNT_CACHE_TTL', 30)
+    
+    def get_estimate_threshold(self) -> int:
+        if self.estimate_threshold is not None:
+            return self.estimate_threshold
+        return getattr(settings, 'PAGINATION_COUNT_ESTIMATE_THRESHOLD', 100000)
+    
+    def get_count(self, queryset: QuerySet) -> Tuple[int, bool]:
+        """
+        Число записей queryset
+        
+        Returns:
+            (число, True - точное число / False - оценка по статистике)
+        """
+        estimate = self.estimate(queryset)
+        if estimate is not None:
+            return estimate, False
+        return self.count(queryset), True
+    
+    def count(self, queryset: QuerySet) -> int:
+        """Точное число записей (из кэша, если сигнатура уже считалась)"""
+        timeout = self.get_timeout()
+        if timeout <= 0:
+            return queryset.count()
+        try:
+            sql, params = queryset.order_by().query.sql_with_params()
+        except EmptyResultSet:
+            # Фильтр заведомо пустой (например, id__in=[])
+            return 0
+        
+        signature = hashlib.md5(f'{sql}:{params!r}'.encode()).hexdigest()
+        key = f'{self.KEY_PREFIX}{queryset.model._meta.label_lower}:{self.version(queryset.model)}:{signature}'
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, timeout)
+        return count
+    
+    def estimate(self, queryset: QuerySet) -> Optional[int]:
+        """Оценка числа строк таблицы без фильтров или None, если нужен точный COUNT"""
+        threshold = self.get_estimate_threshold()
+        if threshold <= 0 or not self.supports_estimate(queryset):
+            return None
+        query = queryset.query
+        if query.where or query.distinct or query.combinator or query.is_sliced:
+            return None
+        
+        table = queryset.model._meta.db_table
+        key = self.ESTIMATE_KEY.format(alias=queryset.db, table=table)
+        estimate = cache.get(key)
+        if estimate is None:
+            estimate = self.table_estimate(queryset.db, table)
+            cache.set(key, estimate, self.get_timeout())
+        # До первого ANALYZE reltuples = -1 (или 0)
+        return estimate if estimate >= threshold else None
+    
+    @staticmethod
+    def supports_estimate(queryset: QuerySet) -> bool:
+        return connections[queryset.db].vendor == 'postgresql'
+    
+    @staticmethod
+    def table_estimate(alias: str, table: str) -> int:
+        """Число строк таблицы по статистике планировщика PostgreSQL"""
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+            row = cursor.fetchone()
+        return int(row[0]) if row else -1
+    
+    def version(self, model) -> int:
+        """Текущая версия таблицы модели"""
+        key = self.VERSION_KEY.format(label=model._meta.label_lower)
+        version = cache.get(key)
+        if version is None:
+            # Ключ версии вытеснен: начинаем с нового значения, чтобы не совпасть со старыми
+            cache.add(key, time.time_ns(), None)
+            version = cache.get(key)
+        return version
+    
+    def invalidate(self, model):
+        """Сбрасывает закэшированные числа записей модели"""
+        try:
+            cache.incr(self.VERSION_KEY.format(label=model._meta.label_lower))
+        except ValueError:
+            # Версии нет - закэшированных чисел с ней тоже нет
+            pass
+
+
+class EstimatedPage(Page):
+    """
+    Страница при оцененном числе записей: есть ли следующая страница,
+    известно по лишней строке выборки, а не по num_pages из оценки
+    """
+    
+    def __init__(self, object_list, number, paginator, has_more: bool):
+        super().__init__(object_list, number, paginator)
+        self.has_more = has_more
+    
+    def has_next(self):
+        return self.has_more
+    
+    def end_index(self):
+        return self.start_index() + len(self.object_list) - 1
+
+
+class CountingPaginator(Paginator):
+    """
+    Paginator с числом записей из CountProvider.
+    
+    count_exact показывает, точное ли число записей. При оценке номер
+    страницы не ограничивается num_pages, а страница выбирается с одной
+    лишней строкой: она показывает, есть ли следующая. На последней
+    странице число записей становится известно точно и заменяет оценку.
+    """
+    
+    def __init__(self, object_list, per_page, orphans=0, allow_empty_first_page=True, count_provider=None):
+        super().__init__(object_list, per_page, orphans, allow_empty_first_page)
+        self.count_provider = count_provider or pagination_count_provider
+        self.count_exact = True
+    
+    @cached_property
+    def count(self):
+        if not isinstance(self.object_list, QuerySet):
+            return super().count
+        count, self.count_exact = self.count_provider.get_count(self.object_list)
+        return count
+    
+    def validate_number(self, number):
+        """При оценке числа записей номер страницы сверху не ограничивается"""
+        if self.count_exact:
+            return super().validate_number(number)
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_("That page number is not an integer"))
+        if number < 1:
+            raise EmptyPage(_("That page number is less than 1"))
+        return number
+    
+    def page(self, number):
+        count = self.count  # заодно определяет count_exact
+        if not self.count_exact:
+            return self._estimated_page(number)
+        
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        if top + self.orphans >= count:
+            top = count
+        return self._get_page(self.slice(bottom, top), number, self)
+    
+    def _estimated_page(self, number) -> EstimatedPage:
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.slice(bottom, bottom + self.per_page + 1))
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not rows and number > 1:
+            raise EmptyPage(_("That page contains no results"))
+        
+        seen = bottom + len(rows)
+        if not has_more:
+            # Последняя страница: число записей известно точно
+            self.count, self.count_exact = seen, True
+        elif self.count <= seen:
+            # Оценка меньше уже просмотренного - поднимаем ее до нижней границы
+            self.count = seen + 1
+        self.__dict__.pop('num_pages', None)
+        return EstimatedPage(rows, number, self, has_more)
+    
+    def slice(self, bottom: int, top: int):
+        """Записи страницы"""
+        return self.object_list[bottom:top]
+
+
+class TwoPhasePaginator(CountingPaginator):
+    """
+    Paginator в две фазы.
+    
+    Сначала выбираются только id страницы (ORDER BY ... LIMIT/OFFSET по
+    узкому индексу, без JOIN для select_related), затем строки страницы
+    загружаются по id со всеми select_related/prefetch_related исходного
+    queryset и расставляются в порядке первой фазы. Если сортировка не
+    однозначна, к ней добавляется pk, чтобы записи с одинаковым ключом
+    не повторялись и не терялись между страницами.
+    """
+    
+    def slice(self, bottom: int, top: int):
+        if not self._is_two_phase():
+            return super().slice(bottom, top)
+        
+        ordered = self._with_tiebreaker(self.object_list)
+        ids = list(
+            ordered.select_related(None).prefetch_related(None).values_list('pk', flat=True)[bottom:top]
+        )
+        if not ids:
+            return []
+        
+        rows = {row.pk: row for row in self.object_list.filter(pk__in=ids).order_by()}
+        return [rows[pk] for pk in ids if pk in rows]
+    
+    def _is_two_phase(self) -> bool:
+        """Объединения и уже срезанные queryset загружаются обычным способом"""
+        return (
+            isinstance(self.object_list, QuerySet)
+            and not self.object_list.query.combinator
+            and not self.object_list.query.is_sliced
+        )
+    
+    @staticmethod
+    def _with_tiebreaker(queryset: QuerySet) -> QuerySet:
+        """Добавляет pk в конец сортировки, если она не однозначна"""
+        query = queryset.query
+        ordering = list(query.order_by) or (list(queryset.model._meta.ordering) if query.default_ordering else [])
+        if not all(isinstance(field, str) for field in ordering):
+            return queryset
+        names = [field.lstrip('-') for field in ordering]
+        if 'pk' in names or queryset.model._meta.pk.name in names:
+            return queryset
+        descending = bool(ordering) and ordering[-1].startswith('-')
+        return queryset.order_by(*ordering, '-pk' if descending else 'pk')
 
 
 class OptimizedPageNumberPagination(PageNumberPagination):
-    """Оптимизированная пагинация с улучшенной производительностью"""
+    """
+    Оптимизированная пагинация с улучшенной производительностью: число
+    записей кэшируется или оценивается (CountProvider), count_exact в
+    ответе показывает, точное ли оно
+    """
     
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
+    django_paginator_class = CountingPaginator
     
     def get_paginated_response(self, data):
         """Возвращает оптимизированный ответ с пагинацией"""
         return Response({
             'count': self.page.paginator.count,
+            'count_exact': self.page.paginator.count_exact,
             'next': self.get_next_link(),
             'previous': self.get_previous_link(),
             'page_size': self.get_page_size(self.request),
@@ -31,43 +301,21 @@ class OptimizedPageNumberPagination(PageNumberPagination):
 
 
 class FastPageNumberPagination(PageNumberPagination):
-    """Быстрая пагинация для больших списков"""
+    """
+    Быстрая пагинация для больших списков: страница загружается в две
+    фазы (TwoPhasePaginator), число записей - из CountProvider
+    """
     
     page_size = 50
     page_size_query_param = 'page_size'
     max_page_size = 200
-    
-    def paginate_queryset(self, queryset, request, view=None):
-        """Оптимизированная пагинация с использованием only()"""
-        page_size = self.get_page_size(request)
-        
-        # Используем only() для загрузки только ID при подсчете
-        count_queryset = queryset.only('id')
-        
-        paginator = self.django_paginator_class(count_queryset, page_size)
-        page_number = request.query_params.get(self.page_query_param, 1)
-        
-        if page_number in self.last_page_strings:
-            page_number = paginator.num_pages
-        
-        try:
-            self.page = paginator.page(page_number)
-        except (PageNotAnInteger, EmptyPage):
-            self.page = paginator.page(1)
-        
-        # Теперь получаем полные данные только для текущей страницы
-        if self.page.has_other_pages():
-            self.page_ids = list(self.page.object_list.values_list('id', flat=True))
-            self.page_objects = queryset.filter(id__in=self.page_ids)
-        else:
-            self.page_objects = queryset
-        
-        return list(self.page_objects)
+    django_paginator_class = TwoPhasePaginator
     
     def get_paginated_response(self, data):
         """Возвращает ответ с оптимизированной пагинацией"""
         return Response({
             'count': self.page.paginator.count,
+            'count_exact': self.page.paginator.count_exact,
             'next': self.get_next_link(),
             'previous': self.get_previous_link(),
             'page_size': self.get_page_size(self.request),
@@ -79,45 +327,197 @@ class FastPageNumberPagination(PageNumberPagination):
         })
 
 
-class CursorPagination(PageNumberPagination):
-    """Пагинация с курсором для очень больших списков"""
+class CursorPagination(BasePagination):
+    """
+    Keyset (курсорная) пагинация по (created_at, id).
+    
+    Страница выбирается условием "после позиции курсора" вместо OFFSET,
+    поэтому время ответа не растет с глубиной страницы, а новые записи
+    не сдвигают уже показанные. id - однозначный тай-брейкер для записей
+    с одинаковым created_at; запрос опирается на составной индекс
+    (created_at, id).
+    
+    Курсор непрозрачный и подписан SECRET_KEY: он хранит позицию и
+    направление (вперед/назад) и не может быть подделан клиентом.
+    Сортировка - только по дате создания: ?ordering=created_at дает
+    порядок от старых к новым, иначе - от новых к старым. Общее число
+    записей (лишний COUNT) считается только по ?with_count=true - через
+    CountProvider, как у пагинации по номерам страниц.
+    """
     
     page_size = 100
     page_size_query_param = 'page_size'
     max_page_size = 500
     cursor_query_param = 'cursor'
+    count_query_param = 'with_count'
+    ordering_query_param = 'ordering'
+    cursor_salt = 'core.pagination.cursor'
+    invalid_cursor_message = 'Неверный курсор'
     
     def paginate_queryset(self, queryset, request, view=None):
-        """Пагинация с использованием курсора"""
-        page_size = self.get_page_size(request)
-        cursor = request.query_params.get(self.cursor_query_param)
+        """Страница после позиции курсора"""
+        self.request = request
+        self.limit = self.get_page_size(request)
+        self.descending = request.query_params.get(self.ordering_query_param) != 'created_at'
+        position = self.decode_cursor(request)
+        backwards = position is not None and position[2] == 'prev'
         
-        if cursor:
-            # Фильтруем по курсору (предполагаем, что есть поле created_at)
-            queryset = queryset.filter(created_at__lt=cursor)
+        self.count = self.count_exact = None
+        if self._wants_count(request):
+            self.count, self.count_exact = pagination_count_provider.get_count(queryset)
         
-        # Ограничиваем количество результатов
-        queryset = queryset[:page_size + 1]
+        # Назад - обратный порядок от курсора, затем страница переворачивается
+        descending = self.descending != backwards
+        queryset = queryset.order_by(*(('-created_at', '-id') if descending else ('created_at', 'id')))
+        if position is not None:
+            queryset = queryset.filter(self._after(position[0], position[1], descending))
         
-        self.has_next = len(queryset) > page_size
-        if self.has_next:
-            queryset = queryset[:page_size]
+        results = list(queryset[:self.limit + 1])
+        has_more = len(results) > self.limit
+        results = results[:self.limit]
         
-        return list(queryset)
+        if backwards:
+            results.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        
+        self.page = results
+        return results
     
     def get_paginated_response(self, data):
         """Возвращает ответ с курсорной пагинацией"""
-        next_cursor = None
-        if self.has_next and data:
-            next_cursor = data[-1]['created_at']
+        next_cursor = self._cursor(self.page[-1], 'next') if self.has_next and self.page else None
+        previous_cursor = self._cursor(self.page[0], 'prev') if self.has_previous and self.page else None
         
         return Response({
-            'count': len(data),
+            'count': self.count,
+            'count_exact': self.count_exact,
+            'next': self._link(next_cursor),
+            'previous': self._link(previous_cursor),
             'next_cursor': next_cursor,
+            'previous_cursor': previous_cursor,
             'has_next': self.has_next,
-            'page_size': self.get_page_size(self.request),
+            'has_previous': self.has_previous,
+            'page_size': self.limit,
             'results': data
         })
+    
+    def get_page_size(self, request) -> int:
+        """Размер страницы из параметра запроса с ограничением max_page_size"""
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+    
+    def decode_cursor(self, request) -> Optional[Tuple[datetime, int, str]]:
+        """
+        Позиция из курсора запроса
+        
+        Returns:
+            (created_at, id, направление) или None для первой страницы
+            
+        Raises:
+            NotFound: Если курсор поврежден или подделан
+        """
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            created_at, pk, direction = signing.loads(cursor, salt=self.cursor_salt)
+            return datetime.fromisoformat(created_at), int(pk), direction
+        except (signing.BadSignature, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+    
+    def encode_cursor(self, created_at: datetime, pk: int, direction: str) -> str:
+        """Подписанный курсор позиции"""
+        return signing.dumps([created_at.isoformat(), pk, direction], salt=self.cursor_salt, compress=True)
+    
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Курсор страницы из next_cursor/previous_cursor (пустой - первая страница)',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Количество записей на странице',
+                'schema': {'type': 'integer'},
+            },
+            {
+                'name': self.count_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Посчитать общее количество записей',
+                'schema': {'type': 'boolean'},
+            },
+        ]
+    
+    def _wants_count(self, request) -> bool:
+        return request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes')
+    
+    @staticmethod
+    def _after(created_at: datetime, pk: int, descending: bool) -> Q:
+        """
+        Записи после позиции в порядке сортировки. Условие по created_at
+        вынесено отдельно, чтобы база могла сканировать диапазон индекса.
+        """
+        if descending:
+            return Q(created_at__lte=created_at) & (Q(created_at__lt=created_at) | Q(id__lt=pk))
+        return Q(created_at__gte=created_at) & (Q(created_at__gt=created_at) | Q(id__gt=pk))
+    
+    def _cursor(self, item, direction: str) -> str:
+        if isinstance(item, dict):
+            return self.encode_cursor(item['created_at'], item['id'], direction)
+        return self.encode_cursor(item.created_at, item.pk, direction)
+    
+    def _link(self, cursor: Optional[str]) -> Optional[str]:
+        if cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+
+class CursorOrPageNumberPagination(FastPageNumberPagination):
+    """
+    Пагинация списков с большим объемом данных: номера страниц (в две
+    фазы, как FastPageNumberPagination), либо keyset пагинация
+    CursorPagination, если в запросе есть параметр cursor (пустой cursor -
+    первая страница). Глубокие страницы через cursor не требуют OFFSET
+    сканирования.
+    """
+    
+    page_size = 20
+    max_page_size = 100
+    cursor_pagination_class = CursorPagination
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.cursor_pagination_class.cursor_query_param in request.query_params:
+            self.cursor_paginator = self.cursor_pagination_class()
+            self.cursor_paginator.page_size = self.page_size
+            self.cursor_paginator.max_page_size = self.max_page_size
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+    
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+    
+    def get_schema_operation_parameters(self, view):
+        cursor_parameters = [
+            parameter for parameter in self.cursor_pagination_class().get_schema_operation_parameters(view)
+            if parameter['name'] != self.page_size_query_param
+        ]
+        return super().get_schema_operation_parameters(view) + cursor_parameters
 
 
 class PaginationService:
@@ -269,3 +669,7 @@ class PaginationConfig:
             return FastPageNumberPagination
         else:
             return OptimizedPageNumberPagination
+
+
+# Источник числа записей общий для процесса (сами числа и версии - в общем кэше)
+pagination_count_provider = CountProvider()
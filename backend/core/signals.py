@@ -0,0 +1,32 @@
+"""
+Сигналы приложения core
+"""
+from django.apps import apps
+from django.db.models.signals import post_delete, post_save
+
+from .pagination import pagination_count_provider
+
+# Модели, изменения которых меняют числа записей списков с пагинацией:
+# модель -> модели списков, чьи числа нужно сбросить
+PAGINATION_COUNT_SOURCES = {
+    'telegram_requests.Request': ('telegram_requests.Request',),
+    'projects.Project': ('projects.Project',),
+    'projects.ProjectRole': ('projects.ProjectRole',),
+    'artists.Artist': ('artists.Artist',),
+    # Фильтр артистов по навыкам
+    'artists.ArtistSkill': ('artists.Artist',),
+    'people.Person': ('people.Person',),
+}
+
+
+def invalidate_pagination_counts(sender, **kwargs):
+    """Новая версия таблицы модели сбрасывает закэшированные числа записей"""
+    for label in PAGINATION_COUNT_SOURCES.get(sender._meta.label, ()):
+        pagination_count_provider.invalidate(apps.get_model(label))
+
+
+# Остальные модели (ключи блоков, корзины индекса дубликатов и т.п.)
+# не обращаются к кэшу при каждом сохранении
+for source in PAGINATION_COUNT_SOURCES:
+    post_save.connect(invalidate_pagination_counts, sender=source)
+    post_delete.connect(invalidate_pagination_counts, sender=source)
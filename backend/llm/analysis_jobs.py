@@ -0,0 +1,488 @@
+"""
+Асинхронный анализ запросов через LLM: очередь задач и выполнение анализа
+"""
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.utils import timezone
+from rest_framework import status
+
+from telegram_requests.models import Request
+from .artist_catalog import artist_catalog
+from .metrics import llm_metrics
+from .registry import get_llm_service
+from .resilience import CircuitOpenError
+from .validators import repair_llm_response
+
+logger = logging.getLogger(__name__)
+
+
+def _report_progress(progress: Optional[Callable[[str, int], None]], stage: str, percent: int):
+    if progress:
+        progress(stage, percent)
+
+
+def perform_analysis(
+    telegram_request: Request,
+    use_emulator: bool,
+    force_refresh: bool = False,
+    username: str = '',
+    progress: Optional[Callable[[str, int], None]] = None,
+    artists_data: Optional[List[Dict[str, Any]]] = None
+) -> Tuple[Dict[str, Any], int]:
+    """
+    Анализ запроса через LLM с сохранением статуса анализа
+    
+    Args:
+        telegram_request: Запрос для анализа
+        use_emulator: Использовать эмулятор вместо OpenAI
+        force_refresh: Не использовать сохраненный ответ LLM
+        username: Пользователь, запустивший анализ (для логов)
+        progress: Колбэк (stage, percent) для отчета о ходе анализа
+        artists_data: Снимок каталога артистов (по умолчанию - текущий)
+        
+    Returns:
+        (данные ответа, HTTP статус)
+    """
+    payload, http_status, analysis_status = run_analysis(
+        telegram_request, use_emulator, force_refresh, username, progress, artists_data
+    )
+    if analysis_status:
+        # Только статус анализа: за время вызова LLM запрос могли изменить другие пользователи
+        telegram_request.analysis_status = analysis_status
+        telegram_request.save(update_fields=['analysis_status', 'updated_at'])
+    return payload, http_status
+
+
+def build_analysis_response(
+    telegram_request: Request,
+    analysis_result: Dict[str, Any],
+    processing_time: float
+) -> Dict[str, Any]:
+    """
+    Ответ анализа в формате API из результата LLM
+    
+    Args:
+        telegram_request: Анализируемый запрос
+        analysis_result: Результат LLM или эмулятора
+        processing_time: Время анализа в секундах
+    """
+    # Применяем fallback логику для кастинг-директора
+    contacts = analysis_result.get('contacts', {})
+    casting_director = contacts.get('casting_director', {})
+
+    # Если LLM не определил имя кастинг-директора или confidence низкий, используем автора запроса
+    if (not casting_director.get('name') or 
+        casting_director.get('name') == 'Не определен' or 
+        (casting_director.get('confidence') or 0) < 0.5):
+
+        logger.info(f"🔄 Fallback: используем автора запроса '{telegram_request.author_name}' как кастинг-директора")
+
+        # Сохраняем извлеченные LLM данные, но подставляем имя автора
+        contacts['casting_director'] = {
+            'name': telegram_request.author_name,  # Fallback имя
+            'email': casting_director.get('email'),  # Сохраняем извлеченный email
+            'phone': casting_director.get('phone'),  # Сохраняем извлеченный телефон
+            'telegram': casting_director.get('telegram'),  # Сохраняем извлеченный telegram
+            'confidence': max(0.7, casting_director.get('confidence') or 0)  # Минимум 0.7 для fallback
+        }
+
+        logger.info(f"📧 Сохранены извлеченные контакты: email={casting_director.get('email')}, phone={casting_director.get('phone')}, telegram={casting_director.get('telegram')}")
+
+    # Формируем ответ (LLM эмулятор уже возвращает правильную структуру)
+    response_data = {
+        'project_analysis': analysis_result['project_analysis'],
+        'contacts': contacts,
+        'confidence': analysis_result['project_analysis'].get('confidence', 0.85),
+        'processing_time': processing_time,
+        'used_emulator': analysis_result.get('used_emulator', False),
+        'cached': analysis_result.get('cached', False),
+        'errors': []
+    }
+    return response_data
+
+
+def analysis_error_response(error: Exception, request_id: int, start_time: float) -> Tuple[Dict[str, Any], int]:
+    """
+    Ответ API для ошибки анализа
+    
+    Args:
+        error: Исключение анализа
+        request_id: ID запроса (для логов)
+        start_time: Время начала анализа
+        
+    Returns:
+        (данные ответа, HTTP статус)
+    """
+    if isinstance(error, CircuitOpenError):
+        # Upstream недоступен: отвечаем сразу, не занимая воркер повторами
+        logger.warning(f"Анализ запроса {request_id} отклонен circuit breaker: {error}")
+        return {
+            'error': 'OpenAI сервис временно недоступен',
+            'details': str(error),
+            'retry_after': round(error.retry_after),
+            'processing_time': time.time() - start_time,
+            'used_emulator': False,
+            'suggestion': 'Повторите анализ позже или используйте режим черновика (эмулятор)'
+        }, status.HTTP_503_SERVICE_UNAVAILABLE
+
+    if isinstance(error, ValueError):
+        # Специальная обработка для отсутствия OpenAI сервиса
+        processing_time = time.time() - start_time
+        error_message = str(error)
+        logger.error(f"OpenAI сервис недоступен для запроса {request_id}: {error_message}")
+
+        return {
+            'error': 'OpenAI сервис недоступен',
+            'details': error_message,
+            'processing_time': processing_time,
+            'used_emulator': False,
+            'suggestion': 'Пожалуйста, настройте OPENAI_API_KEY в переменных окружения или включите fallback_to_emulator в конфигурации'
+        }, status.HTTP_503_SERVICE_UNAVAILABLE
+
+    processing_time = time.time() - start_time
+    error_type = type(error).__name__
+    error_message = str(error)
+
+    # Проверяем, является ли это ошибкой OpenAI API (по сообщению об ошибке)
+    if 'Error code: 401' in error_message or 'invalid_api_key' in error_message or 'Incorrect API key' in error_message:
+        logger.error(f"Недействительный API ключ OpenAI для запроса {request_id}: {error_message}")
+        return {
+            'error': 'Недействительный API ключ OpenAI',
+            'details': 'API ключ OpenAI не прошел аутентификацию. Пожалуйста, проверьте настройки OPENAI_API_KEY.',
+            'processing_time': processing_time,
+            'used_emulator': False,
+            'suggestion': 'Получите новый API ключ на https://platform.openai.com/api-keys и обновите OPENAI_API_KEY в .env файле'
+        }, status.HTTP_503_SERVICE_UNAVAILABLE
+
+    # Общая обработка других ошибок
+    logger.error(f"Ошибка анализа запроса {request_id} ({error_type}): {error_message}")
+    return {
+        'error': 'Ошибка анализа LLM',
+        'error_type': error_type,
+        'details': error_message,
+        'processing_time': processing_time,
+        'used_emulator': False
+    }, status.HTTP_500_INTERNAL_SERVER_ERROR
+
+
+def record_analysis_metrics(start_time: float, succeeded: bool):
+    """Учитывает завершенный анализ в общих метриках LLM"""
+    llm_metrics.observe('analysis_seconds', time.time() - start_time)
+    llm_metrics.increment('analyses_succeeded' if succeeded else 'analyses_failed')
+
+
+def run_analysis(
+    telegram_request: Request,
+    use_emulator: bool,
+    force_refresh: bool = False,
+    username: str = '',
+    progress: Optional[Callable[[str, int], None]] = None,
+    artists_data: Optional[List[Dict[str, Any]]] = None
+) -> Tuple[Dict[str, Any], int, Optional[str]]:
+    """
+    Анализ запроса через LLM без записи в БД (можно вызывать из потоков)
+    
+    Args:
+        telegram_request: Запрос для анализа
+        use_emulator: Использовать эмулятор вместо OpenAI
+        force_refresh: Не использовать сохраненный ответ LLM
+        username: Пользователь, запустивший анализ (для логов)
+        progress: Колбэк (stage, percent) для отчета о ходе анализа
+        artists_data: Артисты для анализа (по умолчанию - из снимка каталога)
+        
+    Returns:
+        (данные ответа, HTTP статус, новый analysis_status запроса или None)
+    """
+    request_id = telegram_request.id
+    
+    # Получаем данные артистов для LLM из снимка каталога
+    if artists_data is None:
+        artists_data = artist_catalog.get_artists()
+
+    # Подготавливаем данные запроса
+    request_data = {
+        'text': telegram_request.text,
+        'author_name': telegram_request.author_name,
+        'author_telegram_id': telegram_request.author_telegram_id,
+        'created_at': telegram_request.created_at.isoformat()
+    }
+
+    # LLM сервис общий для процесса
+    llm_service = get_llm_service()
+    _report_progress(progress, 'analyzing', 30)
+
+    # Логируем начало анализа
+    logger.info(f"Начало анализа запроса {request_id} пользователем {username}, режим: {'эмулятор' if use_emulator else 'OpenAI GPT-4o'}")
+    start_time = time.time()
+
+    # Выполняем анализ
+    try:
+        # Принудительно используем эмулятор если указано в параметре
+        if use_emulator:
+            logger.info("📝 Режим черновика: используем эмулятор")
+            analysis_result = llm_service.emulator.analyze_request(request_data, artists_data)
+        else:
+            logger.info("🤖 Режим GPT-4o: используем OpenAI API")
+            analysis_result = llm_service.analyze_request(
+                request_data,
+                artists_data,
+                force_refresh=force_refresh
+            )
+
+        processing_time = time.time() - start_time
+
+        _report_progress(progress, 'validating', 90)
+        
+        # Валидируем ответ; исправимые отклонения от схемы исправляются без повторного вызова LLM
+        try:
+            analysis_result = repair_llm_response(analysis_result)
+        except Exception as e:
+            logger.error(f"Ошибка валидации ответа для запроса {request_id}: {str(e)}")
+            record_analysis_metrics(start_time, succeeded=False)
+            return {'error': 'Ошибка валидации ответа LLM', 'details': str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR, None
+
+        response_data = build_analysis_response(telegram_request, analysis_result, processing_time)
+
+        logger.info(f"Анализ запроса {request_id} завершен успешно за {processing_time:.2f}с")
+        record_analysis_metrics(start_time, succeeded=True)
+
+        return response_data, status.HTTP_200_OK, 'analyzed'
+
+    except Exception as e:
+        payload, http_status = analysis_error_response(e, request_id, start_time)
+        record_analysis_metrics(start_time, succeeded=False)
+        return payload, http_status, 'error'
+
+
+class AnalysisJobQueue:
+    """
+    Очередь фонового анализа запросов через LLM.
+
+    Вызов OpenAI может занимать до timeout * max_retries секунд, поэтому
+    эндпоинт анализа ставит задачу в очередь и сразу отвечает 202 с
+    job_id, а анализ выполняется пулом потоков ограниченного размера
+    (LLM_ANALYSIS_WORKERS). Состояние задач хранится в кэше Django и
+    доступно всем воркерам; для каждого запроса одновременно существует
+    не более одной активной задачи - повторная постановка возвращает ее же.
+    Запрос захватывается атомарным cache.add, поэтому задачу не создадут
+    дважды и два воркера одновременно.
+
+    Задачи живут в памяти процесса: если процесс перезапущен, незавершенная
+    задача остается в статусе queued/running до истечения JOB_TTL, а
+    повторный запуск анализа создает новую, когда старая не обновлялась
+    дольше удвоенного максимального времени вызова OpenAI.
+    """
+
+    JOB_CACHE_KEY = 'llm:analysis_job:{job_id}'
+    REQUEST_CACHE_KEY = 'llm:analysis_job:request:{request_id}'
+    REPLACE_CACHE_KEY = 'llm:analysis_job:request:{request_id}:replace:{job_id}'
+    JOB_TTL = 24 * 60 * 60
+    ACTIVE_STATUSES = ('queued', 'running')
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or getattr(settings, 'LLM_ANALYSIS_WORKERS', 2)
+        self.stale_after = (
+            getattr(settings, 'OPENAI_TIMEOUT', 60) * (getattr(settings, 'OPENAI_MAX_RETRIES', 3) + 1) * 2
+        )
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        request_id: int,
+        use_emulator: bool = False,
+        force_refresh: bool = False,
+        username: str = ''
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Ставит анализ запроса в очередь
+
+        Returns:
+            (задача, создана ли новая задача)
+        """
+        job, created = self.create(request_id)
+        if not created:
+            return job, False
+
+        self._get_executor().submit(self._run, job['job_id'], use_emulator, force_refresh, username)
+        logger.info(f"Анализ запроса {request_id} поставлен в очередь: задача {job['job_id']}")
+        return job, True
+
+    def create(self, request_id: int) -> Tuple[Dict[str, Any], bool]:
+        """
+        Регистрирует задачу анализа без запуска (запуск - submit или пакетный анализ)
+
+        Returns:
+            (задача, создана ли новая задача); при активной задаче возвращается она
+        """
+        now = timezone.now().isoformat()
+        job = {
+            'job_id': uuid.uuid4().hex,
+            'request_id': request_id,
+            'status': 'queued',
+            'stage': 'queued',
+            'progress': 0,
+            'result': None,
+            'http_status': None,
+            'created_at': now,
+            'updated_at': now,
+        }
+        # Задача сохраняется до захвата запроса: другой воркер не должен
+        # увидеть ID задачи без ее данных и счесть ее неактивной
+        self._save(job)
+        request_key = self.REQUEST_CACHE_KEY.format(request_id=request_id)
+
+        for _ in range(2):
+            # Атомарный захват запроса: add удается только одному воркеру
+            if cache.add(request_key, job['job_id'], self.JOB_TTL):
+                return job, True
+
+            current_id = cache.get(request_key)
+            if current_id is None:
+                # Ключ истек между add и get - пробуем захватить снова
+                continue
+            existing = self.get(current_id)
+            if existing and self._is_active(existing):
+                logger.info(f"Анализ запроса {request_id} уже выполняется: задача {existing['job_id']}")
+                return self._discard(job, existing)
+
+            # Завершенную или зависшую задачу заменяет только один воркер
+            replace_key = self.REPLACE_CACHE_KEY.format(request_id=request_id, job_id=current_id)
+            if cache.add(replace_key, job['job_id'], self.stale_after):
+                cache.set(request_key, job['job_id'], self.JOB_TTL)
+                return job, True
+
+            # Другой воркер уже заменил задачу - возвращаем его задачу
+            winner = self.get_for_request(request_id) or existing
+            if winner:
+                return self._discard(job, winner)
+            break
+
+        # Чужая задача так и не появилась (ключ истекал при каждой попытке) -
+        # запрос закрепляется за своей задачей, а не за удаленной
+        cache.set(request_key, job['job_id'], self.JOB_TTL)
+        return job, True
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Задача по ID"""
+        return cache.get(self.JOB_CACHE_KEY.format(job_id=job_id))
+
+    def get_for_request(self, request_id: int) -> Optional[Dict[str, Any]]:
+        """Последняя задача анализа запроса"""
+        job_id = cache.get(self.REQUEST_CACHE_KEY.format(request_id=request_id))
+        return self.get(job_id) if job_id else None
+
+    def run(self, job_id: str, use_emulator: bool = False, force_refresh: bool = False, username: str = '') -> bool:
+        """
+        Выполняет задачу анализа
+
+        Returns:
+            True, если анализ завершен успешно
+        """
+        job = self.get(job_id)
+        if not job:
+            logger.warning(f"Задача анализа {job_id} не найдена")
+            return False
+
+        self.start(job_id)
+        try:
+            telegram_request = Request.objects.get(pk=job['request_id'])
+            payload, http_status = perform_analysis(
+                telegram_request,
+                use_emulator=use_emulator,
+                force_refresh=force_refresh,
+                username=username,
+                progress=self.progress_callback(job_id)
+            )
+        except Request.DoesNotExist:
+            payload, http_status = {'error': 'Запрос не найден'}, status.HTTP_404_NOT_FOUND
+        except Exception as e:
+            logger.error(f"Ошибка выполнения задачи анализа {job_id}: {e}")
+            payload, http_status = {'error': 'Внутренняя ошибка сервера'}, status.HTTP_500_INTERNAL_SERVER_ERROR
+
+        return self.finish(job_id, payload, http_status)
+
+    def start(self, job_id: str):
+        """Отмечает начало выполнения задачи"""
+        self._update(job_id, status='running', stage='loading', progress=10)
+
+    def progress_callback(self, job_id: str) -> Callable[[str, int], None]:
+        """Колбэк отчета о ходе анализа для run_analysis"""
+        return lambda stage, percent: self._update(job_id, stage=stage, progress=percent)
+
+    def finish(self, job_id: str, payload: Dict[str, Any], http_status: int) -> bool:
+        """
+        Сохраняет результат задачи
+
+        Returns:
+            True, если анализ завершен успешно
+        """
+        succeeded = http_status == status.HTTP_200_OK
+        self._update(
+            job_id,
+            status='completed' if succeeded else 'failed',
+            stage='completed' if succeeded else 'failed',
+            progress=100,
+            result=payload,
+            http_status=http_status
+        )
+        return succeeded
+
+    def shutdown(self, wait: bool = True):
+        """Останавливает пул потоков"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=wait)
+
+    def _run(self, job_id: str, use_emulator: bool, force_refresh: bool, username: str) -> bool:
+        """Выполнение задачи в рабочем потоке"""
+        close_old_connections()
+        try:
+            return self.run(job_id, use_emulator, force_refresh, username)
+        finally:
+            close_old_connections()
+
+    def _discard(self, job: Dict[str, Any], existing: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], bool]:
+        """Удаляет незахваченную задачу и возвращает задачу другого воркера"""
+        cache.delete(self.JOB_CACHE_KEY.format(job_id=job['job_id']))
+        return existing or job, False
+
+    def _is_active(self, job: Dict[str, Any]) -> bool:
+        if job['status'] not in self.ACTIVE_STATUSES:
+            return False
+        # Задача, зависшая после перезапуска процесса, не блокирует новый анализ
+        updated_at = datetime.fromisoformat(job['updated_at'])
+        return (timezone.now() - updated_at).total_seconds() < self.stale_after
+
+    def _update(self, job_id: str, **fields):
+        job = self.get(job_id)
+        if not job:
+            return
+        job.update(fields, updated_at=timezone.now().isoformat())
+        self._save(job)
+
+    def _save(self, job: Dict[str, Any]):
+        cache.set(self.JOB_CACHE_KEY.format(job_id=job['job_id']), job, self.JOB_TTL)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='llm-analysis'
+                )
+            return self._executor
+
+
+# Очередь общая для процесса
+analysis_job_queue = AnalysisJobQueue()
@@ -5,3 +5,6 @@ class LlmConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'llm'
     verbose_name = 'LLM Integration'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,151 @@
+"""
+Компактный кэшируемый снимок каталога артистов для LLM
+"""
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+
+class ArtistCatalog:
+    """
+    Версионированный снимок каталога артистов для анализа запросов.
+
+    Снимок строится через values_list только по нужным колонкам (без bio,
+    фотографий и прочих тяжелых полей); навыки подтягиваются одним запросом
+    по ArtistSkill. Готовый снимок хранится в кэше Django под ключом с
+    номером версии, а версия увеличивается сигналами при изменении
+    Artist/ArtistSkill/Skill. Пока версия не изменилась, снимок не
+    перестраивается, а эндпоинт артистов отвечает 304 по ETag.
+
+    Массовые операции в обход сигналов (QuerySet.update, bulk_create)
+    требуют явного вызова invalidate().
+    """
+
+    VERSION_CACHE_KEY = 'llm:artist_catalog:version'
+    SNAPSHOT_CACHE_KEY = 'llm:artist_catalog:snapshot:{version}'
+    SNAPSHOT_TIMEOUT = 24 * 60 * 60
+
+    FIELDS = (
+        'id', 'first_name', 'last_name', 'age', 'gender', 'height', 'weight',
+        'clothing_size', 'shoe_size', 'hair_color', 'eye_color',
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local: Optional[Dict[str, Any]] = None
+
+    def version(self) -> int:
+        """Текущая версия каталога"""
+        cache.add(self.VERSION_CACHE_KEY, 1, None)
+        return cache.get(self.VERSION_CACHE_KEY, 1)
+
+    def etag(self, version: Optional[int] = None) -> str:
+        """ETag эндпоинта артистов для версии каталога"""
+        return f'"artists-v{version or self.version()}"'
+
+    def invalidate(self):
+        """Помечает снимок устаревшим"""
+        try:
+            cache.incr(self.VERSION_CACHE_KEY)
+        except ValueError:
+            cache.set(self.VERSION_CACHE_KEY, 2, None)
+
+    def invalidate_on_commit(self):
+        """
+        Инвалидация из сигналов
+
+        Версия увеличивается сразу и еще раз после коммита: снимок,
+        собранный другим воркером до фиксации транзакции, не переживет ее
+        """
+        self.invalidate()
+        transaction.on_commit(self.invalidate)
+
+    def get_snapshot(self) -> Dict[str, Any]:
+        """
+        Возвращает актуальный снимок каталога
+
+        Returns:
+            Словарь с ключами version, artists (формат анализа запроса)
+            и llm_artists (формат эндпоинта артистов для LLM)
+        """
+        version = self.version()
+        local = self._local
+        if local and local['version'] == version:
+            return local
+
+        snapshot = cache.get(self.SNAPSHOT_CACHE_KEY.format(version=version))
+        if snapshot is None:
+            with self._lock:
+                snapshot = cache.get(self.SNAPSHOT_CACHE_KEY.format(version=version))
+                if snapshot is None:
+                    snapshot = self.build(version)
+                    cache.set(
+                        self.SNAPSHOT_CACHE_KEY.format(version=version),
+                        snapshot,
+                        self.SNAPSHOT_TIMEOUT
+                    )
+
+        self._local = snapshot
+        return snapshot
+
+    def get_artists(self) -> List[Dict[str, Any]]:
+        """Артисты в формате для анализа запроса"""
+        return self.get_snapshot()['artists']
+
+    def build(self, version: int) -> Dict[str, Any]:
+        """Строит снимок каталога из БД"""
+        from artists.models import Artist, ArtistSkill
+        from .serializers import ArtistForLLMSerializer
+
+        skills = defaultdict(list)
+        for artist_id, skill_name in ArtistSkill.objects.order_by(
+            'artist_id', 'skill__name'
+        ).values_list('artist_id', 'skill__name'):
+            skills[artist_id].append(skill_name)
+
+        artists = []
+        llm_artists = []
+        for row in Artist.objects.order_by('id').values_list(*self.FIELDS):
+            artist = dict(zip(self.FIELDS, row))
+            artist_skills = skills.get(artist['id'], [])
+            artists.append({
+                'id': artist['id'],
+                'name': f"{artist['first_name']} {artist['last_name']}",
+                'age': artist['age'],
+                'gender': artist['gender'],
+                'height': artist['height'],
+                'weight': artist['weight'],
+                'clothing_size': artist['clothing_size'],
+                'shoe_size': artist['shoe_size'],
+                'hair_color': artist['hair_color'],
+                'eye_color': artist['eye_color'],
+                'skills': artist_skills,
+                'languages': [],  # Языки в каталоге пока не хранятся
+                'special_requirements': []
+            })
+            llm_artists.append({
+                **artists[-1],
+                'height': artist['height'] or 0,
+                'weight': artist['weight'] or 0,
+                'clothing_size': artist['clothing_size'] or '',
+                'shoe_size': artist['shoe_size'] or '',
+                'hair_color': artist['hair_color'] or '',
+                'eye_color': artist['eye_color'] or '',
+            })
+
+        logger.info(f"Снимок каталога артистов v{version} построен: {len(artists)} артистов")
+        return {
+            'version': version,
+            'artists': artists,
+            'llm_artists': [dict(item) for item in ArtistForLLMSerializer(llm_artists, many=True).data],
+        }
+
+
+# Снимок общий для процесса
+artist_catalog = ArtistCatalog()
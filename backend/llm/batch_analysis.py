@@ -0,0 +1,174 @@
+"""
+Пакетный анализ запросов через LLM
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from django.conf import settings
+from django.db import connections
+from rest_framework import status
+
+from telegram_requests.models import Request
+from .analysis_jobs import analysis_job_queue, perform_analysis
+from .artist_catalog import artist_catalog
+
+logger = logging.getLogger(__name__)
+
+
+class BatchAnalyzer:
+    """
+    Анализ пачки запросов с ограниченной параллельностью.
+
+    Снимок каталога артистов берется один раз на пачку, запросы к модели
+    выполняются пулом потоков (не больше LLM_BATCH_CONCURRENCY одновременно),
+    а результаты отдаются по мере готовности - в порядке завершения, а не
+    в порядке входного списка. Каждое событие содержит index - позицию
+    запроса во входном списке; на каждый ID приходится ровно одно событие
+    result, последним идет summary.
+
+    Для каждого запроса регистрируется задача AnalysisJobQueue, поэтому
+    эндпоинт статуса анализа отдает результат и без пакетного ответа.
+    analysis_status запроса сохраняет рабочий поток сразу после анализа,
+    поэтому статус записывается, даже если клиент перестал читать ответ.
+    """
+
+    def __init__(self, concurrency: Optional[int] = None):
+        limit = getattr(settings, 'LLM_BATCH_CONCURRENCY', 4)
+        self.concurrency = max(1, min(concurrency or limit, limit))
+
+    def analyze(
+        self,
+        request_ids: Iterable[int],
+        use_emulator: bool = False,
+        force_refresh: bool = False,
+        username: str = ''
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Анализирует запросы и отдает события по мере готовности
+
+        Args:
+            request_ids: ID запросов (повторы игнорируются)
+            use_emulator: Использовать эмулятор вместо OpenAI
+            force_refresh: Не использовать сохраненные ответы LLM
+            username: Пользователь, запустивший анализ (для логов)
+
+        Yields:
+            События result (по одному на запрос) и итоговое summary
+        """
+        start_time = time.time()
+        request_ids = list(dict.fromkeys(request_ids))
+        requests = Request.objects.in_bulk(request_ids)
+        summary = {'total': len(request_ids), 'succeeded': 0, 'failed': 0, 'skipped': 0}
+
+        pending = []
+        for index, request_id in enumerate(request_ids):
+            telegram_request = requests.get(request_id)
+            if telegram_request is None:
+                summary['failed'] += 1
+                yield self._result(index, request_id, None, status.HTTP_404_NOT_FOUND, {'error': 'Запрос не найден'})
+                continue
+
+            job, created = analysis_job_queue.create(request_id)
+            if not created:
+                summary['skipped'] += 1
+                yield self._result(
+                    index, request_id, job['job_id'], status.HTTP_409_CONFLICT,
+                    {'error': 'Анализ запроса уже выполняется'}
+                )
+                continue
+            pending.append((index, telegram_request, job['job_id']))
+
+        if pending:
+            logger.info(
+                f"Пакетный анализ {len(pending)} запросов пользователем {username}, "
+                f"параллельно: {self.concurrency}"
+            )
+            # Каталог артистов один на всю пачку
+            artists_data = artist_catalog.get_artists()
+            yield from self._run(pending, artists_data, use_emulator, force_refresh, username, summary)
+
+        summary['processing_time'] = time.time() - start_time
+        yield {'type': 'summary', **summary}
+
+    def _run(
+        self,
+        pending: List[tuple],
+        artists_data: List[Dict[str, Any]],
+        use_emulator: bool,
+        force_refresh: bool,
+        username: str,
+        summary: Dict[str, Any]
+    ) -> Iterator[Dict[str, Any]]:
+        executor = ThreadPoolExecutor(
+            max_workers=min(self.concurrency, len(pending)),
+            thread_name_prefix='llm-batch'
+        )
+        futures = {
+            executor.submit(
+                self._analyze_one, telegram_request, job_id, use_emulator, force_refresh, username, artists_data
+            ): (index, telegram_request, job_id)
+            for index, telegram_request, job_id in pending
+        }
+        try:
+            for future in as_completed(futures):
+                index, telegram_request, job_id = futures[future]
+                payload, http_status = future.result()
+                summary['succeeded' if http_status == status.HTTP_200_OK else 'failed'] += 1
+                yield self._result(index, telegram_request.id, job_id, http_status, payload)
+        finally:
+            # Клиент отключился: не начатые задачи отменяются, начатые завершаются в фоне
+            for future, (_, telegram_request, job_id) in futures.items():
+                if future.cancel():
+                    analysis_job_queue.finish(
+                        job_id, {'error': 'Пакетный анализ прерван'}, status.HTTP_503_SERVICE_UNAVAILABLE
+                    )
+            executor.shutdown(wait=False)
+
+    @staticmethod
+    def _analyze_one(
+        telegram_request: Request,
+        job_id: str,
+        use_emulator: bool,
+        force_refresh: bool,
+        username: str,
+        artists_data: List[Dict[str, Any]]
+    ) -> tuple:
+        """Анализ одного запроса в рабочем потоке с сохранением analysis_status"""
+        analysis_job_queue.start(job_id)
+        try:
+            payload, http_status = perform_analysis(
+                telegram_request,
+                use_emulator=use_emulator,
+                force_refresh=force_refresh,
+                username=username,
+                progress=analysis_job_queue.progress_callback(job_id),
+                artists_data=artists_data
+            )
+        except Exception as e:
+            logger.error(f"Ошибка пакетного анализа запроса {telegram_request.id}: {e}")
+            payload, http_status = {'error': 'Внутренняя ошибка сервера'}, status.HTTP_500_INTERNAL_SERVER_ERROR
+        finally:
+            # Соединения с БД рабочего потока не переживают задачу
+            connections.close_all()
+
+        analysis_job_queue.finish(job_id, payload, http_status)
+        return payload, http_status
+
+    @staticmethod
+    def _result(
+        index: int,
+        request_id: int,
+        job_id: Optional[str],
+        http_status: int,
+        payload: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        return {
+            'type': 'result',
+            'index': index,
+            'request_id': request_id,
+            'job_id': job_id,
+            'status_code': http_status,
+            'result': payload,
+        }
@@ -0,0 +1,257 @@
+"""
+Предварительный отбор артистов-кандидатов перед вызовом LLM
+"""
+import json
+import logging
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .artist_catalog import artist_catalog
+
+logger = logging.getLogger(__name__)
+
+
+class PrefilterMetrics:
+    """
+    Метрики предварительного отбора: сколько артистов и токенов
+    передавалось бы в модель без отбора и сколько передано после него
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.metrics = {}
+        self.reset_metrics()
+
+    def record(self, artists_total: int, candidates: int, tokens_before: int, tokens_after: int):
+        """Учитывает один отбор кандидатов"""
+        with self._lock:
+            self.metrics['requests'] += 1
+            self.metrics['artists_total'] += artists_total
+            self.metrics['candidates_total'] += candidates
+            self.metrics['artist_tokens_before'] += tokens_before
+            self.metrics['artist_tokens_after'] += tokens_after
+
+    def record_prompt_tokens(self, prompt_tokens: int):
+        """Учитывает фактический размер промпта по данным API"""
+        with self._lock:
+            self.metrics['prompt_tokens'] += prompt_tokens
+
+    def get_metrics(self) -> Dict[str, int]:
+        """Получение текущих метрик"""
+        with self._lock:
+            return self.metrics.copy()
+
+    def reset_metrics(self):
+        """Сброс метрик"""
+        with self._lock:
+            self.metrics = {
+                'requests': 0,
+                'artists_total': 0,
+                'candidates_total': 0,
+                'artist_tokens_before': 0,
+                'artist_tokens_after': 0,
+                'prompt_tokens': 0,
+            }
+
+
+class ArtistCandidateSelector:
+    """
+    Отбор артистов, подходящих под запрос, до вызова модели.
+
+    Из текста запроса извлекаются дешевые признаки - пол, возрастной
+    диапазон, город и упомянутые навыки (по аналогии с эмулятором
+    LLMEmulatorService._generate_roles). Пол, возраст и город сужают
+    выборку через индексированные поля Artist, совпавшие навыки
+    определяют порядок кандидатов. Первые top_n попадают в промпт модели.
+
+    Настройки - секция artist_prefilter в llm_config.yaml:
+        enabled: включить отбор
+        strategy: 'signals' (отбор по признакам) или 'none' (все артисты)
+        top_n: сколько кандидатов передавать в модель
+    """
+
+    STRATEGIES = ('signals', 'none')
+    DEFAULT_TOP_N = 50
+    CHARS_PER_TOKEN = 4  # Оценка размера в токенах без токенизатора модели
+    VOCABULARY_CACHE_KEY = 'llm:artist_candidates:vocabulary:{version}'
+
+    GENDER_PATTERNS = (
+        ('male', re.compile(r'мужчин|мужск|парн|парен')),
+        ('female', re.compile(r'женщин|женск|девушк')),
+        ('boy', re.compile(r'мальчик')),
+        ('girl', re.compile(r'девочк')),
+    )
+    AGE_PATTERNS = (
+        re.compile(r'(\d{1,2})\s*[-–—]\s*(\d{1,2})\s*(?:лет|год)'),
+        re.compile(r'от\s*(\d{1,2})\s*до\s*(\d{1,2})\s*(?:лет|год)'),
+    )
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.enabled = config.get('enabled', True)
+        self.strategy = config.get('strategy', 'signals')
+        self.top_n = int(config.get('top_n', self.DEFAULT_TOP_N))
+        if self.strategy not in self.STRATEGIES:
+            logger.warning(f"Неизвестная стратегия отбора артистов '{self.strategy}', используется 'signals'")
+            self.strategy = 'signals'
+
+    def extract_signals(self, text: str) -> Dict[str, Any]:
+        """
+        Извлекает признаки отбора из текста запроса
+
+        Returns:
+            Словарь с genders, age_min, age_max, cities и skill_ids
+        """
+        text = (text or '').lower()
+        signals = {
+            'genders': [gender for gender, pattern in self.GENDER_PATTERNS if pattern.search(text)],
+            'age_min': None,
+            'age_max': None,
+            'cities': [],
+            'skill_ids': [],
+        }
+
+        ages = []
+        for pattern in self.AGE_PATTERNS:
+            for low, high in pattern.findall(text):
+                ages.extend(sorted((int(low), int(high))))
+        if ages:
+            signals['age_min'], signals['age_max'] = min(ages), max(ages)
+
+        vocabulary = self._vocabulary()
+        signals['cities'] = [city for city in vocabulary['cities'] if self._stem(city) in text]
+        signals['skill_ids'] = [
+            skill_id for skill_id, name in vocabulary['skills'] if self._stem(name) in text
+        ]
+        return signals
+
+    @staticmethod
+    def _stem(word: str) -> str:
+        """Грубая основа слова: «Москва» совпадает с «в Москве»"""
+        word = word.lower().strip()
+        return word[:-1] if len(word) > 4 else word
+
+    def select(
+        self,
+        text: str,
+        artists_data: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Отбирает кандидатов для передачи в модель
+
+        Args:
+            text: Текст запроса
+            artists_data: Полный список артистов из снимка каталога
+
+        Returns:
+            (кандидаты, извлеченные признаки)
+        """
+        if not self.enabled or self.strategy == 'none' or len(artists_data) <= self.top_n:
+            return artists_data, {}
+
+        signals = self.extract_signals(text)
+        ranked_ids = self._ranked_ids(signals)
+        if not ranked_ids:
+            # Признаки ничего не нашли - модель получает ограниченный общий список
+            logger.info("По признакам запроса артисты не найдены, передаются первые кандидаты каталога")
+            return artists_data[:self.top_n], signals
+
+        by_id = {artist['id']: artist for artist in artists_data}
+        candidates = [by_id[artist_id] for artist_id in ranked_ids if artist_id in by_id]
+        return candidates[:self.top_n], signals
+
+    def prepare(self, text: str, artists_data: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Отбирает кандидатов и учитывает отбор в метриках
+
+        Args:
+            text: Текст запроса
+            artists_data: Полный список артистов
+
+        Returns:
+            Список кандидатов (не больше top_n)
+        """
+        artists_data = artists_data or []
+        candidates, signals = self.select(text, artists_data)
+
+        tokens_before = self.estimate_tokens(artists_data)
+        tokens_after = self.estimate_tokens(candidates)
+        prefilter_metrics.record(len(artists_data), len(candidates), tokens_before, tokens_after)
+
+        logger.info(
+            f"Отбор кандидатов: {len(artists_data)} -> {len(candidates)} артистов, "
+            f"~{tokens_before} -> ~{tokens_after} токенов, признаки: {signals}"
+        )
+        return candidates
+
+    def fingerprint(self) -> str:
+        """
+        Настройки отбора для ключа кэша ответов
+
+        Вместе с текстом запроса и версией каталога они однозначно
+        определяют набор кандидатов, поэтому кэш можно проверить до отбора.
+        """
+        if not self.enabled or self.strategy == 'none':
+            return 'all'
+        return f'{self.strategy}:{self.top_n}'
+
+    @staticmethod
+    def render(artists_data: List[Dict[str, Any]]) -> str:
+        """Компактный JSON кандидатов для промпта: пустые поля не передаются"""
+        compact = [
+            {key: value for key, value in artist.items() if value not in (None, '', [], 0)}
+            for artist in artists_data
+        ]
+        return json.dumps(compact, ensure_ascii=False, separators=(',', ':'))
+
+    def estimate_tokens(self, artists_data: List[Dict[str, Any]]) -> int:
+        """Оценка размера списка артистов в токенах промпта"""
+        return len(self.render(artists_data)) // self.CHARS_PER_TOKEN
+
+    def _ranked_ids(self, signals: Dict[str, Any]) -> List[int]:
+        """ID артистов, подходящих под признаки, в порядке релевантности"""
+        from artists.models import Artist
+
+        queryset = Artist.objects.all()
+        if signals['genders']:
+            queryset = queryset.filter(gender__in=signals['genders'])
+        if signals['age_min'] is not None:
+            queryset = queryset.filter(
+                Q(age__isnull=True) | Q(age__range=(signals['age_min'], signals['age_max']))
+            )
+        if signals['cities']:
+            queryset = queryset.filter(city__in=signals['cities'])
+
+        if signals['skill_ids']:
+            queryset = queryset.annotate(
+                matched_skills=Count('skills', filter=Q(skills__skill_id__in=signals['skill_ids']))
+            ).order_by('-matched_skills', '-availability_status', 'id')
+        else:
+            queryset = queryset.order_by('-availability_status', 'id')
+
+        return list(queryset.values_list('id', flat=True)[:self.top_n])
+
+    def _vocabulary(self) -> Dict[str, list]:
+        """Города и навыки каталога; обновляются вместе с версией снимка артистов"""
+        from artists.models import Artist, Skill
+
+        key = self.VOCABULARY_CACHE_KEY.format(version=artist_catalog.version())
+        vocabulary = cache.get(key)
+        if vocabulary is None:
+            vocabulary = {
+                'cities': list(
+                    Artist.objects.exclude(Q(city__isnull=True) | Q(city=''))
+                    .order_by('city').values_list('city', flat=True).distinct()
+                ),
+                'skills': list(Skill.objects.values_list('id', 'name')),
+            }
+            cache.set(key, vocabulary, artist_catalog.SNAPSHOT_TIMEOUT)
+        return vocabulary
+
+
+# Метрики общие для процесса
+prefilter_metrics = PrefilterMetrics()
@@ -10,6 +10,8 @@ from typing import Dict, Any, Optional, List
 from django.conf import settings
 from django.core.exceptions import ValidationError
 
+from .metrics import LLMMetrics, llm_metrics
+
 # Настройка логгера
 logger = logging.getLogger('llm_errors')
 
@@ -152,16 +154,23 @@ class ErrorLogger:
 class ErrorMetrics:
     """
     Класс для сбора метрик ошибок
+    
+    Счетчики процесса; если передан shared, каждое увеличение учитывается
+    и в общих метриках LLMMetrics (суммируются по всем воркерам)
     """
     
-    def __init__(self):
+    def __init__(self, shared: Optional[LLMMetrics] = None):
+        self.shared = shared
         self.metrics = {
             'validation_errors': 0,
             'llm_request_errors': 0,
             'json_parse_errors': 0,
             'retry_attempts': 0,
+            'circuit_breaker_trips': 0,
+            'circuit_open_rejections': 0,
             'fallback_activations': 0,
             'successful_validations': 0,
+            'validation_repairs': 0,
             'total_requests': 0
         }
     
@@ -169,6 +178,8 @@ class ErrorMetrics:
         """Увеличение метрики"""
         if metric_name in self.metrics:
             self.metrics[metric_name] += 1
+            if self.shared is not None:
+                self.shared.increment(metric_name)
     
     def get_metrics(self) -> Dict[str, int]:
         """Получение текущих метрик"""
@@ -187,6 +198,11 @@ class ErrorMetrics:
         
         return (total_errors / self.metrics['total_requests']) * 100
     
+    def get_circuit_breaker(self) -> Dict[str, Any]:
+        """Состояние circuit breaker OpenAI (общее для воркеров)"""
+        from .resilience import openai_circuit_breaker
+        return openai_circuit_breaker.snapshot()
+    
     def reset_metrics(self):
         """Сброс метрик"""
         for key in self.metrics:
@@ -195,7 +211,7 @@ class ErrorMetrics:
 
 # Глобальные экземпляры
 error_logger = ErrorLogger()
-error_metrics = ErrorMetrics()
+error_metrics = ErrorMetrics(shared=llm_metrics)
 
 
 def log_error(error_type: str, error: Exception, context: Dict[str, Any] = None):
@@ -231,4 +247,7 @@ def get_error_metrics() -> Dict[str, Any]:
     """
     metrics = error_metrics.get_metrics()
     metrics['error_rate'] = error_metrics.get_error_rate()
+    metrics['circuit_breaker'] = error_metrics.get_circuit_breaker()
+    # Счетчики всех воркеров (metrics выше - только текущий процесс)
+    metrics['all_workers'] = llm_metrics.snapshot()['counters']
     return metrics
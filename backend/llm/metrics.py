@@ -0,0 +1,293 @@
+"""
+Метрики LLM конвейера: счетчики и гистограммы задержек, общие для воркеров
+"""
+import atexit
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм задержек, секунды (последняя корзина - +Inf)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 60.0, 120.0)
+
+
+class LLMMetrics:
+    """
+    Счетчики и гистограммы задержек LLM конвейера.
+
+    Наблюдения копятся в памяти процесса (блокировка и пара операций со
+    словарем - единицы микросекунд) и не чаще раза в
+    LLM_METRICS_FLUSH_INTERVAL секунд сбрасываются в общий кэш
+    инкрементами. Поэтому снимок суммирует данные всех воркеров и
+    переживает перезапуск процесса (если кэш - Redis). Суммы задержек
+    хранятся в микросекундах: инкремент в кэше работает с целыми.
+
+    Первое наблюдение после сброса заводит таймер до следующего сброса,
+    поэтому наблюдения простаивающего воркера тоже попадают в кэш; при
+    завершении процесса остаток сбрасывается через atexit.
+    """
+
+    KEY_PREFIX = 'llm:metrics:'
+
+    COUNTERS = {
+        'total_requests': 'Запросы на анализ',
+        'analyses_succeeded': 'Успешные анализы',
+        'analyses_failed': 'Анализы, завершившиеся ошибкой',
+        'validation_errors': 'Ошибки валидации ответа',
+        'validation_repairs': 'Ответы, исправленные без повторного вызова',
+        'successful_validations': 'Успешные валидации',
+        'llm_request_errors': 'Ошибки запросов к LLM',
+        'json_parse_errors': 'Ошибки разбора JSON ответа',
+        'retry_attempts': 'Повторы вызова OpenAI',
+        'fallback_activations': 'Переключения на эмулятор',
+        'circuit_breaker_trips': 'Открытия circuit breaker',
+        'circuit_open_rejections': 'Вызовы, отклоненные circuit breaker',
+    }
+
+    HISTOGRAMS = {
+        'openai_call_seconds': 'Время одного вызова OpenAI',
+        'retry_delay_seconds': 'Задержка перед повтором вызова OpenAI',
+        'validation_seconds': 'Время валидации и исправления ответа',
+        'analysis_seconds': 'Полное время анализа запроса',
+    }
+
+    def __init__(self, flush_interval: Optional[float] = None, key_prefix: Optional[str] = None):
+        self.flush_interval = (
+            flush_interval if flush_interval is not None
+            else getattr(settings, 'LLM_METRICS_FLUSH_INTERVAL', 5)
+        )
+        self.key_prefix = key_prefix or self.KEY_PREFIX
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {}
+        self._buckets: Dict[str, List[int]] = {}
+        self._sums: Dict[str, float] = {}
+        self._last_flush = time.monotonic()
+        self._timer: Optional[threading.Timer] = None
+
+    def increment(self, name: str, value: int = 1):
+        """Увеличивает счетчик (неизвестные имена игнорируются)"""
+        if name not in self.COUNTERS:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+        self._maybe_flush()
+
+    def observe(self, name: str, seconds: float):
+        """Учитывает одно наблюдение задержки в гистограмме"""
+        if name not in self.HISTOGRAMS:
+            return
+        index = bisect_left(LATENCY_BUCKETS, seconds)
+        with self._lock:
+            buckets = self._buckets.get(name)
+            if buckets is None:
+                buckets = self._buckets[name] = [0] * (len(LATENCY_BUCKETS) + 1)
+            buckets[index] += 1
+            self._sums[name] = self._sums.get(name, 0.0) + seconds
+        self._maybe_flush()
+
+    @contextmanager
+    def timer(self, name: str):
+        """Измеряет время блока и учитывает его в гистограмме"""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start_time)
+
+    def flush(self):
+        """Сбрасывает накопленные наблюдения процесса в общий кэш"""
+        with self._lock:
+            counters, self._counters = self._counters, {}
+            buckets, self._buckets = self._buckets, {}
+            sums, self._sums = self._sums, {}
+            self._last_flush = time.monotonic()
+
+        # (ключ кэша, прирост, (вид, имя, номер корзины)) - по виду и имени
+        # несохраненный прирост возвращается в очередь процесса
+        deltas = [
+            (self._counter_key(name), value, ('counter', name, None))
+            for name, value in counters.items() if value
+        ]
+        for name, counts in buckets.items():
+            for index, count in enumerate(counts):
+                if count:
+                    deltas.append((self._bucket_key(name, index), count, ('bucket', name, index)))
+            deltas.append((
+                self._sum_key(name), int(round(sums.get(name, 0.0) * 1_000_000)), ('sum', name, None)
+            ))
+
+        for position, (key, value, _) in enumerate(deltas):
+            try:
+                cache.add(key, 0, None)
+                try:
+                    cache.incr(key, value)
+                except ValueError:
+                    # Ключ вытеснен между add и incr
+                    cache.set(key, value, None)
+            except Exception as e:
+                logger.warning(f"Не удалось сохранить метрики LLM в кэш: {e}")
+                # Уже записанные ключи не возвращаются - иначе они учтутся дважды
+                self._restore_unwritten(deltas[position:], sums)
+                return
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Метрики всех воркеров
+
+        Returns:
+            {'counters': {имя: значение},
+             'histograms': {имя: {'buckets': [(le, накопленное число)], 'count', 'sum'}}}
+        """
+        self.flush()
+        keys = [self._counter_key(name) for name in self.COUNTERS]
+        for name in self.HISTOGRAMS:
+            keys.extend(self._bucket_key(name, index) for index in range(len(LATENCY_BUCKETS) + 1))
+            keys.append(self._sum_key(name))
+        values = cache.get_many(keys)
+
+        counters = {name: values.get(self._counter_key(name), 0) for name in self.COUNTERS}
+        histograms = {}
+        for name in self.HISTOGRAMS:
+            cumulative = 0
+            buckets = []
+            for index, bound in enumerate(LATENCY_BUCKETS + (float('inf'),)):
+                cumulative += values.get(self._bucket_key(name, index), 0)
+                buckets.append((bound, cumulative))
+            histograms[name] = {
+                'buckets': buckets,
+                'count': cumulative,
+                'sum': values.get(self._sum_key(name), 0) / 1_000_000,
+            }
+        return {'counters': counters, 'histograms': histograms}
+
+    def latency_summary(self, snapshot: Optional[Dict[str, Any]] = None) -> Dict[str, Dict[str, Any]]:
+        """Число наблюдений, среднее, p50 и p95 по каждой гистограмме"""
+        snapshot = snapshot or self.snapshot()
+        summary = {}
+        for name, histogram in snapshot['histograms'].items():
+            count = histogram['count']
+            summary[name] = {
+                'count': count,
+                'avg': round(histogram['sum'] / count, 4) if count else None,
+                'p50': self.quantile(histogram['buckets'], 0.5),
+                'p95': self.quantile(histogram['buckets'], 0.95),
+            }
+        return summary
+
+    @staticmethod
+    def quantile(buckets: List[Tuple[float, int]], q: float) -> Optional[float]:
+        """Квантиль по накопленным корзинам (линейно внутри корзины, как histogram_quantile)"""
+        total = buckets[-1][1] if buckets else 0
+        if not total:
+            return None
+        rank = q * total
+        lower_bound, lower_count = 0.0, 0
+        for bound, count in buckets:
+            if count >= rank:
+                if bound == float('inf'):
+                    # Выше последней границы оценки нет
+                    return lower_bound
+                if count == lower_count:
+                    return bound
+                return round(lower_bound + (bound - lower_bound) * (rank - lower_count) / (count - lower_count), 4)
+            lower_bound, lower_count = bound, count
+        return lower_bound
+
+    def prometheus(self, snapshot: Optional[Dict[str, Any]] = None) -> str:
+        """Метрики в текстовом формате Prometheus"""
+        snapshot = snapshot or self.snapshot()
+        lines = []
+        for name, value in snapshot['counters'].items():
+            metric = f'llm_{name}_total'
+            lines.append(f'# HELP {metric} {self.COUNTERS[name]}')
+            lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{metric} {value}')
+        for name, histogram in snapshot['histograms'].items():
+            metric = f'llm_{name}'
+            lines.append(f'# HELP {metric} {self.HISTOGRAMS[name]}')
+            lines.append(f'# TYPE {metric} histogram')
+            for bound, count in histogram['buckets']:
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{metric}_bucket{{le="{le}"}} {count}')
+            lines.append(f"{metric}_sum {histogram['sum']}")
+            lines.append(f"{metric}_count {histogram['count']}")
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        """Сбрасывает метрики всех воркеров"""
+        with self._lock:
+            self._counters, self._buckets, self._sums = {}, {}, {}
+        keys = [self._counter_key(name) for name in self.COUNTERS]
+        for name in self.HISTOGRAMS:
+            keys.extend(self._bucket_key(name, index) for index in range(len(LATENCY_BUCKETS) + 1))
+            keys.append(self._sum_key(name))
+        cache.delete_many(keys)
+
+    def _maybe_flush(self):
+        elapsed = time.monotonic() - self._last_flush
+        if elapsed >= self.flush_interval:
+            self.flush()
+            return
+        if self._timer is None or not self._timer.is_alive():
+            with self._lock:
+                # После fork таймер родителя в дочернем процессе не работает
+                if self._timer is None or not self._timer.is_alive():
+                    self._timer = threading.Timer(self.flush_interval - elapsed, self._flush_on_timer)
+                    self._timer.daemon = True
+                    self._timer.start()
+
+    def _flush_on_timer(self):
+        with self._lock:
+            self._timer = None
+        self.flush()
+
+    def _restore_unwritten(
+        self,
+        deltas: List[Tuple[str, int, Tuple[str, str, Optional[int]]]],
+        sums: Dict[str, float]
+    ):
+        """Возвращает в очередь процесса приросты ключей, которые не удалось записать"""
+        counters: Dict[str, int] = {}
+        buckets: Dict[str, List[int]] = {}
+        pending_sums: Dict[str, float] = {}
+        for _, value, (kind, name, index) in deltas:
+            if kind == 'counter':
+                counters[name] = value
+            elif kind == 'bucket':
+                buckets.setdefault(name, [0] * (len(LATENCY_BUCKETS) + 1))[index] = value
+            else:
+                pending_sums[name] = sums.get(name, 0.0)
+        self._restore(counters, buckets, pending_sums)
+
+    def _restore(self, counters: Dict[str, int], buckets: Dict[str, List[int]], sums: Dict[str, float]):
+        """Возвращает несохраненные наблюдения в очередь процесса"""
+        with self._lock:
+            for name, value in counters.items():
+                self._counters[name] = self._counters.get(name, 0) + value
+            for name, counts in buckets.items():
+                current = self._buckets.setdefault(name, [0] * (len(LATENCY_BUCKETS) + 1))
+                for index, count in enumerate(counts):
+                    current[index] += count
+            for name, seconds in sums.items():
+                self._sums[name] = self._sums.get(name, 0.0) + seconds
+
+    def _counter_key(self, name: str) -> str:
+        return f'{self.key_prefix}counter:{name}'
+
+    def _bucket_key(self, name: str, index: int) -> str:
+        return f'{self.key_prefix}histogram:{name}:{index}'
+
+    def _sum_key(self, name: str) -> str:
+        return f'{self.key_prefix}histogram:{name}:sum_us'
+
+
+# Метрики общие для процесса; данные воркеров суммируются в кэше
+llm_metrics = LLMMetrics()
+atexit.register(llm_metrics.flush)
@@ -4,14 +4,21 @@
 
 import json
 import logging
-from typing import Dict, List, Any, Optional
+import time
+from typing import Dict, List, Any, Iterator, Optional, Tuple
 from pathlib import Path
 from django.conf import settings
 from openai import OpenAI, OpenAIError
 from openai.types.chat import ChatCompletion
 
 from .validators import LLMResponseValidator
-from .error_logging import error_logger, log_error
+from .error_logging import error_logger, error_metrics, log_error
+from .metrics import llm_metrics
+from .artist_catalog import artist_catalog
+from .candidates import ArtistCandidateSelector
+from .response_cache import llm_response_cache
+from .registry import config_files, llm_registry
+from .resilience import CircuitOpenError, RetryPolicy, openai_circuit_breaker
 
 logger = logging.getLogger(__name__)
 
@@ -21,20 +28,25 @@ class OpenAIService:
     Сервис для работы с OpenAI GPT-4o API
     """
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, candidate_selector: Optional[ArtistCandidateSelector] = None):
         """
         Инициализация сервиса
         
         Args:
             api_key: API ключ OpenAI (если не указан, берется из settings)
+            candidate_selector: Отбор артистов для промпта (по умолчанию передаются все)
         """
+        self.candidate_selector = candidate_selector or ArtistCandidateSelector({'strategy': 'none'})
         self.api_key = api_key or getattr(settings, 'OPENAI_API_KEY', None)
         if not self.api_key:
             raise ValueError("OPENAI_API_KEY не указан в настройках")
         
-        self.client = OpenAI(api_key=self.api_key)
+        # Клиент общий для процесса: HTTP соединения переиспользуются между запросами
+        self.client = llm_registry.get_openai_client(OpenAI, self.api_key)
         self.prompt = self._load_prompt()
         self.schema = self._load_schema()
+        self.prompt_version = llm_response_cache.fingerprint(self.prompt)
+        self.schema_version = llm_response_cache.fingerprint(self.schema)
         
         # Параметры модели
         self.model = getattr(settings, 'OPENAI_MODEL', 'gpt-4o')
@@ -42,6 +54,10 @@ class OpenAIService:
         self.max_tokens = getattr(settings, 'OPENAI_MAX_TOKENS', 4000)
         self.max_retries = getattr(settings, 'OPENAI_MAX_RETRIES', 3)
         self.timeout = getattr(settings, 'OPENAI_TIMEOUT', 60)
+        self.retry_policy = RetryPolicy(max_retries=self.max_retries)
+        self.circuit_breaker = openai_circuit_breaker
+        # Повторами управляет retry_policy, встроенные повторы клиента отключены
+        self.client.max_retries = 0
         
         logger.info(f"OpenAI Service initialized with model: {self.model}")
     
@@ -49,8 +65,7 @@ class OpenAIService:
         """Загрузка промпта из файла"""
         try:
             prompt_path = Path(__file__).parent / 'llm_prompt.txt'
-            with open(prompt_path, 'r', encoding='utf-8') as f:
-                return f.read()
+            return config_files.load(prompt_path, str)
         except FileNotFoundError:
             logger.error("LLM prompt file not found")
             raise
@@ -59,8 +74,7 @@ class OpenAIService:
         """Загрузка JSON схемы"""
         try:
             schema_path = Path(__file__).parent / 'llm_schema.json'
-            with open(schema_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return config_files.load(schema_path, json.loads)
         except FileNotFoundError:
             logger.error("LLM schema file not found")
             raise
@@ -68,14 +82,16 @@ class OpenAIService:
     def analyze_request(
         self, 
         request_data: Dict[str, Any], 
-        artists_data: Optional[List[Dict[str, Any]]] = None
+        artists_data: Optional[List[Dict[str, Any]]] = None,
+        force_refresh: bool = False
     ) -> Dict[str, Any]:
         """
         Анализ запроса через GPT-4o
         
         Args:
             request_data: Данные запроса (текст, автор, медиа)
-            artists_data: Список доступных артистов (не используется пока)
+            artists_data: Список доступных артистов; в промпт попадают отобранные кандидаты
+            force_refresh: Не использовать сохраненный ответ из кэша
             
         Returns:
             Структурированный JSON ответ
@@ -90,10 +106,19 @@ class OpenAIService:
         if not request_text:
             raise ValueError("Request text is empty")
         
+        # Повторный анализ того же текста не обращается к API
+        cache_key = self._cache_key(request_text, artists_data)
+        if not force_refresh:
+            cached_result = llm_response_cache.get(cache_key)
+            if cached_result is not None:
+                logger.info(f"Request #{request_id} analysis served from LLM response cache")
+                cached_result['cached'] = True
+                return cached_result
+        
         logger.info(f"Analyzing request #{request_id} with OpenAI GPT-4o")
         
-        # Формируем полный промпт
-        full_prompt = f"{self.prompt}\n\n{request_text}"
+        # Формируем полный промпт; кандидаты отбираются только при промахе кэша
+        full_prompt = self._build_prompt(request_text, artists_data)
         
         # Вызываем GPT-4o с JSON mode
         try:
@@ -110,11 +135,16 @@ class OpenAIService:
             validated_result['processing_time'] = getattr(response, 'processing_time', 0)
             validated_result['used_emulator'] = False
             validated_result['model'] = self.model
+            usage = getattr(response, 'usage', None)
+            prompt_tokens = getattr(usage, 'prompt_tokens', None)
+            if isinstance(prompt_tokens, int):
+                validated_result['prompt_tokens'] = prompt_tokens
             
             logger.info(f"Successfully analyzed request #{request_id}")
             
             # Сохраняем последний успешный ответ для эмулятора
             self._save_last_response(validated_result)
+            llm_response_cache.set(cache_key, validated_result)
             
             return validated_result
             
@@ -128,53 +158,181 @@ class OpenAIService:
             log_error('llm_analysis', e, {'request_id': request_id})
             raise
     
-    def _call_openai_with_retry(self, prompt: str, retry_count: int = 0) -> ChatCompletion:
+    def stream_request(
+        self,
+        request_data: Dict[str, Any],
+        artists_data: Optional[List[Dict[str, Any]]] = None,
+        force_refresh: bool = False
+    ) -> Iterator[Tuple[str, Any]]:
         """
-        Вызов OpenAI API с retry логикой и Structured Outputs
+        Потоковый анализ запроса через GPT-4o
         
         Args:
-            prompt: Промпт для GPT-4o
-            retry_count: Текущая попытка (для рекурсии)
+            request_data: Данные запроса (текст, автор, медиа)
+            artists_data: Список доступных артистов; в промпт попадают отобранные кандидаты
+            force_refresh: Не использовать сохраненный ответ из кэша
             
-        Returns:
-            ChatCompletion ответ от API
+        Yields:
+            ('delta', фрагмент JSON) по мере генерации, в конце ('result', ответ)
         """
+        request_text = request_data.get('text', '')
+        request_id = request_data.get('id', 'unknown')
+        
+        if not request_text:
+            raise ValueError("Request text is empty")
+        
+        cache_key = self._cache_key(request_text, artists_data)
+        if not force_refresh:
+            cached_result = llm_response_cache.get(cache_key)
+            if cached_result is not None:
+                logger.info(f"Request #{request_id} analysis served from LLM response cache")
+                cached_result['cached'] = True
+                yield 'result', cached_result
+                return
+        
+        logger.info(f"Streaming analysis of request #{request_id} with OpenAI GPT-4o")
+        start_time = time.time()
+        parts = []
+        prompt_tokens = None
         try:
-            # Используем Structured Outputs с JSON schema для строгого соответствия формату
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "Ты профессиональный ассистент кастинг-директора. Анализируй запросы и извлекай информацию строго по указанной JSON схеме. Всегда возвращай валидный JSON."
-                    },
-                    {
-                        "role": "user", 
-                        "content": prompt
-                    }
-                ],
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-                timeout=self.timeout,
-                response_format={
-                    "type": "json_schema",
-                    "json_schema": {
-                        "name": "casting_request_analysis",
-                        "strict": True,
-                        "schema": self.schema
-                    }
-                }
+            # Повторы возможны только до первого фрагмента: установка соединения идет через retry
+            stream = self._call_openai_with_retry(self._build_prompt(request_text, artists_data), stream=True)
+            for chunk in stream:
+                if chunk.choices:
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        parts.append(delta)
+                        yield 'delta', delta
+                usage = getattr(chunk, 'usage', None)
+                if usage is not None and isinstance(usage.prompt_tokens, int):
+                    prompt_tokens = usage.prompt_tokens
+            
+            content = ''.join(parts)
+            if not content:
+                raise ValueError("Empty response from OpenAI")
+            result = json.loads(content)
+        except OpenAIError as e:
+            log_error('openai_api', e, {'request_id': request_id})
+            raise
+        except json.JSONDecodeError as e:
+            log_error('json_parse', e, {'request_id': request_id, 'response': ''.join(parts)})
+            raise
+        
+        result['processing_time'] = time.time() - start_time
+        result['used_emulator'] = False
+        result['model'] = self.model
+        if prompt_tokens is not None:
+            result['prompt_tokens'] = prompt_tokens
+        
+        logger.info(f"Successfully streamed analysis of request #{request_id}")
+        self._save_last_response(result)
+        llm_response_cache.set(cache_key, result)
+        yield 'result', result
+    
+    def _cache_key(self, request_text: str, artists_data: Optional[List[Dict[str, Any]]] = None) -> str:
+        """Ключ ответа в кэше ответов LLM"""
+        return llm_response_cache.make_key(
+            request_text, self.prompt_version, self.schema_version, self.model, artist_catalog.version(),
+            self.candidate_selector.fingerprint() if artists_data else ''
+        )
+    
+    def _build_prompt(self, request_text: str, artists_data: Optional[List[Dict[str, Any]]] = None) -> str:
+        """Промпт с текстом запроса и отобранными артистами-кандидатами"""
+        prompt = f"{self.prompt}\n\n{request_text}"
+        candidates = self.candidate_selector.prepare(request_text, artists_data) if artists_data else []
+        if candidates:
+            prompt += (
+                "\n\nАРТИСТЫ-КАНДИДАТЫ ИЗ КАТАЛОГА (учитывай при описании ролей):\n"
+                f"{self.candidate_selector.render(candidates)}"
             )
+        return prompt
+    
+    def _call_openai_with_retry(self, prompt: str, stream: bool = False) -> ChatCompletion:
+        """
+        Вызов OpenAI API с повторами и Structured Outputs
+        
+        Между повторами - экспоненциальная задержка с джиттером или
+        Retry-After из ответа. Серия неудачных вызовов открывает circuit
+        breaker, после чего вызовы отклоняются сразу.
+        
+        Args:
+            prompt: Промпт для GPT-4o
+            stream: Получать ответ по частям (возвращается Stream фрагментов)
             
-            return response
+        Returns:
+            ChatCompletion ответ от API
             
-        except OpenAIError as e:
-            if retry_count < self.max_retries:
-                logger.warning(f"OpenAI API error, retrying ({retry_count + 1}/{self.max_retries}): {e}")
-                return self._call_openai_with_retry(prompt, retry_count + 1)
-            else:
-                logger.error(f"OpenAI API error after {self.max_retries} retries: {e}")
+        Raises:
+            CircuitOpenError: Если circuit breaker открыт
+            OpenAIError: Если повторы исчерпаны или ошибка не исправится повтором
+        """
+        attempt = 0
+        while True:
+            try:
+                self.circuit_breaker.check()
+            except CircuitOpenError:
+                error_metrics.increment_metric('circuit_open_rejections')
                 raise
+            try:
+                # Для потока - время до начала ответа
+                with llm_metrics.timer('openai_call_seconds'):
+                    response = self._create_completion(prompt, stream=stream)
+            except OpenAIError as e:
+                if not self.retry_policy.is_retryable(e):
+                    # Ошибка запроса (ключ, формат) не говорит о недоступности upstream
+                    logger.error(f"OpenAI API error, not retryable: {e}")
+                    raise
+                
+                max_retries = self.retry_policy.max_retries
+                delay = self.retry_policy.delay(attempt, e) if attempt < max_retries else None
+                if delay is None:
+                    logger.error(f"OpenAI API error after {attempt + 1} attempts: {e}")
+                    if self.circuit_breaker.record_failure():
+                        error_metrics.increment_metric('circuit_breaker_trips')
+                    raise
+                
+                attempt += 1
+                error_metrics.increment_metric('retry_attempts')
+                llm_metrics.observe('retry_delay_seconds', delay)
+                logger.warning(
+                    f"OpenAI API error, retrying ({attempt}/{max_retries}) in {delay:.2f}s: {e}"
+                )
+                time.sleep(delay)
+                continue
+            
+            self.circuit_breaker.record_success()
+            return response
+    
+    def _create_completion(self, prompt: str, stream: bool = False) -> ChatCompletion:
+        """Один вызов chat completions"""
+        # Размер промпта в потоке приходит последним фрагментом
+        options = {'stream': True, 'stream_options': {'include_usage': True}} if stream else {}
+        # Используем Structured Outputs с JSON schema для строгого соответствия формату
+        return self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {
+                    "role": "system", 
+                    "content": "Ты профессиональный ассистент кастинг-директора. Анализируй запросы и извлекай информацию строго по указанной JSON схеме. Всегда возвращай валидный JSON."
+                },
+                {
+                    "role": "user", 
+                    "content": prompt
+                }
+            ],
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            timeout=self.timeout,
+            response_format={
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "casting_request_analysis",
+                    "strict": True,
+                    "schema": self.schema
+                }
+            },
+            **options
+        )
     
     def _parse_response(self, response: ChatCompletion) -> Dict[str, Any]:
         """
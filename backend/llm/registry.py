@@ -0,0 +1,158 @@
+"""
+Реестр LLM сервисов, общих для процесса
+"""
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigFileCache:
+    """
+    Разобранное содержимое файлов конфигурации (llm_config.yaml, промпт,
+    JSON схема). Файл перечитывается, только если изменились его mtime
+    или размер. Возвращаемые объекты общие - изменять их нельзя.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str], Tuple[Tuple[int, int], Any]] = {}
+
+    @staticmethod
+    def stamp(path) -> Tuple[int, int]:
+        """Отметка версии файла: (mtime в наносекундах, размер)"""
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self, path, parser: Callable[[str], Any], name: str = '') -> Any:
+        """
+        Возвращает разобранное содержимое файла
+
+        Args:
+            path: Путь к файлу
+            parser: Функция разбора текста файла (yaml.safe_load, json.loads, str)
+            name: Имя разбора; один файл может разбираться по-разному
+
+        Raises:
+            FileNotFoundError: Если файла нет
+        """
+        key = (str(path), name or getattr(parser, '__name__', ''))
+        stamp = self.stamp(path)
+        entry = self._entries.get(key)
+        if entry and entry[0] == stamp:
+            return entry[1]
+
+        with open(path, 'r', encoding='utf-8') as f:
+            value = parser(f.read())
+        with self._lock:
+            self._entries[key] = (stamp, value)
+        logger.info(f"Файл конфигурации LLM загружен: {path}")
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class LLMServiceRegistry:
+    """
+    Один LLMService на процесс вместо создания сервиса на каждый запрос.
+
+    Сервис пересоздается, когда меняются файлы конфигурации (по mtime)
+    или настройки OpenAI, поэтому правка llm_config.yaml применяется без
+    перезапуска. Клиент OpenAI создается один раз на API ключ: его пул
+    HTTP соединений переживает пересоздание сервиса.
+    """
+
+    def __init__(self):
+        # Повторный вход: сервис создает клиента OpenAI под той же блокировкой
+        self._lock = threading.RLock()
+        self._service = None
+        self._signature = None
+        self._clients: Dict[Tuple[Any, str], Any] = {}
+
+    @staticmethod
+    def config_paths() -> Tuple[Path, ...]:
+        """Файлы, от которых зависит сервис"""
+        llm_dir = Path(__file__).parent
+        return (
+            Path(settings.BASE_DIR) / 'llm_config.yaml',
+            llm_dir / 'llm_prompt.txt',
+            llm_dir / 'llm_schema.json',
+        )
+
+    def signature(self) -> tuple:
+        """Версия конфигурации: отметки файлов и настройки OpenAI"""
+        stamps = []
+        for path in self.config_paths():
+            try:
+                stamps.append(config_files.stamp(path))
+            except OSError:
+                stamps.append(None)
+        return (
+            tuple(stamps),
+            getattr(settings, 'OPENAI_API_KEY', None),
+            getattr(settings, 'OPENAI_MODEL', 'gpt-4o'),
+        )
+
+    def get_service(self):
+        """Актуальный LLMService"""
+        signature = self.signature()
+        service = self._service
+        if service is not None and self._signature == signature:
+            return service
+
+        with self._lock:
+            if self._service is None or self._signature != signature:
+                from .services import LLMService
+
+                if self._service is not None:
+                    logger.info("Конфигурация LLM изменилась, сервис пересоздается")
+                self._service = LLMService()
+                self._signature = signature
+            return self._service
+
+    def get_openai_client(self, factory: Callable[..., Any], api_key: str):
+        """
+        Общий клиент OpenAI для API ключа
+
+        Args:
+            factory: Класс клиента (openai.OpenAI)
+            api_key: API ключ
+        """
+        key = (factory, api_key)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = factory(api_key=api_key)
+                    self._clients[key] = client
+        return client
+
+    def reset(self):
+        """Сбрасывает сервис и клиентов (тесты, смена ключа)"""
+        with self._lock:
+            self._service = None
+            self._signature = None
+            clients, self._clients = self._clients, {}
+        for client in clients.values():
+            try:
+                client.close()
+            except Exception as e:
+                logger.warning(f"Ошибка закрытия клиента OpenAI: {e}")
+
+
+# Общие для процесса
+config_files = ConfigFileCache()
+llm_registry = LLMServiceRegistry()
+
+
+def get_llm_service():
+    """LLMService, общий для процесса"""
+    return llm_registry.get_service()
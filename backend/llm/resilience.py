@@ -0,0 +1,204 @@
+"""
+Повторы вызовов OpenAI с экспоненциальной задержкой и circuit breaker
+"""
+import logging
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Вызов отклонен: circuit breaker открыт после серии ошибок upstream"""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"OpenAI временно недоступен, повторите через {retry_after:.0f} с")
+
+
+class RetryPolicy:
+    """
+    Задержки между повторами: экспоненциальный рост с полным джиттером
+    (случайная задержка от 0 до base * 2^attempt, но не больше max_delay).
+    Если upstream прислал Retry-After, ждем указанное время; слишком
+    долгое ожидание (больше max_delay) не ждем - повтор отменяется.
+    """
+
+    # Ошибки клиента, которые не исправятся повтором (кроме таймаута, конфликта и лимита)
+    RETRYABLE_CLIENT_STATUSES = (408, 409, 429)
+
+    def __init__(
+        self,
+        max_retries: Optional[int] = None,
+        base_delay: Optional[float] = None,
+        max_delay: Optional[float] = None
+    ):
+        self.max_retries = max_retries if max_retries is not None else getattr(settings, 'OPENAI_MAX_RETRIES', 3)
+        self.base_delay = base_delay if base_delay is not None else getattr(settings, 'OPENAI_RETRY_BASE_DELAY', 0.5)
+        self.max_delay = max_delay if max_delay is not None else getattr(settings, 'OPENAI_RETRY_MAX_DELAY', 20)
+
+    def is_retryable(self, error: Exception) -> bool:
+        """Можно ли повторить вызов после ошибки"""
+        status_code = getattr(error, 'status_code', None)
+        if isinstance(status_code, int) and 400 <= status_code < 500:
+            return status_code in self.RETRYABLE_CLIENT_STATUSES
+        return True
+
+    def delay(self, attempt: int, error: Optional[Exception] = None) -> Optional[float]:
+        """
+        Задержка перед повтором
+
+        Args:
+            attempt: Номер повтора, начиная с 0
+            error: Ошибка предыдущей попытки
+
+        Returns:
+            Секунды ожидания или None, если ждать не имеет смысла
+        """
+        retry_after = self.retry_after(error)
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_delay else None
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    @staticmethod
+    def retry_after(error: Optional[Exception]) -> Optional[float]:
+        """Время ожидания из заголовков retry-after-ms / Retry-After ответа"""
+        response = getattr(error, 'response', None)
+        headers = getattr(response, 'headers', None)
+        if not headers:
+            return None
+
+        value = headers.get('retry-after-ms')
+        if value:
+            try:
+                return max(float(value) / 1000, 0.0)
+            except ValueError:
+                pass
+
+        value = headers.get('retry-after')
+        if not value:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+        try:
+            # Retry-After может быть HTTP датой
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError, OverflowError):
+            return None
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker для upstream API с состоянием в кэше Django.
+
+    После failure_threshold подряд неудачных вызовов (повторы исчерпаны)
+    breaker открывается на reset_timeout секунд: вызовы сразу отклоняются
+    с CircuitOpenError, не занимая воркеры на время таймаута. Затем один
+    пробный вызов (half-open) решает, закрыть breaker или открыть снова.
+    Состояние хранится в общем кэше, поэтому видно всем воркерам.
+    """
+
+    STATE_CLOSED = 'closed'
+    STATE_OPEN = 'open'
+    STATE_HALF_OPEN = 'half_open'
+
+    FAILURES_CACHE_KEY = 'llm:circuit:{name}:failures'
+    OPEN_UNTIL_CACHE_KEY = 'llm:circuit:{name}:open_until'
+    PROBE_CACHE_KEY = 'llm:circuit:{name}:probe'
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: Optional[int] = None,
+        reset_timeout: Optional[float] = None
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold or getattr(settings, 'OPENAI_CIRCUIT_FAILURE_THRESHOLD', 5)
+        self.reset_timeout = reset_timeout or getattr(settings, 'OPENAI_CIRCUIT_RESET_TIMEOUT', 30)
+        self.failures_key = self.FAILURES_CACHE_KEY.format(name=name)
+        self.open_until_key = self.OPEN_UNTIL_CACHE_KEY.format(name=name)
+        self.probe_key = self.PROBE_CACHE_KEY.format(name=name)
+
+    def state(self) -> str:
+        """Текущее состояние breaker"""
+        open_until = cache.get(self.open_until_key)
+        if open_until is None:
+            return self.STATE_CLOSED
+        return self.STATE_OPEN if open_until > time.time() else self.STATE_HALF_OPEN
+
+    def allow_request(self) -> bool:
+        """Можно ли выполнить вызов (в half-open - только один пробный)"""
+        state = self.state()
+        if state == self.STATE_CLOSED:
+            return True
+        if state == self.STATE_HALF_OPEN:
+            return cache.add(self.probe_key, 1, self.reset_timeout)
+        return False
+
+    def check(self):
+        """
+        Raises:
+            CircuitOpenError: Если вызов сейчас не разрешен
+        """
+        if not self.allow_request():
+            raise CircuitOpenError(self.retry_after())
+
+    def retry_after(self) -> float:
+        """Секунды до пробного вызова"""
+        open_until = cache.get(self.open_until_key)
+        return max(open_until - time.time(), 0.0) if open_until else 0.0
+
+    def record_success(self):
+        """Успешный вызов закрывает breaker"""
+        if self.state() != self.STATE_CLOSED:
+            logger.info(f"Circuit breaker {self.name} закрыт")
+        cache.delete_many([self.failures_key, self.open_until_key, self.probe_key])
+
+    def record_failure(self) -> bool:
+        """
+        Учитывает неудачный вызов
+
+        Returns:
+            True, если breaker открылся
+        """
+        cache.add(self.failures_key, 0, None)
+        try:
+            failures = cache.incr(self.failures_key)
+        except ValueError:
+            failures = 1
+            cache.set(self.failures_key, failures, None)
+
+        if self.state() == self.STATE_CLOSED and failures < self.failure_threshold:
+            return False
+
+        # Порог достигнут или не удался пробный вызов - открываем снова
+        cache.set(self.open_until_key, time.time() + self.reset_timeout, None)
+        cache.delete(self.probe_key)
+        logger.warning(
+            f"Circuit breaker {self.name} открыт на {self.reset_timeout} с после {failures} ошибок подряд"
+        )
+        return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Состояние для метрик"""
+        return {
+            'state': self.state(),
+            'failures': cache.get(self.failures_key, 0),
+            'retry_after': round(self.retry_after(), 1),
+            'failure_threshold': self.failure_threshold,
+            'reset_timeout': self.reset_timeout,
+        }
+
+    def reset(self):
+        cache.delete_many([self.failures_key, self.open_until_key, self.probe_key])
+
+
+# Breaker общий для всех воркеров (состояние в кэше)
+openai_circuit_breaker = CircuitBreaker('openai')
@@ -0,0 +1,142 @@
+"""
+Кэш ответов LLM по содержимому запроса
+"""
+import hashlib
+import json
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class LLMResponseCache:
+    """
+    Кэш ответов модели на анализ запросов.
+
+    Ключ - хэш нормализованного текста запроса, версий промпта и схемы
+    (хэши их содержимого), модели и версии каталога артистов. Любое
+    изменение промпта, схемы, модели или каталога дает новый ключ, поэтому
+    явная инвалидация не нужна: старые ответы истекают по TTL.
+
+    Число записей ограничено LLM_RESPONSE_CACHE_MAX_ENTRIES: порядок
+    использования ключей хранится в кэше, при переполнении удаляются давно
+    не использованные ответы. Индекс обновляется без межпроцессной
+    блокировки, поэтому при одновременной записи из разных воркеров лимит
+    может быть кратковременно превышен - записи все равно истекают по TTL.
+    """
+
+    KEY_PREFIX = 'llm:response_cache:entry:'
+    INDEX_CACHE_KEY = 'llm:response_cache:index'
+    HITS_CACHE_KEY = 'llm:response_cache:hits'
+    MISSES_CACHE_KEY = 'llm:response_cache:misses'
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        ttl: Optional[int] = None,
+        max_entries: Optional[int] = None
+    ):
+        self.enabled = enabled if enabled is not None else getattr(settings, 'LLM_RESPONSE_CACHE_ENABLED', True)
+        self.ttl = ttl or getattr(settings, 'LLM_RESPONSE_CACHE_TTL', 24 * 60 * 60)
+        self.max_entries = max_entries or getattr(settings, 'LLM_RESPONSE_CACHE_MAX_ENTRIES', 500)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(value: Any) -> str:
+        """Короткий хэш содержимого (версия промпта или схемы)"""
+        if not isinstance(value, str):
+            value = json.dumps(value, sort_keys=True, ensure_ascii=False)
+        return hashlib.blake2b(value.encode('utf-8'), digest_size=8).hexdigest()
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """Нормализация текста запроса: пробелы и переводы строк не влияют на ключ"""
+        return ' '.join((text or '').split())
+
+    def make_key(
+        self,
+        text: str,
+        prompt_version: str,
+        schema_version: str,
+        model: str,
+        catalog_version: int,
+        candidates: str = ''
+    ) -> str:
+        """Ключ ответа в кэше; candidates - настройки отбора артистов для промпта"""
+        payload = json.dumps(
+            [self.normalize_text(text), prompt_version, schema_version, model, catalog_version, candidates],
+            ensure_ascii=False
+        )
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Возвращает сохраненный ответ и учитывает попадание/промах"""
+        if not self.enabled:
+            return None
+
+        try:
+            result = cache.get(self.KEY_PREFIX + key)
+        except Exception as e:
+            # Недоступный кэш не должен мешать анализу
+            logger.warning(f"Ошибка чтения кэша ответов LLM: {e}")
+            return None
+        self._increment(self.HITS_CACHE_KEY if result is not None else self.MISSES_CACHE_KEY)
+        if result is not None:
+            self._touch(key)
+        return result
+
+    def set(self, key: str, result: Dict[str, Any]):
+        """Сохраняет ответ и вытесняет давно не использованные записи"""
+        if not self.enabled:
+            return
+
+        try:
+            cache.set(self.KEY_PREFIX + key, result, self.ttl)
+        except Exception as e:
+            logger.warning(f"Ошибка записи в кэш ответов LLM: {e}")
+            return
+        evicted = self._touch(key)
+        if evicted:
+            cache.delete_many([self.KEY_PREFIX + old_key for old_key in evicted])
+            logger.info(f"Из кэша ответов LLM вытеснено {len(evicted)} записей")
+
+    def stats(self) -> Dict[str, int]:
+        """Счетчики попаданий и промахов"""
+        return {
+            'hits': cache.get(self.HITS_CACHE_KEY, 0),
+            'misses': cache.get(self.MISSES_CACHE_KEY, 0),
+            'entries': len(cache.get(self.INDEX_CACHE_KEY, [])),
+        }
+
+    def clear(self):
+        """Удаляет все ответы и сбрасывает счетчики"""
+        index = cache.get(self.INDEX_CACHE_KEY, [])
+        cache.delete_many(
+            [self.KEY_PREFIX + key for key in index]
+            + [self.INDEX_CACHE_KEY, self.HITS_CACHE_KEY, self.MISSES_CACHE_KEY]
+        )
+
+    def _touch(self, key: str) -> list:
+        """Переносит ключ в конец очереди LRU и возвращает вытесненные ключи"""
+        with self._lock:
+            index = [old_key for old_key in cache.get(self.INDEX_CACHE_KEY, []) if old_key != key]
+            index.append(key)
+            evicted = index[:-self.max_entries] if len(index) > self.max_entries else []
+            cache.set(self.INDEX_CACHE_KEY, index[len(evicted):], None)
+        return evicted
+
+    @staticmethod
+    def _increment(key: str):
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+# Кэш общий для процесса
+llm_response_cache = LLMResponseCache()
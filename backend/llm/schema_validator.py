@@ -0,0 +1,451 @@
+"""
+Валидатор ответов LLM, скомпилированный из llm_schema.json
+"""
+import copy
+import json
+import logging
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from .registry import config_files
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_PATH = Path(__file__).parent / 'llm_schema.json'
+
+# Значение отсутствует и не может быть подставлено по умолчанию
+_MISSING = object()
+
+# Типы JSON схемы -> типы Python (bool исключается отдельно: это не число)
+PYTHON_TYPES: Dict[str, Tuple[type, ...]] = {
+    'string': (str,),
+    'integer': (int,),
+    'number': (int, float),
+    'boolean': (bool,),
+    'null': (type(None),),
+    'array': (list,),
+    'object': (dict,),
+}
+
+
+class _Context:
+    """Состояние одного прохода: найденные ошибки и выполненные исправления"""
+
+    __slots__ = ('repair', 'errors', 'repairs')
+
+    def __init__(self, repair: bool):
+        self.repair = repair
+        self.errors: List[str] = []
+        self.repairs: List[str] = []
+
+
+Node = Callable[[Any, str, _Context], Any]
+
+
+class CompiledSchemaValidator:
+    """
+    JSON схема, скомпилированная в дерево функций проверки.
+
+    Схема разбирается один раз: для каждого узла заранее готовятся
+    проверки типа, списки обязательных полей и вложенные узлы, поэтому
+    проверка ответа - это только вызовы готовых функций без обхода схемы.
+
+    В режиме исправления (repair) узлы возвращают исправленную копию
+    значения там, где исправление однозначно:
+        - приведение типов ("0.8" -> 0.8, 25.0 -> 25, 180 -> "180",
+          одиночное значение -> список из одного элемента);
+        - ограничение чисел границами minimum/maximum (confidence);
+        - значения enum без учета регистра и пробелов ("Male" -> "male");
+        - отсутствующие обязательные поля, у которых есть значение по
+          умолчанию (null, пустой список, объект из таких полей);
+        - значение, которое нельзя привести, заменяется на null, если
+          схема допускает null.
+    Ошибки, которые так исправить нельзя (нет названия проекта, пустой
+    список ролей), остаются в списке ошибок - такой ответ запрашивается
+    у модели заново.
+
+    Для быстрой проверки (is_valid) схема компилируется еще и в одну
+    функцию без вложенных вызовов (см. _PredicateBuilder): она не собирает
+    ошибок и не строит пути к полям, а только отвечает да/нет.
+
+    additionalProperties не проверяется: сервис дополняет ответ модели
+    метаданными (processing_time, model, cached).
+    """
+
+    def __init__(self, schema: Dict[str, Any]):
+        self.schema = schema
+        self._root = self._compile(schema)
+        self._valid = _PredicateBuilder().build(schema)
+
+    @classmethod
+    def from_text(cls, text: str) -> 'CompiledSchemaValidator':
+        """Компиляция из текста файла схемы"""
+        return cls(json.loads(text))
+
+    def errors(self, data: Any) -> List[str]:
+        """Ошибки соответствия схеме (пустой список - ответ валиден)"""
+        context = _Context(repair=False)
+        self._root(data, '$', context)
+        return context.errors
+
+    def is_valid(self, data: Any) -> bool:
+        """Соответствует ли ответ схеме; то же, что not errors(data), но быстрее"""
+        return self._valid(data)
+
+    def repair(self, data: Any) -> Tuple[Any, List[str], List[str]]:
+        """
+        Исправляет ответ по схеме
+
+        Args:
+            data: Ответ модели (не изменяется)
+
+        Returns:
+            (исправленная копия, выполненные исправления, неисправимые ошибки)
+        """
+        context = _Context(repair=True)
+        value = self._root(data, '$', context)
+        return value, context.repairs, context.errors
+
+    def _compile(self, schema: Dict[str, Any]) -> Node:
+        if 'anyOf' in schema:
+            return self._compile_any_of(schema)
+
+        types = schema.get('type')
+        types = [types] if isinstance(types, str) else list(types or [])
+        accepted = tuple(python_type for name in types for python_type in PYTHON_TYPES[name])
+        reject_bool = 'boolean' not in types
+        nullable = 'null' in types
+        expected = ' or '.join(types)
+        default = self._default(schema)
+
+        inner: List[Node] = []
+        if 'object' in types:
+            inner.append(self._compile_object(schema))
+        if 'array' in types:
+            inner.append(self._compile_array(schema))
+        if 'number' in types or 'integer' in types:
+            inner.append(self._compile_range(schema))
+        if 'enum' in schema:
+            inner.append(self._compile_enum(schema, nullable))
+
+        def check(value, path, context):
+            if accepted and (not isinstance(value, accepted) or (reject_bool and isinstance(value, bool))):
+                if not context.repair:
+                    context.errors.append(f"{path}: expected {expected}")
+                    return value
+                coerced = self._coerce(value, types, default)
+                if coerced is _MISSING:
+                    if nullable:
+                        context.repairs.append(f"{path}: {value!r} replaced with null")
+                        return None
+                    context.errors.append(f"{path}: expected {expected}")
+                    return value
+                context.repairs.append(f"{path}: {value!r} coerced to {coerced!r}")
+                value = coerced
+            if value is None:
+                return value
+            for node in inner:
+                value = node(value, path, context)
+            return value
+
+        return check
+
+    def _compile_any_of(self, schema: Dict[str, Any]) -> Node:
+        branches = [self._compile(branch) for branch in schema['anyOf']]
+        nullable = any(branch.get('type') == 'null' for branch in schema['anyOf'])
+
+        def check(value, path, context):
+            for branch in branches:
+                probe = _Context(repair=False)
+                branch(value, path, probe)
+                if not probe.errors:
+                    return value
+            if context.repair:
+                for branch in branches:
+                    attempt = _Context(repair=True)
+                    repaired = branch(value, path, attempt)
+                    if not attempt.errors:
+                        context.repairs.extend(attempt.repairs)
+                        return repaired
+                if nullable:
+                    context.repairs.append(f"{path}: unmatched value replaced with null")
+                    return None
+            context.errors.append(f"{path}: does not match any allowed variant")
+            return value
+
+        return check
+
+    def _compile_object(self, schema: Dict[str, Any]) -> Node:
+        properties = {name: self._compile(sub) for name, sub in schema.get('properties', {}).items()}
+        defaults = {
+            name: self._default(schema['properties'][name]) if name in schema.get('properties', {}) else _MISSING
+            for name in schema.get('required', [])
+        }
+
+        def check(value, path, context):
+            if context.repair:
+                value = dict(value)
+            for name, default in defaults.items():
+                if name not in value:
+                    if context.repair and default is not _MISSING:
+                        context.repairs.append(f"{path}.{name}: missing, filled with {default!r}")
+                        # Значения по умолчанию общие для всех проходов - отдаем копию
+                        value[name] = copy.deepcopy(default)
+                    else:
+                        context.errors.append(f"{path}.{name}: required field missing")
+            for name, node in properties.items():
+                if name in value:
+                    repaired = node(value[name], f"{path}.{name}", context)
+                    if context.repair:
+                        value[name] = repaired
+            return value
+
+        return check
+
+    def _compile_array(self, schema: Dict[str, Any]) -> Node:
+        items = self._compile(schema['items']) if 'items' in schema else None
+        min_items = schema.get('minItems')
+
+        def check(value, path, context):
+            if min_items is not None and len(value) < min_items:
+                context.errors.append(f"{path}: at least {min_items} item(s) required")
+            if items is None:
+                return list(value) if context.repair else value
+            repaired = [items(item, f"{path}[{index}]", context) for index, item in enumerate(value)]
+            return repaired if context.repair else value
+
+        return check
+
+    @staticmethod
+    def _compile_range(schema: Dict[str, Any]) -> Node:
+        minimum = schema.get('minimum')
+        maximum = schema.get('maximum')
+
+        def check(value, path, context):
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                return value
+            bounded = value
+            if minimum is not None and value < minimum:
+                bounded = minimum
+            elif maximum is not None and value > maximum:
+                bounded = maximum
+            if bounded == value:
+                return value
+            if context.repair:
+                context.repairs.append(f"{path}: {value!r} clamped to {bounded!r}")
+                return bounded
+            context.errors.append(f"{path}: {value!r} out of range [{minimum}, {maximum}]")
+            return value
+
+        return check
+
+    @staticmethod
+    def _compile_enum(schema: Dict[str, Any], nullable: bool) -> Node:
+        allowed = set(schema['enum'])
+        # Нормализованное написание -> значение из enum
+        normalized = {
+            CompiledSchemaValidator._normalize(option): option
+            for option in schema['enum'] if isinstance(option, str)
+        }
+
+        def check(value, path, context):
+            if value in allowed:
+                return value
+            if context.repair:
+                option = normalized.get(CompiledSchemaValidator._normalize(value)) if isinstance(value, str) else None
+                if option is not None:
+                    context.repairs.append(f"{path}: {value!r} normalized to {option!r}")
+                    return option
+                if nullable:
+                    context.repairs.append(f"{path}: {value!r} not in enum, replaced with null")
+                    return None
+            context.errors.append(f"{path}: {value!r} is not one of {sorted(normalized.values())}")
+            return value
+
+        return check
+
+    @staticmethod
+    def _normalize(value: str) -> str:
+        return value.strip().lower().replace(' ', '_').replace('-', '_').replace("'", '')
+
+    @classmethod
+    def _default(cls, schema: Dict[str, Any]) -> Any:
+        """Значение по умолчанию для отсутствующего поля или _MISSING"""
+        if 'anyOf' in schema:
+            return None if any(branch.get('type') == 'null' for branch in schema['anyOf']) else _MISSING
+        types = schema.get('type')
+        types = [types] if isinstance(types, str) else list(types or [])
+        if 'null' in types:
+            return None
+        if 'array' in types and not schema.get('minItems'):
+            return []
+        if 'object' in types:
+            value = {}
+            for name in schema.get('required', []):
+                default = cls._default(schema.get('properties', {}).get(name, {}))
+                if default is _MISSING:
+                    return _MISSING
+                value[name] = default
+            return value
+        return _MISSING
+
+    @staticmethod
+    def _coerce(value: Any, types: List[str], default: Any) -> Any:
+        """Приведение значения к одному из типов схемы или _MISSING"""
+        if value is None:
+            # null вместо обязательного списка или объекта
+            if default is None or default is _MISSING:
+                return _MISSING
+            return copy.deepcopy(default)
+        if isinstance(value, bool):
+            return _MISSING
+        if isinstance(value, dict):
+            # Один объект вместо списка объектов
+            return [value] if 'array' in types else _MISSING
+
+        if isinstance(value, str):
+            text = value.strip()
+            if 'null' in types and text.lower() in ('', 'null', 'none'):
+                return None
+            if 'integer' in types or 'number' in types:
+                try:
+                    number = float(text.replace(',', '.'))
+                except ValueError:
+                    number = None
+                if number is not None:
+                    if 'integer' in types and number.is_integer():
+                        return int(number)
+                    if 'number' in types:
+                        return number
+            if 'array' in types:
+                return [value]
+            return _MISSING
+
+        if isinstance(value, (int, float)):
+            if 'integer' in types and float(value).is_integer():
+                return int(value)
+            if 'integer' in types and 'number' not in types:
+                return int(round(value))
+            if 'string' in types:
+                return str(value)
+        return _MISSING
+
+
+class _PredicateBuilder:
+    """
+    Генерирует по схеме исходный код функции valid(value) -> bool.
+
+    Проверки выполняются те же, что у узлов CompiledSchemaValidator
+    в режиме проверки (тип, обязательные поля, minItems, minimum/maximum,
+    enum), но развернуты в плоский код: вызов функции на каждое поле
+    ответа стоит дороже самой проверки.
+    """
+
+    def __init__(self):
+        self._lines: List[str] = []
+        self._constants: Dict[str, Any] = {}
+        self._names = 0
+
+    def build(self, schema: Dict[str, Any]) -> Callable[[Any], bool]:
+        self._lines = ['def valid(value):']
+        self._emit(schema, 'value', 1)
+        self._lines.append('    return True')
+        namespace = dict(self._constants, MISSING=_MISSING)
+        exec(compile('\n'.join(self._lines), '<llm_schema>', 'exec'), namespace)
+        return namespace['valid']
+
+    def _name(self) -> str:
+        self._names += 1
+        return f'v{self._names}'
+
+    def _constant(self, value: Any) -> str:
+        name = f'c{len(self._constants)}'
+        self._constants[name] = value
+        return name
+
+    def _line(self, depth: int, text: str):
+        self._lines.append('    ' * depth + text)
+
+    def _emit(self, schema: Dict[str, Any], var: str, depth: int):
+        if 'anyOf' in schema:
+            branches = [_PredicateBuilder().build(branch) for branch in schema['anyOf']]
+            condition = ' or '.join(f'{self._constant(branch)}({var})' for branch in branches)
+            self._line(depth, f'if not ({condition}):')
+            self._line(depth + 1, 'return False')
+            return
+
+        types = schema.get('type')
+        types = [types] if isinstance(types, str) else list(types or [])
+        accepted = tuple(python_type for name in types for python_type in PYTHON_TYPES[name])
+        if accepted:
+            condition = f'not isinstance({var}, {self._constant(accepted)})'
+            if 'boolean' not in types and int in accepted:
+                condition += f' or {var}.__class__ is bool'
+            self._line(depth, f'if {condition}:')
+            self._line(depth + 1, 'return False')
+
+        checks_object = 'object' in types
+        checks_array = 'array' in types
+        checks_range = ('number' in types or 'integer' in types) and (
+            'minimum' in schema or 'maximum' in schema
+        )
+        if not (checks_object or checks_array or checks_range or 'enum' in schema):
+            return
+        if 'null' in types:
+            self._line(depth, f'if {var} is not None:')
+            depth += 1
+
+        if checks_object:
+            required = frozenset(schema.get('required', []))
+            if required:
+                self._line(depth, f'if not {self._constant(required)} <= {var}.keys():')
+                self._line(depth + 1, 'return False')
+            for name, sub in schema.get('properties', {}).items():
+                item = self._name()
+                if name in required:
+                    self._line(depth, f'{item} = {var}[{name!r}]')
+                    length = len(self._lines)
+                    self._emit(sub, item, depth)
+                    if len(self._lines) == length:
+                        # Поле без проверок: присваивание не нужно
+                        self._lines.pop()
+                    continue
+                self._line(depth, f'{item} = {var}.get({name!r}, MISSING)')
+                self._line(depth, f'if {item} is not MISSING:')
+                length = len(self._lines)
+                self._emit(sub, item, depth + 1)
+                if len(self._lines) == length:
+                    self._line(depth + 1, 'pass')
+        if checks_array:
+            if schema.get('minItems'):
+                self._line(depth, f'if len({var}) < {schema["minItems"]!r}:')
+                self._line(depth + 1, 'return False')
+            if 'items' in schema:
+                item = self._name()
+                self._line(depth, f'for {item} in {var}:')
+                length = len(self._lines)
+                self._emit(schema['items'], item, depth + 1)
+                if len(self._lines) == length:
+                    self._line(depth + 1, 'pass')
+        if checks_range:
+            bounds = []
+            if 'minimum' in schema:
+                bounds.append(f'{var} < {schema["minimum"]!r}')
+            if 'maximum' in schema:
+                bounds.append(f'{var} > {schema["maximum"]!r}')
+            self._line(
+                depth,
+                f'if isinstance({var}, (int, float)) and {var}.__class__ is not bool and ({" or ".join(bounds)}):'
+            )
+            self._line(depth + 1, 'return False')
+        if 'enum' in schema:
+            self._line(depth, f'if {var} not in {self._constant(set(schema["enum"]))}:')
+            self._line(depth + 1, 'return False')
+
+
+def get_schema_validator() -> CompiledSchemaValidator:
+    """
+    Валидатор текущей llm_schema.json: компилируется один раз и
+    перекомпилируется, только если файл схемы изменился
+    """
+    return config_files.load(SCHEMA_PATH, CompiledSchemaValidator.from_text, name='compiled_validator')
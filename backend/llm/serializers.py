@@ -2,6 +2,7 @@
 Сериализаторы для LLM запросов и ответов
 """
 
+from django.conf import settings
 from rest_framework import serializers
 from typing import Dict, Any, List, Optional
 from .validators import validate_llm_response
@@ -15,6 +16,14 @@ class LLMAnalysisRequestSerializer(serializers.Serializer):
         default=True, 
         help_text="Использовать ли эмулятор вместо реального LLM"
     )
+    force_refresh = serializers.BooleanField(
+        default=False,
+        help_text="Повторить анализ, не используя сохраненный ответ LLM"
+    )
+    sync = serializers.BooleanField(
+        default=False,
+        help_text="Выполнить анализ OpenAI синхронно, без фоновой задачи"
+    )
     
     def validate_request_id(self, value):
         """Валидация ID запроса"""
@@ -23,6 +32,36 @@ class LLMAnalysisRequestSerializer(serializers.Serializer):
         return value
 
 
+class LLMBatchAnalysisRequestSerializer(serializers.Serializer):
+    """Сериализатор для пакетного анализа запросов"""
+    
+    request_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        help_text="ID запросов для анализа"
+    )
+    use_emulator = serializers.BooleanField(
+        default=False,
+        help_text="Использовать ли эмулятор вместо реального LLM"
+    )
+    force_refresh = serializers.BooleanField(
+        default=False,
+        help_text="Повторить анализ, не используя сохраненные ответы LLM"
+    )
+    concurrency = serializers.IntegerField(
+        required=False,
+        min_value=1,
+        help_text="Сколько запросов анализировать одновременно (не больше LLM_BATCH_CONCURRENCY)"
+    )
+    
+    def validate_request_ids(self, value):
+        """Валидация размера пачки"""
+        max_requests = getattr(settings, 'LLM_BATCH_MAX_REQUESTS', 50)
+        if len(set(value)) > max_requests:
+            raise serializers.ValidationError(f"Не больше {max_requests} запросов за один вызов")
+        return value
+
+
 class ProjectRoleSerializer(serializers.Serializer):
     """Сериализатор для роли в проекте"""
     
@@ -79,6 +118,7 @@ class LLMAnalysisResponseSerializer(serializers.Serializer):
     )
     processing_time = serializers.FloatField(help_text="Время обработки в секундах")
     used_emulator = serializers.BooleanField(help_text="Использовался ли эмулятор")
+    cached = serializers.BooleanField(required=False, help_text="Ответ получен из кэша LLM")
     errors = serializers.ListField(
         child=serializers.CharField(),
         required=False,
@@ -144,6 +184,28 @@ class LLMStatusSerializer(serializers.Serializer):
     failed_requests = serializers.IntegerField(help_text="Неудачные запросы")
     emulator_enabled = serializers.BooleanField(help_text="Эмулятор включен")
     current_model = serializers.CharField(help_text="Текущая модель")
+    cache_hits = serializers.IntegerField(help_text="Ответы, полученные из кэша LLM")
+    cache_misses = serializers.IntegerField(help_text="Запросы, не найденные в кэше LLM")
+    circuit_breaker_state = serializers.ChoiceField(
+        choices=[
+            ('closed', 'Закрыт'),
+            ('open', 'Открыт'),
+            ('half_open', 'Пробный вызов')
+        ],
+        help_text="Состояние circuit breaker OpenAI"
+    )
+    stream_time_to_first_content = serializers.FloatField(
+        allow_null=True,
+        required=False,
+        help_text="Среднее время до первого поля или роли в потоковом анализе, с"
+    )
+    retry_attempts = serializers.IntegerField(required=False, help_text="Повторы вызова OpenAI")
+    fallback_activations = serializers.IntegerField(required=False, help_text="Переключения на эмулятор")
+    latency = serializers.DictField(
+        child=serializers.DictField(),
+        required=False,
+        help_text="Задержки по этапам (count, avg, p50, p95 в секундах) по всем воркерам"
+    )
 
 
 class LLMErrorSerializer(serializers.Serializer):
@@ -12,6 +12,8 @@ import logging
 
 from .validators import LLMResponseValidator, LLMRetryHandler
 from .error_logging import error_logger, error_metrics, log_error
+from .candidates import ArtistCandidateSelector, prefilter_metrics
+from .registry import config_files
 
 logger = logging.getLogger(__name__)
 
@@ -29,8 +31,7 @@ class LLMEmulatorService:
         """Загрузка конфигурации LLM"""
         try:
             config_path = settings.BASE_DIR / 'llm_config.yaml'
-            with open(config_path, 'r', encoding='utf-8') as f:
-                return yaml.safe_load(f)
+            return config_files.load(config_path, yaml.safe_load)
         except FileNotFoundError:
             logger.warning("LLM config file not found, using defaults")
             return self._get_default_config()
@@ -633,44 +634,31 @@ class LLMService:
     """
     
     def __init__(self):
-        print("=" * 80)
-        print("🚀 LLMService.__init__ ВЫЗВАН!")
         self.config = self._load_config()
-        print(f"📋 Конфиг загружен: use_emulator = {self.config.get('llm', {}).get('use_emulator')}")
         self.emulator = LLMEmulatorService()
+        self.candidate_selector = ArtistCandidateSelector(self.config.get('artist_prefilter'))
         self.openai_service = None
         
         # Попытка инициализации OpenAI сервиса
-        should_use = self._should_use_openai()
-        print(f"🔍 Должен использовать OpenAI: {should_use}")
-        
-        if should_use:
+        if self._should_use_openai():
             try:
-                print("⏳ Попытка инициализации OpenAI...")
                 logger.info("Attempting to initialize OpenAI service...")
                 from .openai_service import OpenAIService
-                self.openai_service = OpenAIService()
-                print("✅ OpenAI service initialized successfully")
+                self.openai_service = OpenAIService(candidate_selector=self.candidate_selector)
                 logger.info("✅ OpenAI service initialized successfully")
             except Exception as e:
-                print(f"❌ Failed to initialize OpenAI: {e}")
                 logger.error(f"❌ Failed to initialize OpenAI service: {e}")
                 logger.exception("Full error traceback:")
                 logger.warning("⚠️  Falling back to emulator mode")
                 self.openai_service = None
         else:
-            print("ℹ️  OpenAI disabled, using emulator")
             logger.info("ℹ️  OpenAI disabled, using emulator")
-        
-        print(f"🎯 ИТОГ: OpenAI сервис = {self.openai_service is not None}")
-        print("=" * 80)
     
     def _load_config(self) -> Dict[str, Any]:
         """Загрузка конфигурации LLM"""
         try:
             config_path = settings.BASE_DIR / 'llm_config.yaml'
-            with open(config_path, 'r', encoding='utf-8') as f:
-                return yaml.safe_load(f)
+            return config_files.load(config_path, yaml.safe_load) or {}
         except FileNotFoundError:
             logger.warning("LLM config file not found, using defaults")
             return {}
@@ -694,13 +682,19 @@ class LLMService:
         use_emulator = self.config.get('llm', {}).get('use_emulator', True)
         return not use_emulator
     
-    def analyze_request(self, request_data: Dict[str, Any], artists_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def analyze_request(
+        self,
+        request_data: Dict[str, Any],
+        artists_data: List[Dict[str, Any]],
+        force_refresh: bool = False
+    ) -> Dict[str, Any]:
         """
         Анализ запроса через LLM или эмулятор
         
         Args:
             request_data: Данные запроса
             artists_data: Список доступных артистов
+            force_refresh: Повторить вызов модели, даже если ответ есть в кэше
             
         Returns:
             Структурированный JSON ответ
@@ -717,8 +711,13 @@ class LLMService:
         if self.openai_service:
             try:
                 logger.info("🤖 Using OpenAI GPT-4o for request analysis")
-                result = self.openai_service.analyze_request(request_data, artists_data)
+                # Кандидатов отбирает OpenAIService при промахе кэша ответов
+                result = self.openai_service.analyze_request(
+                    request_data, artists_data, force_refresh=force_refresh
+                )
                 logger.info(f"✅ OpenAI analysis completed. Model: {result.get('model')}")
+                if isinstance(result.get('prompt_tokens'), int) and not result.get('cached'):
+                    prefilter_metrics.record_prompt_tokens(result['prompt_tokens'])
                 return result
             except Exception as e:
                 logger.error(f"❌ OpenAI analysis failed: {e}")
@@ -726,7 +725,8 @@ class LLMService:
                 
                 if fallback_to_emulator:
                     logger.warning("⚠️  Falling back to emulator")
-                    return self.emulator.analyze_request(request_data, artists_data)
+                    error_metrics.increment_metric('fallback_activations')
+                    return self.emulator.analyze_request(request_data, self.select_candidates(request_data, artists_data))
                 else:
                     logger.error("❌ Fallback to emulator disabled. Raising exception.")
                     raise
@@ -734,11 +734,24 @@ class LLMService:
             # OpenAI не инициализирован
             if fallback_to_emulator:
                 logger.info("🧪 Using LLM Emulator for request analysis")
-                return self.emulator.analyze_request(request_data, artists_data)
+                return self.emulator.analyze_request(request_data, self.select_candidates(request_data, artists_data))
             else:
                 logger.error("❌ OpenAI service not available and fallback disabled")
                 raise ValueError("OpenAI service is not available. Please configure OPENAI_API_KEY or enable fallback_to_emulator in config.")
     
+    def select_candidates(self, request_data: Dict[str, Any], artists_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Предварительный отбор артистов для передачи в модель
+        
+        Args:
+            request_data: Данные запроса
+            artists_data: Полный список артистов
+            
+        Returns:
+            Список кандидатов (не больше top_n из artist_prefilter)
+        """
+        return self.candidate_selector.prepare(request_data.get('text', ''), artists_data)
+    
     def test_connection(self) -> Dict[str, Any]:
         """
         Тестирование подключения к LLM сервису
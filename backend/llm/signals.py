@@ -0,0 +1,19 @@
+"""
+Сигналы приложения llm
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from artists.models import Artist, ArtistSkill, Skill
+from .artist_catalog import artist_catalog
+
+
+@receiver(post_save, sender=Artist)
+@receiver(post_delete, sender=Artist)
+@receiver(post_save, sender=ArtistSkill)
+@receiver(post_delete, sender=ArtistSkill)
+@receiver(post_save, sender=Skill)
+@receiver(post_delete, sender=Skill)
+def invalidate_artist_catalog(sender, **kwargs):
+    """Сбрасывает снимок каталога артистов при изменении артистов и навыков"""
+    artist_catalog.invalidate_on_commit()
@@ -0,0 +1,352 @@
+"""
+Потоковый анализ запросов: разбор частичного JSON и события SSE
+"""
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .analysis_jobs import analysis_error_response, build_analysis_response, record_analysis_metrics
+from .error_logging import error_metrics
+from .artist_catalog import artist_catalog
+from .registry import get_llm_service
+from .validators import repair_llm_response
+
+logger = logging.getLogger(__name__)
+
+Path = Tuple[Any, ...]
+
+
+class IncrementalJSONParser:
+    """
+    Разбор JSON по мере поступления фрагментов.
+
+    Парсер отслеживает вложенность и путь к текущему значению (ключи
+    объектов и индексы массивов) и, как только значение по отслеживаемому
+    пути закрыто, возвращает его уже разобранным. Так название проекта или
+    очередная роль отдаются клиенту, пока модель еще генерирует остальной
+    ответ. Полный ответ целиком по-прежнему разбирается json.loads в конце.
+    """
+
+    WHITESPACE = ' \t\r\n'
+
+    def __init__(self, watch: Callable[[Path], bool]):
+        """
+        Args:
+            watch: Функция, решающая, нужно ли вернуть значение по пути
+        """
+        self.watch = watch
+        self.buffer = ''
+        self.position = 0
+        # Открытые контейнеры: kind ('object'/'array'), key/index, expect
+        self.stack: List[Dict[str, Any]] = []
+        # Начатые значения: (путь, позиция начала)
+        self.values: List[Tuple[Path, int]] = []
+        self.in_string = False
+        self.escape = False
+        self.string_is_key = False
+        self.key_start = 0
+        self.in_scalar = False
+
+    def feed(self, chunk: str) -> List[Tuple[Path, Any]]:
+        """
+        Добавляет фрагмент ответа
+
+        Returns:
+            Список (путь, значение) для закрытых отслеживаемых значений
+        """
+        self.buffer += chunk
+        completed = []
+        while self.position < len(self.buffer):
+            self._consume(self.buffer[self.position], self.position, completed)
+            self.position += 1
+        return completed
+
+    def _consume(self, char: str, index: int, completed: list):
+        if self.in_string:
+            if self.escape:
+                self.escape = False
+            elif char == '\\':
+                self.escape = True
+            elif char == '"':
+                self.in_string = False
+                if self.string_is_key:
+                    frame = self.stack[-1]
+                    frame['key'] = json.loads(self.buffer[self.key_start:index + 1])
+                    frame['expect'] = 'colon'
+                else:
+                    self._end_value(index + 1, completed)
+            return
+
+        if self.in_scalar:
+            if char not in self.WHITESPACE and char not in ',}]':
+                return
+            self.in_scalar = False
+            self._end_value(index, completed)
+
+        if char in self.WHITESPACE:
+            return
+        if char == '{':
+            self._begin_value(index)
+            self.stack.append({'kind': 'object', 'key': None, 'expect': 'key'})
+        elif char == '[':
+            self._begin_value(index)
+            self.stack.append({'kind': 'array', 'index': 0, 'expect': 'value'})
+        elif char in '}]':
+            self.stack.pop()
+            self._end_value(index + 1, completed)
+        elif char == '"':
+            self.in_string = True
+            frame = self.stack[-1] if self.stack else None
+            self.string_is_key = bool(frame and frame['kind'] == 'object' and frame['expect'] == 'key')
+            if self.string_is_key:
+                self.key_start = index
+            else:
+                self._begin_value(index)
+        elif char == ':':
+            self.stack[-1]['expect'] = 'value'
+        elif char == ',':
+            frame = self.stack[-1]
+            if frame['kind'] == 'object':
+                frame['expect'] = 'key'
+            else:
+                frame['index'] += 1
+                frame['expect'] = 'value'
+        else:
+            # Число, true/false/null
+            self._begin_value(index)
+            self.in_scalar = True
+
+    def _path(self) -> Path:
+        return tuple(frame['key'] if frame['kind'] == 'object' else frame['index'] for frame in self.stack)
+
+    def _begin_value(self, index: int):
+        self.values.append((self._path(), index))
+
+    def _end_value(self, end: int, completed: list):
+        path, start = self.values.pop()
+        if self.stack:
+            self.stack[-1]['expect'] = 'comma'
+        if self.watch(path):
+            try:
+                completed.append((path, json.loads(self.buffer[start:end])))
+            except json.JSONDecodeError as e:
+                logger.warning(f"Не удалось разобрать значение {path} из потока: {e}")
+
+
+class StreamingMetrics:
+    """
+    Метрики потокового анализа: время до первого фрагмента ответа модели
+    и до первого полезного события (поле проекта или роль)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.metrics = {}
+        self.reset_metrics()
+
+    def record(self, time_to_first_token: Optional[float], time_to_first_content: Optional[float], duration: float):
+        """Учитывает один потоковый анализ"""
+        with self._lock:
+            self.metrics['streams'] += 1
+            self.metrics['total_duration'] += duration
+            if time_to_first_token is not None:
+                self.metrics['first_token_count'] += 1
+                self.metrics['total_time_to_first_token'] += time_to_first_token
+            if time_to_first_content is not None:
+                self.metrics['first_content_count'] += 1
+                self.metrics['total_time_to_first_content'] += time_to_first_content
+                self.metrics['max_time_to_first_content'] = max(
+                    self.metrics['max_time_to_first_content'], time_to_first_content
+                )
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Текущие метрики со средними значениями"""
+        with self._lock:
+            metrics = self.metrics.copy()
+        metrics['avg_time_to_first_token'] = (
+            metrics['total_time_to_first_token'] / metrics['first_token_count']
+            if metrics['first_token_count'] else None
+        )
+        metrics['avg_time_to_first_content'] = (
+            metrics['total_time_to_first_content'] / metrics['first_content_count']
+            if metrics['first_content_count'] else None
+        )
+        return metrics
+
+    def reset_metrics(self):
+        """Сброс метрик"""
+        with self._lock:
+            self.metrics = {
+                'streams': 0,
+                'first_token_count': 0,
+                'first_content_count': 0,
+                'total_time_to_first_token': 0.0,
+                'total_time_to_first_content': 0.0,
+                'max_time_to_first_content': 0.0,
+                'total_duration': 0.0,
+            }
+
+
+class AnalysisStreamer:
+    """
+    Потоковый анализ запроса для SSE эндпоинта.
+
+    Фрагменты ответа модели разбираются IncrementalJSONParser, и клиент
+    получает события по мере готовности:
+        field    - поле проекта (название, тип, жанр, описание)
+        role     - очередная роль целиком
+        contacts - контакты
+        result   - итоговый ответ после полной валидации и исправления (как у /analyze/)
+        error    - ошибка анализа или валидации
+    Ответ из кэша или эмулятора отдается теми же событиями сразу.
+    """
+
+    PROJECT_FIELDS = ('project_title', 'project_type', 'genre', 'description')
+
+    def __init__(self, metrics: Optional[StreamingMetrics] = None):
+        self.metrics = metrics or streaming_metrics
+
+    @classmethod
+    def is_watched(cls, path: Path) -> bool:
+        """Пути, значения которых отдаются клиенту до конца ответа"""
+        if len(path) == 2 and path[0] == 'project_analysis':
+            return path[1] in cls.PROJECT_FIELDS
+        if len(path) == 3 and path[:2] == ('project_analysis', 'roles'):
+            return isinstance(path[2], int)
+        return path == ('contacts',)
+
+    def events(
+        self,
+        telegram_request,
+        use_emulator: bool = False,
+        force_refresh: bool = False,
+        username: str = ''
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        События анализа запроса
+
+        Yields:
+            (имя события, данные)
+        """
+        request_id = telegram_request.id
+        start_time = time.time()
+        first_token = first_content = None
+        parser = IncrementalJSONParser(self.is_watched)
+        sent = set()
+        analysis_result = None
+        succeeded = False
+
+        logger.info(f"Потоковый анализ запроса {request_id} пользователем {username}")
+        yield 'started', {'request_id': request_id, 'used_emulator': use_emulator}
+
+        try:
+            request_data = {
+                'id': request_id,
+                'text': telegram_request.text,
+                'author_name': telegram_request.author_name,
+                'author_telegram_id': telegram_request.author_telegram_id,
+                'created_at': telegram_request.created_at.isoformat()
+            }
+            llm_service = get_llm_service()
+            artists_data = artist_catalog.get_artists()
+
+            if use_emulator:
+                analysis_result = llm_service.emulator.analyze_request(request_data, artists_data)
+            else:
+                if not llm_service.openai_service:
+                    raise ValueError(
+                        "OpenAI service is not available. Please configure OPENAI_API_KEY."
+                    )
+                try:
+                    for kind, value in llm_service.openai_service.stream_request(
+                        request_data, artists_data, force_refresh=force_refresh
+                    ):
+                        if kind == 'result':
+                            analysis_result = value
+                            continue
+                        if first_token is None:
+                            first_token = time.time() - start_time
+                        for path, item in parser.feed(value):
+                            sent.add(path)
+                            if first_content is None:
+                                first_content = time.time() - start_time
+                            yield self._event(path, item)
+                except Exception as e:
+                    # Эмулятор подменяет ответ, только пока клиент не получил части ответа модели
+                    fallback = llm_service.config.get('llm', {}).get('fallback_to_emulator', False)
+                    if sent or not fallback:
+                        raise
+                    logger.warning(f"Потоковый анализ OpenAI не удался, используем эмулятор: {e}")
+                    error_metrics.increment_metric('fallback_activations')
+                    analysis_result = llm_service.emulator.analyze_request(
+                        request_data, llm_service.select_candidates(request_data, artists_data)
+                    )
+
+            # Кэш и эмулятор: все, что не успели отдать по частям, отдаем сразу
+            for path, item in self._watched_values(analysis_result):
+                if path not in sent:
+                    if first_content is None:
+                        first_content = time.time() - start_time
+                    yield self._event(path, item)
+
+            processing_time = time.time() - start_time
+            try:
+                analysis_result = repair_llm_response(analysis_result)
+            except Exception as e:
+                logger.error(f"Ошибка валидации ответа для запроса {request_id}: {str(e)}")
+                yield 'error', {
+                    'status_code': 500,
+                    'error': 'Ошибка валидации ответа LLM',
+                    'details': str(e)
+                }
+                return
+
+            response_data = build_analysis_response(telegram_request, analysis_result, processing_time)
+            telegram_request.analysis_status = 'analyzed'
+            telegram_request.save(update_fields=['analysis_status', 'updated_at'])
+            succeeded = True
+            yield 'result', response_data
+
+        except Exception as e:
+            payload, http_status = analysis_error_response(e, request_id, start_time)
+            telegram_request.analysis_status = 'error'
+            telegram_request.save(update_fields=['analysis_status', 'updated_at'])
+            yield 'error', {'status_code': http_status, **payload}
+
+        finally:
+            self.metrics.record(first_token, first_content, time.time() - start_time)
+            record_analysis_metrics(start_time, succeeded)
+
+    def _watched_values(self, result: Optional[Dict[str, Any]]) -> Iterator[Tuple[Path, Any]]:
+        if not result:
+            return
+        project = result.get('project_analysis') or {}
+        for field in self.PROJECT_FIELDS:
+            if field in project:
+                yield ('project_analysis', field), project[field]
+        for index, role in enumerate(project.get('roles') or []):
+            yield ('project_analysis', 'roles', index), role
+        if 'contacts' in result:
+            yield ('contacts',), result['contacts']
+
+    @staticmethod
+    def _event(path: Path, value: Any) -> Tuple[str, Dict[str, Any]]:
+        if path[-2:-1] == ('roles',):
+            return 'role', {'index': path[-1], 'role': value}
+        if path == ('contacts',):
+            return 'contacts', value
+        return 'field', {'field': path[-1], 'value': value}
+
+    @staticmethod
+    def format_sse(event: str, data: Dict[str, Any]) -> str:
+        """Событие в формате text/event-stream"""
+        payload = json.dumps(data, ensure_ascii=False, cls=DjangoJSONEncoder)
+        return f"event: {event}\ndata: {payload}\n\n"
+
+
+# Метрики общие для процесса
+streaming_metrics = StreamingMetrics()
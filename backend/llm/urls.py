@@ -10,11 +10,14 @@ app_name = 'llm'
 urlpatterns = [
     # Анализ запросов
     path('requests/<int:request_id>/analyze/', views.analyze_request, name='analyze_request'),
+    path('requests/<int:request_id>/analyze/stream/', views.stream_request_analysis, name='stream_request_analysis'),
     path('requests/<int:request_id>/analysis-status/', views.get_request_analysis_status, name='request_analysis_status'),
+    path('requests/batch-analyze/', views.analyze_requests_batch, name='analyze_requests_batch'),
     
     # Артисты для LLM
     path('llm/artists/', views.get_artists_for_llm, name='artists_for_llm'),
     
     # Статус LLM
     path('status/', views.get_llm_status, name='llm_status'),
+    path('status/metrics/', views.get_llm_metrics, name='llm_metrics'),
 ]
@@ -8,6 +8,10 @@ import re
 from typing import Dict, List, Any, Optional, Union
 from django.core.exceptions import ValidationError
 
+from .error_logging import error_metrics
+from .metrics import llm_metrics
+from .schema_validator import get_schema_validator
+
 logger = logging.getLogger(__name__)
 
 
@@ -26,6 +30,17 @@ class LLMResponseValidator:
         self.strict_validation = self.config.get('validation', {}).get('json_schema_strict', True)
         self.max_retry_attempts = self.config.get('validation', {}).get('max_retry_attempts', 3)
         
+        # Обязательные непустые поля проекта и роли
+        self.required_project_fields = ['project_title', 'project_type', 'genre', 'description']
+        self.required_role_fields = ['role_type', 'character_name', 'description', 'gender']
+        
+        # Обязательные поля, непустоту которых не гарантируют схема (roles: minItems)
+        # и строгая проверка полей проекта - только их проверяет быстрый путь
+        covered_fields = {'project_analysis.roles'}
+        if self.strict_validation:
+            covered_fields.update(f'project_analysis.{field}' for field in self.required_project_fields)
+        self.fields_beyond_schema = [field for field in self.required_fields if field not in covered_fields]
+        
         # Строгие правила валидации
         self.email_pattern = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
         self.phone_pattern = re.compile(r'^[\+]?[1-9][\d]{0,15}$')
@@ -54,34 +69,7 @@ class LLMResponseValidator:
             ValidationError: Если валидация не прошла
         """
         try:
-            # Проверяем общую структуру
-            self._validate_structure(result)
-            
-            # Проверяем обязательные поля
-            self._validate_required_fields(result)
-            
-            # Проверяем project_analysis
-            if 'project_analysis' in result:
-                self._validate_project_analysis(result['project_analysis'])
-            
-            # Проверяем роли
-            if 'project_analysis' in result and 'roles' in result['project_analysis']:
-                self._validate_roles(result['project_analysis']['roles'])
-            
-            # Проверяем контакты в project_analysis
-            if 'project_analysis' in result:
-                project_analysis = result['project_analysis']
-                if 'casting_director' in project_analysis:
-                    self._validate_contact_person(project_analysis['casting_director'], 'casting_director')
-                if 'director' in project_analysis:
-                    self._validate_contact_person(project_analysis['director'], 'director')
-                if 'producers' in project_analysis:
-                    if isinstance(project_analysis['producers'], list):
-                        for i, producer in enumerate(project_analysis['producers']):
-                            self._validate_contact_person(producer, f'producer_{i}')
-                if 'production_company' in project_analysis:
-                    self._validate_contact_company(project_analysis['production_company'])
-            
+            self._check_analysis_result(result)
             logger.info("LLM response validation passed successfully")
             return True
             
@@ -92,6 +80,126 @@ class LLMResponseValidator:
             logger.error(f"Unexpected error during LLM response validation: {e}")
             raise ValidationError(f"Validation error: {e}")
     
+    def validate_or_repair(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Валидация с локальным исправлением ответа
+        
+        Ответ проверяется скомпилированной JSON схемой и только теми
+        правилами валидатора, которые схема не выражает (непустые значения,
+        границы длины, поля вне схемы). При ошибке он исправляется по схеме
+        (приведение типов, ограничение confidence, значения по умолчанию)
+        и проверяется всеми правилами валидатора.
+        Повторный запрос к LLM нужен, только если исправить ответ не удалось.
+        Отклонения от схемы, которые исправить нельзя, но которые не
+        нарушают правил валидатора, только логируются.
+        
+        Args:
+            result: Результат анализа от LLM (не изменяется)
+            
+        Returns:
+            Валидный результат: исходный или исправленная копия
+            
+        Raises:
+            ValidationError: Если ответ не удалось исправить
+        """
+        with llm_metrics.timer('validation_seconds'):
+            return self._validate_or_repair(result)
+    
+    def _validate_or_repair(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        schema_validator = get_schema_validator()
+        if schema_validator.is_valid(result):
+            try:
+                self._check_rules_beyond_schema(result)
+                return result
+            except ValidationError:
+                # Ошибку с полным текстом даст проверка всеми правилами ниже
+                pass
+        
+        repaired, repairs, schema_errors = (
+            schema_validator.repair(result) if isinstance(result, dict) else (result, [], [])
+        )
+        error = self._find_error(repaired)
+        if error is not None:
+            logger.error(f"LLM response validation failed: {error}")
+            raise error
+        
+        if schema_errors:
+            logger.warning(f"LLM response deviates from schema: {'; '.join(schema_errors)}")
+        if repairs:
+            error_metrics.increment_metric('validation_repairs')
+            logger.info(f"LLM response repaired locally: {'; '.join(repairs)}")
+        return repaired
+    
+    def _find_error(self, result: Dict[str, Any]) -> Optional[ValidationError]:
+        """Ошибка валидации ответа или None"""
+        try:
+            self._check_analysis_result(result)
+        except ValidationError as e:
+            return e
+        except Exception as e:
+            return ValidationError(f"Validation error: {e}")
+        return None
+    
+    def _check_analysis_result(self, result: Dict[str, Any]) -> None:
+        """Проверки ответа без логирования"""
+        # Проверяем общую структуру
+        self._validate_structure(result)
+        
+        # Проверяем обязательные поля
+        self._validate_required_fields(result)
+        
+        # Проверяем project_analysis
+        if 'project_analysis' in result:
+            self._validate_project_analysis(result['project_analysis'])
+        
+        # Проверяем роли
+        if 'project_analysis' in result and 'roles' in result['project_analysis']:
+            self._validate_roles(result['project_analysis']['roles'])
+        
+        # Проверяем контакты в project_analysis
+        if 'project_analysis' in result:
+            self._validate_embedded_contacts(result['project_analysis'])
+    
+    def _check_rules_beyond_schema(self, result: Dict[str, Any]) -> None:
+        """
+        Правила валидатора, которые не выражаются llm_schema.json
+        
+        Вызывается только для ответа, прошедшего схему: наличие и типы
+        полей, диапазоны confidence и непустой список ролей уже проверены.
+        """
+        for field_path in self.fields_beyond_schema:
+            if not self._check_nested_field(result, field_path):
+                raise ValidationError(f"Required field missing: {field_path}")
+        
+        project_analysis = result['project_analysis']
+        if self.strict_validation:
+            for field in self.required_project_fields:
+                if not project_analysis[field] or project_analysis[field] == 'Не определен':
+                    raise ValidationError(f"Project field '{field}' cannot be empty or 'Не определен'")
+        self._validate_project_lengths(project_analysis)
+        
+        for index, role in enumerate(project_analysis['roles']):
+            if self.strict_validation:
+                for field in self.required_role_fields:
+                    if not role[field] or role[field] == 'Не определен':
+                        raise ValidationError(f"Role {index}: Field '{field}' cannot be empty or 'Не определен'")
+            self._validate_role_extras(role, index)
+        
+        self._validate_embedded_contacts(project_analysis)
+    
+    def _validate_embedded_contacts(self, project_analysis: Dict[str, Any]) -> None:
+        """Контакты, которые модель вложила в project_analysis"""
+        if 'casting_director' in project_analysis:
+            self._validate_contact_person(project_analysis['casting_director'], 'casting_director')
+        if 'director' in project_analysis:
+            self._validate_contact_person(project_analysis['director'], 'director')
+        if 'producers' in project_analysis:
+            if isinstance(project_analysis['producers'], list):
+                for i, producer in enumerate(project_analysis['producers']):
+                    self._validate_contact_person(producer, f'producer_{i}')
+        if 'production_company' in project_analysis:
+            self._validate_contact_company(project_analysis['production_company'])
+    
     def _validate_structure(self, result: Dict[str, Any]) -> None:
         """Проверка общей структуры ответа"""
         if not isinstance(result, dict):
@@ -127,11 +235,7 @@ class LLMResponseValidator:
     
     def _validate_project_analysis(self, project_analysis: Dict[str, Any]) -> None:
         """Валидация секции project_analysis"""
-        required_project_fields = [
-            'project_title', 'project_type', 'genre', 'description'
-        ]
-        
-        for field in required_project_fields:
+        for field in self.required_project_fields:
             if field not in project_analysis:
                 raise ValidationError(f"Missing required project field: {field}")
             
@@ -152,6 +256,16 @@ class LLMResponseValidator:
         if not isinstance(project_analysis.get('description', ''), str):
             raise ValidationError("description must be a string")
         
+        self._validate_project_lengths(project_analysis)
+        
+        # Проверяем confidence если есть (схема допускает null)
+        if project_analysis.get('confidence') is not None:
+            confidence = project_analysis['confidence']
+            if not isinstance(confidence, (int, float)) or not (0.0 <= confidence <= 1.0):
+                raise ValidationError("confidence must be a number between 0.0 and 1.0")
+    
+    def _validate_project_lengths(self, project_analysis: Dict[str, Any]) -> None:
+        """Границы длины названия и описания, непустой тип проекта"""
         # Строгая валидация длины полей
         title = project_analysis.get('project_title', '')
         if len(title) < self.min_title_length:
@@ -169,12 +283,6 @@ class LLMResponseValidator:
         project_type = project_analysis.get('project_type', '').strip()
         if not project_type:
             raise ValidationError("project_type is required and cannot be empty")
-        
-        # Проверяем confidence если есть
-        if 'confidence' in project_analysis:
-            confidence = project_analysis['confidence']
-            if not isinstance(confidence, (int, float)) or not (0.0 <= confidence <= 1.0):
-                raise ValidationError("confidence must be a number between 0.0 and 1.0")
     
     def _validate_roles(self, roles: List[Dict[str, Any]]) -> None:
         """Валидация ролей"""
@@ -189,14 +297,10 @@ class LLMResponseValidator:
     
     def _validate_single_role(self, role: Dict[str, Any], index: int) -> None:
         """Валидация одной роли"""
-        required_role_fields = [
-            'role_type', 'character_name', 'description', 'gender'
-        ]
-        
         # age_range опционально - GPT-4o может не всегда его возвращать
         optional_fields = ['age_range']
         
-        for field in required_role_fields:
+        for field in self.required_role_fields:
             if field not in role:
                 raise ValidationError(f"Role {index}: Missing required field '{field}'")
             
@@ -204,6 +308,16 @@ class LLMResponseValidator:
                 if self.strict_validation:
                     raise ValidationError(f"Role {index}: Field '{field}' cannot be empty or 'Не определен'")
         
+        self._validate_role_extras(role, index)
+        
+        # Проверяем confidence если есть (схема допускает null)
+        if role.get('confidence') is not None:
+            confidence = role['confidence']
+            if not isinstance(confidence, (int, float)) or not (0.0 <= confidence <= 1.0):
+                raise ValidationError(f"Role {index}: confidence must be a number between 0.0 and 1.0")
+    
+    def _validate_role_extras(self, role: Dict[str, Any], index: int) -> None:
+        """Поля роли вне схемы: suggested_artists и дополнительные категории навыков"""
         # Проверяем suggested_artists
         if 'suggested_artists' in role:
             if not isinstance(role['suggested_artists'], list):
@@ -223,12 +337,6 @@ class LLMResponseValidator:
             for category in required_skill_categories:
                 if category in skills and not isinstance(skills[category], list):
                     raise ValidationError(f"Role {index}: {category} must be a list")
-        
-        # Проверяем confidence если есть
-        if 'confidence' in role:
-            confidence = role['confidence']
-            if not isinstance(confidence, (int, float)) or not (0.0 <= confidence <= 1.0):
-                raise ValidationError(f"Role {index}: confidence must be a number between 0.0 and 1.0")
     
     def _validate_contacts(self, contacts: Dict[str, Any]) -> None:
         """Валидация контактной информации"""
@@ -372,6 +480,12 @@ class LLMRetryHandler:
             except ValidationError as e:
                 logger.warning(f"LLM response validation failed on attempt {attempt}: {e}")
                 
+                # Сначала пробуем исправить ответ локально, без повторного вызова LLM
+                try:
+                    return self.validator.validate_or_repair(result)
+                except ValidationError:
+                    pass
+                
                 if attempt == self.max_attempts:
                     logger.error(f"All {self.max_attempts} validation attempts failed")
                     raise ValidationError(f"Validation failed after {self.max_attempts} attempts: {e}")
@@ -398,5 +512,27 @@ def validate_llm_response(result: Dict[str, Any], config: Optional[Dict[str, Any
     Raises:
         ValidationError: Если валидация не прошла
     """
-    validator = LLMResponseValidator(config)
+    validator = _default_validator if config is None else LLMResponseValidator(config)
     return validator.validate_analysis_result(result)
+
+
+def repair_llm_response(result: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Валидация ответа LLM с локальным исправлением
+    
+    Args:
+        result: Результат от LLM (не изменяется)
+        config: Конфигурация валидации
+        
+    Returns:
+        Валидный результат: исходный или исправленная копия
+        
+    Raises:
+        ValidationError: Если ответ не удалось исправить
+    """
+    validator = _default_validator if config is None else LLMResponseValidator(config)
+    return validator.validate_or_repair(result)
+
+
+# Валидатор с настройками по умолчанию не хранит состояния и общий для процесса
+_default_validator = LLMResponseValidator()
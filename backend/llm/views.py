@@ -2,27 +2,38 @@
 Views для LLM API endpoints
 """
 
+import json
 import logging
-import time
 from datetime import datetime
 from typing import Dict, Any
 
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import BaseRenderer, JSONRenderer
 from rest_framework.response import Response
+from django.conf import settings
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from django.http import Http404
 from django.db import transaction
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, StreamingHttpResponse
 
-from artists.models import Artist
 from telegram_requests.models import Request
 from django.core.exceptions import ObjectDoesNotExist
-from .services import LLMService
+from .registry import get_llm_service
+from .analysis_jobs import analysis_job_queue, perform_analysis
+from .batch_analysis import BatchAnalyzer
+from .metrics import llm_metrics
+from .artist_catalog import artist_catalog
+from .resilience import openai_circuit_breaker
+from .response_cache import llm_response_cache
+from .streaming import AnalysisStreamer, streaming_metrics
 from .serializers import (
     LLMAnalysisRequestSerializer,
+    LLMBatchAnalysisRequestSerializer,
     LLMAnalysisResponseSerializer,
-    ArtistForLLMSerializer,
     LLMStatusSerializer,
     LLMErrorSerializer
 )
@@ -31,6 +42,17 @@ from .validators import LLMRetryHandler
 logger = logging.getLogger(__name__)
 
 
+class EventStreamRenderer(BaseRenderer):
+    """Позволяет клиентам SSE запрашивать Accept: text/event-stream"""
+    
+    media_type = 'text/event-stream'
+    format = 'sse'
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Ошибки до начала потока отдаются одним событием error
+        return AnalysisStreamer.format_sse('error', data).encode('utf-8')
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def analyze_request(request, request_id):
@@ -50,7 +72,9 @@ def analyze_request(request, request_id):
         # Валидируем входные данные
         serializer = LLMAnalysisRequestSerializer(data={
             'request_id': request_id,
-            'use_emulator': request.data.get('use_emulator', True)
+            'use_emulator': request.data.get('use_emulator', True),
+            'force_refresh': request.data.get('force_refresh', False),
+            'sync': request.data.get('sync', False)
         })
         
         if not serializer.is_valid():
@@ -59,164 +83,43 @@ def analyze_request(request, request_id):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Получаем данные артистов для LLM
-        artists = Artist.objects.all()
-        artists_data = [
-            {
-                'id': artist.id,
-                'name': f"{artist.first_name} {artist.last_name}",
-                'age': artist.age if hasattr(artist, 'age') else None,
-                'gender': artist.gender,
-                'height': artist.height,
-                'weight': artist.weight,
-                'clothing_size': artist.clothing_size,
-                'shoe_size': artist.shoe_size,
-                'hair_color': artist.hair_color,
-                'eye_color': artist.eye_color,
-                'skills': [],  # Пока пустой массив
-                'languages': [],  # Пока пустой массив
-                'special_requirements': []  # Пока пустой массив
-            }
-            for artist in artists
-        ]
-        
-        # Подготавливаем данные запроса
-        request_data = {
-            'text': telegram_request.text,
-            'author_name': telegram_request.author_name,
-            'author_telegram_id': telegram_request.author_telegram_id,
-            'created_at': telegram_request.created_at.isoformat()
-        }
-        
-        # Инициализируем LLM сервис
-        llm_service = LLMService()
-        
-        # Логируем начало анализа
         use_emulator = serializer.validated_data['use_emulator']
-        logger.info(f"Начало анализа запроса {request_id} пользователем {request.user.username}, режим: {'эмулятор' if use_emulator else 'OpenAI GPT-4o'}")
-        start_time = time.time()
+        force_refresh = serializer.validated_data['force_refresh']
         
-        # Выполняем анализ
-        try:
-            # Принудительно используем эмулятор если указано в параметре
-            if use_emulator:
-                logger.info("📝 Режим черновика: используем эмулятор")
-                analysis_result = llm_service.emulator.analyze_request(request_data, artists_data)
-            else:
-                logger.info("🤖 Режим GPT-4o: используем OpenAI API")
-                analysis_result = llm_service.analyze_request(request_data, artists_data)
-            
-            processing_time = time.time() - start_time
-            
-            # Применяем fallback логику для кастинг-директора
-            contacts = analysis_result.get('contacts', {})
-            casting_director = contacts.get('casting_director', {})
-            
-            # Если LLM не определил имя кастинг-директора или confidence низкий, используем автора запроса
-            if (not casting_director.get('name') or 
-                casting_director.get('name') == 'Не определен' or 
-                casting_director.get('confidence', 0) < 0.5):
-                
-                logger.info(f"🔄 Fallback: используем автора запроса '{telegram_request.author_name}' как кастинг-директора")
-                
-                # Сохраняем извлеченные LLM данные, но подставляем имя автора
-                contacts['casting_director'] = {
-                    'name': telegram_request.author_name,  # Fallback имя
-                    'email': casting_director.get('email'),  # Сохраняем извлеченный email
-                    'phone': casting_director.get('phone'),  # Сохраняем извлеченный телефон
-                    'telegram': casting_director.get('telegram'),  # Сохраняем извлеченный telegram
-                    'confidence': max(0.7, casting_director.get('confidence') or 0)  # Минимум 0.7 для fallback
-                }
-                
-                logger.info(f"📧 Сохранены извлеченные контакты: email={casting_director.get('email')}, phone={casting_director.get('phone')}, telegram={casting_director.get('telegram')}")
-            
-            # Формируем ответ (LLM эмулятор уже возвращает правильную структуру)
-            response_data = {
-                'project_analysis': analysis_result['project_analysis'],
-                'contacts': contacts,
-                'confidence': analysis_result['project_analysis'].get('confidence', 0.85),
-                'processing_time': processing_time,
-                'used_emulator': analysis_result.get('used_emulator', False),
-                'errors': []
-            }
-            
-            # Валидируем ответ с помощью нашего валидатора
-            from .validators import validate_llm_response
-            try:
-                validate_llm_response(analysis_result)  # Передаем только project_analysis
-            except Exception as e:
-                logger.error(f"Ошибка валидации ответа для запроса {request_id}: {str(e)}")
-                return Response(
-                    {'error': 'Ошибка валидации ответа LLM', 'details': str(e)},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
-            
-            # Обновляем статус запроса
-            telegram_request.analysis_status = 'analyzed'
-            telegram_request.save()
-            
-            logger.info(f"Анализ запроса {request_id} завершен успешно за {processing_time:.2f}с")
-            
-            return Response(response_data, status=status.HTTP_200_OK)
-            
-        except ValueError as e:
-            # Специальная обработка для отсутствия OpenAI сервиса
-            processing_time = time.time() - start_time
-            error_message = str(e)
-            logger.error(f"OpenAI сервис недоступен для запроса {request_id}: {error_message}")
-            
-            # Обновляем статус запроса на ошибку
-            telegram_request.analysis_status = 'error'
-            telegram_request.save()
-            
-            return Response(
-                {
-                    'error': 'OpenAI сервис недоступен',
-                    'details': error_message,
-                    'processing_time': processing_time,
-                    'used_emulator': False,
-                    'suggestion': 'Пожалуйста, настройте OPENAI_API_KEY в переменных окружения или включите fallback_to_emulator в конфигурации'
-                },
-                status=status.HTTP_503_SERVICE_UNAVAILABLE
+        # Вызов OpenAI выполняется в фоне, чтобы не занимать воркер на время ответа модели
+        run_async = (
+            not use_emulator
+            and not serializer.validated_data['sync']
+            and getattr(settings, 'LLM_ANALYSIS_ASYNC', True)
+        )
+        if run_async:
+            job, created = analysis_job_queue.submit(
+                telegram_request.id,
+                use_emulator=use_emulator,
+                force_refresh=force_refresh,
+                username=request.user.username
             )
-            
-        except Exception as e:
-            processing_time = time.time() - start_time
-            error_type = type(e).__name__
-            error_message = str(e)
-            
-            # Проверяем, является ли это ошибкой OpenAI API (по сообщению об ошибке)
-            if 'Error code: 401' in error_message or 'invalid_api_key' in error_message or 'Incorrect API key' in error_message:
-                logger.error(f"Недействительный API ключ OpenAI для запроса {request_id}: {error_message}")
-                telegram_request.analysis_status = 'error'
-                telegram_request.save()
-                
-                return Response(
-                    {
-                        'error': 'Недействительный API ключ OpenAI',
-                        'details': 'API ключ OpenAI не прошел аутентификацию. Пожалуйста, проверьте настройки OPENAI_API_KEY.',
-                        'processing_time': processing_time,
-                        'used_emulator': False,
-                        'suggestion': 'Получите новый API ключ на https://platform.openai.com/api-keys и обновите OPENAI_API_KEY в .env файле'
-                    },
-                    status=status.HTTP_503_SERVICE_UNAVAILABLE
-                )
-            
-            # Общая обработка других ошибок
-            logger.error(f"Ошибка анализа запроса {request_id} ({error_type}): {error_message}")
-            telegram_request.analysis_status = 'error'
-            telegram_request.save()
-            
             return Response(
                 {
-                    'error': 'Ошибка анализа LLM',
-                    'error_type': error_type,
-                    'details': error_message,
-                    'processing_time': processing_time,
-                    'used_emulator': False
+                    'job_id': job['job_id'],
+                    'request_id': telegram_request.id,
+                    'status': job['status'],
+                    'progress': job['progress'],
+                    'deduplicated': not created,
+                    'status_url': (
+                        f"{reverse('llm:request_analysis_status', args=[telegram_request.id])}?job_id={job['job_id']}"
+                    )
                 },
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                status=status.HTTP_202_ACCEPTED
             )
+        
+        response_data, http_status = perform_analysis(
+            telegram_request,
+            use_emulator=use_emulator,
+            force_refresh=force_refresh,
+            username=request.user.username
+        )
+        return Response(response_data, status=http_status)
             
     except Request.DoesNotExist:
         logger.warning(f"Запрос {request_id} не найден для анализа.")
@@ -232,6 +135,84 @@ def analyze_request(request, request_id):
         )
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@renderer_classes([JSONRenderer, EventStreamRenderer])
+def stream_request_analysis(request, request_id):
+    """
+    Потоковый анализ запроса через LLM (server-sent events)
+    
+    POST /api/requests/{id}/analyze/stream/
+    
+    События: started, field, role, contacts и в конце result или error.
+    """
+    try:
+        telegram_request = Request.objects.get(id=request_id)
+    except Request.DoesNotExist:
+        logger.warning(f"Запрос {request_id} не найден для анализа.")
+        return Response({'error': 'Запрос не найден'}, status=status.HTTP_404_NOT_FOUND)
+    
+    serializer = LLMAnalysisRequestSerializer(data={
+        'request_id': request_id,
+        'use_emulator': request.data.get('use_emulator', False),
+        'force_refresh': request.data.get('force_refresh', False)
+    })
+    if not serializer.is_valid():
+        return Response(
+            {'error': 'Неверные входные данные', 'details': serializer.errors},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    events = AnalysisStreamer().events(
+        telegram_request,
+        use_emulator=serializer.validated_data['use_emulator'],
+        force_refresh=serializer.validated_data['force_refresh'],
+        username=request.user.username
+    )
+    response = StreamingHttpResponse(
+        (AnalysisStreamer.format_sse(event, data) for event, data in events),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def analyze_requests_batch(request):
+    """
+    Пакетный анализ запросов через LLM
+    
+    POST /api/requests/batch-analyze/
+    
+    Ответ - поток NDJSON: строка result на каждый запрос по мере готовности
+    (index - позиция во входном списке) и итоговая строка summary.
+    """
+    serializer = LLMBatchAnalysisRequestSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(
+            {'error': 'Неверные входные данные', 'details': serializer.errors},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    data = serializer.validated_data
+    events = BatchAnalyzer(concurrency=data.get('concurrency')).analyze(
+        data['request_ids'],
+        use_emulator=data['use_emulator'],
+        force_refresh=data['force_refresh'],
+        username=request.user.username
+    )
+    response = StreamingHttpResponse(
+        (json.dumps(event, ensure_ascii=False, cls=DjangoJSONEncoder) + '\n' for event in events),
+        content_type='application/x-ndjson'
+    )
+    # Строки отдаются клиенту сразу, без буферизации прокси
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_artists_for_llm(request):
@@ -241,37 +222,23 @@ def get_artists_for_llm(request):
     GET /api/artists/for-llm/
     """
     try:
-        artists = Artist.objects.all()
-        
-        # Подготавливаем данные для сериализации
-        artists_data = [
-            {
-                'id': artist.id,
-                'name': f"{artist.first_name} {artist.last_name}",
-                'age': artist.age if hasattr(artist, 'age') else 25,  # Дефолтный возраст
-                'gender': artist.gender,
-                'height': artist.height or 0,
-                'weight': artist.weight or 0,
-                'clothing_size': artist.clothing_size or '',
-                'shoe_size': artist.shoe_size or '',
-                'hair_color': artist.hair_color or '',
-                'eye_color': artist.eye_color or '',
-                'skills': [],  # Пока пустой массив
-                'languages': [],  # Пока пустой массив
-                'special_requirements': []  # Пока пустой массив
-            }
-            for artist in artists
-        ]
+        etag = artist_catalog.etag()
+        if etag in request.headers.get('If-None-Match', ''):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            response['ETag'] = etag
+            return response
         
-        # Сериализуем данные артистов
-        serializer = ArtistForLLMSerializer(artists_data, many=True)
+        snapshot = artist_catalog.get_snapshot()
+        artists = snapshot['llm_artists']
         
         logger.info(f"Получен список артистов для LLM: {len(artists)} артистов")
         
-        return Response({
-            'artists': serializer.data,
+        response = Response({
+            'artists': artists,
             'total_count': len(artists)
         }, status=status.HTTP_200_OK)
+        response['ETag'] = artist_catalog.etag(snapshot['version'])
+        return response
         
     except Exception as e:
         logger.error(f"Ошибка получения артистов для LLM: {str(e)}")
@@ -290,18 +257,29 @@ def get_llm_status(request):
     GET /api/llm/status/
     """
     try:
-        llm_service = LLMService()
+        llm_service = get_llm_service()
+        # Метрики всех воркеров
+        metrics = llm_metrics.snapshot()
+        counters = metrics['counters']
         
         # Получаем статус (это можно расширить в будущем)
         status_data = {
             'status': 'idle',
             'last_request_time': datetime.now(),
-            'total_requests': 0,  # Можно добавить счетчики
-            'successful_requests': 0,
-            'failed_requests': 0,
+            'total_requests': counters['analyses_succeeded'] + counters['analyses_failed'],
+            'successful_requests': counters['analyses_succeeded'],
+            'failed_requests': counters['analyses_failed'],
             'emulator_enabled': llm_service.config.get('use_emulator', True),
             'current_model': llm_service.config.get('model', 'gpt-4o')
         }
+        cache_stats = llm_response_cache.stats()
+        status_data['cache_hits'] = cache_stats['hits']
+        status_data['cache_misses'] = cache_stats['misses']
+        status_data['circuit_breaker_state'] = openai_circuit_breaker.state()
+        status_data['stream_time_to_first_content'] = streaming_metrics.get_metrics()['avg_time_to_first_content']
+        status_data['retry_attempts'] = counters['retry_attempts']
+        status_data['fallback_activations'] = counters['fallback_activations']
+        status_data['latency'] = llm_metrics.latency_summary(metrics)
         
         serializer = LLMStatusSerializer(data=status_data)
         if serializer.is_valid():
@@ -320,6 +298,20 @@ def get_llm_status(request):
         )
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_llm_metrics(request):
+    """
+    Метрики LLM конвейера всех воркеров в текстовом формате Prometheus
+    
+    GET /api/status/metrics/
+    """
+    return HttpResponse(
+        llm_metrics.prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_request_analysis_status(request, request_id):
@@ -335,11 +327,20 @@ def get_request_analysis_status(request, request_id):
             logger.warning(f"Запрос {request_id} не найден для анализа.")
             return Response({'error': 'Запрос не найден'}, status=status.HTTP_404_NOT_FOUND)
         
+        job_id = request.query_params.get('job_id')
+        if job_id:
+            job = analysis_job_queue.get(job_id)
+            if not job or job['request_id'] != telegram_request.id:
+                return Response({'error': 'Задача анализа не найдена'}, status=status.HTTP_404_NOT_FOUND)
+        else:
+            job = analysis_job_queue.get_for_request(telegram_request.id)
+        
         return Response({
             'request_id': request_id,
             'analysis_status': telegram_request.analysis_status,
             'created_at': telegram_request.created_at,
-            'updated_at': telegram_request.updated_at
+            'updated_at': telegram_request.updated_at,
+            'job': job
         }, status=status.HTTP_200_OK)
         
     except Request.DoesNotExist:
@@ -50,12 +50,12 @@ class BulkImportService:
             # 4. Парсим файл
             records = self.parser.parse_file(file_path)
             
-            # 5. Валидируем и обрабатываем каждую запись
-            preview_records = []
+            # 5. Валидируем каждую запись
             error_records = []
             valid_count = 0
             invalid_count = 0
             
+            valid_records = []
             for record in records:
                 # Валидация данных
                 validation_errors = self.validator.validate(record['data'])
@@ -68,24 +68,28 @@ class BulkImportService:
                     })
                     invalid_count += 1
                 else:
-                    # Поиск дубликатов только для валидных записей
-                    try:
-                        duplicates = self.duplicate_finder.find_duplicates(record['data'])
-                        record['potential_duplicates'] = duplicates
-                        valid_count += 1
-                    except Exception as e:
-                        record['validation_errors'] = [f'Ошибка поиска дубликатов: {str(e)}']
-                        error_records.append({
-                            'row_number': record['row_number'],
-                            'errors': [str(e)]
-                        })
-                        invalid_count += 1
-                
-                preview_records.append(record)
+                    valid_records.append(record)
+            
+            # Поиск дубликатов только для валидных записей - одним пакетом
+            try:
+                batch_duplicates = self.duplicate_finder.find_duplicates_batch(
+                    [record['data'] for record in valid_records]
+                )
+                for record, duplicates in zip(valid_records, batch_duplicates):
+                    record['potential_duplicates'] = duplicates
+                valid_count = len(valid_records)
+            except Exception as e:
+                for record in valid_records:
+                    record['validation_errors'] = [f'Ошибка поиска дубликатов: {str(e)}']
+                    error_records.append({
+                        'row_number': record['row_number'],
+                        'errors': [str(e)]
+                    })
+                invalid_count += len(valid_records)
             
             # 6. Сохраняем результаты в сессию
             import_session.records_data = {
-                'preview': preview_records,
+                'preview': records,
                 'errors': error_records
             }
             import_session.total_rows = len(records)
@@ -1,8 +1,9 @@
 """
 Поиск дубликатов персон для импорта
 """
-from typing import List, Dict, Optional
-from rapidfuzz import fuzz
+from typing import List, Dict, Optional, Iterable, Tuple
+from django.db.models import Q
+from rapidfuzz import fuzz, process
 from .models import Person
 
 
@@ -15,6 +16,16 @@ class PersonDuplicateFinder:
     MEDIUM_MATCH_THRESHOLD = 70
     MIN_MATCH_THRESHOLD = 60
     
+    # Отбор кандидатов по фамилии
+    FUZZY_LAST_NAME_THRESHOLD = 75
+    MAX_NAME_MATCHES = 10
+    MAX_CONTACT_MATCHES = 10
+    
+    # Количество потоков для rapidfuzz.process.cdist (-1 - все ядра)
+    BATCH_WORKERS = -1
+    # Максимальный размер блока матрицы схожести (строки x персоны)
+    BATCH_MATRIX_CELLS = 10_000_000
+    
     def find_duplicates(self, person_data: Dict, limit: int = 5) -> List[Dict]:
         """
         Поиск похожих персон в БД
@@ -26,8 +37,6 @@ class PersonDuplicateFinder:
         Returns:
             List[Dict]: Список похожих персон с оценкой совпадения
         """
-        candidates = []
-        
         last_name = person_data.get('last_name', '').strip()
         first_name = person_data.get('first_name', '').strip()
         phones = person_data.get('phones', [])
@@ -38,27 +47,95 @@ class PersonDuplicateFinder:
         if not last_name:
             return []
         
-        # 1. Поиск по точному совпадению ФИО
-        exact_matches = self._find_by_exact_name(last_name, first_name)
-        for person in exact_matches:
-            match_info = self._calculate_match_score(person, person_data)
-            if match_info['match_score'] >= self.MIN_MATCH_THRESHOLD:
-                candidates.append(match_info)
-        
-        # 2. Поиск по fuzzy совпадению ФИО
-        fuzzy_matches = self._find_by_fuzzy_name(last_name, first_name)
-        for person in fuzzy_matches:
-            # Проверяем, что не добавляем дубликат
-            if not any(c['person_id'] == person.id for c in candidates):
-                match_info = self._calculate_match_score(person, person_data)
-                if match_info['match_score'] >= self.MIN_MATCH_THRESHOLD:
-                    candidates.append(match_info)
+        return self._rank_candidates(
+            person_data,
+            [
+                # 1. Поиск по точному совпадению ФИО
+                self._find_by_exact_name(last_name, first_name),
+                # 2. Поиск по fuzzy совпадению ФИО
+                self._find_by_fuzzy_name(last_name, first_name),
+                # 3. Поиск по контактам
+                self._find_by_contacts(phones, telegrams, emails),
+            ],
+            limit
+        )
+    
+    def find_duplicates_batch(self, records: List[Dict], limit: int = 5) -> List[List[Dict]]:
+        """
+        Поиск похожих персон сразу для множества записей импорта
         
-        # 3. Поиск по контактам
-        contact_matches = self._find_by_contacts(phones, telegrams, emails)
-        for person in contact_matches:
-            # Проверяем, что не добавляем дубликат
-            if not any(c['person_id'] == person.id for c in candidates):
+        Результат для каждой записи совпадает с find_duplicates, но база
+        персон загружается один раз, матрица схожести фамилий считается
+        через rapidfuzz.process.cdist, а контакты ищутся одним запросом
+        на тип контакта.
+        
+        Args:
+            records: Данные персон из импорта
+            limit: Максимальное количество результатов на запись
+            
+        Returns:
+            List[List[Dict]]: Похожие персоны для каждой записи (в том же порядке)
+        """
+        results = [[] for _ in records]
+        
+        searchable = [
+            index for index, person_data in enumerate(records)
+            if person_data.get('last_name', '').strip()
+        ]
+        if not searchable:
+            return results
+        
+        # Вся база активных персон в порядке сортировки модели
+        corpus = list(
+            Person.objects.filter(is_active=True).values('id', 'last_name', 'first_name')
+        )
+        positions = {entry['id']: position for position, entry in enumerate(corpus)}
+        
+        exact_ids = self._batch_exact_name_ids(records, searchable, corpus)
+        fuzzy_ids = self._batch_fuzzy_name_ids(records, searchable, corpus)
+        contact_ids = self._batch_contact_ids(records, searchable, positions)
+        
+        needed_ids = set()
+        for index in searchable:
+            needed_ids.update(exact_ids[index])
+            needed_ids.update(fuzzy_ids[index])
+            needed_ids.update(contact_ids[index])
+        persons = Person.objects.in_bulk(needed_ids)
+        
+        for index in searchable:
+            results[index] = self._rank_candidates(
+                records[index],
+                [
+                    [persons[person_id] for person_id in exact_ids[index] if person_id in persons],
+                    [persons[person_id] for person_id in fuzzy_ids[index] if person_id in persons],
+                    [persons[person_id] for person_id in contact_ids[index] if person_id in persons],
+                ],
+                limit
+            )
+        
+        return results
+    
+    def _rank_candidates(
+        self,
+        person_data: Dict,
+        match_groups: List[List[Person]],
+        limit: int
+    ) -> List[Dict]:
+        """
+        Оценивает найденных персон и возвращает лучшие совпадения
+        
+        Args:
+            person_data: Данные персоны из импорта
+            match_groups: Найденные персоны: точные, fuzzy и по контактам
+            limit: Максимальное количество результатов
+        """
+        candidates = []
+        
+        for group_index, persons in enumerate(match_groups):
+            for person in persons:
+                # Проверяем, что не добавляем дубликат
+                if group_index > 0 and any(c['person_id'] == person.id for c in candidates):
+                    continue
                 match_info = self._calculate_match_score(person, person_data)
                 if match_info['match_score'] >= self.MIN_MATCH_THRESHOLD:
                     candidates.append(match_info)
@@ -68,6 +145,156 @@ class PersonDuplicateFinder:
         
         return candidates[:limit]
     
+    def _batch_exact_name_ids(
+        self,
+        records: List[Dict],
+        searchable: List[int],
+        corpus: List[Dict]
+    ) -> Dict[int, List[int]]:
+        """Точные совпадения ФИО для пакета записей (аналог _find_by_exact_name)"""
+        by_last_name = {}
+        for entry in corpus:
+            by_last_name.setdefault(entry['last_name'].lower(), []).append(entry)
+        
+        exact_ids = {}
+        for index in searchable:
+            last_name = records[index].get('last_name', '').strip().lower()
+            first_name = records[index].get('first_name', '').strip().lower()
+            
+            matches = by_last_name.get(last_name, [])
+            if first_name:
+                matches = [entry for entry in matches if entry['first_name'].lower() == first_name]
+            
+            exact_ids[index] = [entry['id'] for entry in matches[:self.MAX_NAME_MATCHES]]
+        
+        return exact_ids
+    
+    def _batch_fuzzy_name_ids(
+        self,
+        records: List[Dict],
+        searchable: List[int],
+        corpus: List[Dict]
+    ) -> Dict[int, List[int]]:
+        """Fuzzy совпадения фамилий для пакета записей (аналог _find_by_fuzzy_name)"""
+        if not corpus:
+            return {index: [] for index in searchable}
+        
+        corpus_ids = [entry['id'] for entry in corpus]
+        corpus_last_names = [entry['last_name'].lower() for entry in corpus]
+        
+        # Матрица считается блоками строк, чтобы не держать в памяти
+        # полную матрицу (строки импорта x вся база)
+        chunk_size = max(1, self.BATCH_MATRIX_CELLS // len(corpus))
+        fuzzy_ids = {}
+        for start in range(0, len(searchable), chunk_size):
+            chunk = searchable[start:start + chunk_size]
+            scores = process.cdist(
+                [records[index].get('last_name', '').strip().lower() for index in chunk],
+                corpus_last_names,
+                scorer=fuzz.ratio,
+                score_cutoff=self.FUZZY_LAST_NAME_THRESHOLD,
+                workers=self.BATCH_WORKERS
+            )
+            for index, row_scores in zip(chunk, scores):
+                hits = row_scores.nonzero()[0]
+                fuzzy_ids[index] = self._select_fuzzy_ids(
+                    (corpus_ids[position], float(row_scores[position])) for position in hits
+                )
+        
+        return fuzzy_ids
+    
+    def _select_fuzzy_ids(self, scored_ids: Iterable[Tuple[int, float]]) -> List[int]:
+        """
+        Отбирает персон с достаточно похожей фамилией: лучшие по оценке,
+        при равной оценке - по id
+        """
+        hits = [
+            (person_id, score) for person_id, score in scored_ids
+            if score >= self.FUZZY_LAST_NAME_THRESHOLD
+        ]
+        hits.sort(key=lambda hit: (-hit[1], hit[0]))
+        return [person_id for person_id, _ in hits[:self.MAX_NAME_MATCHES]]
+    
+    def _batch_contact_ids(
+        self,
+        records: List[Dict],
+        searchable: List[int],
+        positions: Dict[int, int]
+    ) -> Dict[int, List[int]]:
+        """
+        Совпадения по контактам для пакета записей (аналог _find_by_contacts):
+        один запрос на каждый тип контакта
+        """
+        wanted_phones = set()
+        wanted_telegrams = set()
+        wanted_emails = set()
+        for index in searchable:
+            person_data = records[index]
+            wanted_phones.update(p for p in person_data.get('phones', []) if p)
+            wanted_emails.update(e for e in person_data.get('emails', []) if e)
+            for telegram in person_data.get('telegrams', []):
+                if telegram:
+                    telegram_clean = telegram.lstrip('@')
+                    wanted_telegrams.update([telegram_clean, f'@{telegram_clean}'])
+        
+        phone_owners = self._load_contact_owners('phone', 'phones', wanted_phones)
+        telegram_owners = self._load_contact_owners('telegram_username', 'telegram_usernames', wanted_telegrams)
+        email_owners = self._load_contact_owners('email', 'emails', wanted_emails)
+        
+        contact_ids = {}
+        for index in searchable:
+            person_data = records[index]
+            matched = set()
+            for phone in person_data.get('phones', []):
+                if phone:
+                    matched.update(phone_owners.get(phone, ()))
+            for telegram in person_data.get('telegrams', []):
+                if telegram:
+                    telegram_clean = telegram.lstrip('@')
+                    matched.update(telegram_owners.get(telegram_clean, ()))
+                    matched.update(telegram_owners.get(f'@{telegram_clean}', ()))
+            for email in person_data.get('emails', []):
+                if email:
+                    matched.update(email_owners.get(email, ()))
+            
+            ordered = sorted(
+                (person_id for person_id in matched if person_id in positions),
+                key=positions.get
+            )
+            contact_ids[index] = ordered[:self.MAX_CONTACT_MATCHES]
+        
+        return contact_ids
+    
+    def _load_contact_owners(
+        self,
+        legacy_field: str,
+        list_field: str,
+        values: Iterable[str]
+    ) -> Dict[str, set]:
+        """
+        Загружает владельцев контактов одним запросом
+        
+        Returns:
+            Dict[str, set]: Значение контакта -> ID персон
+        """
+        values = sorted(values)
+        if not values:
+            return {}
+        
+        rows = Person.objects.filter(
+            Q(**{f'{legacy_field}__in': values}) | Q(**{f'{list_field}__has_any_keys': values}),
+            is_active=True
+        ).values('id', legacy_field, list_field)
+        
+        wanted = set(values)
+        owners = {}
+        for row in rows:
+            contacts = row[list_field] if isinstance(row[list_field], list) else []
+            for contact in [row[legacy_field], *contacts]:
+                if contact in wanted:
+                    owners.setdefault(contact, set()).add(row['id'])
+        return owners
+    
     def _find_by_exact_name(self, last_name: str, first_name: str) -> List[Person]:
         """Поиск по точному совпадению ФИО"""
         query = Person.objects.filter(
@@ -78,32 +305,27 @@ class PersonDuplicateFinder:
         if first_name:
             query = query.filter(first_name__iexact=first_name)
         
-        return list(query[:10])
+        return list(query[:self.MAX_NAME_MATCHES])
     
     def _find_by_fuzzy_name(self, last_name: str, first_name: str) -> List[Person]:
         """Поиск по нечеткому совпадению ФИО"""
-        # Ищем всех с похожей фамилией
-        all_persons = Person.objects.filter(
-            is_active=True
-        ).values('id', 'last_name', 'first_name')[:1000]
-        
-        matches = []
-        for person_dict in all_persons:
-            # Сравниваем фамилии
-            last_name_score = fuzz.ratio(
-                last_name.lower(),
-                person_dict['last_name'].lower()
-            )
-            
-            # Если фамилия совпадает достаточно хорошо
-            if last_name_score >= 75:
-                person = Person.objects.get(id=person_dict['id'])
-                matches.append(person)
-                
-                if len(matches) >= 10:
-                    break
+        # Сравниваем фамилию со всеми активными персонами
+        last_names = dict(
+            Person.objects.filter(is_active=True).values_list('id', 'last_name').iterator(chunk_size=5000)
+        )
+        results = process.extract(
+            last_name.lower(),
+            {person_id: name.lower() for person_id, name in last_names.items()},
+            scorer=fuzz.ratio,
+            score_cutoff=self.FUZZY_LAST_NAME_THRESHOLD,
+            limit=None
+        )
         
-        return matches
+        person_ids = self._select_fuzzy_ids(
+            (person_id, score) for _, score, person_id in results
+        )
+        persons = Person.objects.in_bulk(person_ids)
+        return [persons[person_id] for person_id in person_ids if person_id in persons]
     
     def _find_by_contacts(
         self, 
@@ -141,7 +363,7 @@ class PersonDuplicateFinder:
         if not query:
             return []
         
-        return list(Person.objects.filter(query, is_active=True).distinct()[:10])
+        return list(Person.objects.filter(query, is_active=True).distinct()[:self.MAX_CONTACT_MATCHES])
     
     def _calculate_match_score(self, person: Person, person_data: Dict) -> Dict:
         """
@@ -195,16 +417,16 @@ class PersonDuplicateFinder:
         telegrams = person_data.get('telegrams', [])
         emails = person_data.get('emails', [])
         
-        # Получаем все контакты существующей персоны
-        existing_phones = person.phones if isinstance(person.phones, list) else []
+        # Получаем все контакты существующей персоны (копии, чтобы не менять объект)
+        existing_phones = list(person.phones) if isinstance(person.phones, list) else []
         if person.phone:  # Старое поле
             existing_phones.append(person.phone)
         
-        existing_telegrams = person.telegram_usernames if isinstance(person.telegram_usernames, list) else []
+        existing_telegrams = list(person.telegram_usernames) if isinstance(person.telegram_usernames, list) else []
         if person.telegram_username:  # Старое поле
             existing_telegrams.append(person.telegram_username)
         
-        existing_emails = person.emails if isinstance(person.emails, list) else []
+        existing_emails = list(person.emails) if isinstance(person.emails, list) else []
         if person.email:  # Старое поле
             existing_emails.append(person.email)
         
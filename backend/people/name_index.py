@@ -0,0 +1,242 @@
+"""
+Триграммный индекс имен персон для быстрого fuzzy-поиска
+"""
+import heapq
+import string
+import threading
+from collections import Counter, defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from django.core.cache import cache
+from rapidfuzz import process
+
+
+class PersonNameIndex:
+    """
+    Индекс триграмм нормализованных имен активных персон.
+
+    Строится один раз на процесс (лениво, при первом поиске) и обновляется
+    инкрементально через сигналы post_save/post_delete. Поиск сначала сужает
+    множество кандидатов по общим триграммам, а затем пересчитывает оценку
+    только для них через rapidfuzz.
+
+    Версия индекса хранится в кэше Django: если персону изменили в другом
+    воркере, версия расходится и индекс перестраивается при следующем поиске.
+    Массовые операции в обход сигналов (QuerySet.update, bulk_create)
+    индекс не видит — устаревшие записи отсеиваются при загрузке персон.
+    """
+
+    NGRAM_SIZE = 3
+    VERSION_CACHE_KEY = 'people:name_index:version'
+    # Триграммы, встречающиеся у большей доли персон, не участвуют в отборе
+    # (например, окончание "ов "), если в запросе есть более редкие
+    COMMON_NGRAM_RATIO = 0.2
+    COMMON_NGRAM_MIN_COUNT = 100
+
+    _punctuation_table = str.maketrans('', '', string.punctuation)
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries: Dict[int, Tuple[str, str]] = {}
+        self._postings: Dict[str, Set[int]] = defaultdict(set)
+        self._built = False
+        self._version: Optional[int] = None
+
+    @staticmethod
+    def build_search_string(person) -> str:
+        """Строка для fuzzy matching: полное и краткое имя персоны"""
+        search_string = f"{person.full_name} {person.short_name}"
+        if person.middle_name:
+            search_string += f" {person.first_name} {person.middle_name}"
+        return search_string
+
+    @classmethod
+    def normalize(cls, text: str) -> str:
+        """Нормализует текст для построения триграмм"""
+        if not text:
+            return ""
+        text = text.lower().translate(cls._punctuation_table)
+        return ' '.join(text.split())
+
+    @classmethod
+    def ngrams(cls, text: str) -> Set[str]:
+        """Возвращает множество триграмм нормализованного текста"""
+        grams = set()
+        for token in cls.normalize(text).split():
+            padded = f" {token} "
+            for i in range(len(padded) - cls.NGRAM_SIZE + 1):
+                grams.add(padded[i:i + cls.NGRAM_SIZE])
+        return grams
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def rebuild(self, rows: Optional[Iterable[Tuple[int, str, str]]] = None):
+        """
+        Полностью перестраивает индекс
+
+        Args:
+            rows: Итерируемое (id, person_type, search_string). Если не задано,
+                данные загружаются из БД
+        """
+        with self._lock:
+            self._version = self._current_version()
+            if rows is None:
+                rows = self._load_rows()
+
+            self._entries = {}
+            self._postings = defaultdict(set)
+            for person_id, person_type, search_string in rows:
+                self._add(person_id, person_type, search_string)
+            self._built = True
+
+    def update_person(self, person):
+        """Добавляет, обновляет или удаляет персону после сохранения"""
+        with self._lock:
+            if self._built:
+                self._remove(person.pk)
+                if person.is_active:
+                    self._add(person.pk, person.person_type, self.build_search_string(person))
+            self._sync_version()
+
+    def remove_person(self, person_id: int):
+        """Удаляет персону из индекса"""
+        with self._lock:
+            if self._built:
+                self._remove(person_id)
+            self._sync_version()
+
+    def discard(self, person_id: int):
+        """Удаляет устаревшую запись без изменения версии"""
+        with self._lock:
+            self._remove(person_id)
+
+    def candidates(
+        self,
+        name: str,
+        person_type: Optional[str] = None,
+        max_candidates: int = 200
+    ) -> Dict[int, str]:
+        """
+        Отбирает кандидатов с наибольшим числом общих триграмм
+
+        Returns:
+            Словарь {person_id: search_string}
+        """
+        self._ensure_fresh()
+
+        with self._lock:
+            grams = self.ngrams(name)
+            if not grams:
+                # Слишком короткий запрос - сравниваем со всеми
+                return {
+                    person_id: search_string
+                    for person_id, (entry_type, search_string) in self._entries.items()
+                    if not person_type or entry_type == person_type
+                }
+
+            postings = [self._postings[gram] for gram in grams if gram in self._postings]
+            common_limit = max(
+                self.COMMON_NGRAM_MIN_COUNT,
+                int(len(self._entries) * self.COMMON_NGRAM_RATIO)
+            )
+            rare_postings = [ids for ids in postings if len(ids) <= common_limit]
+            if rare_postings:
+                postings = rare_postings
+
+            overlap = Counter()
+            for ids in postings:
+                overlap.update(ids)
+
+            if person_type:
+                overlap = Counter({
+                    person_id: count for person_id, count in overlap.items()
+                    if self._entries[person_id][0] == person_type
+                })
+
+            best = heapq.nlargest(
+                max_candidates,
+                overlap.items(),
+                key=lambda item: (item[1], -item[0])
+            )
+            return {person_id: self._entries[person_id][1] for person_id, _ in best}
+
+    def search(
+        self,
+        name: str,
+        scorer: Callable,
+        person_type: Optional[str] = None,
+        score_cutoff: float = 0,
+        max_candidates: int = 200
+    ) -> List[Tuple[int, float]]:
+        """
+        Ищет персон по имени
+
+        Returns:
+            Список (person_id, score 0-100), отсортированный по убыванию оценки,
+            при равной оценке - по id
+        """
+        choices = self.candidates(name, person_type, max_candidates)
+        if not choices:
+            return []
+
+        results = process.extract(
+            name,
+            choices,
+            scorer=scorer,
+            score_cutoff=score_cutoff,
+            limit=None
+        )
+        ranked = [(person_id, score) for _, score, person_id in results]
+        ranked.sort(key=lambda item: (-item[1], item[0]))
+        return ranked
+
+    def _add(self, person_id: int, person_type: str, search_string: str):
+        self._entries[person_id] = (person_type, search_string)
+        for gram in self.ngrams(search_string):
+            self._postings[gram].add(person_id)
+
+    def _remove(self, person_id: int):
+        entry = self._entries.pop(person_id, None)
+        if entry is None:
+            return
+        for gram in self.ngrams(entry[1]):
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.discard(person_id)
+                if not ids:
+                    del self._postings[gram]
+
+    def _ensure_fresh(self):
+        if not self._built or self._version != self._current_version():
+            self.rebuild()
+
+    def _current_version(self) -> int:
+        return cache.get(self.VERSION_CACHE_KEY, 0)
+
+    def _sync_version(self):
+        """Увеличивает общую версию; локальный индекс уже содержит изменение"""
+        cache.add(self.VERSION_CACHE_KEY, 0, None)
+        try:
+            new_version = cache.incr(self.VERSION_CACHE_KEY)
+        except ValueError:
+            cache.set(self.VERSION_CACHE_KEY, 1, None)
+            new_version = 1
+
+        # Если между нами и общей версией были чужие изменения -
+        # оставляем расхождение, индекс перестроится при следующем поиске
+        if self._built and self._version == new_version - 1:
+            self._version = new_version
+
+    def _load_rows(self):
+        from .models import Person
+
+        persons = Person.objects.filter(is_active=True).only(
+            'id', 'person_type', 'first_name', 'last_name', 'middle_name'
+        )
+        for person in persons.iterator(chunk_size=2000):
+            yield person.pk, person.person_type, self.build_search_string(person)
+
+
+# Индекс общий для процесса
+person_name_index = PersonNameIndex()
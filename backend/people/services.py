@@ -5,6 +5,7 @@ from django.conf import settings
 from django.db.models import Q
 from rapidfuzz import fuzz, process
 from .models import Person
+from .name_index import person_name_index
 
 
 class PersonMatchingService:
@@ -189,60 +190,64 @@ class PersonMatchingService:
         Returns:
             Список словарей с найденными персонами и их оценками схожести
         """
-        # Фильтруем только активных персон
-        queryset = Person.objects.filter(is_active=True)
-        
-        # Фильтруем по типу персоны, если указан
-        if person_type:
-            queryset = queryset.filter(person_type=person_type)
-        
         # Получаем порог схожести для типа персоны
         threshold = self.thresholds.get(person_type, self.thresholds.get('directors', 0.6))
         
-        # Получаем всех кандидатов данного типа для fuzzy matching
-        # Для персон обычно их немного (до нескольких тысяч), поэтому fuzzy matching работает быстро
-        candidates = list(queryset)
-        
-        # Если после фильтрации ничего не найдено, возвращаем пустой список
-        if not candidates:
-            return []
-        
-        # Подготавливаем данные для fuzzy matching
-        person_data = []
-        for person in candidates:
-            # Создаем строку для поиска из полных имен
-            search_string = f"{person.full_name} {person.short_name}"
-            if person.middle_name:
-                search_string += f" {person.first_name} {person.middle_name}"
-            
-            person_data.append((person, search_string))
-        
-        # Выполняем fuzzy matching
+        # Индекс сужает поиск до кандидатов с общими триграммами,
+        # fuzzy matching выполняется только для них
         scorer_name = self.fuzzy_config['scorer'].replace('fuzz.', '')
         scorer = getattr(fuzz, scorer_name)
-        results = process.extract(
-            name, 
-            [data[1] for data in person_data],
+        ranked = person_name_index.search(
+            name,
             scorer=scorer,
-            limit=limit
+            person_type=person_type,
+            score_cutoff=threshold * 100,
+            max_candidates=self.config['search']['limits'].get('name_index_candidates', 200)
         )
         
         matches = []
-        for result_string, score, index in results:
+        for person, score in self._load_ranked_persons(ranked, person_type, limit):
             # Нормализуем оценку (0-1)
             normalized_score = score / 100.0
-            
-            # Проверяем порог схожести
-            if normalized_score >= threshold:
-                person = person_data[index][0]
-                matches.append({
-                    'person': person,
-                    'score': normalized_score,
-                    'confidence': self._get_confidence_level(normalized_score)
-                })
+            matches.append({
+                'person': person,
+                'score': normalized_score,
+                'confidence': self._get_confidence_level(normalized_score)
+            })
         
         return matches
     
+    def _load_ranked_persons(
+        self,
+        ranked: List[Tuple[int, float]],
+        person_type: Optional[str],
+        limit: int
+    ) -> List[Tuple[Person, float]]:
+        """
+        Загружает персон из результатов индекса одним запросом на порцию,
+        сохраняя порядок по оценке
+        """
+        queryset = Person.objects.filter(is_active=True)
+        if person_type:
+            queryset = queryset.filter(person_type=person_type)
+        
+        result = []
+        position = 0
+        while len(result) < limit and position < len(ranked):
+            chunk = ranked[position:position + limit - len(result)]
+            position += len(chunk)
+            persons = queryset.in_bulk([person_id for person_id, _ in chunk])
+            
+            for person_id, score in chunk:
+                person = persons.get(person_id)
+                if person is None:
+                    # Запись устарела (изменена в обход сигналов)
+                    person_name_index.discard(person_id)
+                    continue
+                result.append((person, score))
+        
+        return result
+    
     def get_persons_by_type(self, person_type: str) -> List[Person]:
         """
         Получает список персон по типу
@@ -0,0 +1,20 @@
+"""
+Сигналы приложения people
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Person
+from .name_index import person_name_index
+
+
+@receiver(post_save, sender=Person)
+def update_person_name_index(sender, instance, **kwargs):
+    """Обновляет индекс имен после сохранения персоны"""
+    person_name_index.update_person(instance)
+
+
+@receiver(post_delete, sender=Person)
+def remove_person_from_name_index(sender, instance, **kwargs):
+    """Удаляет персону из индекса имен"""
+    person_name_index.remove_person(instance.pk)
@@ -1,9 +1,9 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
 from django.db.models import Q, Count, Case, When, IntegerField
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiTypes
+from core.pagination import OptimizedPageNumberPagination
 from .models import Person
 from .serializers import (
     PersonSerializer, 
@@ -17,8 +17,11 @@ from .serializers import (
 from .services import person_matching_service
 
 
-class PersonPagination(PageNumberPagination):
-    """Пагинация для списка персон"""
+class PersonPagination(OptimizedPageNumberPagination):
+    """
+    Пагинация для списка персон: COUNT по запросу с аннотацией числа
+    проектов кэшируется CountProvider
+    """
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
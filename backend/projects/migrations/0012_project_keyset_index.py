@@ -0,0 +1,17 @@
+# Generated by Django 4.2.24 on 2026-10-17 02:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0011_project_usage_rights_parsed'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['created_at', 'id'], name='projects_pr_created_3ed563_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.24 on 2026-10-17 03:00
+
+from django.db import migrations
+
+
+def fill_blocking_keys(apps, schema_editor):
+    """Заполнить ключи блоков существующих проектов"""
+    from projects.services import project_matching_service
+
+    Project = apps.get_model('projects', 'Project')
+    project_matching_service.blocker.rebuild(
+        Project.objects.all(),
+        project_matching_service.blocking_keys,
+        key_model=apps.get_model('core', 'BlockingKey'),
+    )
+
+
+def clear_blocking_keys(apps, schema_editor):
+    """Удалить ключи блоков проектов"""
+    apps.get_model('core', 'BlockingKey').objects.filter(scope='projects.project').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0012_project_keyset_index'),
+        ('core', '0004_blockingkey'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_blocking_keys, clear_blocking_keys),
+    ]
@@ -212,6 +212,8 @@ class Project(BaseModel):
             models.Index(fields=['is_active', 'status']),
             models.Index(fields=['title', 'is_active']),
             models.Index(fields=['project_type', 'is_active']),
+            # Keyset пагинация списка проектов
+            models.Index(fields=['created_at', 'id']),
         ]
     
     def __str__(self):
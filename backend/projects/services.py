@@ -1,9 +1,10 @@
 import yaml
 import os
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set
 from django.conf import settings
 from django.db.models import Q
 from rapidfuzz import fuzz, process
+from core.blocking import CandidateBlocker
 from .models import Project
 
 
@@ -15,6 +16,7 @@ class ProjectMatchingService:
         self.thresholds = self.config['search']['thresholds']['projects']
         self.field_weights = self.config['search']['field_weights']['projects']
         self.fuzzy_config = self.config['search']['fuzzy_matching']['rapidfuzz']
+        self.blocker = CandidateBlocker(self.config)
         
     def _load_config(self) -> Dict[str, Any]:
         """Загружает конфигурацию из search_config.yaml"""
@@ -89,8 +91,8 @@ class ProjectMatchingService:
         if not any(search_data.values()):
             return []
         
-        # Получаем все активные проекты
-        projects = Project.objects.filter(is_active=True).select_related(
+        # Отбираем кандидатов по ключам блоков вместо перебора всех проектов
+        projects = self._get_candidates(search_data).select_related(
             'project_type', 'genre', 'production_company', 'director'
         )
         
@@ -151,6 +153,24 @@ class ProjectMatchingService:
         matches.sort(key=lambda x: x['score'], reverse=True)
         return matches[:limit]
     
+    def blocking_keys(self, project: Project) -> Set[str]:
+        """Ключи блоков проекта для индекса кандидатов"""
+        return self.blocker.record_keys(project, text_fields=['title', 'description'])
+    
+    def _get_candidates(self, search_data: Dict[str, str]):
+        """Отбирает кандидатов для fuzzy matching по токенам названия и описания"""
+        keys = set()
+        
+        title = search_data.get('title')
+        if title:
+            keys |= self.blocker.text_keys(['title'], title)
+        
+        description = search_data.get('description')
+        if description:
+            keys |= self.blocker.text_keys(['title', 'description'], description)
+        
+        return self.blocker.candidates(Project.objects.filter(is_active=True), keys)
+    
     def search_by_title(self, title: str, limit: int = 5) -> List[Dict[str, Any]]:
         """
         Ищет проекты по названию
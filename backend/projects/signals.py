@@ -0,0 +1,26 @@
+"""
+Сигналы приложения projects
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Project
+from .services import project_matching_service
+
+BLOCKING_FIELDS = {'title', 'description'}
+
+
+@receiver(post_save, sender=Project)
+def index_project_blocking_keys(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Обновляет ключи блоков записи для отбора кандидатов"""
+    if raw or (update_fields and not BLOCKING_FIELDS & set(update_fields)):
+        return
+    project_matching_service.blocker.reindex(
+        instance, project_matching_service.blocking_keys(instance)
+    )
+
+
+@receiver(post_delete, sender=Project)
+def remove_project_blocking_keys(sender, instance, **kwargs):
+    """Удаляет ключи блоков удаленной записи"""
+    project_matching_service.blocker.remove(instance)
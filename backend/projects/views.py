@@ -15,7 +15,7 @@ from .serializers import (
 from .services import project_matching_service
 from core.optimizations import OptimizedQuerySets, QueryOptimizer
 from core.caching import QuerySetCache, UserDataCache, CacheInvalidationService
-from core.pagination import OptimizedPageNumberPagination
+from core.pagination import CursorOrPageNumberPagination, OptimizedPageNumberPagination
 
 
 class ProjectPermission(permissions.BasePermission):
@@ -172,7 +172,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
     
     queryset = Project.objects.all()
     permission_classes = [permissions.IsAuthenticated, ProjectPermission]
-    pagination_class = OptimizedPageNumberPagination
+    pagination_class = CursorOrPageNumberPagination
     
     def perform_create(self, serializer):
         # Обрабатываем request_id если он передан
@@ -147,11 +147,14 @@ class RequestImageAdmin(BaseModelAdmin):
     """Админка для изображений запросов"""
     
     list_display = [
-        'id', 'request_link', 'image_preview', 'file_size', 'created_at'
+        'id', 'request_link', 'image_preview', 'file_size', 'ingestion_status', 'created_at'
     ]
-    list_filter = ['created_at', 'request__status']
+    list_filter = ['ingestion_status', 'created_at', 'request__status']
     search_fields = ['request__author_name', 'caption', 'telegram_file_id']
-    readonly_fields = ['telegram_file_id', 'file_size', 'created_at', 'updated_at']
+    readonly_fields = [
+        'telegram_file_id', 'file_size', 'ingestion_status', 'ingestion_attempts',
+        'ingestion_error', 'created_at', 'updated_at'
+    ]
     
     def request_link(self, obj):
         """Ссылка на запрос"""
@@ -180,14 +183,15 @@ class RequestFileAdmin(BaseModelAdmin):
     
     list_display = [
         'id', 'request_link', 'original_filename', 'file_size_mb', 
-        'mime_type', 'created_at'
+        'mime_type', 'ingestion_status', 'created_at'
     ]
-    list_filter = ['mime_type', 'created_at', 'request__status']
+    list_filter = ['ingestion_status', 'mime_type', 'created_at', 'request__status']
     search_fields = [
         'request__author_name', 'original_filename', 'telegram_file_id'
     ]
     readonly_fields = [
-        'telegram_file_id', 'created_at', 'updated_at', 'file_size_mb'
+        'telegram_file_id', 'created_at', 'updated_at', 'file_size_mb',
+        'ingestion_status', 'ingestion_attempts', 'ingestion_error'
     ]
     
     def request_link(self, obj):
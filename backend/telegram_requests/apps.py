@@ -5,3 +5,6 @@ class TelegramRequestsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'telegram_requests'
     verbose_name = 'Telegram Запросы'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -29,6 +29,9 @@ class DuplicateDetectionConfig:
         'Переслано из',
     ])
     
+    # Отбор кандидатов через MinHash/LSH индекс вместо полного перебора окна
+    USE_LSH_INDEX = getattr(settings, 'DUPLICATE_USE_LSH_INDEX', True)
+    
     # Логирование
     ENABLE_DEBUG_LOGGING = getattr(settings, 'DUPLICATE_DEBUG_LOGGING', False)
     
@@ -1,14 +1,17 @@
 """
 Сервис для обнаружения дубликатов запросов
 """
+import hashlib
 import logging
 import re
 from datetime import datetime, timedelta
-from typing import List, Tuple, Optional
-from fuzzywuzzy import fuzz
+from typing import Callable, List, Tuple, Optional
+from rapidfuzz import fuzz, process
+from django.db.models import Q
 from django.utils import timezone
 from .models import Request
 from .duplicate_config import config
+from .duplicate_index import RequestMinHashIndex
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +29,7 @@ class DuplicateDetectionService:
         self.config = config_instance or config
         self.similarity_threshold = self.config.SIMILARITY_THRESHOLD
         self.time_window_days = self.config.TIME_WINDOW_DAYS
+        self.index = RequestMinHashIndex(self.time_window_days)
     
     def normalize_text(self, text: str) -> str:
         """
@@ -76,6 +80,52 @@ class DuplicateDetectionService:
         
         return False
     
+    def token_signature(self, normalized_text: str) -> str:
+        """
+        Хэш набора слов нормализованного текста
+        
+        Тексты, отличающиеся только порядком или повторами слов,
+        получают одинаковую сигнатуру.
+        """
+        if not normalized_text:
+            return ""
+        tokens = ' '.join(sorted(set(normalized_text.split())))
+        return hashlib.blake2b(tokens.encode('utf-8'), digest_size=16).hexdigest()
+    
+    def duplicate_fields(self, text: str) -> Tuple[str, str]:
+        """
+        Поля запроса для поиска дубликатов
+        
+        Args:
+            text: Исходный текст запроса
+            
+        Returns:
+            Кортеж (нормализованный_текст, сигнатура_слов); пустые строки,
+            если текст не проверяется на дубликаты
+        """
+        if self.should_skip_text(text):
+            return "", ""
+        normalized = self.normalize_text(text)
+        return normalized, self.token_signature(normalized)
+    
+    def get_scorer(self) -> Callable:
+        """Функция сравнения rapidfuzz для COMPARISON_METHOD"""
+        return getattr(fuzz, self.config.COMPARISON_METHOD, fuzz.token_sort_ratio)
+    
+    @staticmethod
+    def round_score(score: float) -> int:
+        """
+        Округляет оценку rapidfuzz до целого процента
+        
+        rapidfuzz возвращает дробные оценки, а fuzzywuzzy округлял их
+        до целых; пороги SIMILARITY_THRESHOLD подбирались под целые оценки.
+        """
+        return int(round(score))
+    
+    def threshold_score(self) -> int:
+        """Минимальная целая оценка схожести; round убирает погрешность 0.9 * 100 = 90.00000000000001"""
+        return int(round(self.similarity_threshold * 100))
+    
     def calculate_similarity(self, text1: str, text2: str) -> float:
         """
         Вычисление схожести между двумя текстами
@@ -98,8 +148,7 @@ class DuplicateDetectionService:
             return 0.0
         
         # Выбираем метод сравнения на основе конфигурации
-        method = getattr(fuzz, self.config.COMPARISON_METHOD, fuzz.token_sort_ratio)
-        similarity = method(norm_text1, norm_text2) / 100.0
+        similarity = self.round_score(self.get_scorer()(norm_text1, norm_text2)) / 100.0
         
         if self.config.ENABLE_DEBUG_LOGGING:
             logger.debug(f"Сравнение текстов:")
@@ -121,47 +170,74 @@ class DuplicateDetectionService:
         Returns:
             Список кортежей (запрос, коэффициент_схожести) отсортированный по убыванию схожести
         """
-        if not text or self.should_skip_text(text):
+        normalized, signature = self.duplicate_fields(text)
+        if not normalized:
             return []
         
         # Определяем временное окно
         time_threshold = timezone.now() - timedelta(days=self.time_window_days)
         
-        # Получаем все запросы за указанный период
+        # Получаем запросы за указанный период; короткие тексты и исключения
+        # отсеяны при сохранении - у них пустой normalized_text
         queryset = Request.objects.filter(
             created_at__gte=time_threshold
         ).exclude(
-            text__isnull=True
-        ).exclude(
-            text__exact=''
+            normalized_text=''
         )
         
         # Исключаем конкретный запрос, если указан
         if exclude_request_id:
             queryset = queryset.exclude(id=exclude_request_id)
         
-        # Получаем все запросы
-        requests = list(queryset)
+        # Сужаем окно до кандидатов из LSH индекса и запросов с тем же набором слов
+        if self.config.USE_LSH_INDEX:
+            queryset = queryset.filter(
+                Q(id__in=self.index.candidates(normalized, since=time_threshold)) |
+                Q(token_signature=signature)
+            )
+        
+        choices = dict(queryset.values_list('id', 'normalized_text'))
+        
+        logger.info(f"Поиск дубликатов среди {len(choices)} запросов за последние {self.time_window_days} дней")
         
-        logger.info(f"Поиск дубликатов среди {len(requests)} запросов за последние {self.time_window_days} дней")
+        # Ищем дубликаты; порог снижен на полпроцента, чтобы не отсечь оценки,
+        # которые после округления достигают порога
+        threshold = self.threshold_score()
+        matches = [
+            (self.round_score(score), request_id)
+            for _, score, request_id in process.extract(
+                normalized,
+                choices,
+                scorer=self.get_scorer(),
+                processor=None,
+                score_cutoff=threshold - 0.5,
+                limit=None
+            )
+        ]
+        matches = [(score, request_id) for score, request_id in matches if score >= threshold]
+        requests = Request.objects.in_bulk([request_id for _, request_id in matches])
         
-        # Ищем дубликаты
+        # process.extract уже отсортировал по убыванию схожести
         duplicates = []
-        for request in requests:
-            # Пропускаем короткие тексты и исключения
-            if self.should_skip_text(request.text):
+        for score, request_id in matches:
+            request = requests.get(request_id)
+            if request is None:
                 continue
-                
-            similarity = self.calculate_similarity(text, request.text)
-            if similarity >= self.similarity_threshold:
-                duplicates.append((request, similarity))
-                logger.info(f"Найден дубликат: запрос ID {request.id}, схожесть {similarity:.2%}")
-        
-        # Сортируем по убыванию схожести
-        duplicates.sort(key=lambda x: x[1], reverse=True)
+            similarity = score / 100.0
+            duplicates.append((request, similarity))
+            logger.info(f"Найден дубликат: запрос ID {request.id}, схожесть {similarity:.2%}")
         
         return duplicates
     
+    def index_request(self, request: Request):
+        """
+        Обновляет запись запроса в LSH индексе
+        
+        Args:
+            request: Сохраненный запрос
+        """
+        self.index.index_request(request, request.normalized_text)
+    
     def is_duplicate(self, text: str, exclude_request_id: Optional[int] = None) -> bool:
         """
         Проверка, является ли текст дубликатом
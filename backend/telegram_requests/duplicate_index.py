@@ -0,0 +1,141 @@
+"""
+MinHash/LSH индекс текстов запросов для быстрого поиска кандидатов в дубликаты
+"""
+import hashlib
+import logging
+import random
+import zlib
+from datetime import datetime, timedelta
+from typing import List, Set
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Request, RequestDuplicateBucket
+
+logger = logging.getLogger(__name__)
+
+
+class RequestMinHashIndex:
+    """
+    LSH-индекс MinHash-сигнатур нормализованных текстов запросов.
+
+    Сигнатура из NUM_PERM минимальных хэшей символьных шинглов делится на
+    BANDS полос; хэш каждой полосы - это корзина в таблице
+    RequestDuplicateBucket. Тексты, совпавшие хотя бы в одной корзине,
+    становятся кандидатами, точная схожесть считается только для них.
+    При 32 полосах по 2 строки кандидатами почти наверняка становятся
+    тексты с коэффициентом Жаккара шинглов выше ~0.4; у текстов с
+    token_sort_ratio от 90% он заметно выше.
+    """
+
+    SHINGLE_SIZE = 5
+    NUM_PERM = 64
+    BANDS = 32
+    ROWS_PER_BAND = NUM_PERM // BANDS
+
+    # Универсальное хэширование h(x) = (a * x + b) mod p с фиксированным
+    # seed: сигнатуры должны совпадать во всех процессах и между релизами
+    PRIME = (1 << 31) - 1
+    SEED = 20251017
+
+    PRUNE_CACHE_KEY = 'telegram_requests:duplicate_index:pruned'
+    PRUNE_INTERVAL = 3600  # Очистка устаревших корзин не чаще раза в час
+
+    def __init__(self, time_window_days: int):
+        self.time_window_days = time_window_days
+
+        rng = random.Random(self.SEED)
+        self._a = np.array([rng.randrange(1, self.PRIME) for _ in range(self.NUM_PERM)], dtype=np.uint64)
+        self._b = np.array([rng.randrange(0, self.PRIME) for _ in range(self.NUM_PERM)], dtype=np.uint64)
+
+    def shingles(self, normalized_text: str) -> Set[str]:
+        """
+        Символьные шинглы текста с отсортированными словами,
+        чтобы перестановка слов не меняла набор шинглов
+        """
+        text = ' '.join(sorted(normalized_text.split()))
+        if len(text) <= self.SHINGLE_SIZE:
+            return {text} if text else set()
+        return {
+            text[i:i + self.SHINGLE_SIZE]
+            for i in range(len(text) - self.SHINGLE_SIZE + 1)
+        }
+
+    def signature(self, normalized_text: str) -> np.ndarray:
+        """MinHash-сигнатура текста"""
+        shingles = self.shingles(normalized_text)
+        if not shingles:
+            return np.array([], dtype=np.uint64)
+
+        hashes = np.array(
+            [zlib.crc32(shingle.encode('utf-8')) % self.PRIME for shingle in shingles],
+            dtype=np.uint64
+        )
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % self.PRIME
+        return permuted.min(axis=1)
+
+    def buckets(self, normalized_text: str) -> List[int]:
+        """Хэши полос сигнатуры (корзины LSH)"""
+        signature = self.signature(normalized_text)
+        if not len(signature):
+            return []
+
+        buckets = []
+        for band in range(self.BANDS):
+            rows = signature[band * self.ROWS_PER_BAND:(band + 1) * self.ROWS_PER_BAND]
+            digest = hashlib.blake2b(
+                band.to_bytes(2, 'big') + rows.tobytes(),
+                digest_size=8
+            ).digest()
+            buckets.append(int.from_bytes(digest, 'big', signed=True))
+        return buckets
+
+    def candidates(self, normalized_text: str, since: datetime):
+        """
+        ID запросов-кандидатов, попавших хотя бы в одну корзину текста
+
+        Returns:
+            QuerySet со значениями request_id (используется как подзапрос)
+        """
+        return RequestDuplicateBucket.objects.filter(
+            bucket__in=self.buckets(normalized_text),
+            created_at__gte=since
+        ).values('request_id')
+
+    def index_request(self, request: Request, normalized_text: str):
+        """
+        Добавляет или обновляет корзины запроса
+
+        Args:
+            request: Сохраненный запрос
+            normalized_text: Нормализованный текст запроса; пустая строка
+                удаляет запрос из индекса
+        """
+        buckets = set(self.buckets(normalized_text)) if normalized_text else set()
+        existing = set(request.duplicate_buckets.values_list('bucket', flat=True))
+
+        if buckets != existing:
+            with transaction.atomic():
+                request.duplicate_buckets.all().delete()
+                RequestDuplicateBucket.objects.bulk_create([
+                    RequestDuplicateBucket(
+                        request=request,
+                        bucket=bucket,
+                        created_at=request.created_at
+                    )
+                    for bucket in buckets
+                ])
+
+        if cache.add(self.PRUNE_CACHE_KEY, True, self.PRUNE_INTERVAL):
+            self.prune_expired()
+
+    def prune_expired(self) -> int:
+        """Удаляет корзины запросов, вышедших за временное окно"""
+        threshold = timezone.now() - timedelta(days=self.time_window_days)
+        deleted, _ = RequestDuplicateBucket.objects.filter(created_at__lt=threshold).delete()
+        if deleted:
+            logger.info(f"Удалено {deleted} устаревших корзин индекса дубликатов")
+        return deleted
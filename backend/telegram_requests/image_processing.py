@@ -25,7 +25,18 @@ class ImageProcessingService:
     OPTIMIZED_SIZE = (1200, 1200)
     
     @staticmethod
-    def optimize_image(image_file, max_size=None, quality=None):
+    def apply_draft(img, size):
+        """
+        Включает быстрое уменьшение JPEG при декодировании
+        
+        Декодер сразу масштабирует изображение в 2/4/8 раз, но не меньше
+        size, поэтому итоговое качество после LANCZOS не меняется
+        """
+        if size and img.format == 'JPEG':
+            img.draft('RGB', tuple(size))
+    
+    @staticmethod
+    def optimize_image(image_file, max_size=None, quality=None, use_draft=True):
         """
         Оптимизирует изображение для веб-отображения
         
@@ -33,6 +44,7 @@ class ImageProcessingService:
             image_file: Файл изображения
             max_size: Максимальный размер (width, height)
             quality: Качество JPEG (0-100)
+            use_draft: Использовать быстрое уменьшение JPEG при декодировании
             
         Returns:
             Оптимизированный файл изображения
@@ -40,6 +52,10 @@ class ImageProcessingService:
         try:
             # Открываем изображение
             with Image.open(image_file) as img:
+                original_size = img.size
+                if use_draft:
+                    ImageProcessingService.apply_draft(img, max_size)
+                
                 # Конвертируем в RGB если нужно
                 if img.mode in ('RGBA', 'LA', 'P'):
                     img = img.convert('RGB')
@@ -47,9 +63,6 @@ class ImageProcessingService:
                 # Поворачиваем изображение согласно EXIF данным
                 img = ImageOps.exif_transpose(img)
                 
-                # Получаем размеры
-                original_size = img.size
-                
                 # Если указан максимальный размер, масштабируем
                 if max_size:
                     img.thumbnail(max_size, Image.Resampling.LANCZOS)
@@ -84,19 +97,23 @@ class ImageProcessingService:
             return None
     
     @staticmethod
-    def create_thumbnail(image_file, size=None):
+    def create_thumbnail(image_file, size=None, use_draft=True):
         """
         Создает миниатюру изображения
         
         Args:
             image_file: Файл изображения
             size: Размер миниатюры (width, height)
+            use_draft: Использовать быстрое уменьшение JPEG при декодировании
             
         Returns:
             Файл миниатюры
         """
         try:
             with Image.open(image_file) as img:
+                if use_draft:
+                    ImageProcessingService.apply_draft(img, size or ImageProcessingService.THUMBNAIL_SIZE)
+                
                 # Конвертируем в RGB если нужно
                 if img.mode in ('RGBA', 'LA', 'P'):
                     img = img.convert('RGB')
@@ -156,5 +173,33 @@ class ImageProcessingService:
             return None
 
 
+def render_renditions(content: bytes, specs: list, use_draft: bool = True) -> dict:
+    """
+    Кодирует версии одного изображения (выполняется в процессе пула)
+    
+    Функция не обращается к Django ORM и хранилищу, поэтому ее можно
+    вызывать в дочерних процессах без инициализации приложения.
+    
+    Args:
+        content: Содержимое исходного изображения
+        specs: Список (kind, size, quality), kind - 'thumbnail' или 'optimized'
+        use_draft: Использовать быстрое уменьшение JPEG при декодировании
+        
+    Returns:
+        Словарь {(kind, size): bytes или None при ошибке}
+    """
+    results = {}
+    for kind, size, quality in specs:
+        source = ContentFile(content)
+        if kind == 'thumbnail':
+            rendered = ImageProcessingService.create_thumbnail(source, size=size, use_draft=use_draft)
+        else:
+            rendered = ImageProcessingService.optimize_image(
+                source, max_size=size, quality=quality, use_draft=use_draft
+            )
+        results[(kind, tuple(size))] = rendered.read() if rendered else None
+    return results
+
+
 # Экземпляр сервиса
 image_processing_service = ImageProcessingService()
@@ -0,0 +1,51 @@
+"""
+Django команда для заполнения полей поиска дубликатов у существующих запросов
+"""
+from django.core.management.base import BaseCommand
+
+from telegram_requests.duplicate_detection import duplicate_detector
+from telegram_requests.models import Request
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает normalized_text и token_signature запросов. '
+        'Нужно запускать после изменения настроек нормализации'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пакета при обновлении запросов (по умолчанию 1000)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        requests = Request.objects.only('id', 'text', 'normalized_text', 'token_signature')
+
+        batch = []
+        processed = 0
+        updated = 0
+        for request in requests.iterator(chunk_size=batch_size):
+            processed += 1
+            fields = duplicate_detector.duplicate_fields(request.text)
+            if fields == (request.normalized_text, request.token_signature):
+                continue
+
+            request.normalized_text, request.token_signature = fields
+            batch.append(request)
+            if len(batch) >= batch_size:
+                Request.objects.bulk_update(batch, ['normalized_text', 'token_signature'])
+                updated += len(batch)
+                batch = []
+
+        if batch:
+            Request.objects.bulk_update(batch, ['normalized_text', 'token_signature'])
+            updated += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Обработано запросов: {processed}, обновлено: {updated}"
+        ))
+        self.stdout.write("Для обновления LSH индекса выполните rebuild_duplicate_index")
@@ -0,0 +1,22 @@
+"""
+Django команда для удаления версий изображений, на которые не ссылаются записи
+"""
+from django.core.management.base import BaseCommand
+
+from telegram_requests.renditions import rendition_service
+
+
+class Command(BaseCommand):
+    help = 'Удаляет версии изображений (renditions/), на которые не ссылается ни одна запись RequestImage'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age-hours',
+            type=float,
+            default=None,
+            help='Не удалять файлы моложе этого возраста (по умолчанию TELEGRAM_RENDITION_ORPHAN_MIN_AGE_HOURS)',
+        )
+
+    def handle(self, *args, **options):
+        deleted = rendition_service.cleanup_orphans(min_age_hours=options['min_age_hours'])
+        self.stdout.write(self.style.SUCCESS(f"Удалено версий без ссылок: {deleted}"))
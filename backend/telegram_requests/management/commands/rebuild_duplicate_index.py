@@ -0,0 +1,38 @@
+"""
+Django команда для перестроения LSH индекса дубликатов запросов
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from telegram_requests.duplicate_detection import duplicate_detector
+from telegram_requests.models import Request
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает LSH индекс дубликатов для запросов во временном окне'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пакета при чтении запросов (по умолчанию 1000)',
+        )
+
+    def handle(self, *args, **options):
+        pruned = duplicate_detector.index.prune_expired()
+        self.stdout.write(f"Удалено устаревших корзин: {pruned}")
+
+        time_threshold = timezone.now() - timedelta(days=duplicate_detector.time_window_days)
+        requests = Request.objects.filter(
+            created_at__gte=time_threshold
+        ).only('id', 'normalized_text', 'created_at')
+
+        indexed = 0
+        for request in requests.iterator(chunk_size=options['batch_size']):
+            duplicate_detector.index_request(request)
+            indexed += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Проиндексировано запросов: {indexed}"))
@@ -0,0 +1,38 @@
+"""
+Django команда для повторной загрузки незавершенных медиафайлов из Telegram
+"""
+from django.core.management.base import BaseCommand
+
+from telegram_requests.media_ingestion import media_ingestion_queue
+from telegram_requests.models import RequestFile, RequestImage
+
+
+class Command(BaseCommand):
+    help = 'Загружает медиафайлы, оставшиеся в очереди после перезапуска или ошибок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--include-failed',
+            action='store_true',
+            help='Повторить также загрузки со статусом "failed"',
+        )
+
+    def handle(self, *args, **options):
+        if options['include_failed']:
+            for model in (RequestImage, RequestFile):
+                model.objects.filter(ingestion_status='failed').update(ingestion_status='pending')
+
+        queued = media_ingestion_queue.resume_pending()
+        self.stdout.write(f"Поставлено в очередь: {queued}")
+
+        # Дожидаемся завершения всех загрузок
+        media_ingestion_queue.shutdown(wait=True)
+
+        failed = sum(
+            model.objects.filter(ingestion_status='failed').count()
+            for model in (RequestImage, RequestFile)
+        )
+        if failed:
+            self.stdout.write(self.style.WARNING(f"Не удалось загрузить: {failed}"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Все медиафайлы загружены"))
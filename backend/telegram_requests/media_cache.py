@@ -2,11 +2,9 @@
 Сервис для кэширования медиафайлов
 """
 import os
-import hashlib
 import logging
 from django.core.cache import cache
 from django.conf import settings
-from PIL import Image
 from io import BytesIO
 import requests
 
@@ -68,70 +66,34 @@ class MediaCacheService:
     
     @staticmethod
     def create_thumbnail(image_path: str, size: tuple = None) -> str:
-        """Создает миниатюру изображения"""
-        if size is None:
-            size = MediaCacheService.THUMBNAIL_SIZE
-            
-        try:
-            # Открываем изображение
-            with Image.open(image_path) as img:
-                # Конвертируем в RGB если нужно
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    img = img.convert('RGB')
-                
-                # Создаем миниатюру
-                img.thumbnail(size, Image.Resampling.LANCZOS)
-                
-                # Сохраняем миниатюру
-                thumbnail_path = f"{image_path}_thumb_{size[0]}x{size[1]}.jpg"
-                
-                # Создаем директорию если не существует
-                os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
-                
-                img.save(thumbnail_path, 'JPEG', quality=85, optimize=True)
-                
-                return thumbnail_path
-                
-        except Exception as e:
-            logger.error(f"Ошибка создания миниатюры для {image_path}: {e}")
-            return image_path
+        """Возвращает путь к миниатюре изображения из кэша версий"""
+        return MediaCacheService._get_rendition_path(image_path, 'thumbnail', size or MediaCacheService.THUMBNAIL_SIZE)
     
     @staticmethod
     def optimize_image(image_path: str) -> str:
-        """Оптимизирует изображение для веб-отображения"""
+        """Возвращает путь к оптимизированной версии изображения из кэша версий"""
+        return MediaCacheService._get_rendition_path(image_path, 'optimized', MediaCacheService.MAX_IMAGE_SIZE)
+    
+    @staticmethod
+    def _get_rendition_path(image_path: str, kind: str, size: tuple = None) -> str:
+        from .renditions import rendition_service
+        
         try:
-            with Image.open(image_path) as img:
-                # Конвертируем в RGB если нужно
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    img = img.convert('RGB')
-                
-                # Уменьшаем размер если слишком большой
-                if img.size[0] > MediaCacheService.MAX_IMAGE_SIZE[0] or img.size[1] > MediaCacheService.MAX_IMAGE_SIZE[1]:
-                    img.thumbnail(MediaCacheService.MAX_IMAGE_SIZE, Image.Resampling.LANCZOS)
-                
-                # Создаем оптимизированную версию
-                optimized_path = f"{image_path}_optimized.jpg"
-                
-                # Создаем директорию если не существует
-                os.makedirs(os.path.dirname(optimized_path), exist_ok=True)
-                
-                img.save(optimized_path, 'JPEG', quality=85, optimize=True)
-                
-                return optimized_path
-                
+            with open(image_path, 'rb') as image_file:
+                name = rendition_service.get_rendition(image_file, kind, size=size)
+            return rendition_service.storage.path(name) if name else image_path
         except Exception as e:
-            logger.error(f"Ошибка оптимизации изображения {image_path}: {e}")
+            logger.error(f"Ошибка получения версии {kind} для {image_path}: {e}")
             return image_path
     
     @staticmethod
     def get_file_hash(file_path: str) -> str:
         """Вычисляет хэш файла для проверки изменений"""
+        from .renditions import rendition_service
+        
         try:
-            hash_md5 = hashlib.md5()
             with open(file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_md5.update(chunk)
-            return hash_md5.hexdigest()
+                return rendition_service.content_hash(f)
         except Exception as e:
             logger.error(f"Ошибка вычисления хэша файла {file_path}: {e}")
             return ""
@@ -0,0 +1,261 @@
+"""
+Фоновая очередь загрузки медиафайлов из Telegram
+"""
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional
+
+from django.conf import settings
+from django.core.files.base import File
+from django.db import close_old_connections, transaction
+from django.db.models import F
+
+from .media_cache import media_cache_service
+from .models import RequestFile, RequestImage
+from .rendition_pool import rendition_pool
+from .services import TelegramFileService
+
+logger = logging.getLogger(__name__)
+
+
+class MediaIngestionQueue:
+    """
+    Очередь фоновой загрузки медиафайлов из Telegram.
+
+    Webhook только создает записи RequestImage/RequestFile со статусом
+    "pending" и сразу отвечает боту. Скачивание выполняется пулом потоков
+    с ограниченной параллельностью; неудачные попытки повторяются с
+    экспоненциальной задержкой, после исчерпания попыток запись получает
+    статус "failed" и текст ошибки.
+
+    Очередь живет в памяти процесса: задачи, не завершенные до перезапуска,
+    остаются в БД со статусом "pending"/"downloading" и подхватываются
+    командой resume_media_ingestion.
+    """
+
+    MAX_IMAGE_SIZE_MB = 10
+    MAX_DOCUMENT_SIZE_MB = 50
+    IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+    UNFINISHED_STATUSES = ('pending', 'downloading')
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        retry_delay: Optional[float] = None
+    ):
+        self.max_workers = max_workers or getattr(settings, 'TELEGRAM_MEDIA_INGESTION_WORKERS', 4)
+        self.max_attempts = max_attempts or getattr(settings, 'TELEGRAM_MEDIA_INGESTION_MAX_ATTEMPTS', 3)
+        self.retry_delay = (
+            retry_delay if retry_delay is not None
+            else getattr(settings, 'TELEGRAM_MEDIA_INGESTION_RETRY_DELAY', 2.0)
+        )
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def enqueue_images(self, request_obj, photo_data: List[dict]) -> List[RequestImage]:
+        """
+        Создает записи изображений и ставит их в очередь загрузки
+
+        Args:
+            request_obj: Объект запроса
+            photo_data: Список фотографий из сообщения Telegram
+
+        Returns:
+            Созданные записи RequestImage со статусом "pending"
+        """
+        images = []
+        for photo in photo_data:
+            file_id = photo.get('file_id')
+            if not file_id:
+                continue
+            images.append(RequestImage.objects.create(
+                request=request_obj,
+                telegram_file_id=file_id,
+                file_size=photo.get('file_size'),
+                caption="",
+                ingestion_status='pending',
+                created_by=request_obj.created_by
+            ))
+
+        for image in images:
+            self.submit_on_commit(RequestImage, image.pk)
+
+        logger.info(f"В очередь загрузки добавлено {len(images)} изображений запроса {request_obj.id}")
+        return images
+
+    def enqueue_document(self, request_obj, document_data: dict) -> Optional[RequestFile]:
+        """
+        Создает запись документа и ставит ее в очередь загрузки
+
+        Args:
+            request_obj: Объект запроса
+            document_data: Данные документа из сообщения Telegram
+
+        Returns:
+            Созданная запись RequestFile со статусом "pending" или None
+        """
+        file_id = document_data.get('file_id')
+        if not file_id:
+            return None
+
+        request_file = RequestFile.objects.create(
+            request=request_obj,
+            original_filename=document_data.get('file_name', f'document_{file_id}'),
+            file_size=document_data.get('file_size', 0),
+            mime_type=document_data.get('mime_type', 'application/octet-stream'),
+            telegram_file_id=file_id,
+            ingestion_status='pending',
+            created_by=request_obj.created_by
+        )
+        self.submit_on_commit(RequestFile, request_file.pk)
+
+        logger.info(f"Документ {file_id} запроса {request_obj.id} добавлен в очередь загрузки")
+        return request_file
+
+    def submit_on_commit(self, model, pk: int):
+        """Ставит запись в очередь после фиксации транзакции"""
+        transaction.on_commit(lambda: self.submit(model, pk))
+
+    def submit(self, model, pk: int) -> Future:
+        """Ставит запись в очередь загрузки"""
+        return self._get_executor().submit(self._run, model, pk)
+
+    def resume_pending(self) -> int:
+        """
+        Повторно ставит в очередь незавершенные загрузки
+
+        Returns:
+            Количество поставленных в очередь записей
+        """
+        count = 0
+        for model in (RequestImage, RequestFile):
+            pks = model.objects.filter(
+                ingestion_status__in=self.UNFINISHED_STATUSES
+            ).values_list('pk', flat=True)
+            for pk in pks:
+                self.submit(model, pk)
+                count += 1
+        return count
+
+    def ingest(self, model, pk: int) -> bool:
+        """
+        Скачивает и сохраняет медиафайл с повторными попытками
+
+        Args:
+            model: RequestImage или RequestFile
+            pk: ID записи
+
+        Returns:
+            True, если файл загружен
+        """
+        try:
+            media = model.objects.get(pk=pk)
+        except model.DoesNotExist:
+            logger.warning(f"Медиафайл {model.__name__} {pk} удален до загрузки")
+            return False
+
+        if media.ingestion_status == 'ready':
+            return True
+
+        try:
+            telegram_service = TelegramFileService()
+        except ValueError as e:
+            self._mark_failed(media, str(e))
+            return False
+
+        max_size_mb = self.MAX_IMAGE_SIZE_MB if model is RequestImage else self.MAX_DOCUMENT_SIZE_MB
+        error = ''
+        for attempt in range(1, self.max_attempts + 1):
+            model.objects.filter(pk=pk).update(
+                ingestion_status='downloading',
+                ingestion_attempts=F('ingestion_attempts') + 1
+            )
+
+            try:
+                result = telegram_service.open_telegram_file(media.telegram_file_id, max_size_mb=max_size_mb)
+                error = '' if result else 'Не удалось скачать файл из Telegram'
+            except Exception as e:
+                result = None
+                error = str(e)
+
+            if result:
+                downloaded, filename = result
+                try:
+                    self._store(media, downloaded, filename)
+                finally:
+                    downloaded.close()
+                logger.info(f"Медиафайл {media.telegram_file_id} загружен с попытки {attempt}")
+                return True
+
+            logger.warning(
+                f"Попытка {attempt}/{self.max_attempts} загрузки {media.telegram_file_id} не удалась: {error}"
+            )
+            if attempt < self.max_attempts and self.retry_delay:
+                time.sleep(self.retry_delay * 2 ** (attempt - 1))
+
+        self._mark_failed(media, error)
+        return False
+
+    def shutdown(self, wait: bool = True):
+        """Останавливает пул потоков"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=wait)
+
+    def _run(self, model, pk: int) -> bool:
+        """Выполнение задачи в рабочем потоке"""
+        close_old_connections()
+        try:
+            return self.ingest(model, pk)
+        except Exception as e:
+            logger.error(f"Ошибка фоновой загрузки {model.__name__} {pk}: {e}")
+            return False
+        finally:
+            close_old_connections()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='media-ingestion'
+                )
+            return self._executor
+
+    def _store(self, media, downloaded: File, filename: str):
+        """Сохраняет скачанный файл и помечает запись загруженной"""
+        if isinstance(media, RequestImage):
+            if not filename.lower().endswith(self.IMAGE_EXTENSIONS):
+                filename += '.jpg'  # По умолчанию jpg
+            media.image.save(filename, downloaded, save=False)
+            media.file_size = downloaded.size
+            file_fields = ['image', 'file_size']
+        else:
+            media.file.save(media.original_filename, downloaded, save=False)
+            media.file_size = media.file_size or downloaded.size
+            file_fields = ['file', 'file_size']
+
+        media.ingestion_status = 'ready'
+        media.ingestion_error = ''
+        media.save(update_fields=file_fields + ['ingestion_status', 'ingestion_error', 'updated_at'])
+        media_cache_service.clear_media_cache(media.request_id)
+        
+        if isinstance(media, RequestImage):
+            # Миниатюра и оптимизированная версия создаются в пуле процессов
+            rendition_pool.submit([media.pk])
+
+    def _mark_failed(self, media, error: str):
+        type(media).objects.filter(pk=media.pk).update(
+            ingestion_status='failed',
+            ingestion_error=error
+        )
+        media_cache_service.clear_media_cache(media.request_id)
+        logger.error(f"Не удалось загрузить медиафайл {media.telegram_file_id}: {error}")
+
+
+# Очередь общая для процесса
+media_ingestion_queue = MediaIngestionQueue()
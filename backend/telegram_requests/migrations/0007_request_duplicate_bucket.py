@@ -0,0 +1,28 @@
+# Generated by Django 4.2.24 on 2026-10-17 00:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telegram_requests', '0006_simplify_request_statuses'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestDuplicateBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.BigIntegerField(help_text='Хэш полосы MinHash-сигнатуры', verbose_name='Корзина')),
+                ('created_at', models.DateTimeField(help_text='Дата создания запроса, для временного окна и очистки', verbose_name='Дата создания запроса')),
+                ('request', models.ForeignKey(help_text='Запрос, текст которого попал в корзину', on_delete=django.db.models.deletion.CASCADE, related_name='duplicate_buckets', to='telegram_requests.request', verbose_name='Запрос')),
+            ],
+            options={
+                'verbose_name': 'Корзина дубликатов',
+                'verbose_name_plural': 'Корзины дубликатов',
+                'indexes': [models.Index(fields=['bucket', 'created_at'], name='telegram_re_bucket_c171ec_idx'), models.Index(fields=['created_at'], name='telegram_re_created_3f5d07_idx')],
+            },
+        ),
+    ]
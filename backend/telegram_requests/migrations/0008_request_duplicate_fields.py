@@ -0,0 +1,27 @@
+# Generated by Django 4.2.24 on 2026-10-17 00:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telegram_requests', '0007_request_duplicate_bucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='request',
+            name='normalized_text',
+            field=models.TextField(blank=True, default='', editable=False, help_text='Текст, подготовленный для поиска дубликатов (пусто, если запрос не проверяется)', verbose_name='Нормализованный текст'),
+        ),
+        migrations.AddField(
+            model_name='request',
+            name='token_signature',
+            field=models.CharField(blank=True, default='', editable=False, help_text='Хэш набора слов нормализованного текста', max_length=32, verbose_name='Сигнатура слов'),
+        ),
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['token_signature'], name='telegram_re_token_s_f6cc4b_idx'),
+        ),
+    ]
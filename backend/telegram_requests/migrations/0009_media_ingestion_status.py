@@ -0,0 +1,61 @@
+# Generated by Django 4.2.24 on 2026-10-17 00:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telegram_requests', '0008_request_duplicate_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='requestfile',
+            name='ingestion_attempts',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Количество попыток скачать файл из Telegram', verbose_name='Попытки загрузки'),
+        ),
+        migrations.AddField(
+            model_name='requestfile',
+            name='ingestion_error',
+            field=models.TextField(blank=True, default='', help_text='Описание последней ошибки загрузки', verbose_name='Ошибка загрузки'),
+        ),
+        migrations.AddField(
+            model_name='requestfile',
+            name='ingestion_status',
+            field=models.CharField(choices=[('pending', 'В очереди'), ('downloading', 'Загружается'), ('ready', 'Загружен'), ('failed', 'Ошибка загрузки')], default='ready', help_text='Статус загрузки файла из Telegram', max_length=20, verbose_name='Статус загрузки'),
+        ),
+        migrations.AddField(
+            model_name='requestimage',
+            name='ingestion_attempts',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Количество попыток скачать файл из Telegram', verbose_name='Попытки загрузки'),
+        ),
+        migrations.AddField(
+            model_name='requestimage',
+            name='ingestion_error',
+            field=models.TextField(blank=True, default='', help_text='Описание последней ошибки загрузки', verbose_name='Ошибка загрузки'),
+        ),
+        migrations.AddField(
+            model_name='requestimage',
+            name='ingestion_status',
+            field=models.CharField(choices=[('pending', 'В очереди'), ('downloading', 'Загружается'), ('ready', 'Загружен'), ('failed', 'Ошибка загрузки')], default='ready', help_text='Статус загрузки файла из Telegram', max_length=20, verbose_name='Статус загрузки'),
+        ),
+        migrations.AlterField(
+            model_name='requestfile',
+            name='file',
+            field=models.FileField(blank=True, help_text='Загруженный файл', upload_to='requests/files/%Y/%m/%d/', verbose_name='Файл'),
+        ),
+        migrations.AlterField(
+            model_name='requestimage',
+            name='image',
+            field=models.ImageField(blank=True, help_text='Файл изображения', upload_to='requests/images/%Y/%m/%d/', verbose_name='Изображение'),
+        ),
+        migrations.AddIndex(
+            model_name='requestfile',
+            index=models.Index(fields=['ingestion_status'], name='telegram_re_ingesti_4a05aa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requestimage',
+            index=models.Index(fields=['ingestion_status'], name='telegram_re_ingesti_aa7bbf_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.24 on 2026-10-17 02:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telegram_requests', '0009_media_ingestion_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['created_at', 'id'], name='telegram_re_created_8e5d2e_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.24 on 2026-10-17 05:30
+
+from datetime import timedelta
+
+from django.db import migrations
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+
+
+def fill_duplicate_fields(apps, schema_editor):
+    """Заполнить поля поиска дубликатов и корзины LSH индекса существующих запросов"""
+    from telegram_requests.duplicate_detection import duplicate_detector
+
+    Request = apps.get_model('telegram_requests', 'Request')
+    RequestDuplicateBucket = apps.get_model('telegram_requests', 'RequestDuplicateBucket')
+    time_threshold = timezone.now() - timedelta(days=duplicate_detector.time_window_days)
+
+    requests = Request.objects.filter(normalized_text='').only(
+        'id', 'text', 'created_at', 'normalized_text', 'token_signature'
+    )
+    batch = []
+    buckets = []
+    for request in requests.order_by('pk').iterator(chunk_size=BATCH_SIZE):
+        normalized, signature = duplicate_detector.duplicate_fields(request.text)
+        if not normalized:
+            continue
+
+        request.normalized_text, request.token_signature = normalized, signature
+        batch.append(request)
+        if request.created_at >= time_threshold:
+            buckets.extend(
+                RequestDuplicateBucket(request_id=request.pk, bucket=bucket, created_at=request.created_at)
+                for bucket in set(duplicate_detector.index.buckets(normalized))
+            )
+
+        if len(batch) >= BATCH_SIZE:
+            Request.objects.bulk_update(batch, ['normalized_text', 'token_signature'])
+            RequestDuplicateBucket.objects.bulk_create(buckets, batch_size=BATCH_SIZE)
+            batch = []
+            buckets = []
+
+    if batch:
+        Request.objects.bulk_update(batch, ['normalized_text', 'token_signature'])
+        RequestDuplicateBucket.objects.bulk_create(buckets, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telegram_requests', '0010_request_keyset_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_duplicate_fields, migrations.RunPython.noop),
+    ]
@@ -20,6 +20,23 @@ class Request(BaseModel):
     # Основные поля
     text = models.TextField(verbose_name="Текст запроса", help_text="Содержимое запроса от пользователя")
     
+    # Поиск дубликатов
+    normalized_text = models.TextField(
+        blank=True,
+        default='',
+        editable=False,
+        verbose_name="Нормализованный текст",
+        help_text="Текст, подготовленный для поиска дубликатов (пусто, если запрос не проверяется)"
+    )
+    token_signature = models.CharField(
+        max_length=32,
+        blank=True,
+        default='',
+        editable=False,
+        verbose_name="Сигнатура слов",
+        help_text="Хэш набора слов нормализованного текста"
+    )
+    
     # Автор и отправитель
     author_name = models.CharField(
         max_length=200, 
@@ -142,12 +159,25 @@ class Request(BaseModel):
             models.Index(fields=['original_created_at']),
             models.Index(fields=['analysis_status']),
             models.Index(fields=['project']),
+            models.Index(fields=['token_signature']),
+            # Keyset пагинация списка запросов
+            models.Index(fields=['created_at', 'id']),
             *BaseModel.Meta.indexes
         ]
 
     def __str__(self):
         return f"Запрос от {self.author_name} ({self.created_at.strftime('%d.%m.%Y %H:%M')})"
 
+    def save(self, *args, **kwargs):
+        """Переопределяем save для подготовки текста к поиску дубликатов"""
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'text' in update_fields:
+            from .duplicate_detection import duplicate_detector
+            self.normalized_text, self.token_signature = duplicate_detector.duplicate_fields(self.text)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'normalized_text', 'token_signature'}
+        super().save(*args, **kwargs)
+
     @property
     def is_forwarded(self):
         """Проверяет, является ли запрос пересланным сообщением"""
@@ -159,7 +189,51 @@ class Request(BaseModel):
         return self.has_images or self.has_files
 
 
-class RequestImage(BaseModel):
+class MediaIngestionMixin(models.Model):
+    """
+    Абстрактная модель статуса фоновой загрузки медиафайла из Telegram.
+    
+    Запись создается сразу при получении webhook, а сам файл скачивается
+    очередью загрузки (см. media_ingestion.py). Файлы, загруженные
+    напрямую, сразу имеют статус "ready".
+    """
+    
+    INGESTION_STATUS_CHOICES = [
+        ('pending', 'В очереди'),
+        ('downloading', 'Загружается'),
+        ('ready', 'Загружен'),
+        ('failed', 'Ошибка загрузки'),
+    ]
+    
+    ingestion_status = models.CharField(
+        max_length=20,
+        choices=INGESTION_STATUS_CHOICES,
+        default='ready',
+        verbose_name="Статус загрузки",
+        help_text="Статус загрузки файла из Telegram"
+    )
+    ingestion_attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name="Попытки загрузки",
+        help_text="Количество попыток скачать файл из Telegram"
+    )
+    ingestion_error = models.TextField(
+        blank=True,
+        default='',
+        verbose_name="Ошибка загрузки",
+        help_text="Описание последней ошибки загрузки"
+    )
+
+    class Meta:
+        abstract = True
+
+    @property
+    def is_ingested(self):
+        """Проверяет, загружен ли файл"""
+        return self.ingestion_status == 'ready'
+
+
+class RequestImage(MediaIngestionMixin, BaseModel):
     """Модель изображения в запросе"""
     
     request = models.ForeignKey(
@@ -171,6 +245,7 @@ class RequestImage(BaseModel):
     )
     image = models.ImageField(
         upload_to='requests/images/%Y/%m/%d/',
+        blank=True,
         verbose_name="Изображение",
         help_text="Файл изображения"
     )
@@ -208,6 +283,7 @@ class RequestImage(BaseModel):
         indexes = [
             models.Index(fields=['request']),
             models.Index(fields=['telegram_file_id']),
+            models.Index(fields=['ingestion_status']),
             *BaseModel.Meta.indexes
         ]
 
@@ -222,37 +298,34 @@ class RequestImage(BaseModel):
         return 0
     
     def process_image(self):
-        """Обрабатывает изображение: создает миниатюру и оптимизирует"""
-        from .image_processing import image_processing_service
+        """Создает миниатюру и оптимизированную версию через кэш версий изображений"""
+        from .renditions import rendition_service
         
         if not self.image:
             return
         
         try:
-            # Создаем миниатюру
-            thumbnail_file = image_processing_service.create_thumbnail(self.image)
-            if thumbnail_file:
-                # Сохраняем миниатюру
-                thumbnail_name = f"thumb_{self.image.name.split('/')[-1]}"
-                self.thumbnail.save(thumbnail_name, thumbnail_file, save=False)
-            
-            # Оптимизируем основное изображение
-            optimized_file = image_processing_service.optimize_image(
-                self.image,
-                max_size=(1200, 1200),
-                quality=85
-            )
-            
-            if optimized_file:
-                # Сохраняем оптимизированное изображение
-                optimized_name = f"opt_{self.image.name.split('/')[-1]}"
-                self.image.save(optimized_name, optimized_file, save=False)
+            renditions = rendition_service.process(self.image)
+            if renditions:
+                self.apply_renditions(renditions)
                 
         except Exception as e:
             import logging
             logger = logging.getLogger(__name__)
             logger.error(f"Ошибка обработки изображения {self.id}: {str(e)}")
     
+    def apply_renditions(self, renditions):
+        """Переключает запись на готовые версии и удаляет исходник"""
+        from .renditions import rendition_service
+        
+        original_name = self.image.name
+        self.thumbnail.name = renditions['thumbnail']
+        self.image.name = renditions['optimized']
+        
+        # Исходник больше не нужен: запись ссылается на общую оптимизированную версию
+        if not rendition_service.is_rendition(original_name):
+            self.image.storage.delete(original_name)
+    
     def save(self, *args, **kwargs):
         """Переопределяем save для обработки изображения"""
         is_new = self.pk is None
@@ -265,7 +338,7 @@ class RequestImage(BaseModel):
             super().save(update_fields=['image', 'thumbnail'])
 
 
-class RequestFile(BaseModel):
+class RequestFile(MediaIngestionMixin, BaseModel):
     """Модель файла в запросе"""
     
     request = models.ForeignKey(
@@ -277,6 +350,7 @@ class RequestFile(BaseModel):
     )
     file = models.FileField(
         upload_to='requests/files/%Y/%m/%d/',
+        blank=True,
         verbose_name="Файл",
         help_text="Загруженный файл"
     )
@@ -310,6 +384,7 @@ class RequestFile(BaseModel):
             models.Index(fields=['request']),
             models.Index(fields=['telegram_file_id']),
             models.Index(fields=['mime_type']),
+            models.Index(fields=['ingestion_status']),
             *BaseModel.Meta.indexes
         ]
 
@@ -331,4 +406,34 @@ class RequestFile(BaseModel):
         """Возвращает размер файла в мегабайтах"""
         if self.file_size:
             return round(self.file_size / (1024 * 1024), 2)
-        return 0
\ No newline at end of file
+        return 0
+
+class RequestDuplicateBucket(models.Model):
+    """LSH-корзина MinHash-сигнатуры текста запроса для поиска дубликатов"""
+    
+    request = models.ForeignKey(
+        Request,
+        on_delete=models.CASCADE,
+        related_name='duplicate_buckets',
+        verbose_name="Запрос",
+        help_text="Запрос, текст которого попал в корзину"
+    )
+    bucket = models.BigIntegerField(
+        verbose_name="Корзина",
+        help_text="Хэш полосы MinHash-сигнатуры"
+    )
+    created_at = models.DateTimeField(
+        verbose_name="Дата создания запроса",
+        help_text="Дата создания запроса, для временного окна и очистки"
+    )
+
+    class Meta:
+        verbose_name = "Корзина дубликатов"
+        verbose_name_plural = "Корзины дубликатов"
+        indexes = [
+            models.Index(fields=['bucket', 'created_at']),
+            models.Index(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        return f"Корзина {self.bucket} для запроса {self.request_id}"
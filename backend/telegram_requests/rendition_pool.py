@@ -0,0 +1,185 @@
+"""
+Параллельная генерация версий изображений в пуле процессов
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .image_processing import render_renditions
+from .media_cache import media_cache_service
+from .models import RequestImage
+from .renditions import rendition_service
+
+logger = logging.getLogger(__name__)
+
+
+class RenditionPool:
+    """
+    Генерация миниатюр и оптимизированных версий для пачки изображений.
+
+    Кодирование JPEG в Pillow упирается в CPU, поэтому альбом из 10 фото
+    в одном потоке обрабатывается последовательно. Пул процессов кодирует
+    изображения параллельно на всех ядрах, а родительский процесс только
+    хэширует исходники, сохраняет результат в кэш версий (renditions) и
+    обновляет записи RequestImage.
+
+    generate() - синхронный вызов (тесты, открытие медиафайлов запроса),
+    submit() - фоновая обработка для очереди загрузки медиафайлов.
+    При TELEGRAM_RENDITION_WORKERS = 0 изображения кодируются в текущем
+    процессе.
+    """
+
+    # spawn не копирует потоки и соединения с БД родительского процесса
+    START_METHOD = 'spawn'
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = (
+            max_workers if max_workers is not None
+            else getattr(settings, 'TELEGRAM_RENDITION_WORKERS', 4)
+        )
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._dispatcher: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def generate(self, images: Iterable[RequestImage]) -> int:
+        """
+        Создает недостающие версии изображений и обновляет записи
+
+        Args:
+            images: Записи RequestImage с загруженными исходниками
+
+        Returns:
+            Количество обработанных изображений
+        """
+        jobs = []
+        sources: Dict[str, bytes] = {}
+        for image in images:
+            if not image.image or (image.thumbnail and rendition_service.is_rendition(image.image.name)):
+                continue
+            try:
+                with image.image.open('rb') as source:
+                    content = source.read()
+            except (OSError, ValueError) as e:
+                logger.error(f"Не удалось прочитать изображение {image.id}: {e}")
+                continue
+            content_hash = rendition_service.content_hash(BytesIO(content))
+            jobs.append((image, content_hash))
+            # Одинаковые фото в пачке кодируются один раз
+            sources.setdefault(content_hash, content)
+
+        if not jobs:
+            return 0
+
+        tasks = []
+        for content_hash, content in sources.items():
+            specs = rendition_service.specs(content_hash)
+            if specs:
+                tasks.append((content_hash, content, specs))
+        failed = self._store(tasks, self._render(tasks))
+
+        processed = 0
+        request_ids = set()
+        for image, content_hash in jobs:
+            if content_hash in failed:
+                continue
+            renditions = {
+                kind: rendition_service.rendition_name(content_hash, kind, params['size'])
+                for kind, params in rendition_service.RENDITIONS.items()
+            }
+            image.apply_renditions(renditions)
+            image.save(update_fields=['image', 'thumbnail', 'updated_at'])
+            request_ids.add(image.request_id)
+            processed += 1
+
+        for request_id in request_ids:
+            media_cache_service.clear_media_cache(request_id)
+
+        logger.info(f"Версии созданы для {processed} из {len(jobs)} изображений")
+        return processed
+
+    def submit(self, image_ids: List[int]) -> Future:
+        """Ставит генерацию версий в фоновую очередь"""
+        return self._get_dispatcher().submit(self._run, list(image_ids))
+
+    def shutdown(self, wait: bool = True):
+        """Останавливает пул процессов и очередь"""
+        with self._lock:
+            dispatcher, self._dispatcher = self._dispatcher, None
+            executor, self._executor = self._executor, None
+        if dispatcher:
+            dispatcher.shutdown(wait=wait)
+        if executor:
+            executor.shutdown(wait=wait)
+
+    def _render(self, tasks) -> List[dict]:
+        """Кодирует версии в пуле процессов (или в текущем процессе)"""
+        contents = [content for _, content, _ in tasks]
+        specs = [task_specs for _, _, task_specs in tasks]
+        if not tasks or self.max_workers <= 0:
+            return list(map(render_renditions, contents, specs))
+
+        try:
+            return list(self._get_executor().map(render_renditions, contents, specs))
+        except BrokenProcessPool:
+            logger.error("Пул процессов версий изображений остановлен, обработка в текущем процессе")
+            with self._lock:
+                self._executor = None
+            return list(map(render_renditions, contents, specs))
+
+    def _store(self, tasks, results) -> set:
+        """
+        Сохраняет закодированные версии в кэш
+
+        Returns:
+            Хэши исходников, которые не удалось закодировать
+        """
+        failed = set()
+        for (content_hash, _, specs), rendered in zip(tasks, results):
+            if any(rendered.get((kind, tuple(size))) is None for kind, size, _ in specs):
+                logger.error(f"Не удалось закодировать изображение {content_hash}")
+                failed.add(content_hash)
+                continue
+            for kind, size, _ in specs:
+                rendition_service.store(content_hash, kind, size, rendered[(kind, tuple(size))])
+        return failed
+
+    def _run(self, image_ids: List[int]) -> int:
+        """Выполнение задачи в фоновом потоке"""
+        close_old_connections()
+        try:
+            return self.generate(RequestImage.objects.filter(pk__in=image_ids))
+        except Exception as e:
+            logger.error(f"Ошибка фоновой генерации версий изображений {image_ids}: {e}")
+            return 0
+        finally:
+            close_old_connections()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context(self.START_METHOD)
+                )
+            return self._executor
+
+    def _get_dispatcher(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._dispatcher is None:
+                # По потоку на процесс, чтобы одиночные задачи загружали все ядра
+                self._dispatcher = ThreadPoolExecutor(
+                    max_workers=max(self.max_workers, 1),
+                    thread_name_prefix='renditions'
+                )
+            return self._dispatcher
+
+
+# Пул общий для процесса
+rendition_pool = RenditionPool()
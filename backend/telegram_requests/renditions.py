@@ -0,0 +1,221 @@
+"""
+Кэш версий изображений (миниатюры и оптимизированные копии) по хэшу содержимого
+"""
+import hashlib
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Q
+
+from .image_processing import image_processing_service
+
+logger = logging.getLogger(__name__)
+
+
+class ImageRenditionService:
+    """
+    Единый сервис версий изображений.
+
+    Версия адресуется хэшем исходного содержимого и параметрами:
+    renditions/<hh>/<hash>/<kind>_<W>x<H>.jpg. Поэтому каждая версия
+    кодируется один раз, а одинаковые фотографии, пересланные в разные
+    запросы, используют одни и те же файлы.
+
+    Версии - основное хранилище изображений запросов: RequestImage ссылается
+    на них, а исходник после обработки удаляется. Поэтому версии не
+    вытесняются по размеру; удаляются только сироты - версии, на которые
+    не ссылается ни одна запись (удаленные запросы, версии MediaCacheService).
+    Очистка обходит весь каталог и выполняется командой cleanup_renditions
+    по расписанию, а не в запросах.
+    """
+
+    ROOT = 'renditions'
+    HASH_CHUNK_SIZE = 1024 * 1024
+
+    RENDITIONS = {
+        'thumbnail': {'size': (300, 300)},
+        'optimized': {'size': (1200, 1200), 'quality': 85},
+    }
+
+    def __init__(self, storage=None):
+        self.storage = storage or default_storage
+
+    def content_hash(self, file) -> str:
+        """
+        Хэш содержимого файла
+
+        blake2b заметно быстрее md5 на 64-битных платформах и входит в
+        стандартную библиотеку
+        """
+        hasher = hashlib.blake2b(digest_size=16)
+        if hasattr(file, 'seek'):
+            file.seek(0)
+        for chunk in iter(lambda: file.read(self.HASH_CHUNK_SIZE), b''):
+            hasher.update(chunk)
+        if hasattr(file, 'seek'):
+            file.seek(0)
+        return hasher.hexdigest()
+
+    def rendition_name(self, content_hash: str, kind: str, size: Tuple[int, int]) -> str:
+        """Имя версии в хранилище"""
+        return f"{self.ROOT}/{content_hash[:2]}/{content_hash}/{kind}_{size[0]}x{size[1]}.jpg"
+
+    def is_rendition(self, name: str) -> bool:
+        """Проверяет, что файл хранится в кэше версий"""
+        return bool(name) and name.startswith(f"{self.ROOT}/")
+
+    def get_rendition(
+        self,
+        image_file,
+        kind: str,
+        size: Optional[Tuple[int, int]] = None,
+        content_hash: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Возвращает имя версии изображения, создавая ее при первом обращении
+
+        Args:
+            image_file: Файл исходного изображения
+            kind: 'thumbnail' или 'optimized'
+            size: Размер версии (по умолчанию из RENDITIONS)
+            content_hash: Хэш исходника, если уже известен
+
+        Returns:
+            Имя файла версии в хранилище или None при ошибке
+        """
+        params = self.RENDITIONS[kind]
+        size = tuple(size or params['size'])
+        content_hash = content_hash or self.content_hash(image_file)
+        name = self.rendition_name(content_hash, kind, size)
+
+        if self.storage.exists(name):
+            return name
+
+        image_file.seek(0)
+        if kind == 'thumbnail':
+            rendered = image_processing_service.create_thumbnail(image_file, size=size)
+        else:
+            rendered = image_processing_service.optimize_image(
+                image_file,
+                max_size=size,
+                quality=params.get('quality')
+            )
+        if rendered is None:
+            return None
+        return self.store(content_hash, kind, size, rendered)
+
+    def specs(self, content_hash: str) -> List[Tuple[str, Tuple[int, int], Optional[int]]]:
+        """
+        Параметры версий, которых еще нет в хранилище
+
+        Returns:
+            Список (kind, size, quality)
+        """
+        return [
+            (kind, params['size'], params.get('quality'))
+            for kind, params in self.RENDITIONS.items()
+            if not self.storage.exists(self.rendition_name(content_hash, kind, params['size']))
+        ]
+
+    def store(self, content_hash: str, kind: str, size: Tuple[int, int], content) -> str:
+        """
+        Сохраняет закодированную версию в хранилище
+
+        Args:
+            content_hash: Хэш исходника
+            kind: 'thumbnail' или 'optimized'
+            size: Размер версии
+            content: File или bytes с JPEG
+
+        Returns:
+            Имя файла версии в хранилище
+        """
+        name = self.rendition_name(content_hash, kind, size)
+        if isinstance(content, bytes):
+            content = ContentFile(content)
+
+        saved_name = self.storage.save(name, content)
+        if saved_name != name:
+            # Ту же версию одновременно создал другой поток
+            self.storage.delete(saved_name)
+        return name
+
+    def process(self, image_file) -> Optional[Dict[str, str]]:
+        """
+        Создает все версии изображения
+
+        Returns:
+            Словарь {kind: имя файла} или None, если изображение не читается
+        """
+        content_hash = self.content_hash(image_file)
+        renditions = {}
+        for kind in self.RENDITIONS:
+            name = self.get_rendition(image_file, kind, content_hash=content_hash)
+            if name is None:
+                return None
+            renditions[kind] = name
+        return renditions
+
+    def cleanup_orphans(self, min_age_hours: Optional[float] = None) -> int:
+        """
+        Удаляет версии, на которые не ссылается ни одна запись RequestImage
+
+        Args:
+            min_age_hours: Не трогать файлы моложе этого возраста - версия
+                может быть уже сохранена, а запись о ней еще нет
+                (по умолчанию TELEGRAM_RENDITION_ORPHAN_MIN_AGE_HOURS)
+
+        Returns:
+            Количество удаленных файлов
+        """
+        try:
+            root = self.storage.path(self.ROOT)
+        except NotImplementedError:
+            # Удаленные хранилища чистятся своими политиками жизненного цикла
+            return 0
+        if not os.path.isdir(root):
+            return 0
+
+        if min_age_hours is None:
+            min_age_hours = getattr(settings, 'TELEGRAM_RENDITION_ORPHAN_MIN_AGE_HOURS', 24)
+        created_before = time.time() - min_age_hours * 3600
+
+        candidates = []
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                full_path = os.path.join(dirpath, filename)
+                if os.stat(full_path).st_mtime > created_before:
+                    continue
+                relative = os.path.relpath(full_path, root).replace(os.sep, '/')
+                candidates.append(f"{self.ROOT}/{relative}")
+
+        referenced = self._referenced_names(candidates)
+        deleted = 0
+        for name in candidates:
+            if name not in referenced:
+                self.storage.delete(name)
+                deleted += 1
+
+        logger.info(f"Из хранилища версий изображений удалено {deleted} файлов-сирот")
+        return deleted
+
+    def _referenced_names(self, names, batch_size: int = 1000) -> set:
+        from .models import RequestImage
+
+        referenced = set()
+        for start in range(0, len(names), batch_size):
+            batch = names[start:start + batch_size]
+            for image, thumbnail in RequestImage.objects.filter(
+                Q(image__in=batch) | Q(thumbnail__in=batch)
+            ).values_list('image', 'thumbnail'):
+                referenced.update((image, thumbnail))
+        return referenced
+
+
+# Экземпляр сервиса
+rendition_service = ImageRenditionService()
@@ -16,9 +16,11 @@ class RequestImageSerializer(BaseModelSerializer):
         model = RequestImage
         fields = BaseModelSerializer.Meta.fields + [
             'request', 'image', 'thumbnail', 'telegram_file_id', 'file_size', 
-            'caption', 'file_size_mb'
+            'caption', 'file_size_mb', 'ingestion_status', 'ingestion_error'
+        ]
+        read_only_fields = BaseModelSerializer.Meta.read_only_fields + [
+            'file_size_mb', 'ingestion_status', 'ingestion_error'
         ]
-        read_only_fields = BaseModelSerializer.Meta.read_only_fields + ['file_size_mb']
 
 
 class RequestFileSerializer(BaseModelSerializer):
@@ -31,9 +33,11 @@ class RequestFileSerializer(BaseModelSerializer):
         model = RequestFile
         fields = BaseModelSerializer.Meta.fields + [
             'request', 'file', 'original_filename', 'file_size', 
-            'mime_type', 'telegram_file_id', 'file_size_mb'
+            'mime_type', 'telegram_file_id', 'file_size_mb', 'ingestion_status', 'ingestion_error'
+        ]
+        read_only_fields = BaseModelSerializer.Meta.read_only_fields + [
+            'file_size_mb', 'ingestion_status', 'ingestion_error'
         ]
-        read_only_fields = BaseModelSerializer.Meta.read_only_fields + ['file_size_mb']
 
 
 class RequestListSerializer(BaseListSerializer):
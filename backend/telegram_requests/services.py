@@ -1,43 +1,74 @@
 import os
+import tempfile
+import threading
 import requests
 import logging
+from requests.adapters import HTTPAdapter
 from django.conf import settings
-from django.core.files.base import ContentFile
+from django.core.files.base import File
 from typing import Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """
+    Общая для процесса HTTP-сессия Bot API
+    
+    Соединения с api.telegram.org переиспользуются (keep-alive) между
+    запросами и потоками очереди загрузки вместо нового TCP/TLS
+    рукопожатия на каждый вызов.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            pool_size = getattr(settings, 'TELEGRAM_HTTP_POOL_SIZE', 10)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session = requests.Session()
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
 
 class TelegramFileService:
     """Сервис для скачивания файлов из Telegram"""
     
-    def __init__(self, bot_token: str = None):
+    CHUNK_SIZE = 64 * 1024  # Размер блока при потоковом скачивании
+    
+    def __init__(self, bot_token: str = None, session: requests.Session = None):
         # Пробуем получить BOT_TOKEN из разных источников
         self.bot_token = bot_token or os.getenv('BOT_TOKEN') or os.environ.get('BOT_TOKEN')
         # BOT_TOKEN удален из логов из соображений безопасности
         if not self.bot_token:
             raise ValueError("BOT_TOKEN не установлен")
         
-        self.api_url = f"https://api.telegram.org/bot{self.bot_token}"
+        base_url = getattr(settings, 'TELEGRAM_API_URL', 'https://api.telegram.org').rstrip('/')
+        self.api_url = f"{base_url}/bot{self.bot_token}"
+        self.file_url = f"{base_url}/file/bot{self.bot_token}"
+        self.session = session or get_http_session()
     
-    def get_file_path(self, file_id: str) -> Optional[str]:
+    def get_file_info(self, file_id: str) -> Optional[dict]:
         """
-        Получает путь к файлу в Telegram
+        Получает информацию о файле в Telegram (getFile)
         
         Args:
             file_id: ID файла в Telegram
             
         Returns:
-            Путь к файлу или None если ошибка
+            Словарь с file_path и file_size или None если ошибка
         """
         try:
             url = f"{self.api_url}/getFile"
-            response = requests.get(url, params={'file_id': file_id}, timeout=10)
+            response = self.session.get(url, params={'file_id': file_id}, timeout=10)
             response.raise_for_status()
             
             data = response.json()
             if data.get('ok'):
-                return data['result']['file_path']
+                return data['result']
             else:
                 logger.error(f"Ошибка получения пути файла: {data}")
                 return None
@@ -46,6 +77,19 @@ class TelegramFileService:
             logger.error(f"Ошибка при получении пути файла {file_id}: {e}")
             return None
     
+    def get_file_path(self, file_id: str) -> Optional[str]:
+        """
+        Получает путь к файлу в Telegram
+        
+        Args:
+            file_id: ID файла в Telegram
+            
+        Returns:
+            Путь к файлу или None если ошибка
+        """
+        file_info = self.get_file_info(file_id)
+        return file_info['file_path'] if file_info else None
+    
     def download_file(self, file_path: str) -> Optional[bytes]:
         """
         Скачивает файл из Telegram
@@ -57,8 +101,8 @@ class TelegramFileService:
             Содержимое файла в байтах или None если ошибка
         """
         try:
-            url = f"https://api.telegram.org/file/bot{self.bot_token}/{file_path}"
-            response = requests.get(url, timeout=30)
+            url = f"{self.file_url}/{file_path}"
+            response = self.session.get(url, timeout=30)
             response.raise_for_status()
             
             return response.content
@@ -67,9 +111,85 @@ class TelegramFileService:
             logger.error(f"Ошибка при скачивании файла {file_path}: {e}")
             return None
     
+    def stream_file(self, file_path: str, max_size_mb: int = 20) -> Optional[File]:
+        """
+        Потоково скачивает файл из Telegram во временный файл
+        
+        В памяти находится не больше одного блока CHUNK_SIZE; скачивание
+        прерывается, как только размер превышает max_size_mb.
+        
+        Args:
+            file_path: Путь к файлу в Telegram
+            max_size_mb: Максимальный размер файла в МБ
+            
+        Returns:
+            File с содержимым (позиция в начале) или None если ошибка
+        """
+        max_size = max_size_mb * 1024 * 1024
+        url = f"{self.file_url}/{file_path}"
+        temp_file = tempfile.TemporaryFile()
+        
+        try:
+            with self.session.get(url, stream=True, timeout=30) as response:
+                response.raise_for_status()
+                
+                content_length = int(response.headers.get('Content-Length') or 0)
+                if content_length > max_size:
+                    logger.warning(f"Файл {file_path} слишком большой: {content_length / (1024 * 1024):.2f}MB > {max_size_mb}MB")
+                    temp_file.close()
+                    return None
+                
+                size = 0
+                for chunk in response.iter_content(chunk_size=self.CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > max_size:
+                        logger.warning(f"Файл {file_path} превысил {max_size_mb}MB при скачивании")
+                        temp_file.close()
+                        return None
+                    temp_file.write(chunk)
+            
+            temp_file.seek(0)
+            return File(temp_file, name=os.path.basename(file_path))
+            
+        except requests.RequestException as e:
+            logger.error(f"Ошибка при скачивании файла {file_path}: {e}")
+            temp_file.close()
+            return None
+    
+    def open_telegram_file(self, file_id: str, max_size_mb: int = 20) -> Optional[Tuple[File, str]]:
+        """
+        Потоково скачивает файл из Telegram по file_id
+        
+        Args:
+            file_id: ID файла в Telegram
+            max_size_mb: Максимальный размер файла в МБ
+            
+        Returns:
+            Tuple (временный файл, имя файла) или None если ошибка.
+            Файл нужно закрыть после сохранения
+        """
+        file_info = self.get_file_info(file_id)
+        if not file_info or not file_info.get('file_path'):
+            return None
+        
+        # Размер известен заранее - не скачиваем заведомо большой файл
+        if (file_info.get('file_size') or 0) > max_size_mb * 1024 * 1024:
+            logger.warning(f"Файл {file_id} слишком большой: {file_info['file_size']} байт > {max_size_mb}MB")
+            return None
+        
+        file_path = file_info['file_path']
+        filename = os.path.basename(file_path) or f"telegram_file_{file_id}"
+        
+        downloaded = self.stream_file(file_path, max_size_mb=max_size_mb)
+        if downloaded is None:
+            return None
+        return downloaded, filename
+    
     def download_telegram_file(self, file_id: str, max_size_mb: int = 20) -> Optional[Tuple[bytes, str]]:
         """
-        Скачивает файл из Telegram по file_id
+        Скачивает файл из Telegram по file_id целиком в память
+        
+        Для сохранения файлов используйте open_telegram_file.
         
         Args:
             file_id: ID файла в Telegram
@@ -118,13 +238,14 @@ class TelegramFileService:
         Returns:
             RequestImage объект или None если ошибка
         """
+        result = None
         try:
             # Скачиваем файл
-            result = self.download_telegram_file(file_id, max_size_mb=10)
+            result = self.open_telegram_file(file_id, max_size_mb=10)
             if not result:
                 return None
             
-            file_content, filename = result
+            django_file, filename = result
             
             # Создаем объект RequestImage
             from .models import RequestImage
@@ -132,16 +253,14 @@ class TelegramFileService:
             # Определяем расширение файла
             if not filename.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.webp')):
                 filename += '.jpg'  # По умолчанию jpg
-            
-            # Создаем файл
-            django_file = ContentFile(file_content, name=filename)
+            django_file.name = filename
             
             # Создаем RequestImage
             request_image = RequestImage.objects.create(
                 request=request_obj,
                 image=django_file,
                 telegram_file_id=file_id,
-                file_size=len(file_content),
+                file_size=django_file.size,
                 caption="",  # Подпись будет добавлена отдельно
                 created_by=request_obj.created_by
             )
@@ -152,6 +271,9 @@ class TelegramFileService:
         except Exception as e:
             logger.error(f"Ошибка при сохранении изображения {file_id}: {e}")
             return None
+        finally:
+            if result:
+                result[0].close()
     
     def save_document_from_telegram(self, file_id: str, document_data: dict, request_obj) -> Optional['RequestFile']:
         """
@@ -165,29 +287,28 @@ class TelegramFileService:
         Returns:
             RequestFile объект или None если ошибка
         """
+        result = None
         try:
             # Скачиваем файл
-            result = self.download_telegram_file(file_id, max_size_mb=50)
+            result = self.open_telegram_file(file_id, max_size_mb=50)
             if not result:
                 return None
             
-            file_content, _ = result
+            django_file, _ = result
             
             # Получаем оригинальное имя файла из данных Telegram
             original_filename = document_data.get('file_name', f'document_{file_id}')
+            django_file.name = original_filename
             
             # Создаем объект RequestFile
             from .models import RequestFile
             
-            # Создаем файл
-            django_file = ContentFile(file_content, name=original_filename)
-            
             # Создаем RequestFile
             request_file = RequestFile.objects.create(
                 request=request_obj,
                 file=django_file,
                 original_filename=original_filename,
-                file_size=document_data.get('file_size', len(file_content)),
+                file_size=document_data.get('file_size', django_file.size),
                 mime_type=document_data.get('mime_type', 'application/octet-stream'),
                 telegram_file_id=file_id,
                 created_by=request_obj.created_by
@@ -199,3 +320,6 @@ class TelegramFileService:
         except Exception as e:
             logger.error(f"Ошибка при сохранении документа {file_id}: {e}")
             return None
+        finally:
+            if result:
+                result[0].close()
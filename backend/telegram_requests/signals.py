@@ -0,0 +1,17 @@
+"""
+Сигналы приложения telegram_requests
+"""
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Request
+
+
+@receiver(post_save, sender=Request)
+def index_request_for_duplicates(sender, instance, created, update_fields=None, **kwargs):
+    """Добавляет текст запроса в LSH индекс дубликатов"""
+    if not created and update_fields is not None and 'text' not in update_fields:
+        return
+
+    from .duplicate_detection import duplicate_detector
+    duplicate_detector.index_request(instance)
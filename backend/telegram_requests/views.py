@@ -21,16 +21,17 @@ from core.views import BaseModelViewSet
 from core.permissions import OwnerPermission
 from core.optimizations import OptimizedQuerySets, QueryOptimizer
 from core.caching import QuerySetCache, UserDataCache, CacheInvalidationService
-from core.pagination import OptimizedPageNumberPagination
+from core.pagination import CursorOrPageNumberPagination
 from .models import Request, RequestImage, RequestFile
 from .serializers import (
     RequestSerializer, RequestListSerializer, RequestCreateSerializer,
     RequestResponseSerializer, RequestStatusSerializer,
     RequestImageSerializer, RequestFileSerializer, TelegramWebhookDataSerializer
 )
-from .services import TelegramFileService
 from .duplicate_detection import duplicate_detector
 from .media_cache import media_cache_service
+from .media_ingestion import media_ingestion_queue
+from .rendition_pool import rendition_pool
 
 logger = logging.getLogger(__name__)
 
@@ -46,7 +47,7 @@ class RequestViewSet(BaseModelViewSet):
     search_fields = ['text', 'author_name']
     ordering_fields = ['created_at', 'original_created_at', 'processed_at']
     ordering = ['-created_at']
-    pagination_class = OptimizedPageNumberPagination
+    pagination_class = CursorOrPageNumberPagination
     
     def get_queryset(self):
         """Все агенты видят все запросы с поддержкой фильтрации"""
@@ -203,7 +204,13 @@ class RequestViewSet(BaseModelViewSet):
             logger.info(f"Получение медиафайлов запроса {request_obj.id} из БД")
             
             # Оптимизируем запросы с помощью select_related
-            images = request_obj.images.select_related('request').all()
+            images = list(request_obj.images.select_related('request').all())
+            
+            # Недостающие миниатюры альбома создаются параллельно
+            pending_images = [image for image in images if image.image and not image.thumbnail]
+            if pending_images:
+                rendition_pool.generate(pending_images)
+            
             image_serializer = RequestImageSerializer(images, many=True, context={'request': request})
             
             files = request_obj.files.select_related('request').all()
@@ -413,57 +420,20 @@ class TelegramWebhookViewSet(viewsets.ViewSet):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
     def _process_images(self, request_obj, photo_data):
-        """Обработка изображений из Telegram"""
-        import logging
-        logger = logging.getLogger(__name__)
-        
+        """Постановка изображений из Telegram в очередь загрузки"""
         try:
-            logger.info(f"Обрабатываем {len(photo_data)} изображений для запроса {request_obj.id}")
-            # BOT_TOKEN удален из логов из соображений безопасности
-            
-            # Инициализируем сервис для работы с Telegram
-            telegram_service = TelegramFileService()
-            
-            # Обрабатываем все фотографии в сообщении
-            for i, photo in enumerate(photo_data):
-                file_id = photo.get('file_id')
-                file_size = photo.get('file_size', 0)
-                logger.info(f"Обрабатываем изображение {i+1}/{len(photo_data)}: {file_id}, размер: {file_size}")
-                if file_id:
-                    # Скачиваем и сохраняем изображение
-                    request_image = telegram_service.save_image_from_telegram(file_id, request_obj)
-                    if request_image:
-                        # Обновляем размер файла из данных Telegram
-                        request_image.file_size = file_size
-                        request_image.save()
-                        logger.info(f"Изображение {file_id} успешно сохранено, размер: {file_size}")
-                    else:
-                        logger.error(f"Не удалось сохранить изображение {file_id}")
-                        
+            media_ingestion_queue.enqueue_images(request_obj, photo_data)
         except Exception as e:
             # Логируем ошибку, но не прерываем создание запроса
-            logger.error(f"Ошибка при обработке изображений: {e}")
+            logger.error(f"Ошибка при постановке изображений в очередь: {e}")
     
     def _process_documents(self, request_obj, document_data):
-        """Обработка документов из Telegram"""
+        """Постановка документа из Telegram в очередь загрузки"""
         try:
-            # Инициализируем сервис для работы с Telegram
-            telegram_service = TelegramFileService()
-            
-            # Скачиваем и сохраняем документ
-            file_id = document_data.get('file_id')
-            if file_id:
-                request_file = telegram_service.save_document_from_telegram(file_id, document_data, request_obj)
-                if request_file:
-                    import logging
-                    logger = logging.getLogger(__name__)
-                    logger.info(f"Документ {file_id} успешно обработан")
-                        
+            media_ingestion_queue.enqueue_document(request_obj, document_data)
         except Exception as e:
             # Логируем ошибку, но не прерываем создание запроса
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"Ошибка при обработке документов: {e}")
+            logger.error(f"Ошибка при постановке документа в очередь: {e}")
 
     @action(detail=True, methods=['get'], url_path='text')
     def get_request_text(self, request, pk=None):
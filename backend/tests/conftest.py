@@ -101,3 +101,13 @@ def enable_db_access_for_all_tests(db):
     Автоматически включает доступ к базе данных для всех тестов
     """
     pass
+
+
+@pytest.fixture(autouse=True)
+def temporary_media_root(tmp_path):
+    """
+    Загруженные в тестах файлы сохраняются во временную папку, а не в media/
+    """
+    from django.test import override_settings
+    with override_settings(MEDIA_ROOT=tmp_path / 'media'):
+        yield
@@ -0,0 +1,66 @@
+"""
+Бенчмарк поиска дубликатов запросов: предвычисленный текст против пересчета
+"""
+import random
+import time
+
+import pytest
+from rapidfuzz import process
+
+from telegram_requests.duplicate_detection import DuplicateDetectionService
+
+WORDS = [
+    'ищем', 'актера', 'актрису', 'на', 'роль', 'в', 'сериал', 'фильм', 'рекламу',
+    'съемки', 'москве', 'петербурге', 'лет', 'опыт', 'обязателен', 'главную',
+    'эпизод', 'гонорар', 'кастинг', 'пробы', 'мая', 'июня', 'врача', 'полицейского',
+    'студента', 'мамы', 'папы', 'бабушки', 'блондинку', 'брюнета', 'спортивного',
+]
+
+
+def _make_texts(size):
+    """Генерирует синтетические тексты запросов"""
+    rng = random.Random(size)
+    return [
+        ' '.join(rng.choice(WORDS) for _ in range(rng.randint(12, 30))) + f' #{i}'
+        for i in range(size)
+    ]
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize('size', [10_000, 100_000])
+def test_precomputed_text_vs_per_message_normalization(size):
+    """Задержка обработки одного сообщения при size запросах в окне"""
+    service = DuplicateDetectionService()
+    texts = _make_texts(size)
+    message = texts[size // 2] + ' срочно'
+    threshold = service.similarity_threshold
+
+    # Прежняя схема: нормализация и проверка каждого исторического текста
+    start_time = time.perf_counter()
+    legacy = [
+        index for index, text in enumerate(texts)
+        if not service.should_skip_text(text)
+        and service.calculate_similarity(message, text) >= threshold
+    ]
+    legacy_time = time.perf_counter() - start_time
+
+    # Новая схема: тексты нормализованы при сохранении
+    choices = dict(enumerate(service.duplicate_fields(text)[0] for text in texts))
+    start_time = time.perf_counter()
+    normalized, _ = service.duplicate_fields(message)
+    matches = process.extract(
+        normalized,
+        choices,
+        scorer=service.get_scorer(),
+        processor=None,
+        score_cutoff=round(threshold * 100, 6),
+        limit=None
+    )
+    precomputed_time = time.perf_counter() - start_time
+
+    assert sorted(key for _, _, key in matches) == legacy
+    assert size // 2 in legacy
+    assert precomputed_time < legacy_time
+
+    print(f"\n{size} запросов: пересчет {legacy_time * 1000:.1f}ms, "
+          f"предвычисленный текст {precomputed_time * 1000:.1f}ms на сообщение")
@@ -0,0 +1,87 @@
+"""
+Бенчмарк keyset пагинации против OFFSET на глубоких страницах
+"""
+import time
+import pytest
+from rest_framework.request import Request as DRFRequest
+from rest_framework.test import APIRequestFactory
+
+from core.pagination import CursorPagination, OptimizedPageNumberPagination
+from telegram_requests.models import Request
+from tests.unit.users.factories import AgentFactory
+
+ROWS = 20_000
+PAGE_SIZE = 100
+DEPTHS = (1, 50, 190)
+
+
+def _request(params):
+    return DRFRequest(APIRequestFactory().get('/api/requests/', params))
+
+
+def _timed(callback, repeats=5):
+    """Лучшее время из нескольких повторов"""
+    best = None
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        result = callback()
+        elapsed = time.perf_counter() - start_time
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+@pytest.mark.slow
+@pytest.mark.django_db
+def test_keyset_vs_offset_deep_pages():
+    """Время страницы не должно расти с глубиной у курсорной пагинации"""
+    agent = AgentFactory()
+    Request.objects.bulk_create(
+        [
+            Request(
+                text=f"Запрос {index}",
+                author_name='Автор',
+                author_telegram_id=index,
+                sender_telegram_id=index,
+                telegram_message_id=index,
+                telegram_chat_id=1,
+                created_by=agent,
+            )
+            for index in range(ROWS)
+        ],
+        batch_size=2000,
+    )
+    # created_at почти совпадает у всех записей (auto_now_add) - порядок держит тай-брейкер по id
+    queryset = Request.objects.order_by('-created_at', '-id')
+
+    # Курсоры нужных страниц: обход вперед
+    cursors = {}
+    paginator = CursorPagination()
+    paginator.page_size = PAGE_SIZE
+    cursor = ''
+    for page in range(1, max(DEPTHS) + 1):
+        cursors[page] = cursor
+        paginator.paginate_queryset(queryset, _request({'cursor': cursor}))
+        cursor = paginator.get_paginated_response([]).data['next_cursor']
+
+    timings = {}
+    print()
+    for depth in DEPTHS:
+        keyset_time, keyset_page = _timed(
+            lambda: CursorPagination().paginate_queryset(queryset, _request({'cursor': cursors[depth]}))
+        )
+        offset_paginator = OptimizedPageNumberPagination()
+        offset_paginator.max_page_size = PAGE_SIZE
+        offset_time, offset_page = _timed(
+            lambda: offset_paginator.paginate_queryset(
+                queryset, _request({'page': depth, 'page_size': PAGE_SIZE})
+            )
+        )
+        timings[depth] = keyset_time
+        assert [row.id for row in keyset_page] == [row.id for row in offset_page]
+        print(
+            f"Страница {depth}: keyset {keyset_time * 1000:.2f} мс, "
+            f"OFFSET + COUNT {offset_time * 1000:.2f} мс"
+        )
+
+    # Запас на шум таймера: страница курсора не дорожает с глубиной
+    assert timings[max(DEPTHS)] < timings[1] * 3
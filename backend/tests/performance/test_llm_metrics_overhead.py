@@ -0,0 +1,35 @@
+"""
+Бенчмарк стоимости одного наблюдения метрик LLM (включая периодический
+сброс в общий кэш)
+"""
+import time
+
+import pytest
+from django.core.cache import cache
+
+from llm.metrics import LLMMetrics
+
+OBSERVATIONS = 20000
+
+
+@pytest.mark.slow
+def test_observation_overhead():
+    """Микросекунды на наблюдение: цель - меньше 50 мкс"""
+    cache.clear()
+    # Сброс в кэш чаще, чем в продакшене, чтобы его стоимость вошла в замер
+    metrics = LLMMetrics(flush_interval=0.01, key_prefix='benchmark:metrics:')
+
+    start_time = time.perf_counter()
+    for index in range(OBSERVATIONS):
+        metrics.observe('openai_call_seconds', (index % 100) / 10)
+        metrics.increment('retry_attempts')
+    per_observation_us = (time.perf_counter() - start_time) * 1e6 / (OBSERVATIONS * 2)
+
+    snapshot = metrics.snapshot()
+    metrics.reset()
+
+    assert snapshot['histograms']['openai_call_seconds']['count'] == OBSERVATIONS
+    assert snapshot['counters']['retry_attempts'] == OBSERVATIONS
+    assert per_observation_us < 50
+
+    print(f"\nНаблюдение метрики: {per_observation_us:.2f} мкс")
@@ -0,0 +1,43 @@
+"""
+Бенчмарк накладных расходов LLMService на запрос: создание сервиса
+на каждый запрос против общего сервиса из реестра
+"""
+import time
+import pytest
+from django.test import override_settings
+
+from llm.registry import config_files, get_llm_service, llm_registry
+from llm.services import LLMService
+
+ITERATIONS = 200
+
+
+def _per_call_ms(func):
+    start_time = time.perf_counter()
+    for _ in range(ITERATIONS):
+        func()
+    return (time.perf_counter() - start_time) * 1000 / ITERATIONS
+
+
+@pytest.mark.slow
+@override_settings(OPENAI_API_KEY='sk-benchmark')
+def test_llm_service_per_request_overhead():
+    """Миллисекунды на запрос: прежнее создание LLMService и реестр"""
+
+    def per_request():
+        # Прежнее поведение: конфиг, промпт и схема читаются заново, клиент OpenAI новый
+        config_files.clear()
+        llm_registry.reset()
+        return LLMService()
+
+    try:
+        before_ms = _per_call_ms(per_request)
+        llm_registry.reset()
+        get_llm_service()
+        after_ms = _per_call_ms(get_llm_service)
+    finally:
+        llm_registry.reset()
+
+    assert after_ms * 10 < before_ms
+
+    print(f"\nLLMService на запрос: создание {before_ms:.2f} мс, реестр {after_ms:.3f} мс")
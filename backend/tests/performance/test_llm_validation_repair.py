@@ -0,0 +1,134 @@
+"""
+Бенчмарк валидации ответов LLM: время скомпилированной проверки схемы
+и доля ответов, требующих повторного вызова модели, до и после
+локального исправления
+"""
+import copy
+import time
+
+import pytest
+from django.core.exceptions import ValidationError
+
+from llm.schema_validator import CompiledSchemaValidator, SCHEMA_PATH, get_schema_validator
+from llm.validators import LLMResponseValidator, repair_llm_response
+from tests.unit.llm.fake_openai import ANALYSIS
+
+ITERATIONS = 500
+
+
+def _base_response():
+    response, _, errors = get_schema_validator().repair(dict(ANALYSIS, confidence=0.9, errors=[]))
+    assert not errors
+    return response
+
+
+def _variant(change):
+    response = _base_response()
+    change(response)
+    return response
+
+
+def _set(path, value):
+    def change(response):
+        target = response
+        for key in path[:-1]:
+            target = target[key]
+        target[path[-1]] = value
+    return change
+
+
+def _corpus():
+    """
+    Ответы с отклонениями, встречающимися в ответах модели: числа строкой,
+    confidence вне диапазона, регистр enum, пропущенные необязательные
+    поля, одиночное значение вместо списка, а также неисправимые ответы
+    """
+    role = ('project_analysis', 'roles', 0)
+    return [
+        _base_response(),
+        _base_response(),
+        _variant(_set(('project_analysis', 'confidence'), 1.3)),
+        _variant(_set(('project_analysis', 'confidence'), '0.85')),
+        _variant(_set(role + ('confidence',), -0.1)),
+        _variant(_set(role + ('confidence',), '0.9')),
+        _variant(_set(role + ('age_min',), '25')),
+        _variant(_set(role + ('gender',), 'Female')),
+        _variant(_set(role + ('media_presence',), 'Да')),
+        _variant(_set(('project_analysis', 'roles'), copy.deepcopy(ANALYSIS['project_analysis']['roles'][0]))),
+        _variant(_set(role + ('skills_required',), None)),
+        _variant(lambda response: response.pop('contacts')),
+        _variant(_set(('project_analysis', 'project_title'), 2024)),
+        # Неисправимые
+        _variant(_set(('project_analysis', 'roles'), [])),
+        _variant(_set(('project_analysis', 'project_title'), 'А')),
+        _variant(lambda response: response['project_analysis'].pop('description')),
+    ]
+
+
+def _needs_recall(validate, response):
+    try:
+        validate(copy.deepcopy(response))
+    except ValidationError:
+        return True
+    return False
+
+
+@pytest.mark.slow
+def test_recall_rate_on_corpus():
+    """Доля ответов, для которых нужен повторный вызов модели"""
+    corpus = _corpus()
+    # Прежнее поведение: ответ, не прошедший правила валидатора, запрашивается заново
+    before = sum(
+        _needs_recall(LLMResponseValidator().validate_analysis_result, response) for response in corpus
+    ) / len(corpus)
+    after = sum(_needs_recall(repair_llm_response, response) for response in corpus) / len(corpus)
+
+    assert before == 10 / len(corpus)
+    assert after == 3 / len(corpus)
+
+    print(f"\nПовторные вызовы на корпусе из {len(corpus)} ответов: до {before:.0%}, после {after:.0%}")
+
+
+@pytest.mark.slow
+def test_compiled_validation_time():
+    """
+    Микросекунды на проверку валидного ответа: прежний валидатор правил
+    против скомпилированной схемы с правилами, которые схема не выражает
+    """
+    response = _base_response()
+    schema_validator = get_schema_validator()
+    baseline_validator = LLMResponseValidator()
+
+    start_time = time.perf_counter()
+    for _ in range(ITERATIONS):
+        baseline_validator.validate_analysis_result(response)
+    baseline_us = (time.perf_counter() - start_time) * 1e6 / ITERATIONS
+
+    start_time = time.perf_counter()
+    for _ in range(ITERATIONS):
+        schema_validator.is_valid(response)
+    compiled_us = (time.perf_counter() - start_time) * 1e6 / ITERATIONS
+
+    start_time = time.perf_counter()
+    for _ in range(ITERATIONS):
+        repair_llm_response(response)
+    full_us = (time.perf_counter() - start_time) * 1e6 / ITERATIONS
+
+    # Компиляция выполняется один раз на версию файла схемы
+    with open(SCHEMA_PATH, encoding='utf-8') as f:
+        schema_text = f.read()
+    start_time = time.perf_counter()
+    CompiledSchemaValidator.from_text(schema_text)
+    compile_us = (time.perf_counter() - start_time) * 1e6
+
+    assert get_schema_validator() is schema_validator
+    assert schema_validator.is_valid(response) and not schema_validator.errors(response)
+    # Схема проверяет типы всех полей ответа, поэтому работы больше, чем у
+    # прежнего валидатора, но правила уже не повторяют проверки схемы
+    assert full_us < baseline_us * 3
+
+    print(
+        f"\nВалидация ответа: прежний валидатор {baseline_us:.0f} мкс, "
+        f"схема {compiled_us:.0f} мкс, схема и правила {full_us:.0f} мкс, "
+        f"компиляция схемы {compile_us:.0f} мкс"
+    )
@@ -0,0 +1,69 @@
+"""
+Бенчмарк индекса имен персон против полного перебора
+"""
+import random
+import time
+
+import pytest
+from rapidfuzz import fuzz, process
+
+from people.name_index import PersonNameIndex
+
+LAST_NAMES = [
+    'Иванов', 'Петров', 'Сидоров', 'Смирнов', 'Кузнецов', 'Попов', 'Соколов',
+    'Лебедев', 'Козлов', 'Новиков', 'Морозов', 'Волков', 'Соловьев', 'Васильев',
+    'Зайцев', 'Павлов', 'Семенов', 'Голубев', 'Виноградов', 'Богданов',
+]
+FIRST_NAMES = [
+    'Александр', 'Дмитрий', 'Максим', 'Сергей', 'Андрей', 'Алексей', 'Артем',
+    'Илья', 'Кирилл', 'Михаил', 'Анна', 'Мария', 'Елена', 'Ольга', 'Наталья',
+]
+
+
+def _make_rows(size):
+    """Генерирует синтетические записи (id, person_type, search_string)"""
+    rng = random.Random(size)
+    rows = []
+    for person_id in range(1, size + 1):
+        # Суффикс делает фамилии уникальными, как в реальной базе
+        last_name = f"{rng.choice(LAST_NAMES)}{person_id:x}"
+        first_name = rng.choice(FIRST_NAMES)
+        search_string = f"{last_name} {first_name} {last_name} {first_name[0]}."
+        rows.append((person_id, 'director', search_string))
+    return rows
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize('size', [1_000, 10_000, 100_000])
+def test_name_index_vs_full_scan(size):
+    """Сравнение поиска через индекс с полным перебором"""
+    rows = _make_rows(size)
+    target_id, _, target_string = rows[size // 2]
+    query = target_string.split()[0]
+
+    start_time = time.perf_counter()
+    index = PersonNameIndex()
+    index.rebuild(rows)
+    build_time = time.perf_counter() - start_time
+
+    # Полный перебор, как в прежней реализации search_by_name
+    start_time = time.perf_counter()
+    full_scan = process.extract(
+        query, [row[2] for row in rows], scorer=fuzz.partial_ratio, limit=5
+    )
+    full_scan_time = time.perf_counter() - start_time
+
+    # Кэш версии не нужен: индекс уже построен и проверка свежести пропускается
+    index._ensure_fresh = lambda: None
+    start_time = time.perf_counter()
+    ranked = index.search(query, scorer=fuzz.partial_ratio, score_cutoff=30)
+    index_time = time.perf_counter() - start_time
+
+    assert ranked[0][0] == target_id
+    assert full_scan[0][1] == ranked[0][1]
+    if size >= 10_000:
+        assert index_time < full_scan_time
+
+    print(f"\n{size} персон: построение индекса {build_time:.3f}s, "
+          f"полный перебор {full_scan_time * 1000:.2f}ms, "
+          f"индекс {index_time * 1000:.2f}ms")
@@ -0,0 +1,68 @@
+"""
+Бенчмарк генерации версий изображений: последовательно против пула процессов
+"""
+import os
+import time
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from telegram_requests.image_processing import render_renditions
+from telegram_requests.rendition_pool import RenditionPool
+from telegram_requests.renditions import ImageRenditionService
+
+PHOTOS = 20
+SPECS = [
+    (kind, params['size'], params.get('quality'))
+    for kind, params in ImageRenditionService.RENDITIONS.items()
+]
+
+
+def _photos():
+    """Фото размера камеры телефона с шумом, чтобы JPEG не был тривиальным"""
+    photos = []
+    for index in range(PHOTOS):
+        noise = Image.effect_noise((1000, 750), 40 + index).convert('RGB')
+        buffer = BytesIO()
+        noise.resize((4000, 3000)).save(buffer, format='JPEG', quality=90)
+        photos.append(buffer.getvalue())
+    return photos
+
+
+def _throughput(func, photos):
+    start_time = time.perf_counter()
+    results = func(photos)
+    elapsed = time.perf_counter() - start_time
+    assert all(value is not None for rendered in results for value in rendered.values())
+    return len(photos) / elapsed
+
+
+@pytest.mark.slow
+def test_rendition_pool_throughput():
+    """Фото в секунду: прежний последовательный код, draft() и пул процессов"""
+    photos = _photos()
+    workers = os.cpu_count() or 1
+    pool = RenditionPool(max_workers=workers)
+
+    def serial(use_draft):
+        return lambda batch: [render_renditions(content, SPECS, use_draft=use_draft) for content in batch]
+
+    def parallel(batch):
+        return pool._render([(str(index), content, SPECS) for index, content in enumerate(batch)])
+
+    try:
+        # Прогрев: запуск процессов не входит в измерение
+        parallel(photos[:workers])
+
+        serial_rate = _throughput(serial(use_draft=False), photos)
+        draft_rate = _throughput(serial(use_draft=True), photos)
+        pool_rate = _throughput(parallel, photos)
+    finally:
+        pool.shutdown()
+
+    assert draft_rate > serial_rate
+    assert pool_rate > serial_rate
+
+    print(f"\n{PHOTOS} фото 4000x3000: последовательно {serial_rate:.1f} фото/с, "
+          f"с draft() {draft_rate:.1f} фото/с, пул из {workers} процессов {pool_rate:.1f} фото/с")
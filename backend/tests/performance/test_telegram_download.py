@@ -0,0 +1,128 @@
+"""
+Бенчмарк скачивания файлов из Telegram: буферизация против потоковой записи
+"""
+import json
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.test import override_settings
+
+from telegram_requests.services import TelegramFileService
+
+BOT_TOKEN = 'bench_token'
+FILE_SIZE = 20 * 1024 * 1024
+FILE_PATH = 'documents/big.bin'
+
+
+class _TelegramStandIn:
+    """Локальный HTTP-сервер с keep-alive, отдающий файл FILE_SIZE байт"""
+
+    def __init__(self):
+        self.connections = set()
+        payload = b'x' * FILE_SIZE
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                server.connections.add(self.client_address)
+                if self.path.startswith(f'/bot{BOT_TOKEN}/getFile'):
+                    body = json.dumps({'ok': True, 'result': {'file_path': FILE_PATH, 'file_size': FILE_SIZE}}).encode()
+                    self._headers(len(body))
+                    self.wfile.write(body)
+                else:
+                    self._headers(FILE_SIZE)
+                    view = memoryview(payload)
+                    for start in range(0, FILE_SIZE, 1024 * 1024):
+                        self.wfile.write(view[start:start + 1024 * 1024])
+
+            def _headers(self, length):
+                self.send_response(200)
+                self.send_header('Content-Length', str(length))
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}'
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def stand_in():
+    server = _TelegramStandIn()
+    with override_settings(TELEGRAM_API_URL=server.url):
+        yield server
+    server.close()
+
+
+def _measure(func):
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start_time
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+@pytest.mark.slow
+def test_streaming_download_memory(stand_in):
+    """Пиковая память при сохранении файла 20 MB"""
+    storage = FileSystemStorage(location=tempfile.mkdtemp())
+    service = TelegramFileService(bot_token=BOT_TOKEN, session=requests.Session())
+    url = f'{service.file_url}/{FILE_PATH}'
+
+    # Прежняя схема: весь файл в памяти, затем ContentFile
+    def buffered():
+        content = requests.get(url, timeout=30).content
+        storage.save('buffered.bin', ContentFile(content))
+
+    def streamed():
+        downloaded, _ = service.open_telegram_file('file_id', max_size_mb=50)
+        storage.save('streamed.bin', downloaded)
+        downloaded.close()
+
+    buffered_time, buffered_peak = _measure(buffered)
+    streamed_time, streamed_peak = _measure(streamed)
+
+    assert storage.size('streamed.bin') == FILE_SIZE
+    assert buffered_peak > FILE_SIZE
+    assert streamed_peak < 2 * 1024 * 1024
+
+    print(f"\n20 MB: буфер {buffered_peak / 2**20:.1f} MB / {buffered_time * 1000:.0f}ms, "
+          f"поток {streamed_peak / 2**20:.2f} MB / {streamed_time * 1000:.0f}ms")
+
+
+@pytest.mark.slow
+def test_session_reuses_connections(stand_in):
+    """Общая сессия переиспользует соединение между вызовами"""
+    service = TelegramFileService(bot_token=BOT_TOKEN, session=requests.Session())
+    url = f'{service.api_url}/getFile'
+
+    for _ in range(5):
+        requests.get(url, params={'file_id': 'file_id'}, timeout=10)
+    unpooled_connections = len(stand_in.connections)
+
+    stand_in.connections.clear()
+    for _ in range(5):
+        assert service.get_file_path('file_id') == FILE_PATH
+    pooled_connections = len(stand_in.connections)
+
+    assert unpooled_connections == 5
+    assert pooled_connections == 1
+
+    print(f"\n5 вызовов getFile: без пула {unpooled_connections} соединений, с пулом {pooled_connections}")
@@ -0,0 +1,156 @@
+"""
+Число SQL запросов списков артистов не зависит от числа артистов
+"""
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from artists.models import Artist, ArtistEducation, ArtistLink, ArtistPhoto, ArtistSkill, Education, Skill
+from tests.unit.users.factories import AgentFactory
+
+# Эндпоинт -> число запросов при любом числе артистов
+LIST_QUERIES = {
+    # COUNT, id страницы, артисты с created_by, навыки с навыком
+    'artist-list': 4,
+    # Артисты, затем по запросу на навыки, навык, образование, учебное заведение, ссылки, фото, предложенные роли
+    'artist-search': 8,
+    # Артисты с created_by, навыки с навыком
+    'artist-for-selection': 2,
+    # Как у list: COUNT, id страницы, артисты с created_by, навыки с навыком
+    'artist-by-skills': 4,
+}
+
+
+@pytest.fixture
+def agent():
+    return AgentFactory()
+
+
+@pytest.fixture
+def client(agent):
+    api_client = APIClient()
+    api_client.force_authenticate(user=agent)
+    return api_client
+
+
+def _create_artists(agent, count):
+    skills = [Skill.objects.get_or_create(name=f'Навык {index}')[0] for index in range(2)]
+    education, _ = Education.objects.get_or_create(institution_name='ГИТИС')
+    for index in range(count):
+        artist = Artist.objects.create(
+            first_name=f'Имя{index}', last_name='Иванов', gender='male', created_by=agent
+        )
+        for skill in skills:
+            ArtistSkill.objects.create(artist=artist, skill=skill)
+        ArtistEducation.objects.create(artist=artist, education=education, graduation_year=2010)
+        ArtistLink.objects.create(artist=artist, title='Портфолио', url='https://example.com')
+        ArtistPhoto.objects.create(artist=artist, photo='artists/photo.jpg')
+        ArtistPhoto.objects.create(artist=artist, photo='artists/photo2.jpg')
+
+
+@pytest.mark.django_db
+class TestArtistCounters:
+    """Денормализованные счетчики связанных записей"""
+
+    def test_counters_follow_related_rows(self, agent):
+        _create_artists(agent, 1)
+        artist = Artist.objects.get()
+
+        assert (artist.skills_count, artist.education_count, artist.links_count, artist.photos_count) == (2, 1, 1, 2)
+
+        artist.photos.first().delete()
+        artist.skills.all().delete()
+        artist.refresh_from_db()
+
+        assert (artist.skills_count, artist.photos_count) == (0, 1)
+
+    def test_refresh_counters_repairs_drift(self, agent):
+        _create_artists(agent, 2)
+        Artist.objects.update(skills_count=0, links_count=7)
+
+        assert Artist.refresh_counters() == 2
+        assert set(Artist.objects.values_list('skills_count', 'links_count')) == {(2, 1)}
+
+    def test_list_serializer_reads_counters(self, client, agent):
+        _create_artists(agent, 1)
+
+        artist = client.get(reverse('artist-list')).data['results'][0]
+
+        assert artist['skills_count'] == 2
+        assert artist['education_count'] == 1
+        assert artist['links_count'] == 1
+        assert artist['photos_count'] == 2
+        assert len(artist['skills']) == 2
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url_name', sorted(LIST_QUERIES))
+def test_list_query_count_is_constant(client, agent, url_name):
+    url = reverse(url_name)
+    _create_artists(agent, 2)
+    params = {'skill_ids': ','.join(str(pk) for pk in Skill.objects.values_list('pk', flat=True))}
+    with CaptureQueriesContext(connection) as few:
+        response = client.get(url, params)
+    assert response.status_code == 200
+
+    _create_artists(agent, 6)
+    with CaptureQueriesContext(connection) as many:
+        client.get(url, {'page': 1, **params})
+
+    assert len(few.captured_queries) == len(many.captured_queries) == LIST_QUERIES[url_name]
+
+
+@pytest.mark.django_db
+class TestSkillsFilter:
+    """Фильтр артистов по навыкам: любой или все навыки"""
+
+    @pytest.fixture
+    def roster(self, agent):
+        skills = [Skill.objects.create(name=name) for name in ('Вокал', 'Танец', 'Фехтование')]
+        artists = {}
+        for name, owned in (('Все', skills), ('Два', skills[:2]), ('Один', skills[:1]), ('Нет', [])):
+            artist = Artist.objects.create(first_name=name, last_name='Тестов', gender='male', created_by=agent)
+            for skill in owned:
+                ArtistSkill.objects.create(artist=artist, skill=skill)
+            artists[name] = artist.pk
+        return skills, artists
+
+    @staticmethod
+    def _names(response):
+        data = response.data['results'] if isinstance(response.data, dict) else response.data
+        return sorted(artist['first_name'] for artist in data)
+
+    def test_by_skills_requires_all(self, client, roster):
+        skills, _ = roster
+        url = reverse('artist-by-skills')
+
+        two = client.get(url, {'skill_ids': f'{skills[0].pk},{skills[1].pk}'})
+        repeated = client.get(url, {'skill_ids': f'{skills[2].pk},{skills[2].pk}'})
+
+        assert self._names(two) == ['Все', 'Два']
+        assert two.data['count'] == 2
+        assert self._names(repeated) == ['Все']
+
+    def test_by_skills_single_query_for_filter(self, client, roster):
+        skills, _ = roster
+        with CaptureQueriesContext(connection) as queries:
+            client.get(reverse('artist-by-skills'), {'skill_ids': ','.join(str(skill.pk) for skill in skills)})
+
+        having = [query['sql'] for query in queries.captured_queries if 'HAVING' in query['sql']]
+        # COUNT, id страницы и загрузка строк страницы - без запросов на каждого артиста
+        assert len(having) == 3
+        assert 'COUNT(DISTINCT' in having[0]
+
+    def test_for_selection_any_and_all(self, client, roster):
+        skills, _ = roster
+        url = reverse('artist-for-selection')
+        skill_ids = f'{skills[1].pk},{skills[2].pk}'
+
+        assert self._names(client.get(url, {'skill_ids': skill_ids})) == ['Все', 'Два']
+        assert self._names(client.get(url, {'skill_ids': skill_ids, 'skills_match': 'all'})) == ['Все']
+
+    def test_invalid_skill_ids(self, client, roster):
+        assert client.get(reverse('artist-by-skills'), {'skill_ids': 'a,b'}).status_code == 400
+        assert client.get(reverse('artist-by-skills')).status_code == 400
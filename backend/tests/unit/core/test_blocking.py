@@ -0,0 +1,133 @@
+"""
+Тесты отбора кандидатов перед fuzzy matching
+"""
+import pytest
+from django.contrib.auth import get_user_model
+
+from companies.models import Company
+from core.blocking import CandidateBlocker
+from core.models import BlockingKey
+
+User = get_user_model()
+
+
+class TestCandidateBlocker:
+    """Тесты построения ключей блоков"""
+
+    def test_token_keys(self):
+        """Ключи - начала и окончания токенов, короткие токены целиком"""
+        blocker = CandidateBlocker({})
+
+        assert blocker.token_keys('Мосфильм, ТВ') == {'мос', 'льм', 'тв'}
+        assert blocker.token_keys('') == set()
+
+    def test_tokens_limited_to_longest(self):
+        """Используются только самые длинные токены запроса"""
+        blocker = CandidateBlocker({'search': {'blocking': {'max_tokens': 2}}})
+
+        assert blocker.tokens('а бб ввв гггг ддддд') == ['ддддд', 'гггг']
+
+    @pytest.mark.parametrize('value,expected', [
+        ('https://www.mosfilm.ru/about', 'mosfilm.ru'),
+        ('mosfilm.ru', 'mosfilm.ru'),
+        ('info@Mosfilm.ru', 'mosfilm.ru'),
+        ('', ''),
+    ])
+    def test_extract_domain(self, value, expected):
+        """Домен извлекается из сайта и email"""
+        assert CandidateBlocker.extract_domain(value) == expected
+
+    def test_ignored_domain_has_no_block(self):
+        """Публичные почтовые домены не образуют блок"""
+        blocker = CandidateBlocker({'search': {'blocking': {'ignored_domains': ['gmail.com']}}})
+
+        assert blocker.domain_keys('someone@gmail.com') == set()
+        assert blocker.domain_keys('someone@mosfilm.ru') == {'domain:mosfilm.ru'}
+
+    def test_index_uses_all_tokens(self):
+        """В индекс записи попадают все токены поля, а не только max_tokens"""
+        blocker = CandidateBlocker({'search': {'blocking': {'max_tokens': 1}}})
+        company = Company(name='Мосфильм ТВ', email='Info@Mosfilm.ru')
+
+        keys = blocker.record_keys(
+            company, text_fields=['name'], domain_fields=['email'], exact_fields=['email']
+        )
+
+        assert keys == {
+            'name:мос', 'name:льм', 'name:тв',
+            'domain:mosfilm.ru', 'email:=info@mosfilm.ru',
+        }
+
+
+@pytest.mark.django_db
+class TestCandidateBlockerQuerySet:
+    """Тесты отбора кандидатов из БД"""
+
+    def test_candidates_selects_only_blocked_candidates(self):
+        """В кандидаты попадают только записи с общими ключами"""
+        user = User.objects.create_user(username='blocker', password='testpass123')
+        mosfilm = Company.objects.create(name='Мосфильм', website='https://mosfilm.ru', created_by=user)
+        Company.objects.create(name='Ленфильм', website='https://lenfilm.ru', created_by=user)
+        Company.objects.create(name='Студия Горького', created_by=user)
+        blocker = CandidateBlocker({})
+
+        by_typo = blocker.candidates(Company.objects.all(), blocker.text_keys(['name'], 'Масфильм'))
+        by_domain = blocker.candidates(Company.objects.all(), blocker.domain_keys('www.mosfilm.ru'))
+
+        assert {company.name for company in by_typo} == {'Мосфильм', 'Ленфильм'}
+        assert list(by_domain) == [mosfilm]
+        assert list(blocker.candidates(Company.objects.all(), blocker.text_keys(['name'], '!!'))) == []
+
+    def test_candidates_ranked_before_truncation(self):
+        """Ограничение числа кандидатов не отсекает запись с наибольшим числом общих ключей"""
+        user = User.objects.create_user(username='blocker', password='testpass123')
+        for name in ['Ленфильм', 'Диафильм', 'Укртелефильм']:
+            Company.objects.create(name=name, created_by=user)
+        mosfilm = Company.objects.create(name='Мосфильм', created_by=user)
+        blocker = CandidateBlocker({'search': {'blocking': {'max_candidates': 1}}})
+
+        candidates = blocker.candidates(Company.objects.all(), blocker.text_keys(['name'], 'Мосфильм'))
+
+        assert list(candidates) == [mosfilm]
+
+    def test_candidates_respect_queryset_filter(self):
+        """Неактивные записи не занимают места среди кандидатов"""
+        user = User.objects.create_user(username='blocker', password='testpass123')
+        Company.objects.create(name='Мосфильм', is_active=False, created_by=user)
+        lenfilm = Company.objects.create(name='Ленфильм', created_by=user)
+        blocker = CandidateBlocker({'search': {'blocking': {'max_candidates': 1}}})
+
+        candidates = blocker.candidates(
+            Company.objects.filter(is_active=True), blocker.text_keys(['name'], 'Мосфильм')
+        )
+
+        assert list(candidates) == [lenfilm]
+
+    def test_keys_follow_record_changes(self):
+        """Ключи блоков обновляются при изменении и удаляются вместе с записью"""
+        user = User.objects.create_user(username='blocker', password='testpass123')
+        company = Company.objects.create(name='Мосфильм', created_by=user)
+        stored = BlockingKey.objects.filter(scope='companies.company', object_id=company.pk)
+
+        company.name = 'Ленфильм'
+        company.save()
+        assert set(stored.values_list('key', flat=True)) == {'name:лен', 'name:льм'}
+
+        company.delete()
+        assert not stored.exists()
+
+    def test_rebuild_fills_keys_for_existing_records(self):
+        """Перестроение индекса восстанавливает ключи всех записей выборки"""
+        from companies.services import company_matching_service
+
+        user = User.objects.create_user(username='blocker', password='testpass123')
+        mosfilm = Company.objects.create(name='Мосфильм', created_by=user)
+        BlockingKey.objects.all().delete()
+
+        company_matching_service.blocker.rebuild(
+            Company.objects.all(), company_matching_service.blocking_keys
+        )
+
+        assert set(BlockingKey.objects.values_list('object_id', 'key')) == {
+            (mosfilm.pk, 'name:мос'), (mosfilm.pk, 'name:льм'),
+        }
@@ -0,0 +1,312 @@
+"""
+Тесты пагинации списков: keyset по (created_at, id), страницы в две фазы,
+кэш и оценка числа записей
+"""
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from django.core.paginator import EmptyPage
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.request import Request as DRFRequest
+from rest_framework.test import APIClient, APIRequestFactory
+
+from artists.models import Artist, ArtistSkill, Skill
+from core.models import BlockingKey
+from core.pagination import CountProvider, CountingPaginator, OptimizedPageNumberPagination
+from people.models import Person
+from telegram_requests.models import Request
+from tests.unit.telegram_requests.factories import RequestFactory
+from tests.unit.users.factories import AgentFactory
+
+
+@pytest.fixture
+def client():
+    api_client = APIClient()
+    api_client.force_authenticate(user=AgentFactory())
+    return api_client
+
+
+@pytest.fixture
+def requests_ids():
+    """7 запросов; у трех одинаковый created_at - порядок решает id"""
+    base = timezone.now() - timedelta(days=1)
+    requests = RequestFactory.create_batch(7)
+    for index, request in enumerate(requests):
+        created_at = base if index < 3 else base + timedelta(minutes=index)
+        Request.objects.filter(pk=request.pk).update(created_at=created_at)
+    ordered = Request.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+    return list(ordered)
+
+
+def _ids(response):
+    return [item['id'] for item in response.data['results']]
+
+
+@pytest.mark.django_db
+class TestCursorPagination:
+    """Курсорная пагинация списка запросов"""
+
+    url = reverse('request-list')
+
+    def test_walks_forward_without_gaps_or_duplicates(self, client, requests_ids):
+        response = client.get(self.url, {'cursor': '', 'page_size': 3})
+        assert response.status_code == 200
+        assert response.data['count'] is None
+        assert response.data['has_previous'] is False
+
+        seen = _ids(response)
+        while response.data['has_next']:
+            response = client.get(self.url, {'cursor': response.data['next_cursor'], 'page_size': 3})
+            seen.extend(_ids(response))
+
+        assert seen == requests_ids
+        assert response.data['next'] is None
+
+    def test_walks_backward(self, client, requests_ids):
+        first = client.get(self.url, {'cursor': '', 'page_size': 3})
+        second = client.get(self.url, {'cursor': first.data['next_cursor'], 'page_size': 3})
+        third = client.get(self.url, {'cursor': second.data['next_cursor'], 'page_size': 3})
+        assert _ids(third) == requests_ids[6:]
+
+        back = client.get(self.url, {'cursor': third.data['previous_cursor'], 'page_size': 3})
+        assert _ids(back) == requests_ids[3:6]
+        assert back.data['has_next'] is True
+        assert back.data['has_previous'] is True
+
+        start = client.get(self.url, {'cursor': back.data['previous_cursor'], 'page_size': 3})
+        assert _ids(start) == requests_ids[:3]
+        assert start.data['has_previous'] is False
+        assert start.data['previous_cursor'] is None
+
+    def test_ascending_order(self, client, requests_ids):
+        response = client.get(self.url, {'cursor': '', 'page_size': 4, 'ordering': 'created_at'})
+        following = client.get(
+            self.url, {'cursor': response.data['next_cursor'], 'page_size': 4, 'ordering': 'created_at'}
+        )
+        assert _ids(response) + _ids(following) == requests_ids[::-1]
+
+    def test_new_rows_do_not_shift_pages(self, client, requests_ids):
+        first = client.get(self.url, {'cursor': '', 'page_size': 3})
+        RequestFactory()
+
+        second = client.get(self.url, {'cursor': first.data['next_cursor'], 'page_size': 3})
+
+        assert _ids(second) == requests_ids[3:6]
+
+    def test_optional_count(self, client, requests_ids):
+        response = client.get(self.url, {'cursor': '', 'with_count': 'true'})
+        assert response.data['count'] == len(requests_ids)
+
+    def test_next_link_keeps_filters(self, client, requests_ids):
+        response = client.get(self.url, {'cursor': '', 'page_size': 2, 'status': 'pending'})
+        if response.data['next']:
+            assert 'status=pending' in response.data['next']
+            assert 'cursor=' in response.data['next']
+
+    def test_tampered_cursor_rejected(self, client, requests_ids):
+        response = client.get(self.url, {'cursor': '', 'page_size': 3})
+        cursor = response.data['next_cursor']
+
+        assert client.get(self.url, {'cursor': cursor[:-2] + 'xx'}).status_code == 404
+        assert client.get(self.url, {'cursor': 'garbage'}).status_code == 404
+
+    def test_page_numbers_without_cursor(self, client, requests_ids):
+        response = client.get(self.url, {'page': 2, 'page_size': 3})
+        assert response.data['current_page'] == 2
+        assert response.data['count'] == len(requests_ids)
+
+
+def _count_queries(queries):
+    return sum(1 for query in queries if query['sql'].upper().startswith('SELECT COUNT('))
+
+
+@pytest.mark.django_db
+class TestTwoPhasePagination:
+    """Страницы списков: id страницы, затем загрузка строк по id"""
+
+    url = reverse('request-list')
+
+    def test_pages_keep_order_with_equal_timestamps(self, client, requests_ids):
+        seen = []
+        for page in (1, 2, 3):
+            response = client.get(self.url, {'page': page, 'page_size': 3})
+            seen.extend(_ids(response))
+
+        assert seen == requests_ids
+        assert response.data['has_next'] is False
+
+    def test_single_page_is_ordered(self, client, requests_ids):
+        response = client.get(self.url, {'page_size': 50})
+        assert _ids(response) == requests_ids
+
+    def test_query_count_does_not_depend_on_page_size(self, client, requests_ids):
+        with CaptureQueriesContext(connection) as small:
+            client.get(self.url, {'page_size': 2, 'status': 'pending'})
+        with CaptureQueriesContext(connection) as large:
+            client.get(self.url, {'page_size': 7})
+
+        # id страницы, строки с select_related, prefetch images и files, COUNT
+        assert len(small.captured_queries) == len(large.captured_queries) == 5
+
+    def test_count_cached_per_filter_signature(self, client, requests_ids):
+        client.get(self.url, {'page_size': 3})
+        with CaptureQueriesContext(connection) as cached:
+            response = client.get(self.url, {'page': 2, 'page_size': 3})
+        with CaptureQueriesContext(connection) as other_filter:
+            client.get(self.url, {'status': 'pending'})
+
+        assert response.data['count'] == len(requests_ids)
+        assert _count_queries(cached.captured_queries) == 0
+        assert _count_queries(other_filter.captured_queries) == 1
+
+    def test_count_invalidated_on_save(self, client, requests_ids):
+        client.get(self.url)
+        RequestFactory()
+
+        response = client.get(self.url)
+
+        assert response.data['count'] == len(requests_ids) + 1
+
+    def test_out_of_range_page(self, client, requests_ids):
+        assert client.get(self.url, {'page': 5, 'page_size': 3}).status_code == 404
+
+    def test_projects_and_artists_lists(self, client):
+        user = AgentFactory()
+        client.force_authenticate(user=user)
+        for index in range(4):
+            Artist.objects.create(first_name=f'Имя{index}', last_name='Иванов', gender='male', created_by=user)
+
+        with CaptureQueriesContext(connection) as artists_queries:
+            artists = client.get(reverse('artist-list'), {'page_size': 3})
+        with CaptureQueriesContext(connection) as projects_queries:
+            projects = client.get(reverse('project-list'))
+
+        assert artists.data['count'] == 4
+        assert len(artists.data['results']) == 3
+        assert artists.data['has_next'] is True
+        assert projects.data['count'] == 0
+        # Пустой список - только COUNT
+        assert len(projects_queries.captured_queries) == 1
+        # COUNT, id страницы, строки, навыки (остальные счетчики - поля артиста)
+        assert len(artists_queries.captured_queries) == 4
+
+
+@pytest.mark.django_db
+class TestCountProvider:
+    """Точные числа записей из кэша и оценки по статистике PostgreSQL"""
+
+    url = reverse('request-list')
+
+    @pytest.fixture
+    def estimated(self):
+        """Статистика планировщика, как у большой таблицы PostgreSQL"""
+        cache.delete_many(['pagination:estimate:default:telegram_requests_request'])
+        with patch.object(CountProvider, 'supports_estimate', return_value=True), \
+                patch.object(CountProvider, 'table_estimate', return_value=250000) as table_estimate:
+            yield table_estimate
+        cache.delete_many(['pagination:estimate:default:telegram_requests_request'])
+
+    def test_exact_count_on_sqlite(self, client, requests_ids):
+        response = client.get(self.url)
+
+        assert response.data['count'] == len(requests_ids)
+        assert response.data['count_exact'] is True
+
+    def test_unfiltered_large_table_is_estimated(self, requests_ids, estimated):
+        provider = CountProvider(estimate_threshold=100000)
+
+        assert provider.get_count(Request.objects.all()) == (250000, False)
+        assert provider.get_count(Request.objects.filter(status='pending'))[1] is True
+        assert CountProvider(estimate_threshold=500000).get_count(Request.objects.all()) == (len(requests_ids), True)
+        assert CountProvider(estimate_threshold=0).get_count(Request.objects.all())[1] is True
+
+    def test_estimate_reported_in_response(self, requests_ids, estimated):
+        paginator = OptimizedPageNumberPagination()
+        page = paginator.paginate_queryset(
+            Request.objects.order_by('-created_at', '-id'),
+            DRFRequest(APIRequestFactory().get('/api/requests/', {'page_size': 5}))
+        )
+        response = paginator.get_paginated_response([row.id for row in page])
+
+        assert response.data['count'] == 250000
+        assert response.data['count_exact'] is False
+        assert response.data['results'] == requests_ids[:5]
+
+    def test_estimated_pages_follow_rows_not_estimate(self, requests_ids, estimated):
+        """При оценке has_next - по лишней строке, страницы за оценкой не дают 404"""
+        estimated.return_value = 3
+        paginator = CountingPaginator(
+            Request.objects.order_by('-created_at', '-id'), 2,
+            count_provider=CountProvider(estimate_threshold=1)
+        )
+
+        beyond_estimate = paginator.page(3)
+        assert [row.id for row in beyond_estimate] == requests_ids[4:6]
+        assert beyond_estimate.has_next() is True
+        assert paginator.count_exact is False
+        assert paginator.count == 7
+        assert paginator.num_pages == 4
+
+        last = paginator.page(4)
+        assert [row.id for row in last] == requests_ids[6:]
+        assert last.has_next() is False
+        assert (paginator.count, paginator.count_exact) == (7, True)
+        assert (last.start_index(), last.end_index()) == (7, 7)
+
+        with pytest.raises(EmptyPage):
+            CountingPaginator(
+                Request.objects.order_by('-created_at', '-id'), 2,
+                count_provider=CountProvider(estimate_threshold=1)
+            ).page(5)
+
+    def test_estimated_last_page_in_response(self, requests_ids, estimated):
+        paginator = OptimizedPageNumberPagination()
+        page = paginator.paginate_queryset(
+            Request.objects.order_by('-created_at', '-id'),
+            DRFRequest(APIRequestFactory().get('/api/requests/', {'page_size': 5, 'page': 2}))
+        )
+        response = paginator.get_paginated_response([row.id for row in page])
+
+        assert response.data['results'] == requests_ids[5:]
+        assert response.data['next'] is None
+        assert response.data['count'] == len(requests_ids)
+        assert response.data['count_exact'] is True
+
+    def test_filtered_list_stays_exact(self, client, requests_ids, estimated):
+        response = client.get(self.url, {'cursor': '', 'with_count': 'true'})
+
+        assert response.data['count'] == len(requests_ids)
+        assert response.data['count_exact'] is True
+        estimated.assert_not_called()
+
+    def test_person_list_count_cached(self, client):
+        user = AgentFactory()
+        client.force_authenticate(user=user)
+        for index in range(3):
+            Person.objects.create(person_type='director', first_name=f'Имя{index}', last_name='Петров', created_by=user)
+
+        client.get(reverse('person-list'))
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse('person-list'), {'page': 1})
+
+        assert response.data['count'] == 3
+        assert response.data['count_exact'] is True
+        assert _count_queries(queries.captured_queries) == 0
+
+    def test_only_paginated_models_invalidate_counts(self):
+        provider = CountProvider()
+        user = AgentFactory()
+        artist = Artist.objects.create(first_name='Имя', last_name='Иванов', gender='male', created_by=user)
+        artist_version = provider.version(Artist)
+
+        with patch.object(cache, 'incr') as incr:
+            BlockingKey.objects.create(scope='test', object_id=1, key='key')
+        incr.assert_not_called()
+
+        ArtistSkill.objects.create(artist=artist, skill=Skill.objects.create(name='Вокал', created_by=user))
+        assert provider.version(Artist) > artist_version
@@ -0,0 +1,155 @@
+"""
+Локальный HTTP сервер вместо api.openai.com для тестов
+"""
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANALYSIS = {
+    'project_analysis': {
+        'project_title': 'Проект',
+        'project_type': 'Фильм',
+        'genre': 'Драма',
+        'description': 'Описание проекта для теста',
+        'roles': [{
+            'role_type': 'Актер',
+            'character_name': 'Герой',
+            'description': 'Описание роли для теста',
+            'age_range': '25-30',
+            'gender': 'male',
+            'suggested_artists': [],
+            'skills_required': {'acting_skills': [], 'special_skills': []},
+            'confidence': 0.9
+        }],
+        'confidence': 0.9
+    },
+    'contacts': {}
+}
+
+# Задержка ответа задается в тексте запроса: «[delay=0.2]»
+DELAY_PATTERN = re.compile(r'\[delay=([\d.]+)\]')
+# Потоковый ответ отдается фрагментами этого размера
+CHUNK_SIZE = 40
+
+
+def stream_chunks(content=None):
+    """Фрагменты потокового ответа chat.completion.chunk"""
+    text = json.dumps(content or ANALYSIS, ensure_ascii=False)
+    for start in range(0, len(text), CHUNK_SIZE):
+        yield {
+            'id': 'chatcmpl-test',
+            'object': 'chat.completion.chunk',
+            'created': 0,
+            'model': 'gpt-4o',
+            'choices': [{'index': 0, 'delta': {'content': text[start:start + CHUNK_SIZE]}, 'finish_reason': None}]
+        }
+    yield {
+        'id': 'chatcmpl-test',
+        'object': 'chat.completion.chunk',
+        'created': 0,
+        'model': 'gpt-4o',
+        'choices': [],
+        'usage': {'prompt_tokens': 10, 'completion_tokens': 5, 'total_tokens': 15}
+    }
+
+
+def completion(content=None):
+    return {
+        'id': 'chatcmpl-test',
+        'object': 'chat.completion',
+        'created': 0,
+        'model': 'gpt-4o',
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': json.dumps(content or ANALYSIS, ensure_ascii=False)},
+            'finish_reason': 'stop'
+        }],
+        'usage': {'prompt_tokens': 10, 'completion_tokens': 5, 'total_tokens': 15}
+    }
+
+
+class FakeOpenAIServer:
+    """
+    Отвечает ответами из очереди responses, затем - успешным анализом
+    (content). Потоковые запросы получают ответ фрагментами с паузой
+    chunk_delay. Считает запросы и максимальное число одновременных.
+    """
+
+    def __init__(self):
+        self.responses = []
+        self.content = None
+        self.chunk_delay = 0
+        self.requests = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8')
+                with server._lock:
+                    server.requests += 1
+                    server.active += 1
+                    server.max_active = max(server.max_active, server.active)
+                    response = server.responses.pop(0) if server.responses else None
+                try:
+                    delay = DELAY_PATTERN.search(body)
+                    if delay:
+                        time.sleep(float(delay.group(1)))
+                    if response is None and json.loads(body).get('stream'):
+                        self._stream()
+                        return
+                    status_code, headers, payload = response or (200, {}, completion(server.content))
+                    data = json.dumps(payload).encode('utf-8')
+                    self.send_response(status_code)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(data)))
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.end_headers()
+                    self.wfile.write(data)
+                finally:
+                    with server._lock:
+                        server.active -= 1
+
+            def _stream(self):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.end_headers()
+                for chunk in stream_chunks(server.content):
+                    self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+                    self.wfile.flush()
+                    time.sleep(server.chunk_delay)
+                self.wfile.write(b'data: [DONE]\n\n')
+                self.wfile.flush()
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.httpd.server_address[1]}/v1'
+
+    def error(self, status_code, headers=None):
+        """Ставит в очередь ответ с ошибкой"""
+        self.responses.append((status_code, headers or {}, {'error': {'message': f'HTTP {status_code}'}}))
+
+    def reset(self):
+        with self._lock:
+            self.responses = []
+            self.content = None
+            self.chunk_delay = 0
+            self.requests = 0
+            self.active = 0
+            self.max_active = 0
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
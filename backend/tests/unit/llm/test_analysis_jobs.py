@@ -0,0 +1,175 @@
+from unittest.mock import Mock, patch
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from llm.analysis_jobs import AnalysisJobQueue, analysis_job_queue
+from tests.unit.telegram_requests.factories import RequestFactory
+from tests.unit.users.factories import AgentFactory
+
+ANALYSIS_RESPONSE = {'project_analysis': {'project_title': 'Проект'}, 'contacts': {}}
+
+
+class AnalysisJobQueueTest(TestCase):
+    """Тесты очереди фонового анализа"""
+
+    def setUp(self):
+        cache.clear()
+        self.queue = AnalysisJobQueue(max_workers=1)
+        self.executor = Mock()
+        self.queue._get_executor = Mock(return_value=self.executor)
+        self.request = RequestFactory()
+
+    def test_submit_deduplicates_active_jobs(self):
+        """Повторная постановка возвращает активную задачу"""
+        job, created = self.queue.submit(self.request.id)
+        same_job, created_again = self.queue.submit(self.request.id)
+
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(same_job['job_id'], job['job_id'])
+        self.assertEqual(self.executor.submit.call_count, 1)
+
+    def test_create_claims_request_across_workers(self):
+        """Очереди разных воркеров не создают вторую задачу для запроса"""
+        other_worker = AnalysisJobQueue(max_workers=1)
+
+        job, created = self.queue.create(self.request.id)
+        same_job, created_again = other_worker.create(self.request.id)
+
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(same_job['job_id'], job['job_id'])
+
+    def test_create_claims_request_when_key_keeps_expiring(self):
+        """Если ключ запроса истекал при каждой попытке, задача все равно закрепляется"""
+        with patch.object(cache, 'add', return_value=False):
+            job, created = self.queue.create(self.request.id)
+
+        self.assertTrue(created)
+        self.assertEqual(self.queue.get_for_request(self.request.id)['job_id'], job['job_id'])
+
+    def test_finished_job_replaced_once(self):
+        """Завершенную задачу заменяет только один воркер"""
+        job, _ = self.queue.create(self.request.id)
+        self.queue.finish(job['job_id'], ANALYSIS_RESPONSE, status.HTTP_200_OK)
+
+        # Другой воркер уже захватил замену этой задачи
+        replace_key = AnalysisJobQueue.REPLACE_CACHE_KEY.format(request_id=self.request.id, job_id=job['job_id'])
+        cache.add(replace_key, 'other-worker-job', 60)
+        _, created = self.queue.create(self.request.id)
+        self.assertFalse(created)
+
+        cache.delete(replace_key)
+        new_job, created = self.queue.create(self.request.id)
+        self.assertTrue(created)
+        self.assertNotEqual(new_job['job_id'], job['job_id'])
+        self.assertEqual(self.queue.get_for_request(self.request.id)['job_id'], new_job['job_id'])
+
+    def test_analysis_saves_only_status(self):
+        """Сохранение статуса не затирает изменения запроса, сделанные во время анализа"""
+        job, _ = self.queue.create(self.request.id)
+
+        def fake_run(telegram_request, *args, **kwargs):
+            type(telegram_request).objects.filter(pk=telegram_request.pk).update(response_text='Ответ агента')
+            return ANALYSIS_RESPONSE, status.HTTP_200_OK, 'analyzed'
+
+        with patch('llm.analysis_jobs.run_analysis', side_effect=fake_run):
+            self.assertTrue(self.queue.run(job['job_id']))
+
+        self.request.refresh_from_db()
+        self.assertEqual(self.request.analysis_status, 'analyzed')
+        self.assertEqual(self.request.response_text, 'Ответ агента')
+
+    def test_run_reports_progress_and_result(self):
+        """Задача проходит этапы и сохраняет результат"""
+        job, _ = self.queue.submit(self.request.id)
+        stages = []
+
+        def fake_analysis(telegram_request, progress=None, **kwargs):
+            progress('analyzing', 30)
+            stages.append(self.queue.get(job['job_id'])['stage'])
+            return ANALYSIS_RESPONSE, status.HTTP_200_OK
+
+        with patch('llm.analysis_jobs.perform_analysis', side_effect=fake_analysis):
+            self.assertTrue(self.queue.run(job['job_id']))
+
+        finished = self.queue.get(job['job_id'])
+        self.assertEqual(stages, ['analyzing'])
+        self.assertEqual(finished['status'], 'completed')
+        self.assertEqual(finished['progress'], 100)
+        self.assertEqual(finished['result'], ANALYSIS_RESPONSE)
+
+        # Завершенная задача не мешает новому анализу
+        _, created = self.queue.submit(self.request.id)
+        self.assertTrue(created)
+
+    def test_failed_analysis_marks_job_failed(self):
+        """Ошибка анализа сохраняется в задаче"""
+        job, _ = self.queue.submit(self.request.id)
+        error = {'error': 'OpenAI сервис недоступен'}
+
+        with patch('llm.analysis_jobs.perform_analysis', return_value=(error, 503)):
+            self.assertFalse(self.queue.run(job['job_id']))
+
+        failed = self.queue.get(job['job_id'])
+        self.assertEqual(failed['status'], 'failed')
+        self.assertEqual(failed['http_status'], 503)
+        self.assertEqual(failed['result'], error)
+
+
+class AnalyzeEndpointTest(TestCase):
+    """Тесты эндпоинта анализа в асинхронном и синхронном режимах"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=AgentFactory())
+        self.request = RequestFactory()
+        self.url = reverse('llm:analyze_request', args=[self.request.id])
+        self.status_url = reverse('llm:request_analysis_status', args=[self.request.id])
+
+    @patch.object(analysis_job_queue, '_get_executor')
+    def test_openai_analysis_is_queued(self, mock_executor):
+        """Анализ через OpenAI возвращает 202 и отслеживается через статус"""
+        response = self.client.post(self.url, {'use_emulator': False}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job_id = response.data['job_id']
+        self.assertFalse(response.data['deduplicated'])
+        self.assertIn(job_id, response.data['status_url'])
+        mock_executor.return_value.submit.assert_called_once()
+
+        duplicate = self.client.post(self.url, {'use_emulator': False}, format='json')
+        self.assertEqual(duplicate.data['job_id'], job_id)
+        self.assertTrue(duplicate.data['deduplicated'])
+
+        with patch('llm.analysis_jobs.perform_analysis', return_value=(ANALYSIS_RESPONSE, 200)):
+            analysis_job_queue.run(job_id)
+
+        status_response = self.client.get(self.status_url, {'job_id': job_id})
+        self.assertEqual(status_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(status_response.data['job']['status'], 'completed')
+        self.assertEqual(status_response.data['job']['result'], ANALYSIS_RESPONSE)
+
+    def test_sync_flag_runs_in_request(self):
+        """Флаг sync сохраняет синхронный режим"""
+        with patch('llm.views.perform_analysis', return_value=(ANALYSIS_RESPONSE, 200)) as mock_analysis:
+            response = self.client.post(self.url, {'use_emulator': False, 'sync': True}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, ANALYSIS_RESPONSE)
+        mock_analysis.assert_called_once()
+
+    @override_settings(LLM_ANALYSIS_ASYNC=False)
+    def test_async_disabled_by_setting(self):
+        with patch('llm.views.perform_analysis', return_value=(ANALYSIS_RESPONSE, 200)):
+            response = self.client.post(self.url, {'use_emulator': False}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_unknown_job_id(self):
+        response = self.client.get(self.status_url, {'job_id': 'missing'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,105 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from llm.artist_catalog import ArtistCatalog, artist_catalog
+from artists.models import Artist, ArtistSkill, Skill
+from tests.unit.users.factories import AgentFactory
+
+
+def _artist(agent, **kwargs):
+    fields = {'first_name': 'Иван', 'last_name': 'Петров', 'gender': 'male', 'created_by': agent}
+    fields.update(kwargs)
+    return Artist.objects.create(**fields)
+
+
+def _skill(artist, name):
+    skill, _ = Skill.objects.get_or_create(name=name, defaults={'created_by': artist.created_by})
+    return ArtistSkill.objects.create(artist=artist, skill=skill)
+
+
+class ArtistCatalogTest(TestCase):
+    """Тесты снимка каталога артистов для LLM"""
+
+    def setUp(self):
+        cache.clear()
+        self.agent = AgentFactory()
+        self.catalog = ArtistCatalog()
+
+    def test_snapshot_includes_skills(self):
+        """Навыки подтягиваются из ArtistSkill"""
+        artist = _artist(self.agent, age=30)
+        _skill(artist, 'Вокал')
+        _skill(artist, 'Акробатика')
+
+        artists = self.catalog.get_artists()
+
+        self.assertEqual(len(artists), 1)
+        self.assertEqual(artists[0]['name'], 'Иван Петров')
+        self.assertEqual(artists[0]['age'], 30)
+        self.assertEqual(artists[0]['skills'], ['Акробатика', 'Вокал'])
+        self.assertEqual(artists[0]['languages'], [])
+
+    def test_snapshot_built_with_two_queries(self):
+        """Снимок строится двумя запросами и не перестраивается без изменений"""
+        for index in range(5):
+            _skill(_artist(self.agent), f'Навык {index}')
+
+        with CaptureQueriesContext(connection) as queries:
+            self.catalog.get_snapshot()
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('bio', queries[1]['sql'])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.catalog.get_snapshot()
+            ArtistCatalog().get_snapshot()
+        self.assertEqual(len(queries), 0)
+
+    def test_signals_invalidate_snapshot(self):
+        """Изменения артистов и навыков сбрасывают снимок"""
+        artist = _artist(self.agent)
+        version = self.catalog.version()
+        self.assertEqual(self.catalog.get_artists()[0]['skills'], [])
+
+        _skill(artist, 'Танцы')
+        self.assertGreater(self.catalog.version(), version)
+        self.assertEqual(self.catalog.get_artists()[0]['skills'], ['Танцы'])
+
+        artist.delete()
+        self.assertEqual(self.catalog.get_artists(), [])
+
+
+class ArtistsForLLMViewTest(TestCase):
+    """Тесты эндпоинта артистов для LLM"""
+
+    def setUp(self):
+        cache.clear()
+        artist_catalog._local = None
+        self.client = APIClient()
+        self.agent = AgentFactory()
+        self.artist = _artist(self.agent, height=None)
+        self.client.force_authenticate(user=self.agent)
+        self.url = reverse('llm:artists_for_llm')
+
+    def test_etag_not_modified(self):
+        """Повторный запрос с тем же ETag получает 304"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_count'], 1)
+        self.assertEqual(response.data['artists'][0]['height'], 0)
+        etag = response['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertFalse([q for q in queries if 'artists_' in q['sql']])
+
+        _artist(self.agent, first_name='Мария', gender='female')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_count'], 2)
+        self.assertNotEqual(response['ETag'], etag)
@@ -0,0 +1,172 @@
+import json
+import time
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from openai import OpenAI
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from llm.analysis_jobs import analysis_job_queue
+from llm.artist_catalog import artist_catalog
+from llm.batch_analysis import BatchAnalyzer
+from llm.openai_service import OpenAIService
+from llm.registry import get_llm_service, llm_registry
+from tests.unit.llm.fake_openai import FakeOpenAIServer
+from tests.unit.telegram_requests.factories import RequestFactory
+from tests.unit.users.factories import AgentFactory
+
+
+@override_settings(OPENAI_API_KEY='test-key', LLM_BATCH_CONCURRENCY=2, LLM_BATCH_MAX_REQUESTS=5)
+class BatchAnalysisTest(TransactionTestCase):
+    """
+    Пакетный анализ против локального фейкового OpenAI.
+
+    TransactionTestCase: analysis_status пишут рабочие потоки через свои
+    соединения с БД, и запись должна быть видна тесту.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = FakeOpenAIServer()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.close()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.server.reset()
+        llm_registry.reset()
+        self.addCleanup(llm_registry.reset)
+        service = get_llm_service()
+        self.assertIsNotNone(service.openai_service)
+        service.openai_service.client = OpenAI(api_key='test-key', base_url=self.server.base_url, max_retries=0)
+        save_patcher = patch.object(OpenAIService, '_save_last_response')
+        save_patcher.start()
+        self.addCleanup(save_patcher.stop)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=AgentFactory())
+        self.url = reverse('llm:analyze_requests_batch')
+
+    def _post(self, data):
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        content = b''.join(response.streaming_content).decode('utf-8')
+        return [json.loads(line) for line in content.splitlines()]
+
+    def test_results_streamed_in_completion_order(self):
+        """Результаты приходят по мере готовности, по одному на каждый запрос"""
+        slow = RequestFactory(text='Нужен актер [delay=0.5]')
+        fast = [RequestFactory(text=f'Нужна актриса {index} [delay=0.05]') for index in range(2)]
+        request_ids = [slow.id, fast[0].id, 999999, fast[1].id, slow.id]
+
+        events = self._post({'request_ids': request_ids})
+
+        results = [event for event in events if event['type'] == 'result']
+        self.assertEqual(events[-1]['type'], 'summary')
+        self.assertEqual(events[-1]['total'], 4)
+        self.assertEqual(events[-1]['succeeded'], 3)
+        self.assertEqual(events[-1]['failed'], 1)
+        self.assertEqual(sorted(event['index'] for event in results), [0, 1, 2, 3])
+
+        # Отсутствующий запрос отвечается сразу, медленный - последним
+        self.assertEqual(results[0]['request_id'], 999999)
+        self.assertEqual(results[0]['status_code'], status.HTTP_404_NOT_FOUND)
+        self.assertEqual(results[-1]['request_id'], slow.id)
+        self.assertEqual(results[-1]['index'], 0)
+
+        # Параллельно, но не больше LLM_BATCH_CONCURRENCY
+        self.assertEqual(self.server.requests, 3)
+        self.assertEqual(self.server.max_active, 2)
+
+    def test_results_written_to_analysis_status(self):
+        """Результат виден через статус анализа отдельного запроса"""
+        telegram_request = RequestFactory(text='Нужен актер для рекламы')
+
+        events = self._post({'request_ids': [telegram_request.id]})
+
+        telegram_request.refresh_from_db()
+        self.assertEqual(telegram_request.analysis_status, 'analyzed')
+        status_response = self.client.get(
+            reverse('llm:request_analysis_status', args=[telegram_request.id])
+        )
+        job = status_response.data['job']
+        self.assertEqual(job['job_id'], events[0]['job_id'])
+        self.assertEqual(job['status'], 'completed')
+        self.assertEqual(job['result'], events[0]['result'])
+
+    def test_status_saved_when_client_stops_reading(self):
+        """analysis_status сохраняется рабочим потоком, а не при чтении результатов"""
+        telegram_requests = [RequestFactory(text=f'Нужен актер {index}') for index in range(2)]
+
+        events = BatchAnalyzer().analyze([request.id for request in telegram_requests])
+        first = next(event for event in events if event['type'] == 'result')
+        events.close()
+
+        # Второй запрос к этому моменту уже начат и завершается в фоне
+        job_ids = [first['job_id']] + [
+            analysis_job_queue.get_for_request(request.id)['job_id']
+            for request in telegram_requests if request.id != first['request_id']
+        ]
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and any(
+            analysis_job_queue.get(job_id)['status'] not in ('completed', 'failed') for job_id in job_ids
+        ):
+            time.sleep(0.02)
+
+        for telegram_request in telegram_requests:
+            telegram_request.refresh_from_db()
+            self.assertEqual(telegram_request.analysis_status, 'analyzed')
+
+    def test_upstream_error_marks_request_failed(self):
+        telegram_request = RequestFactory(text='Нужен каскадер')
+        self.server.error(400)
+
+        events = self._post({'request_ids': [telegram_request.id]})
+
+        self.assertEqual(events[0]['status_code'], status.HTTP_500_INTERNAL_SERVER_ERROR)
+        telegram_request.refresh_from_db()
+        self.assertEqual(telegram_request.analysis_status, 'error')
+        self.assertEqual(analysis_job_queue.get(events[0]['job_id'])['status'], 'failed')
+
+    def test_active_job_is_skipped(self):
+        """Запрос с активной задачей анализа не анализируется повторно"""
+        telegram_request = RequestFactory(text='Нужен актер')
+        job, _ = analysis_job_queue.create(telegram_request.id)
+
+        events = self._post({'request_ids': [telegram_request.id]})
+
+        self.assertEqual(events[0]['status_code'], status.HTTP_409_CONFLICT)
+        self.assertEqual(events[0]['job_id'], job['job_id'])
+        self.assertEqual(events[-1]['skipped'], 1)
+        self.assertEqual(self.server.requests, 0)
+
+    def test_catalog_loaded_once(self):
+        """Снимок каталога артистов берется один раз на пачку"""
+        request_ids = [RequestFactory(text=f'Нужен актер {index}').id for index in range(3)]
+
+        with patch.object(artist_catalog, 'get_artists', wraps=artist_catalog.get_artists) as mock_artists:
+            self._post({'request_ids': request_ids})
+
+        self.assertEqual(mock_artists.call_count, 1)
+
+    def test_invalid_batches(self):
+        self.assertEqual(
+            self.client.post(self.url, {'request_ids': []}, format='json').status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+        self.assertEqual(
+            self.client.post(self.url, {'request_ids': list(range(1, 7))}, format='json').status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+
+    def test_concurrency_capped_by_setting(self):
+        self.assertEqual(BatchAnalyzer(concurrency=10).concurrency, 2)
+        self.assertEqual(BatchAnalyzer(concurrency=1).concurrency, 1)
@@ -0,0 +1,132 @@
+import json
+from unittest.mock import Mock, patch
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from artists.models import Artist, ArtistSkill, Skill
+from llm.artist_catalog import artist_catalog
+from llm.candidates import ArtistCandidateSelector, prefilter_metrics
+from llm.openai_service import OpenAIService
+from llm.services import LLMService
+from tests.unit.users.factories import AgentFactory
+
+REQUEST_TEXT = 'Ищем мужчину 25-35 лет в Москве, нужен вокал. Съемки в июне.'
+
+
+def _openai_response(prompt_tokens):
+    response = Mock()
+    response.choices = [Mock(message=Mock(content=json.dumps({
+        'project_analysis': {'project_title': 'Проект', 'roles': []},
+        'contacts': {},
+    })))]
+    response.usage = Mock(prompt_tokens=prompt_tokens)
+    response.processing_time = 0.1
+    return response
+
+
+class ArtistCandidateSelectorTest(TestCase):
+    """Тесты предварительного отбора артистов"""
+
+    def setUp(self):
+        cache.clear()
+        agent = AgentFactory()
+        vocal = Skill.objects.create(name='Вокал', created_by=agent)
+
+        def artist(first_name, gender, city, age, skills=()):
+            obj = Artist.objects.create(
+                first_name=first_name, last_name='Тестов', gender=gender,
+                city=city, age=age, created_by=agent
+            )
+            for skill in skills:
+                ArtistSkill.objects.create(artist=obj, skill=skill)
+            return obj
+
+        self.singer = artist('Певец', 'male', 'Москва', 30, [vocal])
+        self.actor = artist('Актер', 'male', 'Москва', 28)
+        artist('Старший', 'male', 'Москва', 60)
+        artist('Питерец', 'male', 'Санкт-Петербург', 30, [vocal])
+        artist('Актриса', 'female', 'Москва', 30, [vocal])
+        artist('Мальчик', 'boy', 'Москва', 10)
+        self.artists_data = artist_catalog.get_artists()
+
+    def test_extract_signals(self):
+        """Пол, возраст, город и навыки извлекаются из текста"""
+        signals = ArtistCandidateSelector().extract_signals(REQUEST_TEXT)
+
+        self.assertEqual(signals['genders'], ['male'])
+        self.assertEqual((signals['age_min'], signals['age_max']), (25, 35))
+        self.assertEqual(signals['cities'], ['Москва'])
+        self.assertEqual(len(signals['skill_ids']), 1)
+
+    def test_select_ranks_matching_artists(self):
+        """Подходящие артисты упорядочены по совпавшим навыкам"""
+        selector = ArtistCandidateSelector({'top_n': 3})
+        candidates, _ = selector.select(REQUEST_TEXT, self.artists_data)
+
+        self.assertEqual([c['id'] for c in candidates], [self.singer.id, self.actor.id])
+
+    def test_strategy_none_passes_everyone(self):
+        """Стратегия 'none' отключает отбор"""
+        selector = ArtistCandidateSelector({'strategy': 'none', 'top_n': 2})
+        candidates, _ = selector.select(REQUEST_TEXT, self.artists_data)
+        self.assertEqual(len(candidates), len(self.artists_data))
+
+    def test_no_matches_falls_back_to_top_n(self):
+        """Без совпадений модель получает ограниченный общий список"""
+        selector = ArtistCandidateSelector({'top_n': 2})
+        candidates, _ = selector.select('Ищем девочку 5-7 лет', self.artists_data)
+        self.assertEqual(len(candidates), 2)
+
+    def _openai_llm_service(self):
+        config = {
+            'llm': {'use_emulator': False},
+            'artist_prefilter': {'enabled': True, 'strategy': 'signals', 'top_n': 3},
+        }
+        with patch.object(LLMService, '_load_config', return_value=config):
+            service = LLMService()
+        service.openai_service.client = Mock()
+        service.openai_service.client.chat.completions.create.return_value = _openai_response(1500)
+        prefilter_metrics.reset_metrics()
+        return service
+
+    def _prompt(self, service):
+        return service.openai_service.client.chat.completions.create.call_args.kwargs['messages'][-1]['content']
+
+    @override_settings(OPENAI_API_KEY='test-key')
+    def test_llm_service_passes_candidates_to_openai(self):
+        """В промпт попадают только кандидаты, метрики учитывают токены"""
+        service = self._openai_llm_service()
+
+        with patch.object(OpenAIService, '_save_last_response'):
+            result = service.analyze_request({'text': REQUEST_TEXT}, self.artists_data)
+
+        prompt = self._prompt(service)
+        candidates = service.candidate_selector.render(
+            [artist for artist in self.artists_data if artist['id'] in (self.singer.id, self.actor.id)]
+        )
+        self.assertIn(candidates, prompt)
+        self.assertNotIn('Питерец', prompt)
+        self.assertEqual(result['prompt_tokens'], 1500)
+
+        metrics = prefilter_metrics.get_metrics()
+        self.assertEqual(metrics['requests'], 1)
+        self.assertEqual(metrics['artists_total'], 6)
+        self.assertEqual(metrics['candidates_total'], 2)
+        self.assertLess(metrics['artist_tokens_after'], metrics['artist_tokens_before'])
+        self.assertEqual(metrics['prompt_tokens'], 1500)
+
+    @override_settings(OPENAI_API_KEY='test-key')
+    def test_cache_hit_skips_selection(self):
+        """Ответ из кэша не требует отбора кандидатов"""
+        service = self._openai_llm_service()
+
+        with patch.object(OpenAIService, '_save_last_response'):
+            service.analyze_request({'text': REQUEST_TEXT}, self.artists_data)
+            with patch.object(service.candidate_selector, 'select') as mock_select:
+                result = service.analyze_request({'text': REQUEST_TEXT}, self.artists_data)
+
+        self.assertTrue(result['cached'])
+        mock_select.assert_not_called()
+        self.assertEqual(service.openai_service.client.chat.completions.create.call_count, 1)
+        self.assertEqual(prefilter_metrics.get_metrics()['requests'], 1)
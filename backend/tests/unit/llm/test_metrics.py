@@ -0,0 +1,175 @@
+import time
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from llm.error_logging import ErrorMetrics
+from llm.metrics import LATENCY_BUCKETS, LLMMetrics, llm_metrics
+from tests.unit.users.factories import AgentFactory
+
+
+class LLMMetricsTest(SimpleTestCase):
+    """Тесты общих метрик LLM"""
+
+    def setUp(self):
+        cache.clear()
+        # Два воркера с общим кэшем; сброс в кэш только явный
+        self.worker_a = LLMMetrics(flush_interval=3600, key_prefix='test:metrics:')
+        self.worker_b = LLMMetrics(flush_interval=3600, key_prefix='test:metrics:')
+
+    def test_aggregates_workers(self):
+        self.worker_a.increment('retry_attempts')
+        self.worker_a.observe('openai_call_seconds', 0.3)
+        self.worker_b.increment('retry_attempts', 2)
+        self.worker_b.observe('openai_call_seconds', 1.7)
+        self.worker_b.flush()
+
+        snapshot = self.worker_a.snapshot()
+
+        self.assertEqual(snapshot['counters']['retry_attempts'], 3)
+        histogram = snapshot['histograms']['openai_call_seconds']
+        self.assertEqual(histogram['count'], 2)
+        self.assertAlmostEqual(histogram['sum'], 2.0)
+        self.assertEqual(dict(histogram['buckets'])[0.5], 1)
+        self.assertEqual(dict(histogram['buckets'])[2.5], 2)
+
+    def test_survives_process_restart(self):
+        self.worker_a.increment('fallback_activations')
+        self.worker_a.flush()
+
+        restarted = LLMMetrics(flush_interval=3600, key_prefix='test:metrics:')
+
+        self.assertEqual(restarted.snapshot()['counters']['fallback_activations'], 1)
+
+    def test_pending_observations_not_shared_before_flush(self):
+        self.worker_b.observe('validation_seconds', 0.001)
+
+        self.assertEqual(self.worker_a.snapshot()['histograms']['validation_seconds']['count'], 0)
+
+    def test_flush_interval(self):
+        metrics = LLMMetrics(flush_interval=0, key_prefix='test:metrics:')
+        metrics.observe('analysis_seconds', 12)
+
+        self.assertEqual(self.worker_a.snapshot()['histograms']['analysis_seconds']['count'], 1)
+
+    def test_unknown_names_ignored(self):
+        self.worker_a.increment('unknown')
+        self.worker_a.observe('unknown_seconds', 1)
+        self.assertNotIn('unknown', self.worker_a.snapshot()['counters'])
+
+    def test_cache_failure_keeps_observations(self):
+        self.worker_a.increment('retry_attempts')
+        with patch('llm.metrics.cache.incr', side_effect=ConnectionError('redis down')):
+            self.worker_a.flush()
+
+        self.assertEqual(self.worker_a.snapshot()['counters']['retry_attempts'], 1)
+
+    def test_partial_cache_failure_restores_only_unwritten(self):
+        """Записанные до сбоя ключи не возвращаются в очередь и не учитываются дважды"""
+        self.worker_a.increment('retry_attempts')
+        self.worker_a.increment('fallback_activations')
+        self.worker_a.observe('openai_call_seconds', 0.3)
+        real_incr = cache.incr
+        calls = []
+
+        def flaky_incr(key, delta=1, version=None):
+            calls.append(key)
+            if len(calls) == 2:
+                raise ConnectionError('redis down')
+            return real_incr(key, delta, version)
+
+        with patch('llm.metrics.cache.incr', side_effect=flaky_incr):
+            self.worker_a.flush()
+        snapshot = self.worker_a.snapshot()
+
+        self.assertEqual(snapshot['counters']['retry_attempts'], 1)
+        self.assertEqual(snapshot['counters']['fallback_activations'], 1)
+        self.assertEqual(snapshot['histograms']['openai_call_seconds']['count'], 1)
+        self.assertAlmostEqual(snapshot['histograms']['openai_call_seconds']['sum'], 0.3)
+
+    def test_idle_worker_flushed_by_timer(self):
+        """Наблюдения без последующих вызовов сбрасываются по таймеру"""
+        metrics = LLMMetrics(flush_interval=0.05, key_prefix='test:metrics:')
+        metrics.increment('retry_attempts')
+
+        deadline = time.monotonic() + 2
+        while time.monotonic() < deadline and cache.get('test:metrics:counter:retry_attempts') is None:
+            time.sleep(0.01)
+
+        self.assertEqual(cache.get('test:metrics:counter:retry_attempts'), 1)
+
+    def test_quantile(self):
+        for _ in range(90):
+            self.worker_a.observe('openai_call_seconds', 0.2)
+        for _ in range(10):
+            self.worker_a.observe('openai_call_seconds', 8)
+
+        summary = self.worker_a.latency_summary()['openai_call_seconds']
+
+        self.assertEqual(summary['count'], 100)
+        self.assertTrue(0.1 < summary['p50'] <= 0.25)
+        self.assertTrue(5 < summary['p95'] <= 10)
+        self.assertIsNone(self.worker_a.latency_summary()['validation_seconds']['p95'])
+
+    def test_quantile_above_last_bucket(self):
+        buckets = [(bound, 0) for bound in LATENCY_BUCKETS] + [(float('inf'), 3)]
+        self.assertEqual(LLMMetrics.quantile(buckets, 0.5), LATENCY_BUCKETS[-1])
+
+    def test_prometheus_format(self):
+        self.worker_a.increment('validation_repairs')
+        self.worker_a.observe('validation_seconds', 0.002)
+
+        text = self.worker_a.prometheus()
+
+        self.assertIn('# TYPE llm_validation_repairs_total counter\nllm_validation_repairs_total 1\n', text)
+        self.assertIn('# TYPE llm_validation_seconds histogram\n', text)
+        self.assertIn('llm_validation_seconds_bucket{le="0.005"} 1\n', text)
+        self.assertIn('llm_validation_seconds_bucket{le="+Inf"} 1\n', text)
+        self.assertIn('llm_validation_seconds_count 1\n', text)
+
+    def test_error_metrics_forwarded(self):
+        error_metrics = ErrorMetrics(shared=self.worker_a)
+        error_metrics.increment_metric('validation_errors')
+
+        self.assertEqual(error_metrics.get_metrics()['validation_errors'], 1)
+        self.assertEqual(self.worker_a.snapshot()['counters']['validation_errors'], 1)
+
+
+class LLMMetricsEndpointTest(TestCase):
+    """Метрики в статусе LLM и в формате Prometheus"""
+
+    def setUp(self):
+        cache.clear()
+        llm_metrics.reset()
+        self.client = APIClient()
+        self.client.force_authenticate(user=AgentFactory())
+
+    def test_prometheus_endpoint(self):
+        llm_metrics.observe('openai_call_seconds', 1.2)
+
+        response = self.client.get(reverse('llm:llm_metrics'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn(b'llm_openai_call_seconds_count 1\n', response.content)
+
+    def test_prometheus_endpoint_requires_auth(self):
+        response = APIClient().get(reverse('llm:llm_metrics'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_status_includes_metrics(self):
+        llm_metrics.increment('analyses_succeeded', 3)
+        llm_metrics.increment('analyses_failed')
+        llm_metrics.observe('analysis_seconds', 4)
+
+        response = self.client.get(reverse('llm:llm_status'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_requests'], 4)
+        self.assertEqual(response.data['successful_requests'], 3)
+        self.assertEqual(response.data['failed_requests'], 1)
+        self.assertEqual(response.data['latency']['analysis_seconds']['count'], 1)
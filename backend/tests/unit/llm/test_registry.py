@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import yaml
+from django.test import TestCase, override_settings
+
+from llm.registry import ConfigFileCache, LLMServiceRegistry
+
+
+class ConfigFileCacheTest(TestCase):
+    """Тесты кэша файлов конфигурации"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = Path(self.tmp_dir) / 'llm_config.yaml'
+        self.path.write_text('llm:\n  model: gpt-4o\n', encoding='utf-8')
+        self.files = ConfigFileCache()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_file_parsed_once(self):
+        """Неизмененный файл не разбирается повторно"""
+        parser = Mock(side_effect=yaml.safe_load, __name__='safe_load')
+        first = self.files.load(self.path, parser)
+        second = self.files.load(self.path, parser)
+
+        self.assertIs(first, second)
+        self.assertEqual(parser.call_count, 1)
+
+    def test_file_reloaded_after_change(self):
+        """Изменение файла (mtime) перечитывает его"""
+        self.files.load(self.path, yaml.safe_load)
+        self.path.write_text('llm:\n  model: gpt-4o-mini\n', encoding='utf-8')
+        os.utime(self.path, ns=(1, 1))
+
+        config = self.files.load(self.path, yaml.safe_load)
+        self.assertEqual(config['llm']['model'], 'gpt-4o-mini')
+
+    def test_missing_file(self):
+        with self.assertRaises(FileNotFoundError):
+            self.files.load(Path(self.tmp_dir) / 'missing.yaml', yaml.safe_load)
+
+
+class LLMServiceRegistryTest(TestCase):
+    """Тесты реестра LLM сервисов"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.config_path = Path(self.tmp_dir) / 'llm_config.yaml'
+        self.config_path.write_text('llm:\n  use_emulator: true\n', encoding='utf-8')
+        self.settings_override = override_settings(BASE_DIR=Path(self.tmp_dir))
+        self.settings_override.enable()
+        self.registry = LLMServiceRegistry()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_service_is_shared(self):
+        """Сервис создается один раз"""
+        with patch('llm.services.LLMService.__init__', return_value=None) as mock_init:
+            first = self.registry.get_service()
+            second = self.registry.get_service()
+
+        self.assertIs(first, second)
+        self.assertEqual(mock_init.call_count, 1)
+
+    def test_service_reloaded_when_config_changes(self):
+        """Правка llm_config.yaml пересоздает сервис без перезапуска"""
+        first = self.registry.get_service()
+        self.assertTrue(first.config['llm']['use_emulator'])
+
+        self.config_path.write_text('llm:\n  use_emulator: false\n', encoding='utf-8')
+        os.utime(self.config_path, ns=(1, 1))
+        second = self.registry.get_service()
+
+        self.assertIsNot(first, second)
+        self.assertFalse(second.config['llm']['use_emulator'])
+        self.assertIs(self.registry.get_service(), second)
+
+    def test_openai_client_shared_per_key(self):
+        """Клиент OpenAI создается один раз на API ключ"""
+        factory = Mock(side_effect=lambda api_key: Mock(api_key=api_key))
+
+        first = self.registry.get_openai_client(factory, 'key-1')
+        self.assertIs(self.registry.get_openai_client(factory, 'key-1'), first)
+        self.assertIsNot(self.registry.get_openai_client(factory, 'key-2'), first)
+        self.assertEqual(factory.call_count, 2)
+
+        self.registry.reset()
+        first.close.assert_called_once()
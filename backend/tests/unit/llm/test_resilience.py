@@ -0,0 +1,159 @@
+import time
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from openai import BadRequestError, InternalServerError, OpenAI
+
+from llm.error_logging import error_metrics, get_error_metrics
+from llm.openai_service import OpenAIService
+from llm.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy
+from tests.unit.llm.fake_openai import FakeOpenAIServer
+
+@override_settings(OPENAI_API_KEY='test-key')
+class OpenAIResilienceTest(TestCase):
+    """Повторы и circuit breaker против локального фейкового OpenAI"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = FakeOpenAIServer()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.close()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        error_metrics.reset_metrics()
+        self.server.reset()
+        self.service = OpenAIService()
+        self.service.client = OpenAI(api_key='test-key', base_url=self.server.base_url, max_retries=0)
+        self.service.retry_policy = RetryPolicy(max_retries=2, base_delay=0.01, max_delay=1)
+        self.service.circuit_breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=60)
+        sleep_patcher = patch('llm.openai_service.time.sleep')
+        self.sleep = sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+
+    def test_retry_after_header_is_honoured(self):
+        """Задержка берется из Retry-After ответа 429"""
+        self.server.error(429, {'Retry-After': '0.5'})
+
+        response = self.service._call_openai_with_retry('Test prompt')
+
+        self.assertIn('project_analysis', response.choices[0].message.content)
+        self.assertEqual(self.server.requests, 2)
+        self.sleep.assert_called_once_with(0.5)
+        self.assertEqual(error_metrics.get_metrics()['retry_attempts'], 1)
+
+    def test_exponential_backoff_with_jitter(self):
+        """Задержки растут экспоненциально и не превышают потолок"""
+        for _ in range(3):
+            self.server.error(500)
+
+        with self.assertRaises(InternalServerError):
+            self.service._call_openai_with_retry('Test prompt')
+
+        self.assertEqual(self.server.requests, 3)
+        delays = [call.args[0] for call in self.sleep.call_args_list]
+        self.assertEqual(len(delays), 2)
+        self.assertLessEqual(delays[0], 0.01)
+        self.assertLessEqual(delays[1], 0.02)
+        self.assertEqual(self.service.circuit_breaker.snapshot()['failures'], 1)
+
+    def test_client_errors_are_not_retried(self):
+        """400 не повторяется и не открывает breaker"""
+        self.server.error(400)
+
+        with self.assertRaises(BadRequestError):
+            self.service._call_openai_with_retry('Test prompt')
+
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(self.service.circuit_breaker.snapshot()['failures'], 0)
+
+    def test_circuit_opens_and_fails_fast(self):
+        """После серии неудачных вызовов запросы не доходят до upstream"""
+        for _ in range(6):
+            self.server.error(503)
+        for _ in range(2):
+            with self.assertRaises(InternalServerError):
+                self.service._call_openai_with_retry('Test prompt')
+        requests_before = self.server.requests
+
+        with self.assertRaises(CircuitOpenError) as context:
+            self.service._call_openai_with_retry('Test prompt')
+
+        self.assertEqual(self.server.requests, requests_before)
+        self.assertGreater(context.exception.retry_after, 0)
+        self.assertEqual(error_metrics.get_metrics()['circuit_breaker_trips'], 1)
+        self.assertEqual(error_metrics.get_metrics()['circuit_open_rejections'], 1)
+
+    def test_half_open_probe_closes_circuit(self):
+        """Успешный пробный вызов после таймаута закрывает breaker"""
+        breaker = self.service.circuit_breaker
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertEqual(breaker.state(), 'open')
+
+        cache.set(breaker.open_until_key, time.time() - 1, None)
+        self.assertEqual(breaker.state(), 'half_open')
+        self.service._call_openai_with_retry('Test prompt')
+
+        self.assertEqual(breaker.state(), 'closed')
+        self.assertEqual(breaker.snapshot()['failures'], 0)
+
+
+class CircuitBreakerTest(TestCase):
+    """Тесты состояния circuit breaker в кэше"""
+
+    def setUp(self):
+        cache.clear()
+        self.breaker = CircuitBreaker('unit', failure_threshold=2, reset_timeout=30)
+
+    def test_state_shared_between_instances(self):
+        """Состояние видно другим экземплярам (другим воркерам)"""
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+
+        other_worker = CircuitBreaker('unit', failure_threshold=2, reset_timeout=30)
+        self.assertEqual(other_worker.state(), 'open')
+        self.assertFalse(other_worker.allow_request())
+
+    def test_half_open_allows_single_probe(self):
+        """В half-open разрешен только один пробный вызов"""
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        cache.set(self.breaker.open_until_key, time.time() - 1, None)
+
+        self.assertTrue(self.breaker.allow_request())
+        self.assertFalse(self.breaker.allow_request())
+
+        # Неудачный пробный вызов открывает breaker снова
+        self.assertTrue(self.breaker.record_failure())
+        self.assertEqual(self.breaker.state(), 'open')
+
+    def test_error_metrics_expose_state(self):
+        with patch('llm.resilience.openai_circuit_breaker', self.breaker):
+            self.breaker.record_failure()
+            self.breaker.record_failure()
+            metrics = get_error_metrics()
+        self.assertEqual(metrics['circuit_breaker']['state'], 'open')
+        self.assertEqual(metrics['circuit_breaker']['failures'], 2)
+
+
+class RetryPolicyTest(TestCase):
+    """Тесты расчета задержек"""
+
+    def test_retry_after_http_date(self):
+        class Error(Exception):
+            response = type('Response', (), {'headers': {'retry-after': 'Wed, 21 Oct 2015 07:28:00 GMT'}})()
+
+        self.assertEqual(RetryPolicy.retry_after(Error()), 0.0)
+
+    def test_long_retry_after_is_not_awaited(self):
+        """Ожидание дольше max_delay отменяет повтор"""
+        class Error(Exception):
+            response = type('Response', (), {'headers': {'retry-after': '120'}})()
+
+        self.assertIsNone(RetryPolicy(max_delay=20).delay(0, Error()))
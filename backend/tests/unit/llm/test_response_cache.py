@@ -0,0 +1,110 @@
+import json
+from unittest.mock import Mock, patch
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from llm.openai_service import OpenAIService
+from llm.response_cache import LLMResponseCache, llm_response_cache
+from tests.unit.users.factories import AgentFactory
+
+ANALYSIS = {
+    'project_analysis': {'project_title': 'Проект', 'project_type': 'Фильм', 'roles': []},
+    'contacts': {},
+}
+
+
+def _openai_response():
+    response = Mock()
+    response.choices = [Mock(message=Mock(content=json.dumps(ANALYSIS)))]
+    response.usage = Mock(prompt_tokens=100)
+    response.processing_time = 0.5
+    return response
+
+
+class LLMResponseCacheTest(TestCase):
+    """Тесты кэша ответов LLM"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_key_depends_on_versions(self):
+        """Ключ меняется вместе с промптом, схемой, моделью, каталогом и отбором кандидатов"""
+        response_cache = LLMResponseCache()
+        base = response_cache.make_key('Текст  запроса\n', 'p1', 's1', 'gpt-4o', 1)
+
+        self.assertEqual(base, response_cache.make_key('Текст запроса', 'p1', 's1', 'gpt-4o', 1))
+        self.assertNotEqual(base, response_cache.make_key('Текст запроса', 'p2', 's1', 'gpt-4o', 1))
+        self.assertNotEqual(base, response_cache.make_key('Текст запроса', 'p1', 's2', 'gpt-4o', 1))
+        self.assertNotEqual(base, response_cache.make_key('Текст запроса', 'p1', 's1', 'gpt-4o-mini', 1))
+        self.assertNotEqual(base, response_cache.make_key('Текст запроса', 'p1', 's1', 'gpt-4o', 2))
+        self.assertNotEqual(base, response_cache.make_key('Текст запроса', 'p1', 's1', 'gpt-4o', 1, 'signals:50'))
+
+    def test_size_bounded_lru_eviction(self):
+        """При переполнении вытесняются давно не использованные ответы"""
+        response_cache = LLMResponseCache(enabled=True, ttl=60, max_entries=2)
+        response_cache.set('a', {'value': 'a'})
+        response_cache.set('b', {'value': 'b'})
+        response_cache.get('a')
+        response_cache.set('c', {'value': 'c'})
+
+        self.assertIsNotNone(response_cache.get('a'))
+        self.assertIsNone(response_cache.get('b'))
+        self.assertIsNotNone(response_cache.get('c'))
+        self.assertEqual(response_cache.stats(), {'hits': 3, 'misses': 1, 'entries': 2})
+
+
+class OpenAIServiceCacheTest(TestCase):
+    """Повторный анализ того же текста не вызывает API"""
+
+    def setUp(self):
+        cache.clear()
+        self.service = OpenAIService(api_key='test-key')
+        self.service.client = Mock()
+        self.service.client.chat.completions.create.return_value = _openai_response()
+        self.save_patch = patch.object(OpenAIService, '_save_last_response')
+        self.save_patch.start()
+
+    def tearDown(self):
+        self.save_patch.stop()
+
+    def test_cache_hit_skips_api(self):
+        request_data = {'id': 1, 'text': 'Ищем актера на главную роль'}
+
+        first = self.service.analyze_request(request_data)
+        second = self.service.analyze_request({'id': 2, 'text': ' Ищем актера  на главную роль '})
+
+        self.assertEqual(self.service.client.chat.completions.create.call_count, 1)
+        self.assertNotIn('cached', first)
+        self.assertTrue(second['cached'])
+        self.assertEqual(second['project_analysis'], ANALYSIS['project_analysis'])
+
+    def test_force_refresh_calls_api(self):
+        request_data = {'id': 1, 'text': 'Ищем актера на главную роль'}
+
+        self.service.analyze_request(request_data)
+        refreshed = self.service.analyze_request(request_data, force_refresh=True)
+
+        self.assertEqual(self.service.client.chat.completions.create.call_count, 2)
+        self.assertNotIn('cached', refreshed)
+
+
+class LLMStatusCacheCountersTest(TestCase):
+    """Счетчики кэша в статусе LLM"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=AgentFactory())
+
+    def test_status_exposes_cache_counters(self):
+        llm_response_cache.get('missing')
+
+        response = self.client.get(reverse('llm:llm_status'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['cache_hits'], 0)
+        self.assertEqual(response.data['cache_misses'], 1)
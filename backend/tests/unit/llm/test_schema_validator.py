@@ -0,0 +1,179 @@
+import copy
+from unittest.mock import Mock
+
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase
+
+from llm.error_logging import error_metrics
+from llm.schema_validator import get_schema_validator
+from llm.validators import LLMResponseValidator, LLMRetryHandler, repair_llm_response
+from tests.unit.llm.fake_openai import ANALYSIS
+
+
+def schema_response():
+    """Ответ, полностью соответствующий llm_schema.json"""
+    response, _, errors = get_schema_validator().repair(dict(ANALYSIS, confidence=0.9, errors=[]))
+    assert not errors, errors
+    return response
+
+
+class CompiledSchemaValidatorTest(SimpleTestCase):
+    """Тесты скомпилированного валидатора схемы"""
+
+    def setUp(self):
+        self.validator = get_schema_validator()
+
+    def test_compiled_once(self):
+        self.assertIs(get_schema_validator(), self.validator)
+
+    def test_valid_response(self):
+        self.assertEqual(self.validator.errors(schema_response()), [])
+
+    def test_reports_errors_with_paths(self):
+        response = schema_response()
+        response['project_analysis']['roles'][0]['gender'] = 'robot'
+        response['project_analysis']['confidence'] = 1.5
+        del response['project_analysis']['project_title']
+
+        errors = self.validator.errors(response)
+
+        self.assertEqual(len(errors), 3)
+        self.assertIn('$.project_analysis.project_title: required field missing', errors)
+        self.assertTrue(any(error.startswith('$.project_analysis.roles[0].gender') for error in errors))
+        self.assertTrue(any(error.startswith('$.project_analysis.confidence') for error in errors))
+
+    def test_is_valid_matches_errors(self):
+        """Быстрая проверка дает тот же ответ, что и полный проход с ошибками"""
+        changes = [
+            lambda response: None,
+            lambda response: response.pop('contacts'),
+            lambda response: response.update(confidence=True),
+            lambda response: response['project_analysis'].update(confidence=1.5),
+            lambda response: response['project_analysis'].update(confidence=None),
+            lambda response: response['project_analysis'].update(roles=[]),
+            lambda response: response['project_analysis'].update(project_title=2024),
+            lambda response: response['project_analysis'].update(usage_rights_parsed={'raw_text': 'ТВ'}),
+            lambda response: response['project_analysis']['roles'][0].update(gender='robot'),
+            lambda response: response['project_analysis']['roles'][0].update(media_presence=None),
+            lambda response: response['project_analysis']['roles'][0].update(age_min=-1),
+            lambda response: response['project_analysis']['roles'][0]['skills_required'].update(acting_skills=[1]),
+        ]
+        for change in changes:
+            response = schema_response()
+            change(response)
+            self.assertEqual(self.validator.is_valid(response), not self.validator.errors(response))
+        self.assertFalse(self.validator.is_valid(None))
+
+    def test_repairs_types_ranges_and_defaults(self):
+        response = schema_response()
+        project = response['project_analysis']
+        project['confidence'] = '0.8'
+        role = project['roles'][0]
+        role.update({
+            'confidence': 1.4,
+            'age_min': '25',
+            'age_max': 30.0,
+            'gender': ' Male ',
+            'media_presence': 'maybe',
+            'height': 180,
+        })
+        role['skills_required']['acting_skills'] = 'Пение'
+        del role['notes']
+        response['contacts'] = None
+        original = copy.deepcopy(response)
+
+        repaired, repairs, errors = self.validator.repair(response)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(response, original)
+        self.assertEqual(repaired['project_analysis']['confidence'], 0.8)
+        role = repaired['project_analysis']['roles'][0]
+        self.assertEqual(role['confidence'], 1)
+        self.assertEqual((role['age_min'], role['age_max']), (25, 30))
+        self.assertEqual(role['gender'], 'male')
+        self.assertIsNone(role['media_presence'])
+        self.assertEqual(role['height'], '180')
+        self.assertEqual(role['skills_required']['acting_skills'], ['Пение'])
+        self.assertIsNone(role['notes'])
+        self.assertIsNone(repaired['contacts']['casting_director']['name'])
+        self.assertEqual(repaired['contacts']['producers'], [])
+        self.assertEqual(len(repairs), 10)
+        self.assertEqual(self.validator.errors(repaired), [])
+
+    def test_defaults_are_not_shared(self):
+        first, _, _ = self.validator.repair(dict(ANALYSIS, confidence=0.9))
+        first['contacts']['producers'].append({'name': 'Продюсер'})
+
+        second, _, _ = self.validator.repair(dict(ANALYSIS, confidence=0.9))
+
+        self.assertEqual(second['contacts']['producers'], [])
+
+    def test_unrepairable_errors_kept(self):
+        response = schema_response()
+        response['project_analysis']['roles'] = []
+        response['project_analysis']['roles_extra'] = 'оставляется как есть'
+        response['project_analysis']['genre'] = None
+
+        _, _, errors = self.validator.repair(response)
+
+        self.assertEqual(errors, [
+            '$.project_analysis.genre: expected string',
+            '$.project_analysis.roles: at least 1 item(s) required',
+        ])
+
+
+class ValidateOrRepairTest(SimpleTestCase):
+    """Исправление ответа вместо повторного вызова LLM"""
+
+    def setUp(self):
+        error_metrics.reset_metrics()
+
+    def test_valid_response_returned_as_is(self):
+        response = schema_response()
+        self.assertIs(repair_llm_response(response), response)
+        self.assertEqual(error_metrics.get_metrics()['validation_repairs'], 0)
+
+    def test_repairable_response(self):
+        response = schema_response()
+        response['project_analysis']['confidence'] = 1.2
+        response['project_analysis']['roles'][0]['confidence'] = '0.7'
+        with self.assertRaises(ValidationError):
+            LLMResponseValidator().validate_analysis_result(response)
+
+        repaired = repair_llm_response(response)
+
+        self.assertEqual(repaired['project_analysis']['confidence'], 1)
+        self.assertEqual(repaired['project_analysis']['roles'][0]['confidence'], 0.7)
+        self.assertEqual(response['project_analysis']['confidence'], 1.2)
+        self.assertEqual(error_metrics.get_metrics()['validation_repairs'], 1)
+
+    def test_rules_beyond_schema_checked(self):
+        """Ответ по схеме проверяется правилами, которые схема не выражает"""
+        response = schema_response()
+        response['project_analysis']['roles'][0]['character_name'] = 'Не определен'
+        self.assertTrue(get_schema_validator().is_valid(response))
+
+        with self.assertRaises(ValidationError) as context:
+            repair_llm_response(response)
+
+        self.assertIn("Field 'character_name' cannot be empty", str(context.exception))
+
+    def test_unrepairable_response(self):
+        response = schema_response()
+        response['project_analysis']['project_title'] = 'А'
+
+        with self.assertRaises(ValidationError) as context:
+            repair_llm_response(response)
+
+        self.assertIn('project_title must be at least', str(context.exception))
+
+    def test_retry_handler_repairs_without_recall(self):
+        response = schema_response()
+        response['project_analysis']['confidence'] = -0.3
+        llm_service = Mock()
+        handler = LLMRetryHandler(LLMResponseValidator(), max_attempts=3)
+
+        result = handler.validate_with_retry(response, llm_service, {'id': 1}, [])
+
+        self.assertEqual(result['project_analysis']['confidence'], 0)
+        llm_service.analyze_request.assert_not_called()
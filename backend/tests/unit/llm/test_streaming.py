@@ -0,0 +1,167 @@
+import copy
+import json
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from openai import OpenAI
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from llm.openai_service import OpenAIService
+from llm.registry import get_llm_service, llm_registry
+from llm.streaming import AnalysisStreamer, IncrementalJSONParser, streaming_metrics
+from tests.unit.llm.fake_openai import ANALYSIS, FakeOpenAIServer
+from tests.unit.telegram_requests.factories import RequestFactory
+from tests.unit.users.factories import AgentFactory
+
+
+class IncrementalJSONParserTest(SimpleTestCase):
+    """Тесты разбора частичного JSON"""
+
+    def _feed(self, text, chunk_size=1):
+        parser = IncrementalJSONParser(AnalysisStreamer.is_watched)
+        events = []
+        for start in range(0, len(text), chunk_size):
+            for path, value in parser.feed(text[start:start + chunk_size]):
+                events.append((start, path, value))
+        return events
+
+    def test_values_emitted_as_soon_as_closed(self):
+        """Поле отдается, как только закрыта его строка, до конца ответа"""
+        text = json.dumps(ANALYSIS, ensure_ascii=False)
+        events = self._feed(text)
+
+        paths = [path for _, path, _ in events]
+        self.assertEqual(paths[0], ('project_analysis', 'project_title'))
+        self.assertIn(('project_analysis', 'roles', 0), paths)
+        self.assertEqual(paths[-1], ('contacts',))
+        title_position = events[0][0]
+        self.assertEqual(text[title_position], '"')
+        self.assertLess(title_position, text.index('"roles"'))
+        role = dict((path, value) for _, path, value in events)[('project_analysis', 'roles', 0)]
+        self.assertEqual(role, ANALYSIS['project_analysis']['roles'][0])
+
+    def test_escapes_and_nested_values(self):
+        """Кавычки и скобки внутри строк не ломают разбор"""
+        text = json.dumps({
+            'project_analysis': {
+                'project_title': 'Фильм "Звезды {и} [ветер]" \\ часть 2',
+                'roles': [{'age': 25, 'flags': [True, None], 'name': 'A'}, {'age': 30.5}],
+                'genre': 'Драма'
+            },
+            'contacts': {}
+        })
+        events = {path: value for _, path, value in self._feed(text, chunk_size=7)}
+
+        self.assertEqual(events[('project_analysis', 'project_title')], 'Фильм "Звезды {и} [ветер]" \\ часть 2')
+        self.assertEqual(events[('project_analysis', 'roles', 1)], {'age': 30.5})
+        self.assertEqual(events[('project_analysis', 'genre')], 'Драма')
+        self.assertEqual(events[('contacts',)], {})
+
+
+@override_settings(OPENAI_API_KEY='test-key')
+class StreamingEndpointTest(TestCase):
+    """SSE эндпоинт анализа против локального фейкового OpenAI"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = FakeOpenAIServer()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.close()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.server.reset()
+        streaming_metrics.reset_metrics()
+        llm_registry.reset()
+        self.addCleanup(llm_registry.reset)
+        service = get_llm_service()
+        service.openai_service.client = OpenAI(api_key='test-key', base_url=self.server.base_url, max_retries=0)
+        save_patcher = patch.object(OpenAIService, '_save_last_response')
+        save_patcher.start()
+        self.addCleanup(save_patcher.stop)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=AgentFactory())
+        self.request = RequestFactory(text='Нужен актер для фильма')
+        self.url = reverse('llm:stream_request_analysis', args=[self.request.id])
+
+    def _events(self):
+        response = self.client.post(self.url, {}, format='json', HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = []
+        for block in b''.join(response.streaming_content).decode('utf-8').strip().split('\n\n'):
+            name, data = block.split('\n')
+            events.append((name[len('event: '):], json.loads(data[len('data: '):])))
+        return events
+
+    def test_fields_streamed_before_result(self):
+        """Поля проекта и роли приходят отдельными событиями до итогового ответа"""
+        self.server.chunk_delay = 0.01
+
+        events = self._events()
+
+        names = [name for name, _ in events]
+        self.assertEqual(names[0], 'started')
+        self.assertEqual(names[-1], 'result')
+        self.assertEqual(events[1], ('field', {'field': 'project_title', 'value': 'Проект'}))
+        self.assertIn(('role', {'index': 0, 'role': ANALYSIS['project_analysis']['roles'][0]}), events)
+        self.assertEqual(names.count('field'), 4)
+
+        result = events[-1][1]
+        self.assertFalse(result['cached'])
+        self.assertEqual(result['project_analysis']['project_title'], 'Проект')
+        # Fallback кастинг-директора применяется как в обычном анализе
+        self.assertEqual(result['contacts']['casting_director']['name'], self.request.author_name)
+        self.request.refresh_from_db()
+        self.assertEqual(self.request.analysis_status, 'analyzed')
+
+        metrics = streaming_metrics.get_metrics()
+        self.assertEqual(metrics['streams'], 1)
+        self.assertEqual(metrics['first_content_count'], 1)
+        self.assertLess(metrics['avg_time_to_first_content'], metrics['total_duration'])
+
+    def test_cached_response_replayed_as_events(self):
+        """Ответ из кэша отдается теми же событиями без вызова модели"""
+        self._events()
+        requests_before = self.server.requests
+
+        events = self._events()
+
+        self.assertEqual(self.server.requests, requests_before)
+        self.assertIn(('field', {'field': 'project_title', 'value': 'Проект'}), events)
+        self.assertTrue(events[-1][1]['cached'])
+
+    def test_validation_runs_when_stream_ends(self):
+        """Полная валидация выполняется по окончании потока"""
+        invalid = copy.deepcopy(ANALYSIS)
+        invalid['project_analysis']['roles'] = []
+        self.server.content = invalid
+
+        events = self._events()
+
+        self.assertEqual(events[-1][0], 'error')
+        self.assertEqual(events[-1][1]['error'], 'Ошибка валидации ответа LLM')
+
+    def test_upstream_error_event(self):
+        self.server.error(400)
+
+        events = self._events()
+
+        self.assertEqual(events[-1][0], 'error')
+        self.assertEqual(events[-1][1]['status_code'], status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.request.refresh_from_db()
+        self.assertEqual(self.request.analysis_status, 'error')
+
+    def test_missing_request(self):
+        url = reverse('llm:stream_request_analysis', args=[999999])
+        response = self.client.post(url, {}, format='json', HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertTrue(response.content.startswith(b'event: error'))
@@ -0,0 +1,101 @@
+"""
+Тесты поиска дубликатов персон для импорта
+"""
+import pytest
+
+from people.duplicate_finder import PersonDuplicateFinder
+from people.models import Person
+
+
+def create_person(last_name, first_name, **kwargs):
+    """Создает активного режиссера"""
+    return Person.objects.create(
+        person_type='director',
+        last_name=last_name,
+        first_name=first_name,
+        **kwargs
+    )
+
+
+@pytest.mark.django_db
+class TestPersonDuplicateFinderBatch:
+    """Тесты пакетного поиска дубликатов"""
+
+    def test_batch_matches_single_search_by_name(self):
+        """Пакетный поиск возвращает то же, что и поиск по одной записи"""
+        create_person('Иванов', 'Иван')
+        create_person('Иванова', 'Анна')
+        create_person('Иваненко', 'Иван')
+        create_person('Петров', 'Петр')
+        create_person('Петров', 'Павел')
+        records = [
+            {'last_name': 'Иванов', 'first_name': 'Иван'},
+            {'last_name': 'Петров', 'first_name': ''},
+            {'last_name': 'Сидоров', 'first_name': 'Олег'},
+            {'last_name': '', 'first_name': 'Без фамилии'},
+            {'last_name': ' Петрова ', 'first_name': 'Павел'},
+        ]
+        finder = PersonDuplicateFinder()
+
+        batch = finder.find_duplicates_batch(records)
+
+        assert batch == [finder.find_duplicates(record) for record in records]
+        assert batch[0][0]['match_score'] == 100
+        assert batch[2] == []
+        assert batch[3] == []
+
+    def test_batch_matches_single_search_by_contacts(self):
+        """Совпадения по контактам совпадают с поиском по одной записи"""
+        create_person('Кузнецов', 'Олег', phones=['+79991112233'], telegram_usernames=['@kuz'])
+        create_person('Смирнов', 'Олег', emails=['smirnov@example.com'])
+        records = [
+            {'last_name': 'Другой', 'first_name': 'Олег', 'phones': ['+79991112233'], 'telegrams': ['kuz']},
+            {'last_name': 'Смирнов', 'first_name': 'Олег', 'emails': ['smirnov@example.com']},
+        ]
+        finder = PersonDuplicateFinder()
+
+        batch = finder.find_duplicates_batch(records)
+
+        assert batch == [finder.find_duplicates(record) for record in records]
+
+    def test_batch_does_not_mutate_shared_persons(self):
+        """Одна персона в нескольких строках оценивается одинаково"""
+        create_person('Волков', 'Олег', phones=['+79990000000'])
+        records = [{'last_name': 'Волков', 'first_name': 'Олег'}] * 3
+        finder = PersonDuplicateFinder()
+
+        batch = finder.find_duplicates_batch(records)
+
+        assert batch[0] == batch[1] == batch[2]
+        assert batch[2][0]['existing_data']['phones'] == ['+79990000000', '+79990000000']
+
+
+@pytest.mark.django_db
+class TestPersonDuplicateFinderFuzzyName:
+    """Тесты fuzzy поиска по фамилии"""
+
+    def test_fuzzy_match_beyond_first_thousand_rows(self):
+        """Дубликат находится, даже если в порядке сортировки он дальше 1000-й строки"""
+        Person.objects.bulk_create([
+            Person(person_type='director', last_name=f'Абрамов{i:04d}', first_name='Иван')
+            for i in range(1100)
+        ])
+        duplicate = create_person('Ящиков', 'Олег')
+        finder = PersonDuplicateFinder()
+
+        fuzzy = finder._find_by_fuzzy_name('Ящикова', 'Олег')
+        duplicates = finder.find_duplicates({'last_name': 'Ящикова', 'first_name': 'Олег'})
+
+        assert [person.id for person in fuzzy] == [duplicate.id]
+        assert duplicates[0]['person_id'] == duplicate.id
+        assert finder.find_duplicates_batch([{'last_name': 'Ящикова', 'first_name': 'Олег'}]) == [duplicates]
+
+    def test_fuzzy_matches_ordered_by_score(self):
+        """Результаты упорядочены по оценке, а не по порядку в таблице"""
+        far = create_person('Соколовых', 'Олег')
+        close = create_person('Соколов', 'Олег')
+        closest = create_person('Соколова', 'Анна')
+
+        fuzzy = PersonDuplicateFinder()._find_by_fuzzy_name('Соколова', '')
+
+        assert [person.id for person in fuzzy] == [closest.id, close.id, far.id]
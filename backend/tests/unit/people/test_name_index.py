@@ -0,0 +1,87 @@
+"""
+Тесты триграммного индекса имен персон
+"""
+import pytest
+from rapidfuzz import fuzz
+
+from people.models import Person
+from people.name_index import PersonNameIndex, person_name_index
+from people.services import PersonMatchingService
+
+
+class TestPersonNameIndex:
+    """Тесты индекса без обращения к БД"""
+
+    def test_ngrams_are_normalized(self):
+        """Триграммы строятся по нормализованному тексту"""
+        assert PersonNameIndex.ngrams('Ив.') == PersonNameIndex.ngrams('ив')
+        assert ' ив' in PersonNameIndex.ngrams('Иванов')
+
+    def test_candidates_narrow_by_shared_ngrams(self):
+        """В кандидаты попадают только персоны с общими триграммами"""
+        index = PersonNameIndex()
+        index.rebuild([
+            (1, 'director', 'Иванов Иван Иванов И.'),
+            (2, 'director', 'Петров Петр Петров П.'),
+            (3, 'producer', 'Иванова Анна Иванова А.'),
+        ])
+
+        assert set(index.candidates('Иванов', max_candidates=2)) == {1, 3}
+        assert set(index.candidates('Иванов', person_type='producer')) == {3}
+        assert set(index.candidates('Шукшин')) == set()
+
+    def test_search_is_ordered_by_score_then_id(self):
+        """Результаты упорядочены по оценке, при равенстве - по id"""
+        index = PersonNameIndex()
+        index.rebuild([
+            (5, 'director', 'Сидоров Олег Сидоров О.'),
+            (2, 'director', 'Сидоров Олег Сидоров О.'),
+            (7, 'director', 'Сидоренко Олег Сидоренко О.'),
+        ])
+
+        ranked = index.search('Сидоров', scorer=fuzz.partial_ratio)
+
+        assert [person_id for person_id, _ in ranked[:2]] == [2, 5]
+        assert ranked[0][1] >= ranked[-1][1]
+
+
+@pytest.mark.django_db
+class TestPersonNameIndexSignals:
+    """Тесты инкрементального обновления индекса"""
+
+    def test_index_follows_save_and_delete(self):
+        """Индекс обновляется сигналами post_save/post_delete"""
+        person_name_index.rebuild()
+        person = Person.objects.create(
+            person_type='director', last_name='Кончаловский', first_name='Андрей'
+        )
+        assert person.pk in person_name_index.candidates('Кончаловский')
+
+        person.last_name = 'Михалков'
+        person.save()
+        assert person.pk not in person_name_index.candidates('Кончаловский')
+        assert person.pk in person_name_index.candidates('Михалков')
+
+        person.is_active = False
+        person.save()
+        assert person.pk not in person_name_index.candidates('Михалков')
+
+        person.is_active = True
+        person.save()
+        person_id = person.pk
+        person.delete()
+        assert person_id not in person_name_index.candidates('Михалков')
+
+    def test_search_by_name_skips_stale_entries(self):
+        """Записи, измененные в обход сигналов, не попадают в результаты"""
+        active = Person.objects.create(
+            person_type='director', last_name='Тарковский', first_name='Андрей'
+        )
+        hidden = Person.objects.create(
+            person_type='director', last_name='Тарковский', first_name='Арсений'
+        )
+        Person.objects.filter(pk=hidden.pk).update(is_active=False)
+
+        matches = PersonMatchingService().search_by_name('Тарковский')
+
+        assert [match['person'].pk for match in matches] == [active.pk]
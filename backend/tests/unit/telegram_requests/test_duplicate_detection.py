@@ -0,0 +1,202 @@
+from datetime import timedelta
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from telegram_requests.duplicate_config import DuplicateDetectionConfig
+from telegram_requests.duplicate_detection import DuplicateDetectionService
+from telegram_requests.duplicate_index import RequestMinHashIndex
+from telegram_requests.models import Request, RequestDuplicateBucket
+from tests.unit.telegram_requests.factories import RequestFactory
+
+
+TEXT = "Ищем актрису 25-30 лет на главную роль в полнометражном фильме, съемки в Москве в мае"
+SIMILAR_TEXT = "Ищем актрису 25-30 лет на главную роль в полнометражном фильме, съемки в Москве в июне"
+REORDERED_TEXT = "На главную роль в полнометражном фильме ищем актрису 25-30 лет, съемки в Москве в мае"
+OTHER_TEXT = "Нужен каскадер для рекламного ролика автомобиля, опыт вождения обязателен"
+
+
+class RequestMinHashIndexTest(TestCase):
+    """Тесты MinHash/LSH индекса запросов"""
+
+    def setUp(self):
+        self.service = DuplicateDetectionService()
+        self.index = RequestMinHashIndex(time_window_days=7)
+
+    def normalize(self, text):
+        return self.service.normalize_text(text)
+
+    def test_signature_is_deterministic(self):
+        """Сигнатура не зависит от экземпляра индекса"""
+        other = RequestMinHashIndex(time_window_days=7)
+        self.assertEqual(self.index.buckets(self.normalize(TEXT)), other.buckets(self.normalize(TEXT)))
+
+    def test_similar_texts_share_bucket(self):
+        """Похожие и переставленные тексты попадают в общую корзину"""
+        buckets = set(self.index.buckets(self.normalize(TEXT)))
+        self.assertTrue(buckets & set(self.index.buckets(self.normalize(SIMILAR_TEXT))))
+        self.assertTrue(buckets & set(self.index.buckets(self.normalize(REORDERED_TEXT))))
+        self.assertFalse(buckets & set(self.index.buckets(self.normalize(OTHER_TEXT))))
+
+    def test_request_indexed_on_save(self):
+        """Запрос попадает в индекс при сохранении и переиндексируется при смене текста"""
+        request = RequestFactory(text=TEXT)
+        self.assertEqual(
+            set(request.duplicate_buckets.values_list('bucket', flat=True)),
+            set(self.index.buckets(self.normalize(TEXT)))
+        )
+
+        request.text = OTHER_TEXT
+        request.save()
+        self.assertEqual(
+            set(request.duplicate_buckets.values_list('bucket', flat=True)),
+            set(self.index.buckets(self.normalize(OTHER_TEXT)))
+        )
+
+    def test_short_text_not_indexed(self):
+        """Короткие тексты не индексируются"""
+        request = RequestFactory(text="Привет")
+        self.assertFalse(request.duplicate_buckets.exists())
+
+    def test_prune_expired(self):
+        """Корзины запросов вне временного окна удаляются"""
+        old_request = RequestFactory(text=TEXT)
+        fresh_request = RequestFactory(text=OTHER_TEXT)
+        old_date = timezone.now() - timedelta(days=8)
+        Request.objects.filter(pk=old_request.pk).update(created_at=old_date)
+        RequestDuplicateBucket.objects.filter(request=old_request).update(created_at=old_date)
+
+        self.assertGreater(self.index.prune_expired(), 0)
+        self.assertFalse(old_request.duplicate_buckets.exists())
+        self.assertTrue(fresh_request.duplicate_buckets.exists())
+
+
+class DuplicateDetectionServiceIndexTest(TestCase):
+    """Тесты поиска дубликатов через индекс"""
+
+    def setUp(self):
+        self.service = DuplicateDetectionService()
+
+    def test_find_duplicates_uses_index(self):
+        """Находится только похожий запрос из индекса"""
+        original = RequestFactory(text=TEXT)
+        RequestFactory(text=OTHER_TEXT)
+
+        duplicates = self.service.find_duplicates(REORDERED_TEXT)
+
+        self.assertEqual([request.id for request, _ in duplicates], [original.id])
+        self.assertGreaterEqual(duplicates[0][1], self.service.similarity_threshold)
+
+    def test_find_duplicates_excludes_request(self):
+        """Исключенный запрос не считается собственным дубликатом"""
+        original = RequestFactory(text=TEXT)
+        self.assertEqual(self.service.find_duplicates(TEXT, exclude_request_id=original.id), [])
+
+    def test_find_duplicates_ignores_unindexed_requests(self):
+        """Запрос без корзин не находится, пока индекс не перестроен"""
+        original = RequestFactory(text=TEXT)
+        original.duplicate_buckets.all().delete()
+        self.assertEqual(self.service.find_duplicates(SIMILAR_TEXT), [])
+
+        self.service.index_request(original)
+        self.assertEqual([request.id for request, _ in self.service.find_duplicates(SIMILAR_TEXT)], [original.id])
+
+
+class DuplicateFieldsTest(TestCase):
+    """Тесты предвычисленных полей поиска дубликатов"""
+
+    def setUp(self):
+        self.service = DuplicateDetectionService()
+
+    def test_fields_computed_on_save(self):
+        """normalized_text и token_signature заполняются при сохранении"""
+        request = RequestFactory(text=f"  {TEXT.upper()}  ")
+        self.assertEqual(request.normalized_text, self.service.normalize_text(TEXT))
+        self.assertEqual(request.token_signature, self.service.token_signature(request.normalized_text))
+
+        request.text = OTHER_TEXT
+        request.save(update_fields=['text'])
+        request.refresh_from_db()
+        self.assertEqual(request.normalized_text, self.service.normalize_text(OTHER_TEXT))
+
+    def test_skipped_text_has_empty_fields(self):
+        """Короткие тексты и исключения не получают полей"""
+        for text in ["Привет", "[Сообщение без текста] с подписью"]:
+            request = RequestFactory(text=text)
+            self.assertEqual((request.normalized_text, request.token_signature), ("", ""))
+
+    def test_token_signature_ignores_word_order(self):
+        """Сигнатура не зависит от порядка и повторов слов"""
+        self.assertEqual(
+            self.service.token_signature("актер на роль врача"),
+            self.service.token_signature("на роль врача актер актер")
+        )
+        self.assertNotEqual(
+            self.service.token_signature("актер на роль врача"),
+            self.service.token_signature("актриса на роль врача")
+        )
+
+    def test_find_duplicates_by_token_signature(self):
+        """Запрос с тем же набором слов находится даже без корзин LSH"""
+        original = RequestFactory(text=TEXT)
+        original.duplicate_buckets.all().delete()
+
+        duplicates = self.service.find_duplicates(TEXT.upper())
+
+        self.assertEqual([(request.id, similarity) for request, similarity in duplicates], [(original.id, 1.0)])
+
+    def test_all_comparison_methods_supported(self):
+        """Все методы из get_comparison_methods находят дубликат"""
+        original = RequestFactory(text=TEXT)
+        RequestFactory(text=OTHER_TEXT)
+
+        for method in DuplicateDetectionConfig.get_comparison_methods():
+            config = DuplicateDetectionConfig()
+            config.COMPARISON_METHOD = method
+            service = DuplicateDetectionService(config)
+
+            with self.subTest(method=method):
+                self.assertEqual(service.get_scorer().__name__, method)
+                duplicates = service.find_duplicates(SIMILAR_TEXT)
+                self.assertEqual([request.id for request, _ in duplicates], [original.id])
+
+    def test_scores_rounded_to_whole_percent(self):
+        """Оценки округляются до целых, как в fuzzywuzzy: 98.8 проходит порог 99"""
+        original = RequestFactory(text=TEXT)
+        config = DuplicateDetectionConfig()
+        config.SIMILARITY_THRESHOLD = 0.99
+        service = DuplicateDetectionService(config)
+
+        duplicates = service.find_duplicates(REORDERED_TEXT)
+
+        self.assertEqual([(request.id, similarity) for request, similarity in duplicates], [(original.id, 0.99)])
+        self.assertEqual(service.calculate_similarity(TEXT, REORDERED_TEXT), 0.99)
+
+    def test_backfill_migration(self):
+        """Миграция заполняет поля и корзины у запросов, созданных до нее"""
+        request = RequestFactory(text=TEXT)
+        Request.objects.filter(pk=request.pk).update(normalized_text='', token_signature='')
+        request.duplicate_buckets.all().delete()
+
+        migration = import_module('telegram_requests.migrations.0011_backfill_duplicate_fields')
+        migration.fill_duplicate_fields(apps, None)
+
+        request.refresh_from_db()
+        self.assertEqual(request.normalized_text, self.service.normalize_text(TEXT))
+        self.assertEqual(request.token_signature, self.service.token_signature(request.normalized_text))
+        self.assertEqual([found.id for found, _ in self.service.find_duplicates(SIMILAR_TEXT)], [request.id])
+
+    def test_backfill_command(self):
+        """Команда заполняет поля у запросов, сохраненных в обход save"""
+        request = RequestFactory(text=TEXT)
+        Request.objects.filter(pk=request.pk).update(normalized_text='', token_signature='')
+
+        call_command('backfill_duplicate_fields', stdout=StringIO())
+
+        request.refresh_from_db()
+        self.assertEqual(request.normalized_text, self.service.normalize_text(TEXT))
+        self.assertEqual(request.token_signature, self.service.token_signature(request.normalized_text))
@@ -0,0 +1,206 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from telegram_requests.media_ingestion import MediaIngestionQueue
+from telegram_requests.models import RequestFile, RequestImage
+from telegram_requests.rendition_pool import RenditionPool, rendition_pool
+from tests.unit.telegram_requests.factories import RequestFactory
+
+BOT_TOKEN = 'fake_token'
+
+
+def _jpeg_bytes():
+    buffer = BytesIO()
+    Image.new('RGB', (50, 40), color='red').save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+class FakeTelegramFileServer:
+    """Локальный сервер, имитирующий getFile и скачивание файлов Bot API"""
+
+    def __init__(self):
+        self.files = {}
+        self.failures = {}
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append(self.path)
+                parsed = urlparse(self.path)
+
+                if parsed.path == f'/bot{BOT_TOKEN}/getFile':
+                    file_id = parse_qs(parsed.query).get('file_id', [''])[0]
+                    if server.failures.get(file_id, 0) > 0:
+                        server.failures[file_id] -= 1
+                        return self._send(500, b'error')
+                    if file_id not in server.files:
+                        return self._send(200, json.dumps({'ok': False}).encode())
+                    payload = {'ok': True, 'result': {'file_path': server.files[file_id][0]}}
+                    return self._send(200, json.dumps(payload).encode())
+
+                prefix = f'/file/bot{BOT_TOKEN}/'
+                for file_path, content in server.files.values():
+                    if parsed.path == prefix + file_path:
+                        return self._send(200, content)
+                return self._send(404, b'not found')
+
+            def _send(self, code, body):
+                self.send_response(code)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}'
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def add_file(self, file_id, file_path, content):
+        self.files[file_id] = (file_path, content)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class MediaIngestionQueueTest(TestCase):
+    """Тесты фоновой загрузки медиафайлов через локальный сервер Telegram"""
+
+    def setUp(self):
+        self.server = FakeTelegramFileServer().__enter__()
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            TELEGRAM_API_URL=self.server.url,
+            MEDIA_ROOT=self.media_root
+        )
+        self.settings_override.enable()
+        self.env_patch = patch.dict(os.environ, {'BOT_TOKEN': BOT_TOKEN})
+        self.env_patch.start()
+
+        self.queue = MediaIngestionQueue(max_workers=2, max_attempts=3, retry_delay=0)
+        self.request = RequestFactory()
+
+    def tearDown(self):
+        self.queue.shutdown()
+        self.env_patch.stop()
+        self.settings_override.disable()
+        self.server.__exit__()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_enqueue_creates_pending_records(self):
+        """Записи создаются сразу, загрузка ставится в очередь после коммита"""
+        with patch.object(self.queue, 'submit') as mock_submit:
+            with self.captureOnCommitCallbacks(execute=True):
+                images = self.queue.enqueue_images(self.request, [
+                    {'file_id': 'photo_1', 'file_size': 100},
+                    {'file_id': 'photo_2', 'file_size': 200},
+                ])
+                request_file = self.queue.enqueue_document(self.request, {
+                    'file_id': 'doc_1', 'file_name': 'script.pdf',
+                    'mime_type': 'application/pdf', 'file_size': 300,
+                })
+                mock_submit.assert_not_called()
+
+        self.assertEqual([image.ingestion_status for image in images], ['pending', 'pending'])
+        self.assertEqual(request_file.ingestion_status, 'pending')
+        self.assertEqual(request_file.original_filename, 'script.pdf')
+        self.assertEqual(mock_submit.call_count, 3)
+        self.assertEqual(self.server.requests, [])
+
+    def test_ingest_image(self):
+        """Изображение скачивается, версии создаются в пуле процессов"""
+        self.server.add_file('photo_1', 'photos/file_1.jpg', _jpeg_bytes())
+        image = self.queue.enqueue_images(self.request, [{'file_id': 'photo_1'}])[0]
+
+        with patch.object(rendition_pool, 'submit') as mock_submit:
+            self.assertTrue(self.queue.ingest(RequestImage, image.pk))
+
+        mock_submit.assert_called_once_with([image.pk])
+        image.refresh_from_db()
+        self.assertEqual(image.ingestion_status, 'ready')
+        self.assertEqual(image.ingestion_attempts, 1)
+        self.assertTrue(image.image)
+
+        RenditionPool(max_workers=0).generate([image])
+        image.refresh_from_db()
+        self.assertTrue(image.thumbnail)
+
+    def test_ingest_document(self):
+        """Документ сохраняется под оригинальным именем"""
+        self.server.add_file('doc_1', 'documents/file_2', b'document content')
+        request_file = self.queue.enqueue_document(self.request, {
+            'file_id': 'doc_1', 'file_name': 'script.txt', 'mime_type': 'text/plain',
+        })
+
+        self.assertTrue(self.queue.ingest(RequestFile, request_file.pk))
+
+        request_file.refresh_from_db()
+        self.assertEqual(request_file.ingestion_status, 'ready')
+        self.assertEqual(request_file.file_size, len(b'document content'))
+        with request_file.file.open('rb') as stored:
+            self.assertEqual(stored.read(), b'document content')
+
+    def test_ingest_retries_transient_errors(self):
+        """Временные ошибки сервера повторяются"""
+        self.server.add_file('doc_1', 'documents/file_2', b'content')
+        self.server.failures['doc_1'] = 2
+        request_file = self.queue.enqueue_document(self.request, {'file_id': 'doc_1'})
+
+        self.assertTrue(self.queue.ingest(RequestFile, request_file.pk))
+
+        request_file.refresh_from_db()
+        self.assertEqual(request_file.ingestion_status, 'ready')
+        self.assertEqual(request_file.ingestion_attempts, 3)
+
+    def test_ingest_marks_failed_after_attempts(self):
+        """После исчерпания попыток запись помечается как failed"""
+        request_file = self.queue.enqueue_document(self.request, {'file_id': 'missing'})
+
+        self.assertFalse(self.queue.ingest(RequestFile, request_file.pk))
+
+        request_file.refresh_from_db()
+        self.assertEqual(request_file.ingestion_status, 'failed')
+        self.assertEqual(request_file.ingestion_attempts, 3)
+        self.assertTrue(request_file.ingestion_error)
+
+    def test_submit_runs_in_worker_thread(self):
+        """Задача выполняется в потоке пула"""
+        thread_names = []
+
+        def fake_ingest(model, pk):
+            thread_names.append(threading.current_thread().name)
+            return True
+
+        with patch.object(self.queue, 'ingest', side_effect=fake_ingest):
+            self.assertTrue(self.queue.submit(RequestImage, 1).result(timeout=5))
+
+        self.assertTrue(thread_names[0].startswith('media-ingestion'))
+
+    def test_resume_command_requeues_failed(self):
+        """Команда повторяет незавершенные и неудачные загрузки"""
+        self.server.add_file('doc_1', 'documents/file_2', b'content')
+        request_file = self.queue.enqueue_document(self.request, {'file_id': 'doc_1'})
+        RequestFile.objects.filter(pk=request_file.pk).update(ingestion_status='failed')
+
+        with patch('telegram_requests.media_ingestion.MediaIngestionQueue.submit') as mock_submit:
+            call_command('resume_media_ingestion', '--include-failed', stdout=StringIO())
+
+        mock_submit.assert_called_once_with(RequestFile, request_file.pk)
@@ -0,0 +1,120 @@
+import shutil
+import tempfile
+import threading
+from io import BytesIO
+from unittest.mock import patch
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from telegram_requests.image_processing import render_renditions
+from telegram_requests.models import RequestImage
+from telegram_requests.rendition_pool import RenditionPool
+from tests.unit.telegram_requests.factories import RequestFactory
+
+
+def _image_bytes(color='red', size=(2400, 1600)):
+    buffer = BytesIO()
+    Image.new('RGB', size, color=color).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+def _raw_image(request, content):
+    """Запись с исходником без версий, как после загрузки из Telegram"""
+    image = RequestImage.objects.create(request=request, telegram_file_id='file_id')
+    image.image.save('photo.jpg', ContentFile(content), save=False)
+    RequestImage.objects.filter(pk=image.pk).update(image=image.image.name)
+    return image
+
+
+class RenderRenditionsTest(TestCase):
+    """Тесты кодирования версий в дочернем процессе"""
+
+    def test_draft_keeps_requested_size(self):
+        """Быстрое уменьшение JPEG не уменьшает изображение меньше нужного размера"""
+        specs = [('thumbnail', (300, 300), None), ('optimized', (1200, 1200), 85)]
+        rendered = render_renditions(_image_bytes(), specs)
+
+        with Image.open(BytesIO(rendered[('thumbnail', (300, 300))])) as img:
+            self.assertEqual(img.size, (300, 300))
+        with Image.open(BytesIO(rendered[('optimized', (1200, 1200))])) as img:
+            self.assertEqual(img.size, (1200, 800))
+
+    def test_invalid_image(self):
+        """Нечитаемое изображение возвращает None вместо исключения"""
+        rendered = render_renditions(b'not an image', [('thumbnail', (300, 300), None)])
+        self.assertIsNone(rendered[('thumbnail', (300, 300))])
+
+
+class RenditionPoolTest(TestCase):
+    """Тесты пакетной генерации версий"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.request = RequestFactory()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_generate_in_process_pool(self):
+        """Альбом обрабатывается в дочерних процессах"""
+        images = [_raw_image(self.request, _image_bytes(color)) for color in ('red', 'green', 'blue')]
+        pool = RenditionPool(max_workers=2)
+        try:
+            self.assertEqual(pool.generate(images), 3)
+        finally:
+            pool.shutdown()
+
+        for image in images:
+            image.refresh_from_db()
+            self.assertTrue(image.image.name.startswith('renditions/'))
+            self.assertTrue(default_storage.exists(image.thumbnail.name))
+
+    def test_identical_images_rendered_once(self):
+        """Одинаковые фото в пачке кодируются один раз"""
+        content = _image_bytes()
+        images = [_raw_image(self.request, content) for _ in range(3)]
+        pool = RenditionPool(max_workers=0)
+
+        with patch(
+            'telegram_requests.rendition_pool.render_renditions', wraps=render_renditions
+        ) as mock_render:
+            self.assertEqual(pool.generate(images), 3)
+
+        self.assertEqual(mock_render.call_count, 1)
+        self.assertEqual(len({image.thumbnail.name for image in images}), 1)
+        # Повторная обработка готовых записей ничего не кодирует
+        self.assertEqual(pool.generate(images), 0)
+
+    def test_failed_image_is_left_untouched(self):
+        """Нечитаемое изображение не мешает обработке остальных"""
+        broken = _raw_image(self.request, b'not an image')
+        valid = _raw_image(self.request, _image_bytes())
+        broken_name = broken.image.name
+
+        self.assertEqual(RenditionPool(max_workers=0).generate([broken, valid]), 1)
+
+        broken.refresh_from_db()
+        self.assertEqual(broken.image.name, broken_name)
+        self.assertFalse(broken.thumbnail)
+
+    def test_submit_runs_in_background(self):
+        """Фоновая задача загружает записи по ID и обрабатывает их"""
+        pool = RenditionPool(max_workers=0)
+        thread_names = []
+
+        def fake_generate(images):
+            thread_names.append(threading.current_thread().name)
+            return 2
+
+        with patch.object(pool, 'generate', side_effect=fake_generate) as mock_generate:
+            self.assertEqual(pool.submit([1, 2]).result(timeout=5), 2)
+        pool.shutdown()
+
+        self.assertEqual(mock_generate.call_args[0][0].model, RequestImage)
+        self.assertTrue(thread_names[0].startswith('renditions'))
@@ -0,0 +1,128 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest.mock import patch
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from telegram_requests.image_processing import image_processing_service
+from telegram_requests.media_cache import MediaCacheService
+from telegram_requests.models import RequestImage
+from telegram_requests.renditions import ImageRenditionService
+from tests.unit.telegram_requests.factories import RequestFactory
+
+
+def _image_bytes(color='red', size=(800, 600)):
+    buffer = BytesIO()
+    Image.new('RGB', size, color=color).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+class ImageRenditionServiceTest(TestCase):
+    """Тесты кэша версий изображений"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.service = ImageRenditionService()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_rendition_generated_once(self):
+        """Повторный запрос той же версии не кодирует изображение заново"""
+        content = _image_bytes()
+
+        with patch.object(
+            image_processing_service, 'create_thumbnail',
+            wraps=image_processing_service.create_thumbnail
+        ) as mock_thumbnail:
+            first = self.service.get_rendition(ContentFile(content), 'thumbnail')
+            second = self.service.get_rendition(ContentFile(content), 'thumbnail')
+
+        self.assertEqual(first, second)
+        self.assertEqual(mock_thumbnail.call_count, 1)
+        self.assertTrue(first.startswith('renditions/'))
+        with default_storage.open(first) as thumbnail, Image.open(thumbnail) as img:
+            self.assertEqual(img.size, (300, 300))
+
+    def test_different_sizes_are_separate_renditions(self):
+        """Каждый размер хранится отдельно"""
+        content = _image_bytes()
+        small = self.service.get_rendition(ContentFile(content), 'thumbnail', size=(100, 100))
+        large = self.service.get_rendition(ContentFile(content), 'thumbnail', size=(200, 200))
+        self.assertNotEqual(small, large)
+
+    def test_identical_uploads_are_deduplicated(self):
+        """Одинаковые фото в разных запросах используют общие файлы"""
+        content = _image_bytes('blue')
+        first = RequestImage.objects.create(
+            request=RequestFactory(), image=ContentFile(content, name='photo.jpg')
+        )
+        second = RequestImage.objects.create(
+            request=RequestFactory(), image=ContentFile(content, name='photo.jpg')
+        )
+
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(first.thumbnail.name, second.thumbnail.name)
+        self.assertTrue(default_storage.exists(first.image.name))
+        # Исходники удалены, остались только версии
+        originals = [
+            filename
+            for _, _, filenames in os.walk(os.path.join(self.media_root, 'requests', 'images'))
+            for filename in filenames
+        ]
+        self.assertEqual(originals, [])
+
+    def test_cleanup_removes_only_old_orphans(self):
+        """Удаляются только старые версии без ссылок; версии записей остаются"""
+        orphan = self.service.get_rendition(ContentFile(_image_bytes('red')), 'optimized')
+        fresh_orphan = self.service.get_rendition(ContentFile(_image_bytes('green')), 'optimized')
+        referenced = RequestImage.objects.create(
+            request=RequestFactory(), image=ContentFile(_image_bytes('blue'), name='photo.jpg')
+        )
+        for name in (orphan, referenced.image.name, referenced.thumbnail.name):
+            os.utime(default_storage.path(name), (1, 1))
+
+        deleted = self.service.cleanup_orphans(min_age_hours=1)
+
+        self.assertEqual(deleted, 1)
+        self.assertFalse(default_storage.exists(orphan))
+        self.assertTrue(default_storage.exists(fresh_orphan))
+        self.assertTrue(default_storage.exists(referenced.image.name))
+        self.assertTrue(default_storage.exists(referenced.thumbnail.name))
+
+    def test_store_does_not_scan_storage(self):
+        """Сохранение версии не обходит каталог версий"""
+        with patch('telegram_requests.renditions.os.walk') as mock_walk:
+            self.service.get_rendition(ContentFile(_image_bytes()), 'thumbnail')
+
+        mock_walk.assert_not_called()
+
+    def test_cleanup_command(self):
+        orphan = self.service.get_rendition(ContentFile(_image_bytes('red')), 'thumbnail')
+
+        call_command('cleanup_renditions', '--min-age-hours', '0', stdout=StringIO())
+
+        self.assertFalse(default_storage.exists(orphan))
+
+    def test_media_cache_service_uses_renditions(self):
+        """MediaCacheService отдает версии из общего кэша"""
+        path = os.path.join(self.media_root, 'source.jpg')
+        with open(path, 'wb') as f:
+            f.write(_image_bytes())
+
+        thumbnail_path = MediaCacheService.create_thumbnail(path)
+        optimized_path = MediaCacheService.optimize_image(path)
+
+        self.assertTrue(thumbnail_path.startswith(os.path.join(self.media_root, 'renditions')))
+        self.assertTrue(os.path.exists(optimized_path))
+        self.assertEqual(MediaCacheService.create_thumbnail(path), thumbnail_path)
+        self.assertEqual(len(MediaCacheService.get_file_hash(path)), 32)
@@ -6,7 +6,7 @@ from django.test import TestCase
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.files.base import ContentFile
 
-from telegram_requests.services import TelegramFileService
+from telegram_requests.services import TelegramFileService, get_http_session
 from telegram_requests.models import Request, RequestImage, RequestFile
 from tests.unit.telegram_requests.factories import RequestFactory
 from tests.unit.users.factories import AgentFactory
@@ -18,7 +18,8 @@ class TelegramFileServiceTest(TestCase):
     def setUp(self):
         self.agent = AgentFactory()
         self.request = RequestFactory(created_by=self.agent)
-        self.service = TelegramFileService(bot_token="test_token")
+        self.session = Mock()
+        self.service = TelegramFileService(bot_token="test_token", session=self.session)
         
     def test_init_without_token(self):
         """Тест инициализации без токена"""
@@ -32,9 +33,9 @@ class TelegramFileServiceTest(TestCase):
         self.assertEqual(service.bot_token, "test_token")
         self.assertEqual(service.api_url, "https://api.telegram.org/bottest_token")
     
-    @patch('telegram_requests.services.requests.get')
-    def test_get_file_path_success(self, mock_get):
+    def test_get_file_path_success(self):
         """Тест успешного получения пути к файлу"""
+        mock_get = self.session.get
         # Настраиваем мок
         mock_response = Mock()
         mock_response.json.return_value = {
@@ -57,9 +58,9 @@ class TelegramFileServiceTest(TestCase):
             timeout=10
         )
     
-    @patch('telegram_requests.services.requests.get')
-    def test_get_file_path_failure(self, mock_get):
+    def test_get_file_path_failure(self):
         """Тест неудачного получения пути к файлу"""
+        mock_get = self.session.get
         # Настраиваем мок
         mock_response = Mock()
         mock_response.json.return_value = {'ok': False}
@@ -72,9 +73,9 @@ class TelegramFileServiceTest(TestCase):
         # Проверяем
         self.assertIsNone(result)
     
-    @patch('telegram_requests.services.requests.get')
-    def test_get_file_path_network_error(self, mock_get):
+    def test_get_file_path_network_error(self):
         """Тест ошибки сети при получении пути к файлу"""
+        mock_get = self.session.get
         # Настраиваем мок для вызова исключения
         from requests import RequestException
         mock_get.side_effect = RequestException("Network error")
@@ -85,9 +86,9 @@ class TelegramFileServiceTest(TestCase):
         # Проверяем
         self.assertIsNone(result)
     
-    @patch('telegram_requests.services.requests.get')
-    def test_download_file_success(self, mock_get):
+    def test_download_file_success(self):
         """Тест успешного скачивания файла"""
+        mock_get = self.session.get
         # Настраиваем мок
         test_content = b"test file content"
         mock_response = Mock()
@@ -105,9 +106,9 @@ class TelegramFileServiceTest(TestCase):
             timeout=30
         )
     
-    @patch('telegram_requests.services.requests.get')
-    def test_download_file_network_error(self, mock_get):
+    def test_download_file_network_error(self):
         """Тест ошибки сети при скачивании файла"""
+        mock_get = self.session.get
         # Настраиваем мок для вызова исключения
         from requests import RequestException
         mock_get.side_effect = RequestException("Network error")
@@ -151,12 +152,74 @@ class TelegramFileServiceTest(TestCase):
         # Проверяем
         self.assertIsNone(result)
     
-    @patch.object(TelegramFileService, 'download_telegram_file')
+    def _streaming_response(self, chunks, headers=None):
+        """Мок потокового ответа requests"""
+        response = MagicMock()
+        response.__enter__.return_value = response
+        response.headers = headers or {}
+        response.iter_content.return_value = iter(chunks)
+        return response
+    
+    def test_stream_file_success(self):
+        """Тест потокового скачивания во временный файл"""
+        self.session.get.return_value = self._streaming_response([b"abc", b"def"])
+        
+        result = self.service.stream_file("documents/file_1.txt")
+        
+        self.assertEqual(result.read(), b"abcdef")
+        self.assertEqual(result.name, "file_1.txt")
+        result.close()
+        self.session.get.assert_called_once_with(
+            "https://api.telegram.org/file/bottest_token/documents/file_1.txt",
+            stream=True,
+            timeout=30
+        )
+        self.session.get.return_value.iter_content.assert_called_once_with(
+            chunk_size=TelegramFileService.CHUNK_SIZE
+        )
+    
+    def test_stream_file_stops_at_max_size(self):
+        """Скачивание прерывается, как только превышен лимит"""
+        chunk = b"x" * (512 * 1024)
+        chunks = iter([chunk] * 10)
+        self.session.get.return_value = self._streaming_response(chunks)
+        
+        result = self.service.stream_file("documents/big.bin", max_size_mb=1)
+        
+        self.assertIsNone(result)
+        # Третий блок превысил лимит, остальные не читались
+        self.assertEqual(len(list(chunks)), 7)
+    
+    def test_stream_file_rejects_large_content_length(self):
+        """Файл с Content-Length больше лимита не скачивается"""
+        response = self._streaming_response([b"x"], headers={'Content-Length': str(2 * 1024 * 1024)})
+        self.session.get.return_value = response
+        
+        self.assertIsNone(self.service.stream_file("documents/big.bin", max_size_mb=1))
+        response.iter_content.assert_not_called()
+    
+    @patch.object(TelegramFileService, 'stream_file')
+    @patch.object(TelegramFileService, 'get_file_info')
+    def test_open_telegram_file_skips_large_by_metadata(self, mock_info, mock_stream):
+        """Размер из getFile проверяется до скачивания"""
+        mock_info.return_value = {'file_path': 'documents/big.bin', 'file_size': 30 * 1024 * 1024}
+        
+        self.assertIsNone(self.service.open_telegram_file("test_file_id", max_size_mb=20))
+        mock_stream.assert_not_called()
+    
+    def test_default_session_is_shared(self):
+        """Сервисы без явной сессии используют общий пул соединений"""
+        first = TelegramFileService(bot_token="test_token")
+        second = TelegramFileService(bot_token="other_token")
+        self.assertIs(first.session, second.session)
+        self.assertIs(first.session, get_http_session())
+    
+    @patch.object(TelegramFileService, 'open_telegram_file')
     def test_save_image_from_telegram_success(self, mock_download):
         """Тест успешного сохранения изображения"""
         # Настраиваем мок
         test_content = b"fake image content"
-        mock_download.return_value = (test_content, "test_image.jpg")
+        mock_download.return_value = (ContentFile(test_content), "test_image.jpg")
         
         # Тестируем
         result = self.service.save_image_from_telegram("test_file_id", self.request)
@@ -173,7 +236,7 @@ class TelegramFileServiceTest(TestCase):
         self.assertTrue(result.image)
         self.assertTrue(result.image.name.endswith('.jpg'))
     
-    @patch.object(TelegramFileService, 'download_telegram_file')
+    @patch.object(TelegramFileService, 'open_telegram_file')
     def test_save_image_from_telegram_failure(self, mock_download):
         """Тест неудачного сохранения изображения"""
         # Настраиваем мок для возврата None
@@ -185,12 +248,12 @@ class TelegramFileServiceTest(TestCase):
         # Проверяем
         self.assertIsNone(result)
     
-    @patch.object(TelegramFileService, 'download_telegram_file')
+    @patch.object(TelegramFileService, 'open_telegram_file')
     def test_save_document_from_telegram_success(self, mock_download):
         """Тест успешного сохранения документа"""
         # Настраиваем мок
         test_content = b"fake document content"
-        mock_download.return_value = (test_content, "test_document.pdf")
+        mock_download.return_value = (ContentFile(test_content), "test_document.pdf")
         
         document_data = {
             'file_id': 'test_file_id',
@@ -215,7 +278,7 @@ class TelegramFileServiceTest(TestCase):
         # Проверяем, что файл был сохранен
         self.assertTrue(result.file)
     
-    @patch.object(TelegramFileService, 'download_telegram_file')
+    @patch.object(TelegramFileService, 'open_telegram_file')
     def test_save_document_from_telegram_failure(self, mock_download):
         """Тест неудачного сохранения документа"""
         # Настраиваем мок для возврата None
@@ -241,6 +304,7 @@ class TelegramFileServiceIntegrationTest(TestCase):
     def setUp(self):
         self.agent = AgentFactory()
         self.request = RequestFactory(created_by=self.agent)
+        self.session = Mock()
     
     def test_service_initialization(self):
         """Тест инициализации сервиса"""
@@ -253,9 +317,9 @@ class TelegramFileServiceIntegrationTest(TestCase):
         service = TelegramFileService(bot_token="test_token")
         self.assertEqual(service.api_url, "https://api.telegram.org/bottest_token")
     
-    @patch('telegram_requests.services.requests.get')
-    def test_full_workflow_success(self, mock_get):
+    def test_full_workflow_success(self):
         """Тест полного рабочего процесса успешного скачивания"""
+        mock_get = self.session.get
         # Настраиваем моки для полного цикла
         # 1. getFile
         mock_response_1 = Mock()
@@ -274,7 +338,7 @@ class TelegramFileServiceIntegrationTest(TestCase):
         mock_get.side_effect = [mock_response_1, mock_response_2]
         
         # Создаем сервис и тестируем
-        service = TelegramFileService(bot_token="test_token")
+        service = TelegramFileService(bot_token="test_token", session=self.session)
         
         # Тестируем полный процесс
         result = service.download_telegram_file("test_file_id")
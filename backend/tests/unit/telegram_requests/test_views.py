@@ -359,19 +359,14 @@ class TelegramWebhookViewSetTest(APITestCase):
         request = Request.objects.get(id=request_id)
         self.assertEqual(request.text, webhook_data['message']['text'])
     
-    @patch('telegram_requests.views.TelegramFileService')
-    def test_webhook_photo_message(self, mock_service_class):
+    @patch('telegram_requests.views.media_ingestion_queue.submit')
+    def test_webhook_photo_message(self, mock_submit):
         """Тест webhook с сообщением с фотографией"""
-        # Настраиваем мок сервиса
-        mock_service = Mock()
-        mock_service_class.return_value = mock_service
-        mock_request_image = Mock()
-        mock_service.save_image_from_telegram.return_value = mock_request_image
-        
         webhook_data = TelegramWebhookDataFactory.create_photo_message()
         
         url = '/api/webhook/telegram/webhook/'
-        response = self.client.post(url, webhook_data, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, webhook_data, format='json')
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['status'], 'ok')
@@ -381,23 +376,20 @@ class TelegramWebhookViewSetTest(APITestCase):
         request = Request.objects.get(id=request_id)
         self.assertTrue(request.has_images)
         
-        # Проверяем, что сервис был вызван для скачивания изображения
-        mock_service_class.assert_called_once()
-        mock_service.save_image_from_telegram.assert_called_once()
+        # Изображения ждут фоновой загрузки и поставлены в очередь
+        images = list(request.images.all())
+        self.assertTrue(images)
+        self.assertTrue(all(image.ingestion_status == 'pending' for image in images))
+        self.assertEqual(mock_submit.call_count, len(images))
     
-    @patch('telegram_requests.views.TelegramFileService')
-    def test_webhook_document_message(self, mock_service_class):
+    @patch('telegram_requests.views.media_ingestion_queue.submit')
+    def test_webhook_document_message(self, mock_submit):
         """Тест webhook с сообщением с документом"""
-        # Настраиваем мок сервиса
-        mock_service = Mock()
-        mock_service_class.return_value = mock_service
-        mock_request_file = Mock()
-        mock_service.save_document_from_telegram.return_value = mock_request_file
-        
         webhook_data = TelegramWebhookDataFactory.create_document_message()
         
         url = '/api/webhook/telegram/webhook/'
-        response = self.client.post(url, webhook_data, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, webhook_data, format='json')
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['status'], 'ok')
@@ -407,9 +399,11 @@ class TelegramWebhookViewSetTest(APITestCase):
         request = Request.objects.get(id=request_id)
         self.assertTrue(request.has_files)
         
-        # Проверяем, что сервис был вызван для скачивания документа
-        mock_service_class.assert_called_once()
-        mock_service.save_document_from_telegram.assert_called_once()
+        # Документ ждет фоновой загрузки и поставлен в очередь
+        request_file = request.files.get()
+        self.assertEqual(request_file.ingestion_status, 'pending')
+        self.assertEqual(request_file.original_filename, webhook_data['message']['document']['file_name'])
+        mock_submit.assert_called_once_with(RequestFile, request_file.pk)
     
     def test_webhook_empty_message(self):
         """Тест webhook с пустым сообщением"""
@@ -37,12 +37,12 @@ class ArtistsService {
   }
 
   /**
-   * Получить артистов по навыкам
+   * Получить артистов, обладающих всеми указанными навыками (первая страница)
    */
   async getArtistsBySkills(skillIds: number[]): Promise<Artist[]> {
     const skillIdsString = skillIds.join(',');
-    const response = await apiClient.get(`${this.baseUrl}by-skills/?skill_ids=${skillIdsString}`);
-    return response.data;
+    const response = await apiClient.get(`${this.baseUrl}by_skills/?skill_ids=${skillIdsString}`);
+    return response.data.results || response.data;
   }
 
   /**
@@ -1,10 +1,12 @@
 // Сервис для работы с LLM
 
 import api from './api';
+import { API_BASE_URL } from '../config/api';
 import { ErrorHandler } from '../utils/errorHandler';
 import type { 
   LLMAnalysisResponse, 
   LLMAnalysisResult,
+  LLMAnalysisStreamHandlers,
   LLMStatus,
   AnalysisStatus,
   LLMConfig,
@@ -14,6 +16,34 @@ import type {
   DatasetExportResponse
 } from '../types/llm';
 
+const ANALYSIS_POLL_INTERVAL_MS = 1500;
+const ANALYSIS_POLL_TIMEOUT_MS = 5 * 60 * 1000;
+
+// Ожидание фоновой задачи анализа (ответ 202 от /analyze/)
+export async function waitForAnalysisJob(requestId: number, jobId: string): Promise<any> {
+  const deadline = Date.now() + ANALYSIS_POLL_TIMEOUT_MS;
+
+  while (Date.now() < deadline) {
+    const response = await api.get<any>(
+      `/requests/${requestId}/analysis-status/`,
+      { params: { job_id: jobId } }
+    );
+    const job = response.data.job;
+
+    if (job?.status === 'completed') {
+      return job.result;
+    }
+    if (job?.status === 'failed') {
+      // Формат ошибки совпадает с синхронным ответом, чтобы работала общая обработка
+      throw { response: { status: job.http_status || 500, data: job.result } };
+    }
+
+    await new Promise(resolve => setTimeout(resolve, ANALYSIS_POLL_INTERVAL_MS));
+  }
+
+  throw new Error('Превышено время ожидания анализа запроса');
+}
+
 export class LLMService {
   // Анализ запроса через LLM
   static async analyzeRequest(requestId: number, useEmulator: boolean = true): Promise<LLMAnalysisResult> {
@@ -22,6 +52,10 @@ export class LLMService {
         `/requests/${requestId}/analyze/`,
         { use_emulator: useEmulator }
       );
+
+      if (response.status === 202) {
+        response.data = await waitForAnalysisJob(requestId, response.data.job_id);
+      }
       
       console.log('LLM Response:', response.data);
       
@@ -59,6 +93,79 @@ export class LLMService {
     }
   }
 
+  // Потоковый анализ: поля проекта и роли приходят по мере генерации ответа.
+  // EventSource не передает заголовок авторизации, поэтому SSE читается через fetch
+  static async streamAnalysis(
+    requestId: number,
+    handlers: LLMAnalysisStreamHandlers = {},
+    forceRefresh: boolean = false
+  ): Promise<LLMAnalysisResult> {
+    const token = localStorage.getItem('access_token');
+    const response = await fetch(`${API_BASE_URL}/requests/${requestId}/analyze/stream/`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        Accept: 'text/event-stream',
+        ...(token ? { Authorization: `Bearer ${token}` } : {}),
+      },
+      body: JSON.stringify({ force_refresh: forceRefresh }),
+    });
+
+    if (!response.ok || !response.body) {
+      throw new Error(`Ошибка потокового анализа: ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) {
+        break;
+      }
+      buffer += decoder.decode(value, { stream: true });
+
+      let boundary = buffer.indexOf('\n\n');
+      while (boundary !== -1) {
+        const block = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        boundary = buffer.indexOf('\n\n');
+
+        let event = 'message';
+        let data = '';
+        for (const line of block.split('\n')) {
+          if (line.startsWith('event: ')) {
+            event = line.slice(7);
+          } else if (line.startsWith('data: ')) {
+            data += line.slice(6);
+          }
+        }
+        const payload = data ? JSON.parse(data) : {};
+
+        switch (event) {
+          case 'field':
+            handlers.onField?.(payload.field, payload.value);
+            break;
+          case 'role':
+            handlers.onRole?.(payload.index, payload.role);
+            break;
+          case 'contacts':
+            handlers.onContacts?.(payload);
+            break;
+          case 'result':
+            return payload as LLMAnalysisResult;
+          case 'error': {
+            const details = payload.details ? `\n\nДетали: ${payload.details}` : '';
+            throw new Error(`${payload.error || 'Ошибка анализа запроса'}${details}`);
+          }
+        }
+      }
+    }
+
+    throw new Error('Поток анализа завершился без результата');
+  }
+
   // Получение статуса анализа запроса
   static async getAnalysisStatus(requestId: number): Promise<AnalysisStatus> {
     try {
@@ -1,6 +1,7 @@
 import api from './api';
 import type { RequestListItem } from '../types';
 import type { LLMAnalysisResponse, RequestAnalysisStatus } from '../types/llm';
+import { waitForAnalysisJob } from './llm';
 
 export interface RequestsResponse {
   count: number;
@@ -60,6 +61,10 @@ class RequestsService {
     const response = await api.post<LLMAnalysisResponse>(`/requests/${id}/analyze/`, {
       use_emulator: useEmulator
     });
+    if (response.status === 202) {
+      // Анализ через OpenAI выполняется в фоне, ждем результат задачи
+      return waitForAnalysisJob(id, (response.data as any).job_id);
+    }
     return response.data;
   }
 
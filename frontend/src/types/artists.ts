@@ -41,6 +41,7 @@ export interface ArtistSearchParams {
   height_min?: number;
   height_max?: number;
   skill_ids?: string;
+  skills_match?: 'any' | 'all';
   hair_color?: string;
   eye_color?: string;
   body_type?: string;
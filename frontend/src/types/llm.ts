@@ -92,6 +92,13 @@ export interface LLMStatus {
   error_message?: string;
 }
 
+// Обработчики событий потокового анализа (/analyze/stream/)
+export interface LLMAnalysisStreamHandlers {
+  onField?: (field: string, value: any) => void;
+  onRole?: (index: number, role: ProjectRole) => void;
+  onContacts?: (contacts: ProjectContacts) => void;
+}
+
 export interface LLMConfig {
   model: string;
   temperature: number;